@@ -52,6 +52,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'tickets.middleware.QueryCountMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -161,9 +162,45 @@ LOGIN_URL = 'login'
 
 # Session Configuration
 SESSION_COOKIE_AGE = 1800  # 30 minutes in seconds
-SESSION_SAVE_EVERY_REQUEST = True
+# A expiração por inatividade é renovada pelo SessionTimeoutMiddleware, que
+# regrava a sessão no máximo a cada SESSION_REFRESH_SECONDS (não em todo request).
+SESSION_SAVE_EVERY_REQUEST = False
+SESSION_REFRESH_SECONDS = 60
 SESSION_EXPIRE_AT_BROWSER_CLOSE = True
 
+# Queries por request no header X-DB-Queries (QueryCountMiddleware): desligado
+# por padrão (expõe detalhe interno) — usuários staff sempre recebem; acima de
+# QUERY_COUNT_WARN o request é logado como aviso.
+QUERY_COUNT_HEADER = os.environ.get('QUERY_COUNT_HEADER', '0') == '1'
+QUERY_COUNT_WARN = int(os.environ.get('QUERY_COUNT_WARN', '50'))
+
+# Tools só de leitura pedidas juntas pelo Jota4 rodam em paralelo (ai_service.py):
+# threads por processo e tempo máximo de espera por tool.
+AI_TOOL_WORKERS = int(os.environ.get('AI_TOOL_WORKERS', '4'))
+AI_TOOL_TIMEOUT_SECONDS = float(os.environ.get('AI_TOOL_TIMEOUT_SECONDS', '20'))
+
+# Agendas da tela "Local" ficam em cache por até tantos segundos (technician_agenda.py).
+LOCAL_AGENDA_CACHE_SECONDS = int(os.environ.get('LOCAL_AGENDA_CACHE_SECONDS', '30'))
+
+# Tokens da API (api_tokens.py): dono do token em cache por tantos segundos, e
+# limite de requests por token por minuto (0 desliga). Sem CACHE_REDIS_URL o
+# cache é um por processo: o limite vale por worker do gunicorn (até
+# workers x API_TOKEN_RATE_LIMIT no total) e um token revogado ainda passa na
+# API por até API_TOKEN_CACHE_SECONDS nos outros workers.
+API_TOKEN_CACHE_SECONDS = int(os.environ.get('API_TOKEN_CACHE_SECONDS', '60'))
+API_TOKEN_RATE_LIMIT = int(os.environ.get('API_TOKEN_RATE_LIMIT', '600'))
+
+# Cache compartilhado entre os processos (contagem de requests da API, versões
+# de invalidação dos caches em tickets/). Vazio = LocMemCache, um por processo.
+CACHE_REDIS_URL = os.environ.get('CACHE_REDIS_URL', '')
+if CACHE_REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': CACHE_REDIS_URL,
+        }
+    }
+
 MS_TENANT_ID = os.environ.get('MS_TENANT_ID', '')
 MS_CLIENT_ID = os.environ.get('MS_CLIENT_ID', '')
 MS_CLIENT_SECRET = os.environ.get('MS_CLIENT_SECRET', '')
@@ -173,6 +210,13 @@ CLIENTS_SHAREPOINT_URL = os.environ.get(
     'https://jumperfour.sharepoint.com/:x:/r/sites/LeanKeep/_layouts/15/Doc.aspx?sourcedoc=%7BC9B80D9D-3D50-4E8B-AD2A-4FFC40EF7E1A%7D&file=APANHADO%20DE%20CLIENTES%20LEANKEEP.xlsx&fromShare=true&action=default&mobileredirect=true',
 )
 
+# Pub/sub do canal em tempo real (tickets/realtime.py). Vazio = em memória, só
+# dentro do processo — em produção o gunicorn (WSGI) e o serviço ASGI de
+# /realtime/ são processos diferentes, então aponte para um Redis.
+REALTIME_REDIS_URL = os.environ.get('REALTIME_REDIS_URL', '')
+# Sem Redis, o /realtime/ só abre o stream se tudo roda num processo só (dev).
+REALTIME_SINGLE_PROCESS = os.environ.get('REALTIME_SINGLE_PROCESS', '0') == '1'
+
 # Sem isso, logger.info(...) do módulo `tickets` (tempos de resposta da IA/TTS)
 # eram descartados silenciosamente pelo logging padrão do Django (raiz em WARNING).
 LOGGING = {
@@ -0,0 +1,105 @@
+"""
+Contexto enviado ao modelo a cada mensagem do Chat IA (Jota4).
+
+As mensagens montadas aqui seguem sempre a mesma ordem:
+
+1. SYSTEM_PROMPT puro — idêntico byte a byte em todos os turnos e para todos
+   os usuários. É o prefixo que os providers reaproveitam do cache de prompt
+   (automático na OpenAI/DeepSeek; marcado com cache_control na Anthropic,
+   ver ai_service.py), junto com as TOOL_DEFINITIONS que vêm antes dele.
+2. Contexto do turno (usuário, memória, data/hora, voz...) + o resumo das
+   mensagens antigas da conversa.
+3. Só as mensagens ainda não resumidas.
+
+Quando as mensagens não resumidas passam de HISTORY_WINDOW + COMPACT_BATCH,
+`compact_if_needed()` (chamado depois que a resposta já foi entregue) resume as
+mais antigas em AIChatSession.digest, deixando as HISTORY_WINDOW mais recentes
+na íntegra. Assim o histórico enviado fica limitado e a leitura do banco é só
+das mensagens depois de AIChatSession.digest_until.
+"""
+import logging
+
+from .ai_service import run_agent
+from .ai_tools import SYSTEM_PROMPT
+from .models import AIChatSession
+
+logger = logging.getLogger(__name__)
+
+HISTORY_WINDOW = 12
+COMPACT_BATCH = 8
+DIGEST_MAX_CHARS = 3000
+# Linhas do resumo de reserva (sem IA), quando o provider falha ao resumir.
+FALLBACK_LINE_CHARS = 200
+
+DIGEST_PROMPT = (
+    "Você resume conversas entre um usuário e o Jota4, assistente do sistema de Ordens de Serviço "
+    "JumperFour. Atualize o resumo existente com as mensagens novas: mantenha só o que for útil para "
+    "continuar a conversa (OS, clientes, equipamentos, decisões tomadas, pedidos pendentes, combinados "
+    "com o usuário), em tópicos curtos e sem inventar nada. No máximo 250 palavras. Responda apenas "
+    "com o resumo atualizado."
+)
+
+
+def load_history(session):
+    """Mensagens de usuário/assistente ainda não resumidas, da mais antiga para a
+    mais nova — no máximo HISTORY_WINDOW + COMPACT_BATCH (uma query)."""
+    rows = list(
+        session.messages
+        .filter(pk__gt=session.digest_until, role__in=('user', 'assistant'))
+        .order_by('-pk')
+        .values('id', 'role', 'content')[:HISTORY_WINDOW + COMPACT_BATCH]
+    )
+    rows.reverse()
+    return rows
+
+
+def build_messages(turn_context, digest, history):
+    """Lista de mensagens para run_agent/stream_agent (ver a ordem no topo do módulo)."""
+    context = turn_context.strip()
+    if digest:
+        context += f"\n\nRESUMO DO INÍCIO DESTA CONVERSA (mensagens antigas, já resumidas):\n{digest}"
+    return [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {"role": "system", "content": context},
+    ] + [{"role": m["role"], "content": m["content"]} for m in history]
+
+
+def _transcript(messages):
+    return "\n".join(
+        f"{'Usuário' if m['role'] == 'user' else 'Jota4'}: {m['content']}" for m in messages
+    )
+
+
+def _fallback_digest(digest, messages):
+    lines = [
+        f"{'Usuário' if m['role'] == 'user' else 'Jota4'}: {' '.join(m['content'].split())[:FALLBACK_LINE_CHARS]}"
+        for m in messages
+    ]
+    return "\n".join(filter(None, [digest] + lines))[-DIGEST_MAX_CHARS:]
+
+
+def _summarize(config, digest, messages):
+    prompt = [
+        {"role": "system", "content": DIGEST_PROMPT},
+        {"role": "user", "content": (
+            f"RESUMO ATUAL:\n{digest or '(vazio)'}\n\nMENSAGENS NOVAS:\n{_transcript(messages)}"
+        )},
+    ]
+    text = run_agent(config, prompt, [], lambda name, args: {}, expose_errors=False).strip()
+    if not text or text.startswith("⚠️"):
+        logger.warning("Resumo da conversa via IA falhou; usando resumo simples.")
+        return _fallback_digest(digest, messages)
+    return text[:DIGEST_MAX_CHARS]
+
+
+def compact_if_needed(session, config):
+    """Resume as mensagens antigas da sessão se já passaram do limite. Retorna True se resumiu."""
+    history = load_history(session)
+    if len(history) < HISTORY_WINDOW + COMPACT_BATCH:
+        return False
+    older = history[:-HISTORY_WINDOW]
+    digest = _summarize(config, session.digest, older)
+    # update() em vez de save(): não mexe em updated_at (ordem das sessões no histórico).
+    AIChatSession.objects.filter(pk=session.pk).update(digest=digest, digest_until=older[-1]['id'])
+    session.digest, session.digest_until = digest, older[-1]['id']
+    return True
@@ -4,7 +4,14 @@ Executa o loop de agente: envia mensagens → processa tool calls → retorna re
 """
 import json
 import logging
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+
+from django.conf import settings
+from django.db import connections
+
+from . import http_clients
 
 logger = logging.getLogger(__name__)
 
@@ -19,38 +26,224 @@ DEFAULT_MODELS = {
 # Limitar número de iterações do loop de agente para evitar loops infinitos
 MAX_AGENT_ITERATIONS = 10
 
+# Tools independentes de uma mesma rodada rodam em paralelo neste pool (por
+# processo, compartilhado entre requests — o limite vale para o worker inteiro).
+TOOL_WORKERS = getattr(settings, 'AI_TOOL_WORKERS', 4)
+# Tempo máximo esperando uma tool só de leitura (sozinha ou em grupo); estourado,
+# o modelo recebe um erro no lugar do resultado (a thread não é interrompida, só
+# deixa de ser esperada). Gravações rodam sem prazo: abandonada no meio, a
+# gravação continuaria e o modelo diria ao usuário que ela falhou.
+TOOL_TIMEOUT_SECONDS = getattr(settings, 'AI_TOOL_TIMEOUT_SECONDS', 20)
+
+_tool_pool = None
+_tool_pool_lock = threading.Lock()
+
+GIVE_UP_MESSAGE = "Desculpe, não consegui completar a operação."
+MISSING_KEY_MESSAGE = "⚠️ Chave de API não configurada. Acesse Configurações → Inteligência Artificial para configurar."
+
+
+# Schemas já convertidos para o formato de cada provider, por tool: o roteador
+# (ai_tool_router.py) manda um subconjunto diferente a cada turno, mas as tools
+# são sempre os mesmos dicts de TOOL_DEFINITIONS — converte uma vez por processo.
+_converted_tools = {}
+MAX_CONVERTED_TOOLS = 512
+
+
+def _converted(fmt, tool, convert):
+    key = (fmt, id(tool))
+    cached = _converted_tools.get(key)
+    # Confere a identidade: um dict temporário pode ganhar o id de outro já coletado.
+    if cached is None or cached[0] is not tool:
+        if len(_converted_tools) >= MAX_CONVERTED_TOOLS:
+            return convert(tool)
+        cached = _converted_tools[key] = (tool, convert(tool))
+    return cached[1]
+
+
+def _openai_tool(t):
+    return {
+        "type": "function",
+        "function": {
+            "name": t["name"],
+            "description": t["description"],
+            "parameters": t.get("parameters", {"type": "object", "properties": {}}),
+        }
+    }
+
+
+def _anthropic_tool(t):
+    return {
+        "name": t["name"],
+        "description": t["description"],
+        "input_schema": t.get("parameters", {"type": "object", "properties": {}}),
+    }
+
 
 def _tools_to_openai_format(tools: list) -> list:
     """Converte lista de tools para formato OpenAI/DeepSeek."""
-    return [
-        {
-            "type": "function",
-            "function": {
-                "name": t["name"],
-                "description": t["description"],
-                "parameters": t.get("parameters", {"type": "object", "properties": {}}),
-            }
-        }
-        for t in tools
-    ]
+    return [_converted("openai", t, _openai_tool) for t in tools]
 
 
 def _tools_to_anthropic_format(tools: list) -> list:
     """Converte lista de tools para formato Anthropic."""
-    return [
-        {
-            "name": t["name"],
-            "description": t["description"],
-            "input_schema": t.get("parameters", {"type": "object", "properties": {}}),
-        }
-        for t in tools
-    ]
+    return [_converted("anthropic", t, _anthropic_tool) for t in tools]
+
+
+# Prompt caching da Anthropic: marca até onde o prompt pode ser reaproveitado
+# (tools + system estático entre turnos; a conversa entre iterações do loop).
+_CACHE_CONTROL = {"type": "ephemeral"}
+
+
+def _merge_system_messages(messages: list) -> list:
+    """Junta as system messages iniciais numa só (nem todo provider compatível com
+    OpenAI aceita várias). O prefixo estático continua vindo primeiro, idêntico
+    byte a byte entre turnos — é ele que o cache automático do provider reaproveita."""
+    systems = []
+    index = 0
+    while index < len(messages) and messages[index]["role"] == "system":
+        systems.append(messages[index]["content"])
+        index += 1
+    if len(systems) < 2:
+        return list(messages)
+    return [{"role": "system", "content": "\n\n".join(systems)}] + list(messages[index:])
+
+
+def _with_cache_breakpoint(history: list) -> list:
+    """Cópia do histórico com o marcador de cache no último bloco da última mensagem
+    — as próximas iterações do loop reaproveitam tudo até ali. Só a cópia enviada
+    é marcada: o histórico guardado não acumula marcadores (o limite é 4)."""
+    if not history:
+        return history
+    last = history[-1]
+    content = last["content"]
+    if isinstance(content, str):
+        blocks = [{"type": "text", "text": content, "cache_control": _CACHE_CONTROL}]
+    elif content and isinstance(content[-1], dict):
+        blocks = list(content[:-1]) + [{**content[-1], "cache_control": _CACHE_CONTROL}]
+    else:
+        return history
+    return history[:-1] + [{**last, "content": blocks}]
+
+
+def _get_tool_pool():
+    global _tool_pool
+    with _tool_pool_lock:
+        if _tool_pool is None:
+            _tool_pool = ThreadPoolExecutor(max_workers=TOOL_WORKERS, thread_name_prefix='ai-tool')
+        return _tool_pool
+
+
+def _timed_call(tool_executor, name, args, in_thread=False):
+    """Executa a tool e devolve (resultado, segundos)."""
+    t0 = time.perf_counter()
+    try:
+        result = tool_executor(name, args)
+    finally:
+        if in_thread:
+            # Cada thread do pool abre a própria conexão com o banco — fecha ao
+            # terminar, senão ela fica presa à thread ociosa.
+            connections.close_all()
+    elapsed = time.perf_counter() - t0
+    logger.info("Tool %s executada em %.2fs", name, elapsed)
+    return result, elapsed
 
 
-def _run_openai_agent(client, model: str, messages: list, tools: list, tool_executor) -> str:
+def _run_tool_calls(tool_executor, calls: list, parallel_tools=frozenset()):
+    """
+    Executa as tool calls de uma rodada e devolve [(resultado, segundos)] na
+    mesma ordem de `calls` (lista de (nome, args)). Sequências de tools em
+    `parallel_tools` (só leitura) rodam juntas no pool, com TOOL_TIMEOUT_SECONDS
+    — uma sozinha também, para valer o prazo (ex.: search_web); as demais, uma
+    a uma e na ordem pedida — uma gravação nunca corre junto com outra tool.
+    """
+    results = [None] * len(calls)
+    i = 0
+    while i < len(calls):
+        j = i
+        while j < len(calls) and calls[j][0] in parallel_tools:
+            j += 1
+        if j == i:
+            name, args = calls[i]
+            results[i] = _timed_call(tool_executor, name, args)
+            i += 1
+            continue
+
+        pool = _get_tool_pool()
+        futures = [
+            (k, pool.submit(_timed_call, tool_executor, calls[k][0], calls[k][1], True))
+            for k in range(i, j)
+        ]
+        deadline = time.monotonic() + TOOL_TIMEOUT_SECONDS
+        for k, future in futures:
+            name = calls[k][0]
+            try:
+                results[k] = future.result(timeout=max(0, deadline - time.monotonic()))
+            except FutureTimeoutError:
+                logger.warning("Tool %s excedeu %ss", name, TOOL_TIMEOUT_SECONDS)
+                results[k] = ({"ok": False, "error": f"A ferramenta {name} demorou demais para responder."},
+                              TOOL_TIMEOUT_SECONDS)
+            except Exception as e:
+                results[k] = ({"ok": False, "error": str(e)}, 0.0)
+        i = j
+    return results
+
+
+def _tool_events(tool_executor, calls: list, parallel_tools):
+    """Executa as tool calls emitindo start/end (com a latência de cada uma); retorna os resultados."""
+    for name, _ in calls:
+        yield {"type": "tool", "name": name, "status": "start"}
+    t0 = time.perf_counter()
+    results = _run_tool_calls(tool_executor, calls, parallel_tools)
+    if len(calls) > 1:
+        logger.info("%d tools em %.2fs (soma das latências: %.2fs)", len(calls),
+                    time.perf_counter() - t0, sum(seconds for _, seconds in results))
+    for (name, _), (result, seconds) in zip(calls, results):
+        yield {"type": "tool", "name": name, "status": "end",
+               "ok": bool(result.get("ok", True)), "seconds": round(seconds, 3)}
+    return [result for result, _ in results]
+
+
+def _openai_turn(client, kwargs: dict, stream: bool):
+    """
+    Uma chamada ao modelo OpenAI/DeepSeek. Com `stream`, repassa o texto em eventos
+    `token` conforme chega e remonta os tool_calls a partir dos fragmentos (que
+    chegam pedaço a pedaço, identificados pelo `index`).
+
+    Retorna (via `yield from`) o texto e a lista de tool_calls {id, name, arguments}.
+    """
+    if not stream:
+        msg = client.chat.completions.create(**kwargs).choices[0].message
+        tool_calls = [
+            {"id": tc.id, "name": tc.function.name, "arguments": tc.function.arguments}
+            for tc in (msg.tool_calls or [])
+        ]
+        return msg.content or "", tool_calls
+
+    text_parts = []
+    calls = {}
+    for chunk in client.chat.completions.create(stream=True, **kwargs):
+        if not chunk.choices:
+            continue
+        delta = chunk.choices[0].delta
+        if delta.content:
+            text_parts.append(delta.content)
+            yield {"type": "token", "text": delta.content}
+        for fragment in delta.tool_calls or []:
+            call = calls.setdefault(fragment.index, {"id": "", "name": "", "arguments": ""})
+            if fragment.id:
+                call["id"] = fragment.id
+            if fragment.function and fragment.function.name:
+                call["name"] += fragment.function.name
+            if fragment.function and fragment.function.arguments:
+                call["arguments"] += fragment.function.arguments
+    return "".join(text_parts), [calls[i] for i in sorted(calls)]
+
+
+def _openai_agent_events(client, model: str, messages: list, tools: list, tool_executor, stream: bool = False,
+                         parallel_tools=frozenset()):
     """Loop de agente para OpenAI / DeepSeek (API compatível com OpenAI)."""
     oai_tools = _tools_to_openai_format(tools) if tools else []
-    history = list(messages)
+    history = _merge_system_messages(messages)
 
     for _ in range(MAX_AGENT_ITERATIONS):
         kwargs = {"model": model, "messages": history}
@@ -58,67 +251,86 @@ def _run_openai_agent(client, model: str, messages: list, tools: list, tool_exec
             kwargs["tools"] = oai_tools
             kwargs["tool_choice"] = "auto"
 
-        response = client.chat.completions.create(**kwargs)
-        msg = response.choices[0].message
+        content, tool_calls = yield from _openai_turn(client, kwargs, stream)
 
-        if not msg.tool_calls:
-            return msg.content or ""
+        if not tool_calls:
+            yield {"type": "done", "text": content}
+            return
 
         # Adiciona resposta do assistente com tool_calls
         history.append({
             "role": "assistant",
-            "content": msg.content or "",
+            "content": content,
             "tool_calls": [
                 {
-                    "id": tc.id,
+                    "id": tc["id"],
                     "type": "function",
-                    "function": {"name": tc.function.name, "arguments": tc.function.arguments}
+                    "function": {"name": tc["name"], "arguments": tc["arguments"]}
                 }
-                for tc in msg.tool_calls
+                for tc in tool_calls
             ]
         })
 
-        # Executa cada tool call
-        for tc in msg.tool_calls:
+        # Executa as tool calls (as independentes em paralelo)
+        calls = []
+        for tc in tool_calls:
             try:
-                args = json.loads(tc.function.arguments)
+                args = json.loads(tc["arguments"])
             except Exception:
                 args = {}
-            result = tool_executor(tc.function.name, args)
+            calls.append((tc["name"], args))
+        results = yield from _tool_events(tool_executor, calls, parallel_tools)
+        for tc, result in zip(tool_calls, results):
             history.append({
                 "role": "tool",
-                "tool_call_id": tc.id,
+                "tool_call_id": tc["id"],
                 "content": json.dumps(result, ensure_ascii=False),
             })
 
-    return "Desculpe, não consegui completar a operação."
+    yield {"type": "done", "text": GIVE_UP_MESSAGE}
+
+
+def _anthropic_turn(client, kwargs: dict, stream: bool):
+    """Uma chamada ao Claude; com `stream`, repassa o texto em eventos `token`. Retorna a mensagem final."""
+    if not stream:
+        return client.messages.create(**kwargs)
+    with client.messages.stream(**kwargs) as response_stream:
+        for text in response_stream.text_stream:
+            yield {"type": "token", "text": text}
+        return response_stream.get_final_message()
 
 
-def _run_anthropic_agent(client, model: str, messages: list, tools: list, tool_executor) -> str:
+def _anthropic_agent_events(client, model: str, messages: list, tools: list, tool_executor, stream: bool = False,
+                            parallel_tools=frozenset()):
     """Loop de agente para Anthropic Claude."""
-    # Separa system message das demais
-    system_msg = ""
+    # Separa as system messages das demais. A primeira (prefixo estático, ver
+    # ai_context.py) leva o marcador de cache, assim como a última tool.
+    system_blocks = []
     history = []
     for m in messages:
         if m["role"] == "system":
-            system_msg = m["content"]
+            system_blocks.append({"type": "text", "text": m["content"]})
         else:
             history.append({"role": m["role"], "content": m["content"]})
+    if system_blocks:
+        system_blocks[0]["cache_control"] = _CACHE_CONTROL
 
     ant_tools = _tools_to_anthropic_format(tools) if tools else []
+    if ant_tools:
+        ant_tools[-1] = {**ant_tools[-1], "cache_control": _CACHE_CONTROL}
 
     for _ in range(MAX_AGENT_ITERATIONS):
         kwargs = {
             "model": model,
             "max_tokens": 4096,
-            "messages": history,
+            "messages": _with_cache_breakpoint(history),
         }
-        if system_msg:
-            kwargs["system"] = system_msg
+        if system_blocks:
+            kwargs["system"] = system_blocks
         if ant_tools:
             kwargs["tools"] = ant_tools
 
-        response = client.messages.create(**kwargs)
+        response = yield from _anthropic_turn(client, kwargs, stream)
 
         # Coleta blocos de texto e tool_use
         text_parts = []
@@ -130,15 +342,16 @@ def _run_anthropic_agent(client, model: str, messages: list, tools: list, tool_e
                 tool_uses.append(block)
 
         if not tool_uses:
-            return " ".join(text_parts)
+            yield {"type": "done", "text": " ".join(text_parts)}
+            return
 
         # Adiciona resposta do assistente
         history.append({"role": "assistant", "content": response.content})
 
         # Executa tools e adiciona resultados
         tool_results = []
-        for tu in tool_uses:
-            result = tool_executor(tu.name, tu.input)
+        results = yield from _tool_events(tool_executor, [(tu.name, tu.input) for tu in tool_uses], parallel_tools)
+        for tu, result in zip(tool_uses, results):
             tool_results.append({
                 "type": "tool_result",
                 "tool_use_id": tu.id,
@@ -146,10 +359,18 @@ def _run_anthropic_agent(client, model: str, messages: list, tools: list, tool_e
             })
         history.append({"role": "user", "content": tool_results})
 
-    return "Desculpe, não consegui completar a operação."
+    yield {"type": "done", "text": GIVE_UP_MESSAGE}
 
 
-def run_agent(config, messages: list, tools: list, tool_executor, *, expose_errors: bool = True) -> str:
+def _final_text(events) -> str:
+    for event in events:
+        if event["type"] == "done":
+            return event["text"]
+    return GIVE_UP_MESSAGE
+
+
+def run_agent(config, messages: list, tools: list, tool_executor, *, expose_errors: bool = True,
+              parallel_tools=frozenset()) -> str:
     """
     Executa o loop de agente completo com o provider configurado.
 
@@ -164,43 +385,75 @@ def run_agent(config, messages: list, tools: list, tool_executor, *, expose_erro
             genérica pro usuário final e só loga o detalhe real no servidor — evita
             vazar mensagens de erro internas do provedor de IA pro chat de qualquer
             usuário.
+        parallel_tools: nomes de tools só de leitura que podem rodar em paralelo
+            quando o modelo pede várias na mesma rodada (ex: ai_tools.PARALLEL_SAFE_TOOLS).
+            Fora desse conjunto, as tools rodam uma a uma, como sempre.
 
     Returns:
         Texto da resposta final do assistente
     """
+    return _final_text(stream_agent(config, messages, tools, tool_executor, expose_errors=expose_errors,
+                                    stream=False, parallel_tools=parallel_tools))
+
+
+def stream_agent(config, messages: list, tools: list, tool_executor, *, expose_errors: bool = True, stream: bool = True,
+                 parallel_tools=frozenset()):
+    """
+    Mesmo loop de run_agent(), como gerador de eventos — usado pelo modo streaming
+    do chat (views_ai.py) para mostrar a resposta enquanto ela é gerada:
+
+        {"type": "token", "text": "..."}                   pedaço de texto do modelo
+        {"type": "tool", "name": "...", "status": "start"}  antes de executar uma tool
+        {"type": "tool", "name": "...", "status": "end", "ok": bool, "seconds": float}
+        {"type": "done", "text": "..."}                    resposta final (sempre o último)
+
+    Tokens de uma rodada que termina chamando tools são só o "preâmbulo" dela
+    (ex: "Vou verificar...") — a resposta final é a do evento `done`. Erros do
+    provedor viram o `done`, com o mesmo texto que run_agent() retornaria.
+    """
     provider = config.provider or 'deepseek'
     api_key = config.api_key or ''
     model = config.model or DEFAULT_MODELS.get(provider, 'deepseek-chat')
 
     if not api_key:
-        return "⚠️ Chave de API não configurada. Acesse Configurações → Inteligência Artificial para configurar."
+        yield {"type": "done", "text": MISSING_KEY_MESSAGE}
+        return
 
     t0 = time.perf_counter()
+    first_token_at = None
     try:
+        # Clientes reaproveitados entre mensagens (http_clients.py): mantêm a
+        # conexão com o provedor aberta, sem novo handshake TLS a cada turno.
         if provider == 'anthropic':
-            import anthropic
-            client = anthropic.Anthropic(api_key=api_key)
-            return _run_anthropic_agent(client, model, messages, tools, tool_executor)
+            client = http_clients.sdk_client('anthropic', api_key)
+            events = _anthropic_agent_events(client, model, messages, tools, tool_executor, stream, parallel_tools)
 
         elif provider == 'gemini':
-            from openai import OpenAI
-            client = OpenAI(
-                api_key=api_key,
-                base_url="https://generativelanguage.googleapis.com/v1beta/openai/"
+            client = http_clients.sdk_client(
+                'openai', api_key, "https://generativelanguage.googleapis.com/v1beta/openai/"
             )
-            return _run_openai_agent(client, model, messages, tools, tool_executor)
+            events = _openai_agent_events(client, model, messages, tools, tool_executor, stream, parallel_tools)
 
         else:
             # deepseek ou openai
-            from openai import OpenAI
             base_url = "https://api.deepseek.com" if provider == 'deepseek' else None
-            client = OpenAI(api_key=api_key, **({"base_url": base_url} if base_url else {}))
-            return _run_openai_agent(client, model, messages, tools, tool_executor)
+            client = http_clients.sdk_client('openai', api_key, base_url)
+            events = _openai_agent_events(client, model, messages, tools, tool_executor, stream, parallel_tools)
+
+        for event in events:
+            if first_token_at is None and event["type"] == "token":
+                first_token_at = time.perf_counter() - t0
+            yield event
 
     except Exception as e:
         logger.error("Erro no agente IA (%s): %s", provider, e)
         if expose_errors:
-            return f"⚠️ Erro ao comunicar com a IA: {e}"
-        return "⚠️ Não foi possível obter resposta da IA no momento. Se o problema persistir, avise um administrador."
+            yield {"type": "done", "text": f"⚠️ Erro ao comunicar com a IA: {e}"}
+        else:
+            yield {"type": "done", "text": "⚠️ Não foi possível obter resposta da IA no momento. Se o problema persistir, avise um administrador."}
     finally:
-        logger.info("IA (%s/%s) respondeu em %.2fs", provider, model, time.perf_counter() - t0)
+        if first_token_at is None:
+            logger.info("IA (%s/%s) respondeu em %.2fs", provider, model, time.perf_counter() - t0)
+        else:
+            logger.info("IA (%s/%s) respondeu em %.2fs (primeiro token em %.2fs)",
+                        provider, model, time.perf_counter() - t0, first_token_at)
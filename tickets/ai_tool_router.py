@@ -0,0 +1,161 @@
+"""
+Escolhe, a cada turno do Chat IA, quais tools vão para o modelo — em vez das
+~70 de TOOL_DEFINITIONS sempre. Menos schema no prompt = resposta mais rápida
+e mais barata.
+
+A seleção junta:
+
+- CORE_TOOLS, sempre;
+- os grupos (TOOL_GROUPS) cujas palavras-chave aparecem na mensagem atual ou
+  nas últimas mensagens da conversa (respostas curtas como "sim" ou "a
+  segunda" continuam o assunto anterior);
+- os grupos das tools já usadas na sessão (AIChatSession.used_tools);
+
+e tira as de ADMIN_TOOLS para quem não é admin/super_admin (essas tools
+recusam o usuário de qualquer forma — não há por que oferecê-las ao modelo).
+Sem nenhum grupo reconhecido, vai o grupo de OS (o assunto principal).
+
+A lista sai na ordem de TOOL_DEFINITIONS: a mesma combinação de grupos gera
+sempre o mesmo prefixo de prompt, que o cache dos providers reaproveita.
+"""
+import re
+
+from .ai_tools import TOOL_DEFINITIONS
+from .models import AIChatSession
+
+ADMIN_ROLES = ('admin', 'super_admin')
+# Quantas das tools usadas na sessão são lembradas (as mais recentes).
+MAX_USED_TOOLS = 20
+# Mensagens mais recentes da conversa (além da atual) olhadas para achar o assunto.
+RECENT_MESSAGES = 2
+
+# Tools que recusam quem não é admin/super_admin (checagem no início de cada uma em ai_tools.py).
+ADMIN_TOOLS = frozenset({
+    "delete_ticket", "create_client", "update_client", "create_equipment", "create_contact_jumper",
+    "create_hub", "create_role", "create_page", "create_ticket_type", "create_problem_type",
+    "create_system", "update_system", "create_equipment_type", "create_ticket_status",
+    "create_technician", "create_responsible", "create_user_account", "create_travel",
+    "toggle_page_enabled", "update_page_permission", "get_role_page_permissions",
+    "update_user_restriction", "list_all_users_admin", "get_user_details_admin",
+    "update_user_data_admin", "change_user_password_admin", "get_system_info_admin",
+    "list_online_users_admin",
+})
+
+CORE_TOOLS = frozenset({
+    "search_client", "get_ticket", "clear_chat", "remember_user_preference",
+    "forget_user_preference", "check_pending_alerts", "open_page",
+})
+
+# grupo -> (palavras-chave, tools)
+TOOL_GROUPS = {
+    "tickets": (
+        r"\bos\b|\bo\.s\.?|ordens?\s+de\s+servi|chamad|tickets?|t[ií]quete|abr[ae]|abrir|cri[ae]|"
+        r"evolu[cç]|status|prioridad|prazo|urg[eê]n|atualiz|alter|mud[ae]|exclu|apag|delet|card|"
+        r"ordem|lista|pendent|aberta|fechad|conclu",
+        {
+            "search_client", "get_client_details", "list_ticket_statuses", "list_systems",
+            "list_ticket_types", "list_jumper_contacts", "list_equipments", "list_problem_types",
+            "get_ticket", "get_ticket_evolutions", "create_ticket", "update_ticket",
+            "add_ticket_evolution", "delete_ticket", "reorder_ticket_card", "search_all_contacts",
+        },
+    ),
+    "batch": (
+        r"\blote|em\s+massa|v[aá]rias\s+os|v[aá]rias\s+ordens|v[aá]rios\s+chamados|\bbatch",
+        {
+            "start_ticket_batch", "add_or_update_batch_item", "list_batch_status",
+            "cancel_ticket_batch", "confirm_ticket_batch", "list_ticket_types", "list_systems",
+            "list_problem_types",
+        },
+    ),
+    "registry": (
+        r"client|empresa|cnpj|equipament|contato|\bhub|filial|unidade|cadastr|telefone|e-?mail",
+        {
+            "search_client", "get_client_details", "search_company_details", "search_all_contacts",
+            "list_jumper_contacts", "list_equipments", "list_equipment_types", "create_client",
+            "update_client", "create_equipment", "create_contact_client", "create_contact_jumper",
+            "create_hub",
+        },
+    ),
+    "web": (
+        r"internet|pesquis|google|\bweb\b|\bsite|na\s+rede|cnpj",
+        {"search_web", "search_company_details"},
+    ),
+    "messages": (
+        r"mensag|recado|avis[oa]|alerta|passagem\s+de\s+turno|plant[aã]o|turno|\bchat|convers[ae]\s+com|"
+        r"fal[ae]r?\s+com|mand[ae]|envi[ae]|notific|pend[eê]nc|lid[ao]",
+        {
+            "check_pending_alerts", "get_message_content", "mark_message_read",
+            "acknowledge_handover_alert", "create_handover_entry", "notify_handover_entry",
+            "send_message_to_user", "open_private_chat", "list_users",
+        },
+    ),
+    "navigation": (
+        r"abr[ae]\s+a\s+(tela|p[aá]gina)|\btela|p[aá]gina|ir\s+para|naveg|mostr[ae]\s+a",
+        {"open_page", "list_pages"},
+    ),
+    "admin": (
+        r"usu[aá]ri|senha|permiss|n[ií]ve(l|is)\s+de\s+acesso|acesso|\brole|\bcargo|online|logad|"
+        r"t[eé]cnico|respons[aá]vel|sistema|tipo\s+de|configura|restri[cç]|bloque|libera|viagem|"
+        r"deslocamento|status\s+novo|novo\s+status",
+        {
+            "create_role", "create_page", "create_ticket_type", "create_problem_type", "create_system",
+            "update_system", "create_equipment_type", "create_ticket_status", "create_technician",
+            "create_responsible", "create_user_account", "create_travel", "list_roles", "list_pages",
+            "list_users", "toggle_page_enabled", "update_page_permission", "get_role_page_permissions",
+            "update_user_restriction", "list_all_users_admin", "get_user_details_admin",
+            "update_user_data_admin", "change_user_password_admin", "get_system_info_admin",
+            "list_online_users_admin",
+        },
+    ),
+}
+DEFAULT_GROUP = "tickets"
+
+_GROUP_PATTERNS = {name: re.compile(pattern, re.IGNORECASE) for name, (pattern, _) in TOOL_GROUPS.items()}
+_GROUPS_BY_TOOL = {}
+for _group, (_, _names) in TOOL_GROUPS.items():
+    for _name in _names:
+        _GROUPS_BY_TOOL.setdefault(_name, set()).add(_group)
+
+
+def matching_groups(texts):
+    """Grupos cujas palavras-chave aparecem em algum dos textos."""
+    return {
+        name for name, pattern in _GROUP_PATTERNS.items()
+        if any(text and pattern.search(text) for text in texts)
+    }
+
+
+def select_tools(role, texts, used_tools=(), tools=TOOL_DEFINITIONS):
+    """
+    Subconjunto de `tools` para o turno.
+
+    Args:
+        role: UserProfile.role de quem está conversando
+        texts: mensagem atual + as últimas da conversa (para manter o assunto)
+        used_tools: nomes de tools já usadas na sessão
+    """
+    groups = matching_groups(texts)
+    for name in used_tools:
+        groups |= _GROUPS_BY_TOOL.get(name, set())
+    if not groups:
+        groups = {DEFAULT_GROUP}
+
+    allowed = set(CORE_TOOLS)
+    for group in groups:
+        allowed |= TOOL_GROUPS[group][1]
+    if role not in ADMIN_ROLES:
+        allowed -= ADMIN_TOOLS
+    return [t for t in tools if t["name"] in allowed]
+
+
+def remember_used_tools(session, names):
+    """Acrescenta em session.used_tools as tools chamadas no turno (últimas MAX_USED_TOOLS)."""
+    if not names:
+        return
+    used = [n for n in session.used_tools or [] if n not in names] + list(dict.fromkeys(names))
+    used = used[-MAX_USED_TOOLS:]
+    if used == session.used_tools:
+        return
+    # update() em vez de save(): não mexe em updated_at (ordem das sessões no histórico).
+    AIChatSession.objects.filter(pk=session.pk).update(used_tools=used)
+    session.used_tools = used
@@ -1022,10 +1022,10 @@ def _google_custom_search(query, num=5, api_key=None, engine_id=None):
     import urllib.request
     import urllib.parse
     import json as _json
-    from .models import SearchProviderConfig
+    from . import config_cache, http_clients
 
     if api_key is None or engine_id is None:
-        config = SearchProviderConfig.objects.filter(is_active=True).first()
+        config = config_cache.get_active_search_config()
         api_key = api_key if api_key is not None else ((config.api_key if config else "") or "")
         engine_id = engine_id if engine_id is not None else ((config.google_search_engine_id if config else "") or "")
 
@@ -1048,7 +1048,7 @@ def _google_custom_search(query, num=5, api_key=None, engine_id=None):
 
     import urllib.error
     try:
-        with urllib.request.urlopen(req, timeout=10) as r:
+        with http_clients.urlopen(req, timeout=10) as r:
             data = _json.loads(r.read().decode("utf-8"))
     except urllib.error.HTTPError as e:
         # Extrai a mensagem real de erro do corpo da resposta do Google (ex: chave
@@ -1073,10 +1073,10 @@ def _tavily_search(query, num=5, api_key=None):
     import urllib.request
     import urllib.error
     import json as _json
-    from .models import SearchProviderConfig
+    from . import config_cache, http_clients
 
     if api_key is None:
-        config = SearchProviderConfig.objects.filter(is_active=True).first()
+        config = config_cache.get_active_search_config()
         api_key = (config.api_key if config else "") or ""
 
     if not api_key:
@@ -1099,7 +1099,7 @@ def _tavily_search(query, num=5, api_key=None):
     )
 
     try:
-        with urllib.request.urlopen(req, timeout=10) as r:
+        with http_clients.urlopen(req, timeout=10) as r:
             data = _json.loads(r.read().decode("utf-8"))
     except urllib.error.HTTPError as e:
         try:
@@ -1121,10 +1121,10 @@ def _web_search(query, num=5, provider=None, google_api_key=None, google_engine_
     (google ou tavily), retornando lista normalizada [{'title', 'snippet', 'link'}].
     Os parâmetros *_api_key/engine_id, se passados, sobrepõem o valor salvo (uso em
     telas de teste, antes de salvar)."""
-    from .models import SearchProviderConfig
+    from . import config_cache
 
     if provider is None:
-        config = SearchProviderConfig.objects.filter(is_active=True).first()
+        config = config_cache.get_active_search_config()
         provider = (config.provider if config else "") or "google"
 
     if provider == "tavily":
@@ -1141,10 +1141,10 @@ def google_tts_synthesize(text, voice_gender="FEMALE", api_key=None):
     import urllib.error
     import json as _json
     import base64
-    from .models import VoiceProviderConfig
+    from . import config_cache, http_clients
 
     if api_key is None:
-        config = VoiceProviderConfig.objects.filter(is_active=True).first()
+        config = config_cache.get_active_voice_config()
         api_key = (config.api_key if config else "") or ""
 
     if not api_key:
@@ -1169,7 +1169,7 @@ def google_tts_synthesize(text, voice_gender="FEMALE", api_key=None):
 
     t0 = time.perf_counter()
     try:
-        with urllib.request.urlopen(req, timeout=15) as r:
+        with http_clients.urlopen(req, timeout=15) as r:
             data = _json.loads(r.read().decode("utf-8"))
     except urllib.error.HTTPError as e:
         try:
@@ -1195,9 +1195,9 @@ def elevenlabs_tts_synthesize(text, voice_gender="female", api_key=None, voice_i
     de voz específico da biblioteca do usuário, cadastrado por gênero em SystemSettings.
     Se api_key/voice_id não forem passados, usa os valores salvos (uso normal);
     passá-los permite testar valores ainda não salvos."""
-    from .models import VoiceProviderConfig
+    from . import config_cache, http_clients
 
-    config = VoiceProviderConfig.objects.filter(is_active=True).first() if (api_key is None or voice_id is None) else None
+    config = config_cache.get_active_voice_config() if (api_key is None or voice_id is None) else None
 
     if api_key is None:
         api_key = (config.api_key if config else "") or ""
@@ -1218,11 +1218,10 @@ def elevenlabs_tts_synthesize(text, voice_gender="female", api_key=None, voice_i
             "Integrações (ElevenLabs)."
         )
 
-    from elevenlabs.client import ElevenLabs
     from elevenlabs.core.api_error import ApiError
     from elevenlabs.types.voice_settings import VoiceSettings
 
-    client = ElevenLabs(api_key=api_key)
+    client = http_clients.sdk_client('elevenlabs', api_key)
     t0 = time.perf_counter()
     try:
         audio_stream = client.text_to_speech.convert(
@@ -1264,10 +1263,10 @@ def list_elevenlabs_voices(api_key=None):
     Levanta ValueError se não configurado ou em caso de erro da API. Se api_key
     não for passada, usa a salva em SystemSettings (uso normal); passá-la
     permite testar uma chave ainda não salva."""
-    from .models import VoiceProviderConfig
+    from . import config_cache
 
     if api_key is None:
-        config = VoiceProviderConfig.objects.filter(is_active=True).first()
+        config = config_cache.get_active_voice_config()
         api_key = (config.api_key if config else "") or ""
     if not api_key:
         raise ValueError(
@@ -1315,10 +1314,10 @@ def tts_synthesize(text, voice_gender="female", provider=None, google_api_key=No
     (google ou elevenlabs) — o provedor 'browser' não passa por aqui, é tratado
     inteiramente no navegador do usuário. Retorna áudio em MP3 (bytes); levanta
     ValueError se não configurado ou em caso de erro do provedor."""
-    from .models import VoiceProviderConfig
+    from . import config_cache
 
     if provider is None:
-        config = VoiceProviderConfig.objects.filter(is_active=True).first()
+        config = config_cache.get_active_voice_config()
         provider = (config.provider if config else "") or "browser"
 
     if provider == "elevenlabs":
@@ -2087,7 +2086,8 @@ def _update_ticket(args, user):
 
 
 def _reorder_ticket_card(args, user):
-    from .models import Ticket, TicketListOrder
+    from .models import Ticket
+    from . import ticket_list_order
 
     try:
         ticket = Ticket.objects.get(pk=args["ticket_id"])
@@ -2101,7 +2101,7 @@ def _reorder_ticket_card(args, user):
     if not position and not before_ticket_id and not after_ticket_id:
         return {"ok": False, "error": "Informe 'position' (top/bottom/up/down) ou before_ticket_id/after_ticket_id."}
 
-    order, index = TicketListOrder.move_ticket(
+    index = ticket_list_order.move_ticket(
         user, ticket.id,
         position=position,
         before_ticket_id=before_ticket_id,
@@ -2376,9 +2376,10 @@ def _get_current_shift_handover():
     lógica de virada de turno usada em TaskListView._build_shifts (tela de Tasks) —
     considera turno noturno cruzando meia-noite, se estiver habilitado."""
     from datetime import datetime, timedelta, time as dtime
-    from .models import SystemSettings, ShiftHandover
+    from .models import ShiftHandover
+    from . import config_cache
 
-    settings_obj, _ = SystemSettings.objects.get_or_create(pk=1)
+    settings_obj = config_cache.get_system_settings()
     day_start = settings_obj.day_shift_start or dtime(8, 0)
     day_end = settings_obj.day_shift_end or dtime(20, 0)
     enable_night = bool(settings_obj.enable_night_shift)
@@ -3551,7 +3552,8 @@ def _change_user_password_admin(args, user):
 
 def _get_system_info_admin(args, user):
     from django.contrib.auth.models import User as DjangoUser
-    from .models import Ticket, SystemSettings, AIProviderConfig
+    from .models import Ticket
+    from . import config_cache
 
     role = getattr(getattr(user, 'profile', None), 'role', None)
     if role not in ('admin', 'super_admin'):
@@ -3563,9 +3565,9 @@ def _get_system_info_admin(args, user):
         total_tickets = Ticket.objects.count()
         open_tickets = Ticket.objects.filter(status='open').count()
 
-        settings = SystemSettings.objects.first()
+        settings = config_cache.get_system_settings()
         ai_enabled = settings.ai_enabled if settings else False
-        active_config = AIProviderConfig.objects.filter(is_active=True).first()
+        active_config = config_cache.get_active_ai_config()
         ai_provider = active_config.get_provider_display() if active_config else "Nenhuma configuração ativa"
 
         return {"ok": True, "data": {
@@ -3584,26 +3586,29 @@ def _get_system_info_admin(args, user):
 
 def _list_online_users_admin(args, user):
     from django.contrib.auth.models import User as DjangoUser
-    from .models import ActiveSession
+    from . import presence
 
     role = getattr(getattr(user, 'profile', None), 'role', None)
     if role not in ('admin', 'super_admin'):
         return {"ok": False, "error": "Informações privilegiadas. Somente administradores podem acessar. Solicite ao gestor."}
 
     try:
-        ActiveSession.cleanup_stale()
-        sessions = ActiveSession.objects.select_related('user').all().order_by('-last_activity')
+        sessions = presence.online_sessions()
+        users = DjangoUser.objects.in_bulk({s['user_id'] for s in sessions})
 
         online_users = []
-        for i, session in enumerate(sessions, start=1):
+        for session in sessions:
+            session_user = users.get(session['user_id'])
+            if session_user is None:
+                continue
             online_users.append({
-                "num": i,
-                "user_id": session.user.id,
-                "name": session.user.get_full_name() or session.user.username,
-                "username": session.user.username,
-                "ip_address": session.ip_address,
-                "last_activity": timezone.localtime(session.last_activity).strftime("%d/%m/%Y %H:%M:%S"),
-                "logged_at": timezone.localtime(session.created_at).strftime("%d/%m/%Y %H:%M:%S"),
+                "num": len(online_users) + 1,
+                "user_id": session_user.id,
+                "name": session_user.get_full_name() or session_user.username,
+                "username": session_user.username,
+                "ip_address": session['ip_address'],
+                "last_activity": timezone.localtime(session['last_activity']).strftime("%d/%m/%Y %H:%M:%S"),
+                "logged_at": timezone.localtime(session['created_at']).strftime("%d/%m/%Y %H:%M:%S"),
             })
 
         return {"ok": True, "data": {
@@ -3687,6 +3692,18 @@ _TOOL_REGISTRY = {
 
 
 # System prompt enviado para a IA em toda requisição
+# Tools só de leitura: quando o modelo pede várias numa mesma rodada, o loop de
+# agente (ai_service.py) roda as consecutivas em paralelo. As que gravam algo
+# ficam de fora e rodam sempre em sequência, na ordem pedida.
+PARALLEL_SAFE_TOOLS = frozenset({
+    "search_client", "search_web", "search_company_details", "search_all_contacts",
+    "get_client_details", "list_ticket_statuses", "list_systems", "list_ticket_types",
+    "list_jumper_contacts", "list_equipments", "list_equipment_types", "list_problem_types",
+    "get_ticket", "get_ticket_evolutions", "list_batch_status", "check_pending_alerts",
+    "get_message_content", "list_roles", "list_pages", "list_users", "get_role_page_permissions",
+    "list_all_users_admin", "get_system_info_admin", "list_online_users_admin",
+})
+
 SYSTEM_PROMPT = """Você é o assistente de IA do sistema JumperFour OS — um sistema de gestão de Ordens de Serviço.
 Você fala português brasileiro de forma natural e tranquila, como numa conversa falada com um colega —
 não como quem está lendo um relatório em voz alta. Seja claro e objetivo, mas com calor humano.
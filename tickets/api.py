@@ -1,10 +1,49 @@
-from django.views import View
-from django.http import JsonResponse
-from django.core.serializers.json import DjangoJSONEncoder
-from django.db.models import Q
-from .models import Ticket, Client, Equipment, UserProfile, User
+"""
+API por token (Power BI / integrações).
+
+v1 (api/tickets/, api/clients/, api/equipments/) devolve a tabela inteira
+numa lista só — mantida como está para quem já consome.
+
+v2 (api/v2/...) é a que integrações novas devem usar:
+
+- paginação por cursor em (updated_at, id): `limit` (até API_MAX_LIMIT) e
+  `cursor` (o `next_cursor` da página anterior). A última página também traz
+  `next_cursor`; guardado, ele serve de ponto de partida da próxima
+  sincronização, que só recebe o que mudou desde então. `updated_since`
+  (data/hora ISO) faz o mesmo para a primeira carga;
+- `fields=id,status,...` devolve só esses campos (e só busca o necessário);
+- filtros no servidor — OS: `status`, `client` (IDs separados por vírgula),
+  `created_from`/`created_to` (datas);
+- ETag: hash dos (id, updated_at) das linhas da página (uma consulta só
+  dessas colunas, limitada a limit + 1) mais os parâmetros; `If-None-Match`
+  igual devolve 304 sem ler as linhas completas;
+- a resposta é gerada linha a linha (StreamingHttpResponse), sem montar a
+  lista inteira em memória.
+"""
+import base64
+import hashlib
 import json
-from datetime import datetime
+from collections import namedtuple
+from datetime import datetime, time
+
+from django.contrib.auth.models import User
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Prefetch, Q
+from django.http import JsonResponse, StreamingHttpResponse
+from django.utils import timezone
+from django.utils.cache import get_conditional_response
+from django.utils.dateparse import parse_date, parse_datetime
+from django.utils.http import quote_etag
+from django.views import View
+
+from . import api_tokens
+from .models import Ticket, Client, Equipment
+
+API_DEFAULT_LIMIT = 100
+API_MAX_LIMIT = 1000
+# Linhas lidas do banco por vez ao gerar a resposta.
+API_CHUNK_SIZE = 200
+
 
 class TokenAuthMixin:
     def dispatch(self, request, *args, **kwargs):
@@ -14,22 +53,35 @@ class TokenAuthMixin:
         if not token:
             return JsonResponse({'error': 'Token não fornecido. Use ?token=SEU_TOKEN ou Header Authorization: Bearer SEU_TOKEN'}, status=401)
             
-        try:
-            # Remove 'Bearer ' se vier no header
-            if token.startswith('Bearer '):
-                token = token.split(' ')[1]
-                
-            # Verifica se o token existe e pega o usuário
-            self.user_profile = UserProfile.objects.get(token=token)
-            
-        except UserProfile.DoesNotExist:
+        # Remove 'Bearer ' se vier no header
+        if token.startswith('Bearer '):
+            token = token.split(' ')[1]
+
+        # Dono do token pelo cache (api_tokens.py): sem consulta ao perfil a cada request.
+        self.token_identity = api_tokens.resolve(token)
+        if self.token_identity is None:
             return JsonResponse({'error': 'Token inválido ou expirado.'}, status=401)
-            
-        return super().dispatch(request, *args, **kwargs)
+
+        allowed, remaining = api_tokens.hit(token)
+        if not allowed:
+            response = JsonResponse({'error': 'Limite de requisições do token excedido. Tente novamente em instantes.'}, status=429)
+            response['Retry-After'] = str(api_tokens.retry_after())
+        else:
+            response = super().dispatch(request, *args, **kwargs)
+        if remaining is not None:
+            response['X-RateLimit-Limit'] = str(api_tokens.RATE_LIMIT)
+            response['X-RateLimit-Remaining'] = str(remaining)
+        return response
+
+
+def _technicians_label(ticket):
+    names = [t.username for t in ticket.technicians.all()]
+    return ', '.join(names) if names else 'Sem técnico'
+
 
 class TicketAPIView(TokenAuthMixin, View):
     def get(self, request):
-        tickets = Ticket.objects.all().select_related('client').prefetch_related('technicians')
+        tickets = Ticket.objects.all().select_related('client', 'problem_type').prefetch_related('technicians')
         data = []
         for ticket in tickets:
             data.append({
@@ -37,7 +89,7 @@ class TicketAPIView(TokenAuthMixin, View):
                 'codigo': ticket.formatted_id,
                 'cliente': ticket.client.name,
                 'status': ticket.get_status_display(),
-                'tecnico': ', '.join([t.username for t in ticket.technicians.all()]) if ticket.technicians.exists() else 'Sem técnico',
+                'tecnico': _technicians_label(ticket),
                 'criado_em': ticket.created_at.strftime('%Y-%m-%d %H:%M:%S'),
                 'descricao': ticket.description,
                 'tipo_chamado': ticket.get_call_type_display() if ticket.call_type else None,
@@ -73,3 +125,226 @@ class EquipmentAPIView(TokenAuthMixin, View):
                 'descricao': eq.description
             })
         return JsonResponse({'count': len(data), 'results': data}, safe=False)
+
+
+# --- v2 ---------------------------------------------------------------------
+
+class APIError(Exception):
+    """Parâmetro inválido: vira um 400 com a mensagem."""
+
+
+# get(obj) -> valor; columns: campos para .only(); related/prefetch: o que o campo percorre.
+APIField = namedtuple('APIField', 'get columns related prefetch', defaults=((), (), ()))
+
+
+def _parse_ids(value, name):
+    try:
+        return [int(v) for v in value.split(',') if v.strip()]
+    except ValueError:
+        raise APIError(f"'{name}' deve ser uma lista de IDs separados por vírgula.")
+
+
+def _parse_moment(value, name, end_of_day=False):
+    """Data/hora ISO (ou só a data: início do dia, ou fim com end_of_day) no fuso local."""
+    try:
+        moment = parse_datetime(value)
+        if moment is None:
+            day = parse_date(value)
+            if day is not None:
+                moment = datetime.combine(day, time.max if end_of_day else time.min)
+    except ValueError:
+        moment = None
+    if moment is None:
+        raise APIError(f"'{name}' deve ser uma data (AAAA-MM-DD) ou data/hora ISO.")
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    return moment
+
+
+def _encode_cursor(obj):
+    raw = json.dumps([obj.updated_at.isoformat(), obj.id])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def _decode_cursor(value):
+    try:
+        raw = base64.urlsafe_b64decode(value + '=' * (-len(value) % 4))
+        updated_at, pk = json.loads(raw)
+        moment = datetime.fromisoformat(updated_at)
+        if timezone.is_naive(moment) or not isinstance(pk, int):
+            raise ValueError
+    except (ValueError, TypeError):
+        raise APIError("'cursor' inválido.")
+    return Q(updated_at__gt=moment) | Q(updated_at=moment, id__gt=pk)
+
+
+class SyncAPIView(TokenAuthMixin, View):
+    """
+    Base das views v2: cada subclasse define `fields` (nome público ->
+    APIField), `get_queryset()` e, se houver, `filter_queryset()`.
+    """
+    resource = ''
+    fields = {}
+
+    def get_queryset(self):
+        raise NotImplementedError
+
+    def filter_queryset(self, queryset, params):
+        return queryset
+
+    def get(self, request):
+        try:
+            fields = self._selected_fields(request.GET.get('fields'))
+            limit = self._limit(request.GET.get('limit'))
+            cursor = request.GET.get('cursor') or None
+            queryset = self.filter_queryset(self.get_queryset(), request.GET)
+            if request.GET.get('updated_since'):
+                queryset = queryset.filter(updated_at__gte=_parse_moment(request.GET['updated_since'], 'updated_since'))
+            if cursor:
+                queryset = queryset.filter(_decode_cursor(cursor))
+        except APIError as exc:
+            return JsonResponse({'error': str(exc)}, status=400)
+
+        etag = quote_etag(self._etag(request, queryset, limit))
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            rows = self._rows(queryset, fields)[:limit + 1].iterator(chunk_size=API_CHUNK_SIZE)
+            response = StreamingHttpResponse(
+                self._stream(request, rows, fields, limit, cursor),
+                content_type='application/json; charset=utf-8',
+            )
+        response['ETag'] = etag
+        # Resposta de quem tem o token: não fica em cache compartilhado, e sempre revalida.
+        response['Cache-Control'] = 'private, no-cache'
+        return response
+
+    def _selected_fields(self, value):
+        if not value:
+            return list(self.fields)
+        names = [name.strip() for name in value.split(',') if name.strip()]
+        unknown = [name for name in names if name not in self.fields]
+        if unknown or not names:
+            raise APIError(f"Campos desconhecidos: {', '.join(unknown)}. Disponíveis: {', '.join(self.fields)}.")
+        return list(dict.fromkeys(names))
+
+    def _limit(self, value):
+        if not value:
+            return API_DEFAULT_LIMIT
+        try:
+            limit = int(value)
+        except ValueError:
+            limit = 0
+        if limit < 1:
+            raise APIError("'limit' deve ser um inteiro positivo.")
+        return min(limit, API_MAX_LIMIT)
+
+    def _etag(self, request, queryset, limit):
+        # Só as limit + 1 linhas que a página lê (a extra decide has_more):
+        # o custo não cresce com o que vem depois do cursor.
+        page = list(queryset.order_by('updated_at', 'id').values_list('id', 'updated_at')[:limit + 1])
+        params = sorted((k, v) for k, v in request.GET.lists() if k != 'token')
+        raw = json.dumps([self.resource, params, page], cls=DjangoJSONEncoder)
+        return hashlib.sha1(raw.encode()).hexdigest()
+
+    def _rows(self, queryset, fields):
+        columns, related, prefetch = {'id', 'updated_at'}, set(), []
+        for name in fields:
+            field = self.fields[name]
+            columns.update(field.columns)
+            related.update(field.related)
+            prefetch.extend(p for p in field.prefetch if p not in prefetch)
+        queryset = queryset.only(*columns).order_by('updated_at', 'id')
+        if related:
+            queryset = queryset.select_related(*related)
+        if prefetch:
+            queryset = queryset.prefetch_related(*prefetch)
+        return queryset
+
+    def _stream(self, request, rows, fields, limit, cursor):
+        encoder = DjangoJSONEncoder(ensure_ascii=False)
+        getters = [(name, self.fields[name].get) for name in fields]
+        last, has_more = None, False
+        yield '{"results": ['
+        for index, obj in enumerate(rows):
+            if index == limit:
+                has_more = True
+                break
+            yield (',' if index else '') + encoder.encode({name: get(obj) for name, get in getters})
+            last = obj
+        next_cursor = _encode_cursor(last) if last is not None else cursor
+        next_url = None
+        if has_more:
+            params = request.GET.copy()
+            params['cursor'] = next_cursor
+            next_url = request.build_absolute_uri(f"{request.path}?{params.urlencode()}")
+        yield '], ' + encoder.encode({'has_more': has_more, 'next_cursor': next_cursor, 'next': next_url})[1:]
+
+
+class TicketSyncAPIView(SyncAPIView):
+    resource = 'tickets'
+    fields = {
+        'id': APIField(lambda t: t.id),
+        'codigo': APIField(lambda t: t.formatted_id),
+        'cliente_id': APIField(lambda t: t.client_id, ('client',)),
+        'cliente': APIField(lambda t: t.client.name, ('client', 'client__name'), ('client',)),
+        'status': APIField(lambda t: t.get_status_display(), ('status',)),
+        'status_codigo': APIField(lambda t: t.status, ('status',)),
+        'tecnico': APIField(_technicians_label, prefetch=(
+            Prefetch('technicians', queryset=User.objects.only('id', 'username')),
+        )),
+        'criado_em': APIField(lambda t: t.created_at, ('created_at',)),
+        'atualizado_em': APIField(lambda t: t.updated_at),
+        'prazo': APIField(lambda t: t.deadline, ('deadline',)),
+        'descricao': APIField(lambda t: t.description, ('description',)),
+        'tipo_chamado': APIField(lambda t: t.get_call_type_display() if t.call_type else None, ('call_type',)),
+        'prioridade': APIField(lambda t: t.problem_type.name if t.problem_type else None,
+                               ('problem_type', 'problem_type__name'), ('problem_type',)),
+    }
+
+    def get_queryset(self):
+        return Ticket.objects.all()
+
+    def filter_queryset(self, queryset, params):
+        if params.get('status'):
+            queryset = queryset.filter(status__in=[s.strip() for s in params['status'].split(',') if s.strip()])
+        if params.get('client'):
+            queryset = queryset.filter(client_id__in=_parse_ids(params['client'], 'client'))
+        if params.get('created_from'):
+            queryset = queryset.filter(created_at__gte=_parse_moment(params['created_from'], 'created_from'))
+        if params.get('created_to'):
+            queryset = queryset.filter(created_at__lte=_parse_moment(params['created_to'], 'created_to', end_of_day=True))
+        return queryset
+
+
+class ClientSyncAPIView(SyncAPIView):
+    resource = 'clients'
+    fields = {
+        'id': APIField(lambda c: c.id),
+        'nome': APIField(lambda c: c.name, ('name',)),
+        'email': APIField(lambda c: c.email, ('email',)),
+        'telefone': APIField(lambda c: c.phone, ('phone',)),
+        'endereco': APIField(lambda c: c.address, ('address',)),
+        'contato': APIField(lambda c: c.contact1_name, ('contact1_name',)),
+        'cidade': APIField(lambda c: c.city, ('city',)),
+        'estado': APIField(lambda c: c.state, ('state',)),
+        'criado_em': APIField(lambda c: c.created_at, ('created_at',)),
+        'atualizado_em': APIField(lambda c: c.updated_at),
+    }
+
+    def get_queryset(self):
+        return Client.objects.all()
+
+
+class EquipmentSyncAPIView(SyncAPIView):
+    resource = 'equipments'
+    fields = {
+        'id': APIField(lambda e: e.id),
+        'nome': APIField(lambda e: e.name, ('name',)),
+        'tipo': APIField(lambda e: e.equipment_type.name if e.equipment_type else None,
+                         ('equipment_type', 'equipment_type__name'), ('equipment_type',)),
+        'descricao': APIField(lambda e: e.description, ('description',)),
+        'atualizado_em': APIField(lambda e: e.updated_at),
+    }
+
+    def get_queryset(self):
+        return Equipment.objects.all()
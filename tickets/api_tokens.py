@@ -0,0 +1,112 @@
+"""
+Autenticação por token da API (TokenAuthMixin em api.py) sem consultar o
+perfil a cada request.
+
+`resolve(token)` devolve quem é o dono do token (ids e papel) e guarda a
+resposta no cache por TOKEN_CACHE_SECONDS — inclusive "token inexistente",
+para que tentativas com tokens errados também não batam no banco. O token
+nunca vai em claro para o cache: as chaves usam o SHA-256 dele.
+
+Revogação: qualquer mudança em UserProfile ou User (troca de token,
+desativação, exclusão, mudança de papel) incrementa a versão das entradas
+(signals.py), e o que estava em cache deixa de valer. Com o cache padrão
+(LocMemCache, um por processo) os outros workers só veem a mudança quando a
+entrada expira: no pior caso a API aceita um token revogado por até
+TOKEN_CACHE_SECONDS — por isso o TTL é curto. Com CACHE_REDIS_URL (cache
+compartilhado) a revogação vale na hora para todos. O login por token
+(backends.py) não depende disso: confere usuário ativo e token no banco.
+
+`hit(token)` faz a contagem de requests por token numa janela de
+RATE_WINDOW_SECONDS; acima de API_TOKEN_RATE_LIMIT a API responde 429. A
+contagem fica no mesmo cache: com LocMemCache cada worker conta à parte, e o
+limite efetivo chega a (número de workers) x API_TOKEN_RATE_LIMIT — 3x com o
+os_gunicorn.service atual. Para um limite exato, use CACHE_REDIS_URL.
+"""
+from collections import namedtuple
+import hashlib
+import logging
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .models import UserProfile
+
+logger = logging.getLogger(__name__)
+
+TOKEN_CACHE_SECONDS = getattr(settings, 'API_TOKEN_CACHE_SECONDS', 60)
+# Requests por token a cada RATE_WINDOW_SECONDS (0 desliga o limite).
+RATE_LIMIT = getattr(settings, 'API_TOKEN_RATE_LIMIT', 600)
+RATE_WINDOW_SECONDS = 60
+
+TokenIdentity = namedtuple('TokenIdentity', 'profile_id user_id role')
+# Campos de UserProfile/User que mudam o resultado de resolve().
+IDENTITY_FIELDS = {'token', 'role', 'user', 'is_active'}
+
+_VERSION_KEY = 'tickets:api_token:version'
+# Marca "token inexistente" no cache (None é o "não está no cache").
+_MISSING = 0
+
+
+def token_digest(token):
+    return hashlib.sha256(str(token).encode()).hexdigest()
+
+
+def _version():
+    version = cache.get(_VERSION_KEY)
+    if version is None:
+        cache.add(_VERSION_KEY, int(time.time() * 1000), None)
+        version = cache.get(_VERSION_KEY)
+    return version
+
+
+def invalidate():
+    """Descarta os tokens em cache (chamado pelos signals de UserProfile/User)."""
+    try:
+        cache.incr(_VERSION_KEY)
+    except ValueError:
+        cache.add(_VERSION_KEY, int(time.time() * 1000), None)
+    except Exception:
+        logger.exception("Erro ao invalidar o cache de tokens da API")
+
+
+def resolve(token):
+    """TokenIdentity do dono do token, ou None (token inexistente ou usuário inativo)."""
+    if not token:
+        return None
+    key = f'tickets:api_token:{_version()}:{token_digest(token)}'
+    cached = cache.get(key)
+    if cached is not None:
+        return TokenIdentity(*cached) if cached != _MISSING else None
+
+    row = (
+        UserProfile.objects.filter(token=token, user__is_active=True)
+        .values_list('id', 'user_id', 'role')
+        .first()
+    )
+    cache.set(key, tuple(row) if row else _MISSING, TOKEN_CACHE_SECONDS)
+    return TokenIdentity(*row) if row else None
+
+
+def hit(token):
+    """
+    Conta um request do token na janela atual. Devolve (permitido, restantes);
+    restantes é None quando não há limite.
+    """
+    if not RATE_LIMIT:
+        return True, None
+    window = int(time.time() // RATE_WINDOW_SECONDS)
+    key = f'tickets:api_token:rate:{token_digest(token)}:{window}'
+    cache.add(key, 0, RATE_WINDOW_SECONDS * 2)
+    try:
+        count = cache.incr(key)
+    except ValueError:
+        # Expirou entre o add e o incr: recomeça a contagem.
+        cache.set(key, 1, RATE_WINDOW_SECONDS * 2)
+        count = 1
+    return count <= RATE_LIMIT, max(RATE_LIMIT - count, 0)
+
+
+def retry_after():
+    """Segundos até a próxima janela de contagem."""
+    return RATE_WINDOW_SECONDS - int(time.time()) % RATE_WINDOW_SECONDS
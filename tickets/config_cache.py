@@ -0,0 +1,52 @@
+"""
+Acesso às configurações singleton (SystemSettings) e às configurações de
+provedor ativas (IA, busca, voz), lidas do banco só quando mudam.
+
+Cada valor fica em cache versionado (versioned_cache.py); os signals de
+save/delete desses modelos (signals.py) invalidam o valor correspondente.
+Os objetos devolvidos são compartilhados entre requests — para alterar uma
+configuração, busque a linha no banco (como fazem as telas de Configurações).
+"""
+from .models import AIProviderConfig, SearchProviderConfig, SystemSettings, VoiceProviderConfig
+from .versioned_cache import VersionedCache
+
+
+def _load_system_settings():
+    settings_obj, _ = SystemSettings.objects.get_or_create(pk=1)
+    return settings_obj
+
+
+def _active_loader(model):
+    return lambda: model.objects.filter(is_active=True).first()
+
+
+_caches = {
+    SystemSettings: VersionedCache('system_settings', _load_system_settings),
+    AIProviderConfig: VersionedCache('active_ai_config', _active_loader(AIProviderConfig)),
+    SearchProviderConfig: VersionedCache('active_search_config', _active_loader(SearchProviderConfig)),
+    VoiceProviderConfig: VersionedCache('active_voice_config', _active_loader(VoiceProviderConfig)),
+}
+
+
+def get_system_settings() -> SystemSettings | None:
+    """Configurações gerais (linha pk=1, criada se não existir). None só se a tabela não existir."""
+    return _caches[SystemSettings].get()
+
+
+def get_active_ai_config() -> AIProviderConfig | None:
+    return _caches[AIProviderConfig].get()
+
+
+def get_active_search_config() -> SearchProviderConfig | None:
+    return _caches[SearchProviderConfig].get()
+
+
+def get_active_voice_config() -> VoiceProviderConfig | None:
+    return _caches[VoiceProviderConfig].get()
+
+
+def invalidate(model):
+    """Descarta o valor em cache ligado ao modelo (chamado pelos signals)."""
+    cache = _caches.get(model)
+    if cache is not None:
+        cache.invalidate()
@@ -1,13 +1,9 @@
-from .models import SystemSettings, Notification, ChecklistTemplate, AppPage, RoleLevel, RolePagePermission, SearchProviderConfig, VoiceProviderConfig
-from django.db.utils import OperationalError, ProgrammingError
+from .models import ChecklistTemplate
+from . import config_cache, page_permissions, request_context
 
 def system_settings(request):
-    try:
-        settings = SystemSettings.objects.first()
-        if not settings:
-            settings = SystemSettings.objects.create()
-    except Exception:
-        settings = None
+    user_context = request_context.get(request)
+    settings = user_context.settings
 
     context = {}
     if settings:
@@ -15,16 +11,15 @@ def system_settings(request):
         context['session_timeout_minutes'] = settings.session_timeout_minutes
 
     try:
-        context['active_search_config'] = SearchProviderConfig.objects.filter(is_active=True).first()
-        context['active_voice_config'] = VoiceProviderConfig.objects.filter(is_active=True).first()
-    except (OperationalError, ProgrammingError):
+        context['active_search_config'] = config_cache.get_active_search_config()
+        context['active_voice_config'] = config_cache.get_active_voice_config()
+    except Exception:
         context['active_search_config'] = None
         context['active_voice_config'] = None
 
     if request.user.is_authenticated:
-        unread = Notification.objects.filter(recipient=request.user, is_read=False, deleted_by_recipient=False).order_by('-created_at')
-        context['unread_notifications'] = unread
-        context['unread_notifications_count'] = unread.count()
+        context['unread_notifications'] = user_context.unread_notifications
+        context['unread_notifications_count'] = user_context.unread_notifications_count
         
         # Add checklist templates for sidebar
         try:
@@ -32,26 +27,14 @@ def system_settings(request):
         except Exception:
             context['sidebar_checklist_templates'] = []
 
-        profile = getattr(request.user, 'profile', None)
+        profile = user_context.profile
         role_code = getattr(profile, 'role', None) if profile else None
         allow_pdf_reports = getattr(profile, 'allow_pdf_reports', True) if profile else True
 
         can_access_permissions = role_code in {'admin', 'super_admin'}
-        if role_code == 'super_admin':
-            can_access_permissions = True
-        elif role_code == 'admin':
+        if role_code == 'admin':
             try:
-                page = AppPage.objects.filter(url_name='permissions').first()
-                if page and not page.is_enabled:
-                    can_access_permissions = False
-                else:
-                    role = RoleLevel.objects.filter(code='admin', is_active=True).first()
-                    if role and page:
-                        perm = RolePagePermission.objects.filter(role=role, page=page).first()
-                        if perm and not perm.allowed:
-                            can_access_permissions = False
-            except (OperationalError, ProgrammingError):
-                can_access_permissions = True
+                can_access_permissions = page_permissions.is_allowed('admin', 'permissions')
             except Exception:
                 can_access_permissions = True
 
@@ -101,30 +84,7 @@ def system_settings(request):
             allowed_url_names -= admin_only_url_names
 
         try:
-            pages = list(AppPage.objects.filter(url_name__in=ui_url_names))
-            page_by_id = {p.id: p for p in pages}
-            page_by_url_name = {p.url_name: p for p in pages}
-
-            for url_name, page in page_by_url_name.items():
-                if not page.is_enabled and url_name in allowed_url_names:
-                    allowed_url_names.remove(url_name)
-
-            if role_code and role_code != 'super_admin':
-                role = RoleLevel.objects.filter(code=role_code, is_active=True).first()
-                if role:
-                    denied_page_ids = set(
-                        RolePagePermission.objects.filter(
-                            role=role,
-                            page_id__in=page_by_id.keys(),
-                            allowed=False,
-                        ).values_list('page_id', flat=True)
-                    )
-                    for page_id in denied_page_ids:
-                        page = page_by_id.get(page_id)
-                        if page and page.url_name in allowed_url_names:
-                            allowed_url_names.remove(page.url_name)
-        except (OperationalError, ProgrammingError):
-            pass
+            allowed_url_names = page_permissions.filter_allowed(role_code, allowed_url_names)
         except Exception:
             pass
 
@@ -0,0 +1,230 @@
+"""
+Agregações do Dashboard calculadas com agregação condicional (COUNT ... FILTER)
+e GROUP BY, em vez de um COUNT separado por status e cinco por sistema.
+
+O número de consultas fica constante, independente de quantos TicketStatus ou
+System estiverem cadastrados: uma consulta para cards + série de status, uma
+para o top de clientes, uma para a saúde dos sistemas e uma para a lista de
+TicketStatus ativos.
+
+Quando o filtro é só período/cliente, os totais vêm da tabela consolidada
+TicketDailyStat (ver ticket_stats.py) em vez de varrer Ticket no período todo.
+"""
+from django.db.models import Count, Exists, OuterRef, Q
+from django.utils import timezone
+
+from .models import Client, System, Ticket, TicketStatus
+from . import ticket_stats
+
+
+OPEN_STATUSES = ('open', 'pending')
+
+
+def _count(**filters):
+    # distinct=True porque o queryset pode vir com JOIN em technicians/systems
+    # (filtro por colaborador), o que duplicaria linhas na contagem.
+    if filters:
+        return Count('id', distinct=True, filter=Q(**filters))
+    return Count('id', distinct=True)
+
+
+def status_counts(tickets_qs, user=None):
+    """
+    Retorna ({status_code: total}, total_do_usuario) numa única consulta agrupada
+    por status. O total do usuário (OS em que ele é técnico) vem na mesma
+    consulta como contagem condicional.
+    """
+    annotations = {'total': _count()}
+    if user is not None and getattr(user, 'is_authenticated', False):
+        # EXISTS em vez de filter=Q(technicians=user): o JOIN em technicians
+        # seria reaproveitado do filtro por colaborador e contaria errado.
+        tickets_qs = tickets_qs.annotate(
+            _is_mine=Exists(
+                Ticket.technicians.through.objects.filter(ticket_id=OuterRef('pk'), user_id=user.pk)
+            )
+        )
+        annotations['mine'] = _count(_is_mine=True)
+
+    rows = tickets_qs.order_by().values('status').annotate(**annotations)
+
+    by_status = {}
+    mine = 0
+    for row in rows:
+        by_status[row['status']] = by_status.get(row['status'], 0) + row['total']
+        mine += row.get('mine') or 0
+    return by_status, mine
+
+
+def status_series(by_status, statuses=None):
+    """
+    Labels/dados do gráfico de status na ordem dos TicketStatus ativos (ou dos
+    STATUS_CHOICES legados, quando não houver nenhum cadastrado).
+    """
+    if statuses is None:
+        statuses = list(TicketStatus.objects.filter(is_active=True).order_by('order', 'name'))
+
+    labels, data = [], []
+    if statuses:
+        for ts in statuses:
+            labels.append(ts.name)
+            data.append(by_status.get(ts.code, 0))
+    else:
+        for status_code, status_label in Ticket.STATUS_CHOICES:
+            labels.append(status_label)
+            data.append(by_status.get(status_code, 0))
+    return labels, data
+
+
+def top_clients(tickets_qs, limit=20):
+    """Top N clientes por volume de OS no período (labels, dados)."""
+    rows = (
+        tickets_qs
+        .order_by()
+        .values('client__name')
+        .annotate(total=_count())
+        .order_by('-total')[:limit]
+    )
+    labels, data = [], []
+    for row in rows:
+        labels.append(row['client__name'] or 'Sem Cliente')
+        data.append(row['total'])
+    return labels, data
+
+
+def system_health(tickets_qs, now=None):
+    """
+    Volume, resolvidas, em aberto (no prazo) e atrasadas por sistema, numa única
+    consulta agrupada pelo sistema. Sistemas sem OS no período não aparecem,
+    como antes; a ordem segue o id do sistema (ordem padrão de System).
+    """
+    now = now or timezone.now()
+    rows = (
+        tickets_qs
+        .order_by()
+        .values('systems__id', 'systems__name', 'systems__color')
+        .annotate(
+            volume=_count(),
+            resolved=_count(status='finished'),
+            open=_count(status__in=OPEN_STATUSES, deadline__gte=now),
+            overdue=_count(status__in=OPEN_STATUSES, deadline__lt=now),
+        )
+        .order_by('systems__id')
+    )
+
+    health = {
+        'labels': [],
+        'colors': [],
+        'volume': [],
+        'resolved': [],
+        'open': [],
+        'overdue': [],
+    }
+    for row in rows:
+        if row['systems__id'] is None or not row['volume']:
+            continue
+        health['labels'].append(row['systems__name'])
+        health['colors'].append(row['systems__color'] or '#6c757d')
+        health['volume'].append(row['volume'])
+        health['resolved'].append(row['resolved'])
+        health['open'].append(row['open'])
+        health['overdue'].append(row['overdue'])
+    return health
+
+
+def _rollup_stats(tickets_qs, start, end, client_id=None, user=None, now=None):
+    """
+    Mesmo resultado de status_counts/top_clients/system_health, mas lendo os
+    totais da tabela consolidada. Só "no prazo"/"atrasadas" (que dependem do
+    momento atual, não do dia de abertura) e "minhas OS" consultam Ticket.
+    """
+    by_client_status = ticket_stats.count_by(start, end, ('client', 'status'), client_id=client_id)
+    by_system_status = ticket_stats.count_by(start, end, ('system', 'status'), client_id=client_id)
+
+    by_status = {}
+    by_client = {}
+    for (client_pk, status), total in by_client_status.items():
+        by_status[status] = by_status.get(status, 0) + total
+        by_client[client_pk] = by_client.get(client_pk, 0) + total
+
+    mine = 0
+    if user is not None and getattr(user, 'is_authenticated', False):
+        mine = tickets_qs.filter(technicians=user).count()
+
+    client_names = dict(Client.objects.filter(id__in=by_client.keys()).values_list('id', 'name'))
+    ranked = sorted(by_client.items(), key=lambda item: (-item[1], client_names.get(item[0]) or ''))[:20]
+    client_labels = [client_names.get(pk) or 'Sem Cliente' for pk, _ in ranked]
+    client_data = [total for _, total in ranked]
+
+    volume, resolved = {}, {}
+    for (system_pk, status), total in by_system_status.items():
+        volume[system_pk] = volume.get(system_pk, 0) + total
+        if status == 'finished':
+            resolved[system_pk] = resolved.get(system_pk, 0) + total
+
+    deadlines = (
+        tickets_qs
+        .order_by()
+        .filter(status__in=OPEN_STATUSES, systems__isnull=False)
+        .values('systems__id')
+        .annotate(
+            open=_count(deadline__gte=now),
+            overdue=_count(deadline__lt=now),
+        )
+    )
+    open_by_system = {row['systems__id']: row for row in deadlines}
+
+    health = {'labels': [], 'colors': [], 'volume': [], 'resolved': [], 'open': [], 'overdue': []}
+    for system in System.objects.filter(id__in=[pk for pk, n in volume.items() if n]).order_by('id'):
+        row = open_by_system.get(system.id, {})
+        health['labels'].append(system.name)
+        health['colors'].append(system.color or '#6c757d')
+        health['volume'].append(volume[system.id])
+        health['resolved'].append(resolved.get(system.id, 0))
+        health['open'].append(row.get('open', 0))
+        health['overdue'].append(row.get('overdue', 0))
+
+    return by_status, mine, (client_labels, client_data), health
+
+
+def build_dashboard_stats(tickets_qs, user=None, now=None, period=None, client_id=None):
+    """
+    Monta todas as chaves de contexto de cards e gráficos do Dashboard a partir
+    do queryset já filtrado (período/cliente/colaborador).
+
+    `period` = (inicio, fim) usa a tabela consolidada para os totais; só é
+    válido quando tickets_qs não tem outros filtros além de período e cliente.
+    """
+    now = now or timezone.now()
+
+    if period is not None:
+        by_status, mine, (client_labels, client_data), health = _rollup_stats(
+            tickets_qs, period[0], period[1], client_id=client_id, user=user, now=now
+        )
+    else:
+        by_status, mine = status_counts(tickets_qs, user)
+        client_labels, client_data = top_clients(tickets_qs)
+        health = system_health(tickets_qs, now)
+    status_labels, status_data = status_series(by_status)
+
+    return {
+        'total_tickets': sum(by_status.values()),
+        'tickets_open': by_status.get('open', 0),
+        'tickets_pending': by_status.get('pending', 0),
+        'tickets_finished': by_status.get('finished', 0),
+        'my_tickets': mine,
+
+        'chart_status_labels': status_labels,
+        'chart_status_data': status_data,
+
+        'chart_client_labels': client_labels,
+        'chart_client_data': client_data,
+
+        'chart_system_labels': health['labels'],
+        'chart_system_data': health['volume'],
+        'chart_system_colors': health['colors'],
+
+        'chart_sys_health_labels': health['labels'],
+        'chart_sys_resolved': health['resolved'],
+        'chart_sys_open': health['open'],
+        'chart_sys_overdue': health['overdue'],
+    }
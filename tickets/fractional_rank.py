@@ -0,0 +1,66 @@
+"""
+Chaves de ordenação fracionárias (strings comparáveis lexicograficamente).
+
+Entre duas chaves sempre existe outra, então reposicionar um item grava só a
+linha dele — nada de renumerar a lista inteira. As chaves usam apenas dígitos
+e letras minúsculas para que a comparação seja a mesma no SQLite e no MySQL
+(collation case-insensitive) e nunca terminam em '0', o que garante que sempre
+haja espaço antes de qualquer chave.
+"""
+DIGITS = '0123456789abcdefghijklmnopqrstuvwxyz'
+BASE = len(DIGITS)
+
+# Chave "do meio": usada como posição das OS que o usuário nunca moveu.
+MIDDLE = DIGITS[BASE // 2]
+
+
+def rank_between(lower=None, upper=None):
+    """
+    Chave estritamente entre `lower` e `upper` (None = sem limite daquele lado).
+    Nunca devolve MIDDLE, que é a posição das OS não movidas.
+    """
+    lower = lower or ''
+    if upper is not None and lower >= upper:
+        raise ValueError(f"Chaves fora de ordem: {lower!r} >= {upper!r}")
+    key = _midpoint(lower, upper)
+    if key == MIDDLE:
+        # lower < MIDDLE < upper: fica logo abaixo do bloco não movido.
+        return _midpoint(MIDDLE, upper)
+    return key
+
+
+def _midpoint(lower, upper):
+    if upper is not None:
+        # Prefixo comum (completando `lower` com zeros) é copiado.
+        n = 0
+        while n < len(upper) and (lower[n] if n < len(lower) else '0') == upper[n]:
+            n += 1
+        if n > 0:
+            return upper[:n] + _midpoint(lower[n:], upper[n:])
+
+    digit_lower = DIGITS.index(lower[0]) if lower else 0
+    digit_upper = DIGITS.index(upper[0]) if upper is not None else BASE
+    if digit_upper - digit_lower > 1:
+        return DIGITS[(digit_lower + digit_upper) // 2]
+    # Dígitos consecutivos: desce uma casa.
+    if upper is not None and len(upper) > 1:
+        return upper[:1]
+    return DIGITS[digit_lower] + _midpoint(lower[1:], None)
+
+
+def spread(count, lower=None, upper=None):
+    """`count` chaves crescentes, bem espaçadas, entre lower e upper."""
+    keys = []
+    if count <= 0:
+        return keys
+    # Divide recursivamente ao meio para manter as chaves curtas.
+    def fill(lo, hi, n):
+        if n <= 0:
+            return
+        mid = rank_between(lo, hi)
+        left = (n - 1) // 2
+        fill(lo, mid, left)
+        keys.append(mid)
+        fill(mid, hi, n - 1 - left)
+    fill(lower, upper, count)
+    return keys
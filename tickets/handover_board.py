@@ -0,0 +1,145 @@
+"""
+Dados dos post-its da Passagem de Turno (TaskListView) para uma página inteira
+de turnos, em número fixo de consultas — independente de quantos turnos a
+página tem (7 nos "recentes", até 30 num mês com turno noturno):
+
+- os ShiftHandover dos turnos da página (uma consulta);
+- as anotações desses turnos com autor, pai e alertas (três consultas);
+- as OS abertas dentro da janela da página (uma consulta) e as pendências
+  candidatas (duas, ver _pending_candidates), distribuídas pelos turnos em
+  Python.
+
+Turno sem ShiftHandover continua sem: a linha só é criada quando alguém
+escreve nele (anotação pelo post-it ou pelo Jota4) — abrir a página é só
+leitura.
+"""
+from bisect import bisect_left
+
+from django.db.models import Prefetch, Q
+
+from .models import ShiftHandover, ShiftHandoverEntry, ShiftHandoverEntryAlert, Ticket
+
+# Máximo de OS listadas por turno em cada seção do post-it.
+TICKETS_PER_SHIFT = 30
+PENDING_STATUSES = ('pending', 'in_progress', 'open')
+CLOSED_STATUSES = ('finished', 'canceled')
+
+# Só o que o post-it mostra de cada OS.
+_TICKET_FIELDS = ('id', 'leankeep_id', 'status', 'deadline', 'created_at', 'updated_at', 'client__name')
+
+
+def _ticket_queryset():
+    return Ticket.objects.select_related('client').only(*_TICKET_FIELDS)
+
+
+def _entries_by_handover(handover_ids, user):
+    entries = {}
+    if not handover_ids:
+        return entries
+    queryset = (
+        ShiftHandoverEntry.objects
+        .filter(handover_id__in=handover_ids)
+        .select_related('created_by', 'parent')
+        .prefetch_related(
+            # Todos os alertas (para o criador acompanhar as baixas) e os do usuário (destinatário).
+            Prefetch('alerts', queryset=ShiftHandoverEntryAlert.objects.select_related('target_user'),
+                     to_attr='alerts_all'),
+            Prefetch('alerts', queryset=ShiftHandoverEntryAlert.objects.filter(target_user=user),
+                     to_attr='alerts_for_user'),
+        )
+    )
+    for entry in queryset:
+        entries.setdefault(entry.handover_id, []).append(entry)
+    return entries
+
+
+def _created_in(tickets, created, start, end):
+    """OS abertas em [start, end), mais novas primeiro. `tickets` em ordem crescente de created_at."""
+    lo = bisect_left(created, start)
+    hi = bisect_left(created, end)
+    return tickets[max(lo, hi - TICKETS_PER_SHIFT):hi][::-1]
+
+
+def _pending_at(candidates, end):
+    """Pendências do turno que termina em `end` (mesma regra da consulta, já na ordem dela)."""
+    selected = []
+    for ticket in candidates:
+        if ticket.created_at > end:
+            continue
+        if (ticket.deadline and ticket.deadline < end) or ticket.status in PENDING_STATUSES:
+            selected.append(ticket)
+            if len(selected) >= TICKETS_PER_SHIFT:
+                break
+    return selected
+
+
+def _pending_filter(end):
+    return (
+        Q(created_at__lte=end)
+        & (Q(deadline__lt=end) | Q(status__in=PENDING_STATUSES))
+        & ~Q(status__in=CLOSED_STATUSES)
+    )
+
+
+def _pending_candidates(first_end, last_end):
+    """
+    Candidatas a pendência em qualquer turno da página, na ordem por prazo; a
+    regra de cada turno é aplicada em _pending_at.
+
+    A regra só cresce com o fim do turno: o que é pendência no turno que
+    termina primeiro (`first_end`) é em todos. Dessas basta o começo da fila
+    (TICKETS_PER_SHIFT) — é o que as acumuladas há meses disputam. O resto só
+    vira pendência dentro da janela (criada depois de `first_end`, ou prazo
+    vencendo até `last_end`), então cresce com a janela, não com o histórico.
+    """
+    everywhere = list(
+        _ticket_queryset().filter(_pending_filter(first_end)).order_by('deadline', '-updated_at')[:TICKETS_PER_SHIFT]
+    )
+    in_window = list(
+        _ticket_queryset()
+        .filter(_pending_filter(last_end))
+        .filter(Q(created_at__gt=first_end) | (Q(deadline__gte=first_end) & ~Q(status__in=PENDING_STATUSES)))
+    )
+    candidates = sorted(everywhere + in_window, key=lambda t: t.updated_at, reverse=True)
+    # Prazo vazio primeiro, como no ORDER BY do banco.
+    candidates.sort(key=lambda t: (t.deadline is not None, t.deadline or first_end))
+    return candidates
+
+
+def load(shifts, user):
+    """
+    Para cada turno de `shifts` (dicts com date, type, start e end), na mesma
+    ordem: {'handover': ShiftHandover ou None, 'entries': [...],
+    'tickets_created': [...], 'pendencias': [...]}.
+    """
+    if not shifts:
+        return []
+
+    handovers = {
+        (h.shift_date, h.shift_type): h
+        for h in ShiftHandover.objects.filter(shift_date__in={sh['date'] for sh in shifts})
+    }
+    entries = _entries_by_handover([h.id for h in handovers.values()], user)
+
+    window_start = min(sh['start'] for sh in shifts)
+    window_end = max(sh['end'] for sh in shifts)
+
+    created_tickets = list(
+        _ticket_queryset()
+        .filter(created_at__gte=window_start, created_at__lt=window_end)
+        .order_by('created_at', 'id')
+    )
+    created_at = [t.created_at for t in created_tickets]
+
+    pending_candidates = _pending_candidates(min(sh['end'] for sh in shifts), window_end)
+
+    board = []
+    for sh in shifts:
+        handover = handovers.get((sh['date'], sh['type']))
+        board.append({
+            'handover': handover,
+            'entries': entries.get(handover.id, []) if handover else [],
+            'tickets_created': _created_in(created_tickets, created_at, sh['start'], sh['end']),
+            'pendencias': _pending_at(pending_candidates, sh['end']),
+        })
+    return board
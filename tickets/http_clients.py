@@ -0,0 +1,217 @@
+"""
+Clientes HTTP reaproveitados entre requests (por processo), para não pagar
+conexão TCP + handshake TLS a cada mensagem do chat:
+
+- `sdk_client(kind, api_key, base_url)`: cliente dos SDKs (OpenAI/DeepSeek/
+  Gemini, Anthropic, ElevenLabs), guardado por (tipo, chave, base_url). Os
+  SDKs mantêm um pool httpx com keep-alive e podem ser usados por várias
+  threads ao mesmo tempo. `invalidate()` (signals de AIProviderConfig,
+  SearchProviderConfig e VoiceProviderConfig) descarta todos; os próximos
+  pedidos montam clientes novos com a configuração atual.
+- `urlopen(request, timeout)`: substituto de urllib.request.urlopen para as
+  chamadas REST feitas à mão (busca Google/Tavily, TTS Google, Microsoft
+  Graph). Mantém até POOL_SIZE_PER_HOST conexões abertas por host e devolve
+  uma resposta já lida, com a mesma interface usada por quem chamava
+  urlopen (`read()`, `status`, `headers`, context manager) e as mesmas
+  exceções (urllib.error.HTTPError para status >= 400). Com proxy
+  configurado no ambiente, cai no urllib de sempre.
+"""
+import http.client
+import io
+import logging
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+POOL_SIZE_PER_HOST = 4
+# Conexões ociosas há mais tempo que isso são descartadas (servidores costumam
+# fechar keep-alive ocioso em ~60s).
+IDLE_SECONDS = 50
+MAX_REDIRECTS = 5
+# Limite de clientes de SDK guardados (cada combinação chave/base_url distinta).
+MAX_SDK_CLIENTS = 16
+
+_REDIRECT_CODES = (301, 302, 303, 307, 308)
+
+
+# ---------------------------------------------------------------------------
+# Clientes dos SDKs
+# ---------------------------------------------------------------------------
+
+_sdk_clients = OrderedDict()
+_sdk_lock = threading.Lock()
+
+
+def _build_sdk_client(kind, api_key, base_url):
+    if kind == 'anthropic':
+        import anthropic
+        return anthropic.Anthropic(api_key=api_key)
+    if kind == 'openai':
+        from openai import OpenAI
+        return OpenAI(api_key=api_key, **({"base_url": base_url} if base_url else {}))
+    if kind == 'elevenlabs':
+        from elevenlabs.client import ElevenLabs
+        return ElevenLabs(api_key=api_key)
+    raise ValueError(f"Tipo de cliente desconhecido: {kind}")
+
+
+def sdk_client(kind, api_key, base_url=None):
+    """Cliente do SDK `kind` ('openai', 'anthropic' ou 'elevenlabs'), criado uma vez por chave/base_url."""
+    key = (kind, api_key, base_url)
+    with _sdk_lock:
+        client = _sdk_clients.get(key)
+        if client is not None:
+            _sdk_clients.move_to_end(key)
+            return client
+    client = _build_sdk_client(kind, api_key, base_url)
+    with _sdk_lock:
+        # Outra thread pode ter criado o mesmo cliente nesse meio tempo: fica o primeiro.
+        client = _sdk_clients.setdefault(key, client)
+        _sdk_clients.move_to_end(key)
+        while len(_sdk_clients) > MAX_SDK_CLIENTS:
+            _sdk_clients.popitem(last=False)
+    return client
+
+
+def invalidate():
+    """Descarta os clientes de SDK guardados (chamado quando uma configuração de provedor muda).
+
+    Não fecha os clientes: algum request pode estar no meio de uma chamada com
+    eles — as conexões fecham quando o último uso terminar.
+    """
+    with _sdk_lock:
+        _sdk_clients.clear()
+
+
+# ---------------------------------------------------------------------------
+# Pool de conexões HTTP(S) para chamadas REST
+# ---------------------------------------------------------------------------
+
+_idle = {}  # (scheme, host, port) -> [(conexão, devolvida_em)]
+_idle_lock = threading.Lock()
+
+
+class PooledResponse:
+    """Resposta já lida por inteiro — a conexão volta para o pool antes de chegar aqui."""
+
+    def __init__(self, url, status, reason, headers, body):
+        self.url = url
+        self.status = self.code = status
+        self.reason = reason
+        self.headers = headers
+        self._body = io.BytesIO(body)
+
+    def read(self, amt=None):
+        return self._body.read() if amt is None else self._body.read(amt)
+
+    def getcode(self):
+        return self.status
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+def _take_connection(origin, timeout):
+    now = time.monotonic()
+    with _idle_lock:
+        idle = _idle.get(origin, [])
+        while idle:
+            conn, returned_at = idle.pop()
+            if now - returned_at < IDLE_SECONDS:
+                conn.timeout = timeout
+                if conn.sock is not None:
+                    conn.sock.settimeout(timeout)
+                return conn, True
+            conn.close()
+    return _new_connection(origin, timeout), False
+
+
+def _new_connection(origin, timeout):
+    scheme, host, port = origin
+    conn_cls = http.client.HTTPSConnection if scheme == 'https' else http.client.HTTPConnection
+    return conn_cls(host, port, timeout=timeout)
+
+
+def _release_connection(origin, conn):
+    with _idle_lock:
+        idle = _idle.setdefault(origin, [])
+        if len(idle) < POOL_SIZE_PER_HOST:
+            idle.append((conn, time.monotonic()))
+            return
+    conn.close()
+
+
+def _send(method, url, body, headers, timeout):
+    parts = urllib.parse.urlsplit(url)
+    origin = (parts.scheme, parts.hostname, parts.port or (443 if parts.scheme == 'https' else 80))
+    path = urllib.parse.urlunsplit(('', '', parts.path or '/', parts.query, ''))
+    headers = {'Host': parts.netloc, 'Connection': 'keep-alive', **headers}
+
+    conn, reused = _take_connection(origin, timeout)
+    try:
+        conn.request(method, path, body=body, headers=headers)
+        response = conn.getresponse()
+        payload = response.read()
+    except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError) as e:
+        conn.close()
+        if not reused:
+            raise urllib.error.URLError(e)
+        # O servidor fechou a conexão ociosa: tenta uma vez com uma conexão nova.
+        conn = _new_connection(origin, timeout)
+        try:
+            conn.request(method, path, body=body, headers=headers)
+            response = conn.getresponse()
+            payload = response.read()
+        except Exception:
+            conn.close()
+            raise
+    except Exception:
+        conn.close()
+        raise
+
+    if response.will_close:
+        conn.close()
+    else:
+        _release_connection(origin, conn)
+    return response, payload
+
+
+def urlopen(request, timeout=30):
+    """Como urllib.request.urlopen(request, timeout), reaproveitando conexões por host."""
+    if isinstance(request, str):
+        request = urllib.request.Request(request)
+    url = request.full_url
+    scheme = urllib.parse.urlsplit(url).scheme
+    if scheme not in ('http', 'https') or urllib.request.getproxies().get(scheme):
+        return urllib.request.urlopen(request, timeout=timeout)
+
+    method = request.get_method()
+    body = request.data
+    headers = dict(request.header_items())
+    if body is not None:
+        headers.setdefault('Content-Length', str(len(body)))
+        headers.setdefault('Content-type', 'application/x-www-form-urlencoded')
+
+    for _ in range(MAX_REDIRECTS + 1):
+        response, payload = _send(method, url, body, headers, timeout)
+        if response.status in _REDIRECT_CODES and response.getheader('Location'):
+            url = urllib.parse.urljoin(url, response.getheader('Location'))
+            if response.status == 303 or (response.status in (301, 302) and method == 'POST'):
+                method, body = 'GET', None
+                headers = {k: v for k, v in headers.items() if k.lower() not in ('content-length', 'content-type')}
+            continue
+        if response.status >= 400:
+            raise urllib.error.HTTPError(url, response.status, response.reason, response.msg, io.BytesIO(payload))
+        return PooledResponse(url, response.status, response.reason, response.msg, payload)
+    raise urllib.error.HTTPError(url, response.status, 'Redirecionamentos demais', response.msg, io.BytesIO(payload))
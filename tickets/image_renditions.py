@@ -0,0 +1,105 @@
+"""
+Versões reduzidas ("renditions") das fotos anexadas a OS, evoluções e
+checklists.
+
+As fotos chegam do celular em resolução cheia (vários MB cada). O PDF
+(xhtml2pdf) e as miniaturas da lista não precisam disso: aqui cada foto ganha
+versões redimensionadas e recomprimidas, gravadas em
+MEDIA_ROOT/renditions/<tamanho>/<caminho original>. São geradas logo após o
+upload (signals.py) ou, para fotos antigas, no primeiro uso; uma versão mais
+antiga que a foto original é refeita.
+
+Qualquer falha (arquivo ausente, formato não suportado) devolve o original.
+"""
+import logging
+import os
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+
+logger = logging.getLogger(__name__)
+
+RENDITION_DIR = 'renditions'
+RENDITIONS = {
+    # Tamanho usado nos PDFs (cabe com folga na largura de uma página A4).
+    'report': {'max_size': (1200, 1200), 'quality': 80},
+    # Miniaturas da lista/acordeão de OS.
+    'thumb': {'max_size': (320, 320), 'quality': 75},
+}
+# Só fotos enviadas pelos usuários; logos e ícones ficam como estão.
+SOURCE_DIRS = ('tickets/', 'ticket_updates/', 'checklist_photos/')
+
+
+def rendition_name(name, size):
+    """Caminho (relativo ao MEDIA) da versão `size` da foto `name`."""
+    base, ext = os.path.splitext(name)
+    ext = '.png' if ext.lower() == '.png' else '.jpg'
+    return f'{RENDITION_DIR}/{size}/{base}{ext}'
+
+
+def _absolute(name):
+    return os.path.join(settings.MEDIA_ROOT, name.replace('/', os.sep))
+
+
+def _render(source_path, target_path, spec):
+    from PIL import Image, ImageOps
+
+    with Image.open(source_path) as img:
+        # O xhtml2pdf ignora a orientação EXIF: fotos de celular saíam deitadas.
+        img = ImageOps.exif_transpose(img)
+        img.thumbnail(spec['max_size'], Image.LANCZOS)
+        os.makedirs(os.path.dirname(target_path), exist_ok=True)
+        tmp_path = f'{target_path}.{os.getpid()}.tmp'
+        if target_path.endswith('.png'):
+            img.save(tmp_path, format='PNG', optimize=True)
+        else:
+            if img.mode not in ('RGB', 'L'):
+                img = img.convert('RGB')
+            img.save(tmp_path, format='JPEG', quality=spec['quality'], optimize=True, progressive=True)
+    os.replace(tmp_path, target_path)
+
+
+def ensure(name, size):
+    """
+    Nome (relativo ao MEDIA) a usar para exibir `name` no tamanho `size`: a
+    versão reduzida, gerada agora se ainda não existir, ou o próprio `name`.
+    """
+    spec = RENDITIONS.get(size)
+    if not name or spec is None:
+        return name
+    name = name.replace('\\', '/')
+    if not name.startswith(SOURCE_DIRS):
+        return name
+
+    try:
+        source_mtime = os.path.getmtime(_absolute(name))
+    except OSError:
+        return name
+
+    target = rendition_name(name, size)
+    target_path = _absolute(target)
+    try:
+        if os.path.getmtime(target_path) >= source_mtime:
+            return target
+    except OSError:
+        pass
+
+    try:
+        _render(_absolute(name), target_path, spec)
+    except Exception:
+        logger.warning("Não foi possível gerar a versão %s de %s", size, name, exc_info=True)
+        return name
+    return target
+
+
+def ensure_all(name):
+    """Gera todas as versões de uma foto (chamado após o upload)."""
+    for size in RENDITIONS:
+        ensure(name, size)
+
+
+def url(field_file, size):
+    """URL da versão `size` de um ImageField/FieldFile ('' se não houver arquivo)."""
+    if not field_file:
+        return ''
+    return default_storage.url(ensure(field_file.name, size))
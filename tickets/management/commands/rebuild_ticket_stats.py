@@ -0,0 +1,53 @@
+from __future__ import annotations
+
+from datetime import date, timedelta
+
+from django.core.management import BaseCommand, CommandError
+from django.utils import timezone
+
+from tickets import ticket_stats
+
+
+class Command(BaseCommand):
+    help = "Reconstrói a tabela de estatísticas diárias de OS (TicketDailyStat) a partir das OS."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--start",
+            help="Primeiro dia a reconstruir (YYYY-MM-DD). Sem --start/--end reconstrói tudo.",
+        )
+        parser.add_argument(
+            "--end",
+            help="Último dia a reconstruir (YYYY-MM-DD, inclusive).",
+        )
+        parser.add_argument(
+            "--days",
+            type=int,
+            help="Atalho: reconstrói só os últimos N dias (inclui hoje).",
+        )
+
+    def _parse_day(self, value, label):
+        if not value:
+            return None
+        try:
+            return date.fromisoformat(value)
+        except ValueError:
+            raise CommandError(f"Data inválida em {label}: {value} (use YYYY-MM-DD).")
+
+    def handle(self, *args, **options):
+        start_day = self._parse_day(options.get("start"), "--start")
+        end_day = self._parse_day(options.get("end"), "--end")
+
+        if options.get("days"):
+            end_day = timezone.localdate()
+            start_day = end_day - timedelta(days=options["days"] - 1)
+
+        if start_day and end_day and start_day > end_day:
+            raise CommandError("--start deve ser anterior ou igual a --end.")
+
+        rows = ticket_stats.rebuild(start_day, end_day)
+
+        scope = "todo o histórico"
+        if start_day or end_day:
+            scope = f"{start_day or 'início'} até {end_day or 'hoje'}"
+        self.stdout.write(self.style.SUCCESS(f"Estatísticas diárias reconstruídas ({scope}): {rows} linhas."))
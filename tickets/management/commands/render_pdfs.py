@@ -0,0 +1,60 @@
+from __future__ import annotations
+
+import time
+
+from django.core.management import BaseCommand
+from django.db import close_old_connections
+
+from tickets import pdf_jobs
+
+
+class Command(BaseCommand):
+    help = "Worker da fila de PDFs (PdfRenderJob): gera os relatórios pedidos pelo visualizador."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Processa o que estiver na fila e sai (útil em cron/testes).",
+        )
+        parser.add_argument(
+            "--sleep",
+            type=float,
+            default=1.0,
+            help="Segundos de espera quando a fila está vazia (padrão: 1).",
+        )
+        parser.add_argument(
+            "--purge-days",
+            type=int,
+            default=7,
+            help="Apaga pedidos e PDFs gerados há mais de N dias (padrão: 7; 0 desliga).",
+        )
+
+    def handle(self, *args, **options):
+        once = options["once"]
+        sleep = max(options["sleep"], 0.1)
+        purge_days = options["purge_days"]
+        last_maintenance = 0.0
+
+        while True:
+            close_old_connections()
+            if time.monotonic() - last_maintenance > 600:
+                pdf_jobs.requeue_stale()
+                if purge_days > 0:
+                    pdf_jobs.purge(purge_days)
+                last_maintenance = time.monotonic()
+
+            job = pdf_jobs.claim_next()
+            if job is None:
+                if once:
+                    break
+                time.sleep(sleep)
+                continue
+
+            started = time.monotonic()
+            job = pdf_jobs.run(job)
+            elapsed = time.monotonic() - started
+            if job.status == "done":
+                self.stdout.write(f"PDF {job.kind} #{job.pk} gerado em {elapsed:.1f}s")
+            else:
+                self.stderr.write(f"PDF {job.kind} #{job.pk} falhou: {job.error}")
@@ -8,6 +8,7 @@ from datetime import timedelta
 from django.conf import settings
 from django.utils import timezone
 
+from . import http_clients
 from .models import MicrosoftGraphToken
 
 
@@ -33,7 +34,7 @@ def http_json(method, url, headers=None, data=None, form=None, timeout=30):
         body = json.dumps(data).encode('utf-8')
         final_headers['Content-Type'] = 'application/json'
     req = urllib.request.Request(url, data=body, method=method, headers=final_headers)
-    with urllib.request.urlopen(req, timeout=timeout) as resp:
+    with http_clients.urlopen(req, timeout=timeout) as resp:
         raw = resp.read()
         if not raw:
             return None
@@ -42,7 +43,7 @@ def http_json(method, url, headers=None, data=None, form=None, timeout=30):
 
 def http_bytes(method, url, headers=None, timeout=60):
     req = urllib.request.Request(url, method=method, headers=headers or {})
-    with urllib.request.urlopen(req, timeout=timeout) as resp:
+    with http_clients.urlopen(req, timeout=timeout) as resp:
         return resp.read()
 
 
@@ -1,10 +1,47 @@
-from .models import SystemSettings, ActiveSession, UserProfile, AppPage, RoleLevel, RolePagePermission
+import logging
+import time
+
+from .models import ActiveSession
+from . import page_permissions, presence, request_context
+from django.conf import settings
 from django.core.exceptions import PermissionDenied
+from django.db import connection
 from django.urls import resolve
-from django.db.utils import OperationalError, ProgrammingError
-from django.utils import timezone
 from django.contrib.auth import logout
-from datetime import timedelta
+
+logger = logging.getLogger(__name__)
+
+
+class QueryCountMiddleware:
+    """
+    Conta as queries de cada request (incluindo sessão/autenticação, por isso
+    fica no topo de MIDDLEWARE) e devolve no header X-DB-Queries — é a régua
+    do custo fixo de um request. O header só vai para usuários staff, ou para
+    todos com settings.QUERY_COUNT_HEADER. Acima de settings.QUERY_COUNT_WARN,
+    loga um aviso.
+    """
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.header = getattr(settings, 'QUERY_COUNT_HEADER', False)
+        self.warn_at = getattr(settings, 'QUERY_COUNT_WARN', None)
+
+    def __call__(self, request):
+        count = 0
+
+        def counter(execute, sql, params, many, context):
+            nonlocal count
+            count += 1
+            return execute(sql, params, many, context)
+
+        with connection.execute_wrapper(counter):
+            response = self.get_response(request)
+
+        if self.header or getattr(getattr(request, 'user', None), 'is_staff', False):
+            response['X-DB-Queries'] = str(count)
+        if self.warn_at and count > self.warn_at:
+            logger.warning("%s %s executou %s queries", request.method, request.path, count)
+        return response
+
 
 class EnsureUserProfileMiddleware:
     """
@@ -15,10 +52,11 @@ class EnsureUserProfileMiddleware:
         self.get_response = get_response
 
     def __call__(self, request):
+        # Também cria o request.user_context usado pelos middlewares seguintes.
+        context = request_context.get(request)
         if request.user.is_authenticated:
             try:
-                if not hasattr(request.user, 'profile') or request.user.profile is None:
-                    UserProfile.objects.get_or_create(user=request.user)
+                context.profile
             except Exception:
                 pass
 
@@ -40,38 +78,38 @@ class SingleSessionPerIpMiddleware:
             session_key = request.session.session_key
 
             if session_key:
-                # Verifica/atualiza o registro ActiveSession para esta sessão
                 try:
-                    active, created = ActiveSession.objects.get_or_create(
-                        session_key=session_key,
-                        defaults={
-                            'user': request.user,
-                            'ip_address': ip,
-                            'user_agent': request.META.get('HTTP_USER_AGENT', '')[:500],
-                        }
-                    )
-
-                    if not created:
-                        # Sessão já existe, verificar se o IP mudou
-                        if active.ip_address != ip:
-                            # IP mudou! Pode ser alguém tentando usar a mesma sessão de outro lugar
-                            # ou o IP real do cliente mudou (ex: VPN). Vamos invalidar.
-                            logout(request)
-                            active.delete()
-                            return self.get_response(request)
-
-                        # Atualiza o usuário caso tenha mudado (não deveria)
-                        if active.user != request.user:
-                            active.user = request.user
-                            active.save()
-                        else:
-                            # Mantém last_activity "vivo" enquanto o usuário navega — sem isso,
-                            # o campo (auto_now) só era gravado no primeiro request da sessão,
-                            # fazendo qualquer verificação de "usuário online" parecer desatualizada
-                            # mesmo com o usuário navegando ativamente. Grava no máximo 1x/min.
-                            now = timezone.now()
-                            if (now - active.last_activity) > timedelta(minutes=1):
-                                active.save(update_fields=['last_activity'])
+                    known = request_context.get(request).session_record
+                    if known is None:
+                        # Sessão fora do mapa de presença (nova, ou parada há mais que a
+                        # janela de online): verifica/cria o registro ActiveSession.
+                        active, created = ActiveSession.objects.get_or_create(
+                            session_key=session_key,
+                            defaults={
+                                'user': request.user,
+                                'ip_address': ip,
+                                'user_agent': request.META.get('HTTP_USER_AGENT', '')[:500],
+                            }
+                        )
+                        known_user_id, known_ip = active.user_id, active.ip_address
+                    else:
+                        known_user_id, known_ip = known
+
+                    if known_ip != ip:
+                        # IP mudou! Pode ser alguém tentando usar a mesma sessão de outro lugar
+                        # ou o IP real do cliente mudou (ex: VPN). Vamos invalidar.
+                        logout(request)
+                        ActiveSession.objects.filter(session_key=session_key).delete()
+                        presence.forget([session_key])
+                        return self.get_response(request)
+
+                    # Atualiza o usuário caso tenha mudado (não deveria)
+                    if known_user_id != request.user.id:
+                        ActiveSession.objects.filter(session_key=session_key).update(user=request.user)
+
+                    # Mantém a sessão "viva" enquanto o usuário navega. A atividade vai para
+                    # o mapa de presença (cache) e só chega ao banco em lote — ver presence.py.
+                    presence.touch(session_key, request.user.id, ip)
                 except Exception:
                     # Se der erro (ex: tabela não existe), ignora
                     pass
@@ -91,16 +129,17 @@ class SingleSessionPerIpMiddleware:
         return ip
 
 class SessionTimeoutMiddleware:
+    REFRESHED_AT_KEY = 'session_refreshed_at'
+
     def __init__(self, get_response):
         self.get_response = get_response
 
     def __call__(self, request):
         if request.user.is_authenticated:
             try:
-                settings = SystemSettings.objects.first()
-                if settings:
-                    # Define a expiração da sessão em segundos
-                    request.session.set_expiry(settings.session_timeout_minutes * 60)
+                system_settings = request_context.get(request).settings
+                if system_settings:
+                    self.refresh_expiry(request.session, system_settings.session_timeout_minutes * 60)
             except Exception:
                 pass
 
@@ -113,6 +152,22 @@ class SessionTimeoutMiddleware:
         response = self.get_response(request)
         return response
 
+    def refresh_expiry(self, session, timeout_seconds):
+        """
+        Renova a expiração por inatividade. A sessão só é marcada como alterada
+        (e regravada no banco) quando o timeout muda ou a cada
+        SESSION_REFRESH_SECONDS — em vez de um UPDATE em todo request; o
+        usuário parado expira no máximo esse intervalo antes do timeout exato.
+        """
+        now = int(time.time())
+        refresh_every = getattr(settings, 'SESSION_REFRESH_SECONDS', 60)
+        if (
+            session.get('_session_expiry') != timeout_seconds
+            or now - session.get(self.REFRESHED_AT_KEY, 0) >= refresh_every
+        ):
+            session.set_expiry(timeout_seconds)
+            session[self.REFRESHED_AT_KEY] = now
+
 
 class RolePageAccessMiddleware:
     def __init__(self, get_response):
@@ -147,6 +202,9 @@ class RolePageAccessMiddleware:
             'api_tickets',
             'api_clients',
             'api_equipments',
+            'api_v2_tickets',
+            'api_v2_clients',
+            'api_v2_equipments',
             'clients_sharepoint_sync_status',
             'clients_sharepoint_sync_run',
             'microsoft_connect_start',
@@ -154,7 +212,7 @@ class RolePageAccessMiddleware:
         }:
             return None
 
-        profile = getattr(request.user, 'profile', None)
+        profile = request_context.get(request).profile
         role_code = getattr(profile, 'role', None) if profile else None
 
         if role_code == 'super_admin':
@@ -166,33 +224,23 @@ class RolePageAccessMiddleware:
             'tickets_daily_report_view',
             'tickets_daily_pdf',
             'checklist_pdf',
+            'ticket_pdf_status',
+            'tickets_daily_pdf_status',
+            'tickets_weekly_report_view',
+            'tickets_weekly_pdf_status',
+            'tickets_weekly_report_viewer',
+            'tickets_monthly_report_view',
+            'tickets_monthly_pdf_status',
+            'tickets_monthly_report_viewer',
+            'checklist_pdf_status',
+            'checklist_pdf_viewer',
         }
 
         if url_name in pdf_url_names and profile and not getattr(profile, 'allow_pdf_reports', True):
             raise PermissionDenied
 
-        try:
-            page = AppPage.objects.filter(url_name=url_name).first()
-        except (OperationalError, ProgrammingError):
-            return None
-        if page and not page.is_enabled:
-            raise PermissionDenied
-
-        if not role_code or not page:
-            return None
-
-        try:
-            role = RoleLevel.objects.filter(code=role_code, is_active=True).first()
-        except (OperationalError, ProgrammingError):
-            return None
-        if not role:
-            return None
-
-        try:
-            permission = RolePagePermission.objects.filter(role=role, page=page).first()
-        except (OperationalError, ProgrammingError):
-            return None
-        if permission and not permission.allowed:
+        # Matriz de permissões em memória (page_permissions.py): sem consultas por request.
+        if not page_permissions.is_allowed(role_code, url_name):
             raise PermissionDenied
 
         return None
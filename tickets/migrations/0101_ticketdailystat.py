@@ -0,0 +1,57 @@
+# Generated by Django 6.0.1 on 2026-10-18 09:12
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+
+def backfill_ticket_daily_stats(apps, schema_editor):
+    """Popula a tabela consolidada com o histórico de OS já existente."""
+    Ticket = apps.get_model('tickets', 'Ticket')
+    TicketDailyStat = apps.get_model('tickets', 'TicketDailyStat')
+
+    tickets_qs = Ticket.objects.order_by().annotate(
+        day=TruncDate('created_at', tzinfo=timezone.get_current_timezone())
+    )
+    rows = []
+    for row in tickets_qs.values('day', 'client_id', 'status', 'ticket_type_id').annotate(total=Count('id', distinct=True)):
+        rows.append(TicketDailyStat(system_id=None, **row))
+    per_system = (
+        tickets_qs.filter(systems__isnull=False)
+        .values('day', 'client_id', 'status', 'ticket_type_id', 'systems__id')
+        .annotate(total=Count('id', distinct=True))
+    )
+    for row in per_system:
+        system_id = row.pop('systems__id')
+        rows.append(TicketDailyStat(system_id=system_id, **row))
+    TicketDailyStat.objects.bulk_create(rows, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tickets', '0100_systemsettings_voice_globally_enabled'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TicketDailyStat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(db_index=True, verbose_name='Dia de abertura')),
+                ('status', models.CharField(max_length=50, verbose_name='Status')),
+                ('total', models.PositiveIntegerField(default=0, verbose_name='Quantidade de OS')),
+                ('client', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_stats', to='tickets.client', verbose_name='Cliente')),
+                ('system', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='daily_stats', to='tickets.system', verbose_name='Sistema (vazio = total geral)')),
+                ('ticket_type', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='daily_stats', to='tickets.tickettype', verbose_name='Tipo de Chamado')),
+            ],
+            options={
+                'verbose_name': 'Estatística Diária de OS',
+                'verbose_name_plural': 'Estatísticas Diárias de OS',
+                'indexes': [models.Index(fields=['day', 'client'], name='tickets_dailystat_day_client')],
+            },
+        ),
+        migrations.RunPython(backfill_ticket_daily_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,71 @@
+# Generated by Django 6.0.1 on 2026-10-18 02:21
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+from tickets.fractional_rank import MIDDLE, spread
+
+
+def copy_saved_orders(apps, schema_editor):
+    """Converte a lista JSON de cada usuário em posições acima das OS não movidas."""
+    TicketListOrder = apps.get_model('tickets', 'TicketListOrder')
+    TicketListRank = apps.get_model('tickets', 'TicketListRank')
+    Ticket = apps.get_model('tickets', 'Ticket')
+
+    existing = set(Ticket.objects.values_list('id', flat=True))
+    for saved in TicketListOrder.objects.all():
+        seen = set()
+        ticket_ids = []
+        for ticket_id in saved.order or []:
+            try:
+                ticket_id = int(ticket_id)
+            except (TypeError, ValueError):
+                continue
+            if ticket_id in existing and ticket_id not in seen:
+                seen.add(ticket_id)
+                ticket_ids.append(ticket_id)
+        TicketListRank.objects.bulk_create(
+            [
+                TicketListRank(user_id=saved.user_id, ticket_id=ticket_id, rank=rank)
+                for ticket_id, rank in zip(ticket_ids, spread(len(ticket_ids), None, MIDDLE))
+            ],
+            batch_size=1000,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tickets', '0101_ticketdailystat'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TicketListRank',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('rank', models.CharField(max_length=64, verbose_name='Posição (chave fracionária)')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('ticket', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='list_ranks', to='tickets.ticket')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ticket_list_ranks', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Posição na Lista de OS',
+                'verbose_name_plural': 'Posições na Lista de OS',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='ticketlistrank',
+            index=models.Index(fields=['user', 'rank'], name='tickets_listrank_user_rank'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='ticketlistrank',
+            unique_together={('user', 'ticket')},
+        ),
+        migrations.RunPython(copy_saved_orders, migrations.RunPython.noop),
+        migrations.DeleteModel(
+            name='TicketListOrder',
+        ),
+    ]
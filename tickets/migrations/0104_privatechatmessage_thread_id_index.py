@@ -0,0 +1,19 @@
+# Generated by Django 6.0.1 on 2026-10-18 03:10
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tickets', '0103_pdfrenderjob'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='privatechatmessage',
+            index=models.Index(fields=['thread', 'id'], name='tickets_pcmsg_thread_id'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 6.0.1 on 2026-10-18 04:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tickets', '0105_notificationcounter'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='aichatsession',
+            name='digest',
+            field=models.TextField(blank=True, default='', verbose_name='Resumo das mensagens antigas'),
+        ),
+        migrations.AddField(
+            model_name='aichatsession',
+            name='digest_until',
+            field=models.PositiveIntegerField(default=0, verbose_name='Resumo até a mensagem'),
+        ),
+    ]
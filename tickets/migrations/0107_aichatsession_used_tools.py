@@ -0,0 +1,18 @@
+# Generated by Django 6.0.1 on 2026-10-18 04:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tickets', '0106_aichatsession_digest'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='aichatsession',
+            name='used_tools',
+            field=models.JSONField(blank=True, default=list, verbose_name='Tools usadas na conversa'),
+        ),
+    ]
@@ -177,6 +177,7 @@ class Client(models.Model):
     is_preferred = models.BooleanField(default=False, verbose_name="Empresa Preferencial/Padrão")
     
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="Atualizado em")
 
     def save(self, *args, **kwargs):
         if self.is_preferred:
@@ -190,6 +191,10 @@ class Client(models.Model):
     class Meta:
         verbose_name = "Cliente"
         verbose_name_plural = "Clientes"
+        indexes = [
+            # Paginação/sincronização incremental da API (api_v2).
+            models.Index(fields=['updated_at', 'id'], name='tickets_client_updated_id'),
+        ]
 
 class ClientHub(models.Model):
     client = models.ForeignKey(Client, on_delete=models.CASCADE, related_name='hubs', verbose_name="Cliente")
@@ -223,6 +228,7 @@ class Equipment(models.Model):
     name = models.CharField(max_length=200, verbose_name="Nome do Equipamento")
     equipment_type = models.ForeignKey(EquipmentType, on_delete=models.SET_NULL, null=True, blank=True, verbose_name="Tipo de Equipamento")
     description = models.TextField(verbose_name="Descrição", blank=True, null=True)
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="Atualizado em")
     
     def __str__(self):
         if self.equipment_type:
@@ -232,6 +238,9 @@ class Equipment(models.Model):
     class Meta:
         verbose_name = "Equipamento"
         verbose_name_plural = "Equipamentos"
+        indexes = [
+            models.Index(fields=['updated_at', 'id'], name='tickets_equipment_updated_id'),
+        ]
 
 class OrderType(models.Model):
     name = models.CharField(max_length=100, verbose_name="Tipo de Ordem")
@@ -550,6 +559,13 @@ class VoiceProviderConfig(models.Model):
 class AIChatSession(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='ai_chat_sessions')
     title = models.CharField(max_length=200, blank=True, verbose_name="Título")
+    # Resumo das mensagens antigas da conversa (ver ai_context.py): o modelo recebe
+    # o resumo + só as mensagens depois de `digest_until` (id da última resumida).
+    digest = models.TextField(blank=True, default="", verbose_name="Resumo das mensagens antigas")
+    digest_until = models.PositiveIntegerField(default=0, verbose_name="Resumo até a mensagem")
+    # Tools já chamadas nesta conversa (mais recentes no fim): mantêm os grupos de
+    # tools delas disponíveis nos próximos turnos (ver ai_tool_router.py).
+    used_tools = models.JSONField(default=list, blank=True, verbose_name="Tools usadas na conversa")
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -664,6 +680,9 @@ class PrivateChatMessage(models.Model):
 
     class Meta:
         ordering = ['created_at']
+        # Contagem de não lidas (id > last_read_message_id) e "última mensagem"
+        # por conversa saem direto deste índice, sem varrer o histórico.
+        indexes = [models.Index(fields=['thread', 'id'], name='tickets_pcmsg_thread_id')]
         verbose_name = "Mensagem de Chat Particular"
         verbose_name_plural = "Mensagens de Chat Particular"
 
@@ -1014,7 +1033,8 @@ class Ticket(models.Model):
     def status_color(self):
         """Retorna HEX do status, ou fallback para nomes Bootstrap antigos."""
         try:
-            ts = TicketStatus.objects.filter(code=self.status).first()
+            from .status_registry import get_status
+            ts = get_status(self.status)
             if ts and ts.color:
                 return ts.color
         except Exception:
@@ -1032,7 +1052,8 @@ class Ticket(models.Model):
     def get_status_display(self):
         """Sobrescreve o método padrão para buscar o nome do status no TicketStatus."""
         try:
-            ts = TicketStatus.objects.filter(code=self.status).first()
+            from .status_registry import get_status
+            ts = get_status(self.status)
             if ts:
                 return ts.name
         except Exception:
@@ -1068,7 +1089,8 @@ class Ticket(models.Model):
     def status_display_html(self):
         """Retorna HTML para exibir o status (imagem se houver, ou badge colorida)."""
         try:
-            ts = TicketStatus.objects.filter(code=self.status, is_active=True).first()
+            from .status_registry import get_status
+            ts = get_status(self.status, active_only=True)
             if not ts:
                 return self._badge_style(self.status_color, self.get_status_display())
             if ts.image and ts.image.name:
@@ -1083,7 +1105,8 @@ class Ticket(models.Model):
     def status_row_bg(self):
         """Retorna a cor de fundo em rgba para o card na lista, ou None."""
         try:
-            ts = TicketStatus.objects.filter(code=self.status, is_active=True).first()
+            from .status_registry import get_status
+            ts = get_status(self.status, active_only=True)
             if ts and ts.row_color:
                 return ts.row_color
         except Exception:
@@ -1133,6 +1156,9 @@ class Ticket(models.Model):
     class Meta:
         verbose_name = "Ordem de Serviço"
         verbose_name_plural = "Ordens de Serviço"
+        indexes = [
+            models.Index(fields=['updated_at', 'id'], name='tickets_ticket_updated_id'),
+        ]
 
 class TicketImage(models.Model):
     ticket = models.ForeignKey(Ticket, related_name='images', on_delete=models.CASCADE)
@@ -1155,131 +1181,60 @@ class TicketFavorite(models.Model):
         verbose_name = "Favorito"
         verbose_name_plural = "Favoritos"
 
-class TicketListOrder(models.Model):
+class TicketListRank(models.Model):
     """
-    Ordem manual dos cards de OS na listagem, definida pelo próprio usuário
-    (arrastar e soltar) ou pelo Jota4 a pedido dele. Um registro por usuário.
+    Posição manual de uma OS na listagem de um usuário, definida por ele
+    (arrastar e soltar) ou pelo Jota4 a pedido dele. Só existem linhas para as
+    OS que foram de fato movidas; as demais ficam na posição do meio
+    (fractional_rank.MIDDLE), na ordem padrão da lista.
+
+    `rank` é uma chave fracionária: chaves menores que MIDDLE aparecem acima das
+    OS nunca movidas, maiores aparecem abaixo. Mover uma OS grava só a linha
+    dela (ver ticket_list_order.py).
     """
-    user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='ticket_list_order')
-    order = models.JSONField(default=list, verbose_name="IDs das OS na ordem escolhida")
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='ticket_list_ranks')
+    ticket = models.ForeignKey(Ticket, on_delete=models.CASCADE, related_name='list_ranks')
+    rank = models.CharField(max_length=64, verbose_name="Posição (chave fracionária)")
     updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
-        verbose_name = "Ordem da Lista de OS"
-        verbose_name_plural = "Ordens da Lista de OS"
+        unique_together = ('user', 'ticket')
+        indexes = [
+            models.Index(fields=['user', 'rank'], name='tickets_listrank_user_rank'),
+        ]
+        verbose_name = "Posição na Lista de OS"
+        verbose_name_plural = "Posições na Lista de OS"
 
     def __str__(self):
-        return f"Ordem de {self.user.username} ({len(self.order)} OS)"
-
-    @staticmethod
-    def apply_saved_order(user, tickets):
-        """
-        Reordena uma lista de Tickets (já na ordem padrão) de acordo com a ordem
-        salva do usuário. OS que nunca foram reposicionadas mantêm a posição
-        relativa padrão entre si (sort estável), aparecendo depois das que o
-        usuário já organizou manualmente.
-        """
-        if not user or not getattr(user, 'is_authenticated', False):
-            return tickets
-
-        saved = TicketListOrder.objects.filter(user=user).values_list('order', flat=True).first()
-        if not saved:
-            return tickets
+        return f"{self.user.username}: OS {self.ticket_id} em {self.rank}"
 
-        position = {ticket_id: i for i, ticket_id in enumerate(saved)}
-        fallback = len(saved)
-        tickets = list(tickets)
-        tickets.sort(key=lambda t: position.get(t.id, fallback))
-        return tickets
-
-    @staticmethod
-    def save_new_order(user, visible_ids_in_new_order):
-        """
-        Mescla a nova ordem de um subconjunto visível (ex.: lista filtrada) com a
-        ordem completa já salva, preservando a posição relativa das OS que não
-        fazem parte deste subconjunto.
-        """
-        visible_ids_in_new_order = [int(i) for i in visible_ids_in_new_order]
-        visible_set = set(visible_ids_in_new_order)
-
-        existing_obj = TicketListOrder.objects.filter(user=user).first()
-        existing = list(existing_obj.order) if existing_obj else []
-
-        anchor = None
-        remaining = []
-        for ticket_id in existing:
-            if ticket_id in visible_set:
-                if anchor is None:
-                    anchor = len(remaining)
-                continue
-            remaining.append(ticket_id)
-        if anchor is None:
-            anchor = len(remaining)
-
-        new_order = remaining[:anchor] + visible_ids_in_new_order + remaining[anchor:]
-
-        TicketListOrder.objects.update_or_create(user=user, defaults={'order': new_order})
-        return new_order
-
-    @staticmethod
-    def get_full_ordered_ticket_ids():
-        """
-        Ordem padrão (mesma regra da listagem: status_order, depois -updated_at),
-        usada como base para operações de reposicionamento pelo Jota4.
-        """
-        from django.db.models import Subquery, OuterRef
-        ticket_status_order = TicketStatus.objects.filter(
-            code=OuterRef('status')
-        ).values('order')[:1]
-        return list(
-            Ticket.objects.annotate(status_order=Subquery(ticket_status_order))
-            .order_by('status_order', '-updated_at')
-            .values_list('id', flat=True)
-        )
-
-    @staticmethod
-    def move_ticket(user, ticket_id, position=None, before_ticket_id=None, after_ticket_id=None):
-        """
-        Reposiciona uma única OS na ordem salva do usuário (usado pelo Jota4).
-        `position`: 'top', 'bottom', 'up' ou 'down'.
-        Retorna a nova ordem completa (lista de IDs) e o novo índice (0-based) da OS movida.
-        """
-        ticket_id = int(ticket_id)
-
-        existing_obj = TicketListOrder.objects.filter(user=user).first()
-        if existing_obj and existing_obj.order:
-            order = list(existing_obj.order)
-        else:
-            order = TicketListOrder.get_full_ordered_ticket_ids()
+class TicketDailyStat(models.Model):
+    """
+    Contagem consolidada de OS por dia de abertura (data local) × cliente ×
+    status × tipo de chamado × sistema, mantida pelos signals de Ticket e
+    reconstruível pelo comando `rebuild_ticket_stats`.
+
+    Linhas com system vazio contam cada OS uma única vez (totais gerais); linhas
+    com system preenchido contam as OS que têm aquele sistema — uma OS com dois
+    sistemas aparece em duas dessas linhas, por isso os totais gerais nunca
+    devem ser somados a partir delas.
+    """
+    day = models.DateField(db_index=True, verbose_name="Dia de abertura")
+    client = models.ForeignKey(Client, on_delete=models.CASCADE, related_name='daily_stats', verbose_name="Cliente")
+    status = models.CharField(max_length=50, verbose_name="Status")
+    ticket_type = models.ForeignKey(TicketType, on_delete=models.SET_NULL, null=True, blank=True, related_name='daily_stats', verbose_name="Tipo de Chamado")
+    system = models.ForeignKey(System, on_delete=models.CASCADE, null=True, blank=True, related_name='daily_stats', verbose_name="Sistema (vazio = total geral)")
+    total = models.PositiveIntegerField(default=0, verbose_name="Quantidade de OS")
 
-        if ticket_id in order:
-            current_index = order.index(ticket_id)
-            order.pop(current_index)
-        else:
-            # OS ainda não apareceu na ordem salva (ex.: criada depois do último drag);
-            # trata como se estivesse no fim, para "up"/"down" fazerem sentido.
-            current_index = len(order)
-
-        if before_ticket_id is not None:
-            before_ticket_id = int(before_ticket_id)
-            target = order.index(before_ticket_id) if before_ticket_id in order else len(order)
-        elif after_ticket_id is not None:
-            after_ticket_id = int(after_ticket_id)
-            target = order.index(after_ticket_id) + 1 if after_ticket_id in order else len(order)
-        elif position == 'top':
-            target = 0
-        elif position == 'bottom':
-            target = len(order)
-        elif position == 'up':
-            target = max(0, current_index - 1)
-        elif position == 'down':
-            target = min(len(order), current_index + 1)
-        else:
-            target = current_index
+    class Meta:
+        verbose_name = "Estatística Diária de OS"
+        verbose_name_plural = "Estatísticas Diárias de OS"
+        indexes = [
+            models.Index(fields=['day', 'client'], name='tickets_dailystat_day_client'),
+        ]
 
-        order.insert(target, ticket_id)
-        TicketListOrder.objects.update_or_create(user=user, defaults={'order': order})
-        return order, target
+    def __str__(self):
+        return f"{self.day} - {self.client_id} - {self.status}: {self.total}"
 
 class TechnicianTravel(models.Model):
     TRAVEL_STATUS_CHOICES = (
@@ -1451,12 +1406,54 @@ class Notification(models.Model):
 
     class Meta:
         ordering = ['-created_at']
+        # Caixa de entrada / não lidas do usuário, já na ordem de exibição.
+        indexes = [
+            models.Index(
+                fields=['recipient', 'is_read', 'deleted_by_recipient', '-created_at'],
+                name='tickets_notif_unread_idx',
+            ),
+        ]
         verbose_name = "Notificação"
         verbose_name_plural = "Notificações"
 
     def __str__(self):
         return f"{self.title} - {self.recipient.username}"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Se ela contava como "não lida" ao sair do banco (None = campos adiados):
+        # o contador (notification_counters.py) compara com o estado ao salvar.
+        loaded = instance.__dict__
+        if 'is_read' in loaded and 'deleted_by_recipient' in loaded:
+            instance._counted_as_unread = not loaded['is_read'] and not loaded['deleted_by_recipient']
+        else:
+            instance._counted_as_unread = None
+        return instance
+
+    @property
+    def counts_as_unread(self):
+        return not self.is_read and not self.deleted_by_recipient
+
+
+class NotificationCounter(models.Model):
+    """
+    Contador desnormalizado das notificações não lidas do usuário (badge do
+    menu) e as últimas UNREAD_PREVIEW_SIZE delas — uma linha lida por página em
+    vez de consultar Notification. Mantido por notification_counters.py.
+    """
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name='notification_counter')
+    unread_count = models.PositiveIntegerField(default=0)
+    latest_unread = models.JSONField(default=list, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Contador de Notificações"
+        verbose_name_plural = "Contadores de Notificações"
+
+    def __str__(self):
+        return f"{self.user_id}: {self.unread_count} não lidas"
+
 class ChecklistTemplate(models.Model):
     name = models.CharField(max_length=200, verbose_name="Nome do Checklist")
     department = models.CharField(max_length=100, verbose_name="Departamento/Área", help_text="Ex: CSO, TI, Manutenção")
@@ -1662,28 +1659,37 @@ class ActiveSession(models.Model):
         threshold = timezone.now() - timedelta(minutes=cls.ONLINE_WINDOW_MINUTES)
         cls.objects.filter(last_activity__lt=threshold).delete()
 
+    # As consultas abaixo leem o mapa de presença em cache (presence.py), não a
+    # tabela — que só recebe a atividade em lote e é limpa no flush dele.
     @classmethod
     def online_user_ids(cls):
-        cls.cleanup_stale()
-        return cls.objects.values_list('user_id', flat=True).distinct()
+        from .presence import online_user_ids
+        return online_user_ids()
 
     @classmethod
     def is_user_online(cls, user):
-        cls.cleanup_stale()
-        return cls.objects.filter(user=user).exists()
+        return user.id in cls.online_user_ids()
 
     @classmethod
     def get_status(cls, user):
         """'online' (atividade recente), 'away' (sessão viva mas parada há um
         tempo) ou 'offline' (sem sessão ativa) — usado para a bolinha de status
         no chat particular."""
-        cls.cleanup_stale()
-        session = cls.objects.filter(user=user).order_by('-last_activity').first()
-        if not session:
+        from .presence import status
+        return status(user.id)
+
+    @classmethod
+    def status_from_last_activity(cls, last_activity):
+        """Mesmo critério do get_status, a partir da última atividade já consultada
+        (ex.: anotada em lote numa query de conversas); None = sem sessão."""
+        if last_activity is None:
             return 'offline'
-        if timezone.now() - session.last_activity <= timedelta(minutes=cls.AWAY_AFTER_MINUTES):
+        idle = timezone.now() - last_activity
+        if idle <= timedelta(minutes=cls.AWAY_AFTER_MINUTES):
             return 'online'
-        return 'away'
+        if idle <= timedelta(minutes=cls.ONLINE_WINDOW_MINUTES):
+            return 'away'
+        return 'offline'
 
 class DailyChecklistItemDetail(models.Model):
     item = models.ForeignKey(DailyChecklistItem, on_delete=models.CASCADE, related_name='details')
@@ -1699,3 +1705,42 @@ class DailyChecklistItemDetail(models.Model):
     class Meta:
         verbose_name = "Detalhe do Item"
         verbose_name_plural = "Detalhes dos Itens"
+
+
+class PdfRenderJob(models.Model):
+    """
+    Pedido de geração de PDF (ver pdf_jobs.py). O visualizador cria o pedido
+    pelo endpoint *_pdf_status, acompanha o andamento por ele e, quando pronto,
+    o arquivo é servido do MEDIA (`file_path`, nomeado pelo hash do conteúdo)
+    sem ocupar um worker do gunicorn com o xhtml2pdf.
+    """
+    STATUS_CHOICES = [
+        ('pending', 'Na fila'),
+        ('running', 'Gerando'),
+        ('done', 'Pronto'),
+        ('failed', 'Falhou'),
+    ]
+
+    kind = models.CharField(max_length=20, verbose_name="Relatório")
+    params = models.JSONField(default=dict, blank=True, verbose_name="Parâmetros")
+    user = models.ForeignKey(User, on_delete=models.CASCADE, null=True, blank=True, related_name='pdf_render_jobs')
+    request_key = models.CharField(max_length=64, db_index=True, verbose_name="Chave do pedido")
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    progress = models.PositiveSmallIntegerField(default=0)
+    filename = models.CharField(max_length=255, blank=True, default='')
+    content_hash = models.CharField(max_length=64, blank=True, default='')
+    file_path = models.CharField(max_length=255, blank=True, default='', verbose_name="Arquivo (relativo ao MEDIA)")
+    error = models.TextField(blank=True, default='')
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'created_at'], name='tickets_pdfjob_status_created'),
+        ]
+        verbose_name = "Geração de PDF"
+        verbose_name_plural = "Gerações de PDF"
+
+    def __str__(self):
+        return f"PDF {self.kind} #{self.pk} ({self.status})"
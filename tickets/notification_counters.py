@@ -0,0 +1,140 @@
+"""
+Contador de notificações não lidas por usuário (NotificationCounter).
+
+O badge do menu aparece em toda página; em vez de contar Notification a cada
+render, o contador é mantido na escrita:
+
+- signals.py chama `apply()` no post_save e `removed()` no post_delete de
+  Notification — só soma/subtrai 1 quando o estado "não lida" (não lida e não
+  apagada pelo destinatário) de fato muda;
+- `mark_all_read()` é chamado pela view que marca tudo como lido com um
+  update() em lote (que não dispara signals), e `added_in_bulk()` por quem
+  cria notificações com bulk_create (mensagem para todos/para um grupo);
+- na falta da linha (usuário antigo) ou de informação sobre o estado
+  anterior, `recount()` recalcula a partir de Notification.
+
+Junto vão as últimas UNREAD_PREVIEW_SIZE não lidas (id, título, urgência...),
+recalculadas pelo índice tickets_notif_unread_idx quando a contagem muda.
+"""
+from django.db.models import F
+from django.db.models.functions import Greatest
+
+from .models import Notification, NotificationCounter
+
+UNREAD_PREVIEW_SIZE = 5
+
+
+def _unread(user_id):
+    return Notification.objects.filter(recipient_id=user_id, is_read=False, deleted_by_recipient=False)
+
+
+def _preview_item(n):
+    return {
+        'id': n['id'],
+        'title': n['title'],
+        'urgency': n['urgency'],
+        'notification_type': n['notification_type'],
+        'created_at': n['created_at'].isoformat(),
+    }
+
+
+def _preview(user_id):
+    return [
+        _preview_item(n)
+        for n in _unread(user_id).order_by('-created_at').values(
+            'id', 'title', 'urgency', 'notification_type', 'created_at'
+        )[:UNREAD_PREVIEW_SIZE]
+    ]
+
+
+def recount(user_id):
+    counter, _ = NotificationCounter.objects.update_or_create(
+        user_id=user_id,
+        defaults={'unread_count': _unread(user_id).count(), 'latest_unread': _preview(user_id)},
+    )
+    return counter
+
+
+def get(user_id):
+    """(unread_count, latest_unread) do usuário — uma linha, criada na primeira leitura."""
+    row = NotificationCounter.objects.filter(user_id=user_id).values_list('unread_count', 'latest_unread').first()
+    if row is None:
+        counter = recount(user_id)
+        return counter.unread_count, counter.latest_unread
+    return row
+
+
+def _shift(user_id, delta, create_missing=True):
+    updated = NotificationCounter.objects.filter(user_id=user_id).update(
+        unread_count=Greatest(F('unread_count') + delta, 0),
+        latest_unread=_preview(user_id),
+    )
+    if not updated and create_missing:
+        recount(user_id)
+
+
+def apply(notification, created):
+    """Atualiza o contador do destinatário depois de salvar `notification`."""
+    before = False if created else getattr(notification, '_counted_as_unread', None)
+    after = notification.counts_as_unread
+    notification._counted_as_unread = after
+    if before is None:
+        recount(notification.recipient_id)
+    elif before != after:
+        _shift(notification.recipient_id, 1 if after else -1)
+    elif after:
+        # Não lida editada (título/urgência): só a prévia muda.
+        NotificationCounter.objects.filter(user_id=notification.recipient_id).update(
+            latest_unread=_preview(notification.recipient_id)
+        )
+
+
+def removed(notification):
+    counted = getattr(notification, '_counted_as_unread', None)
+    if counted is None:
+        counted = notification.counts_as_unread
+    if counted:
+        # Sem recriar a linha: a remoção pode vir do próprio usuário sendo excluído (cascata).
+        _shift(notification.recipient_id, -1, create_missing=False)
+
+
+def added_in_bulk(notifications):
+    """
+    Contadores depois de Notification.objects.bulk_create (sem post_save):
+    soma as novas não lidas de cada destinatário num UPDATE com F() por
+    quantidade e põe as novas na frente da prévia — sem recontar usuário a
+    usuário. Quem ainda não tem a linha (ou notificação sem id) é recontado.
+    """
+    by_user = {}
+    for notification in notifications:
+        if notification.counts_as_unread:
+            by_user.setdefault(notification.recipient_id, []).append(notification)
+    if not by_user:
+        return
+
+    missing = {user_id for user_id, items in by_user.items() if any(n.pk is None for n in items)}
+    by_amount = {}
+    for user_id, items in by_user.items():
+        if user_id not in missing:
+            by_amount.setdefault(len(items), []).append(user_id)
+    for amount, user_ids in by_amount.items():
+        NotificationCounter.objects.filter(user_id__in=user_ids).update(unread_count=F('unread_count') + amount)
+
+    counters = list(NotificationCounter.objects.filter(user_id__in=set(by_user) - missing).only('user', 'latest_unread'))
+    for counter in counters:
+        new = sorted(by_user[counter.user_id], key=lambda n: (n.created_at, n.pk), reverse=True)
+        items = [
+            _preview_item({'id': n.pk, 'title': n.title, 'urgency': n.urgency,
+                           'notification_type': n.notification_type, 'created_at': n.created_at})
+            for n in new
+        ]
+        counter.latest_unread = (items + list(counter.latest_unread or []))[:UNREAD_PREVIEW_SIZE]
+    NotificationCounter.objects.bulk_update(counters, ['latest_unread'])
+
+    missing.update(set(by_user) - {counter.user_id for counter in counters})
+    for user_id in missing:
+        recount(user_id)
+
+
+def mark_all_read(user_id):
+    NotificationCounter.objects.update_or_create(user_id=user_id, defaults={'unread_count': 0, 'latest_unread': []})
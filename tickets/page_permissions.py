@@ -0,0 +1,68 @@
+"""
+Matriz de permissões por página (AppPage × RoleLevel × RolePagePermission).
+
+A matriz inteira é pequena (dezenas de páginas × poucos níveis), então é
+montada uma vez e guardada em cache versionado (versioned_cache.py). O
+middleware de acesso, o context processor e as views consultam só
+dicionários em memória; qualquer save/delete desses três modelos
+(signals.py) invalida a matriz.
+"""
+from .models import AppPage, RolePagePermission
+from .versioned_cache import VersionedCache
+
+
+def _build():
+    enabled = dict(AppPage.objects.values_list('url_name', 'is_enabled'))
+    denied = {}
+    rows = RolePagePermission.objects.filter(allowed=False, role__is_active=True).values_list('role__code', 'page__url_name')
+    for role_code, url_name in rows:
+        denied.setdefault(role_code, set()).add(url_name)
+    return {
+        'enabled': enabled,
+        'denied': {role_code: frozenset(url_names) for role_code, url_names in denied.items()},
+    }
+
+
+_matrix = VersionedCache('page_permissions', _build, default={'enabled': {}, 'denied': {}})
+
+
+def get_matrix():
+    """{'enabled': {url_name: bool}, 'denied': {role_code: frozenset(url_name)}}."""
+    return _matrix.get()
+
+
+def invalidate():
+    """Descarta a matriz (chamado pelos signals de AppPage/RoleLevel/RolePagePermission)."""
+    _matrix.invalidate()
+
+
+def page_enabled(url_name):
+    """True/False para páginas cadastradas; None se a URL não é uma AppPage."""
+    return get_matrix()['enabled'].get(url_name)
+
+
+def role_denied(role_code, url_name):
+    """True se o nível (ativo) tem a página explicitamente bloqueada."""
+    return url_name in get_matrix()['denied'].get(role_code, ())
+
+
+def is_allowed(role_code, url_name):
+    """Mesma regra do RolePageAccessMiddleware (sem as exceções fixas de URL)."""
+    if role_code == 'super_admin':
+        return True
+    enabled = page_enabled(url_name)
+    if enabled is None:
+        return True
+    if not enabled:
+        return False
+    return not (role_code and role_denied(role_code, url_name))
+
+
+def filter_allowed(role_code, url_names):
+    """Subconjunto de url_names visível para o nível (páginas desabilitadas saem para todos)."""
+    matrix = get_matrix()
+    enabled = matrix['enabled']
+    allowed = {name for name in url_names if enabled.get(name, True)}
+    if role_code and role_code != 'super_admin':
+        allowed -= matrix['denied'].get(role_code, frozenset())
+    return allowed
@@ -0,0 +1,89 @@
+"""
+Cache em disco de PDFs já gerados, endereçado pelo conteúdo de origem.
+
+Cada relatório que sabe dizer "de que dados depende" (PdfReport.version)
+ganha uma chave: hash de (relatório, versão do template, partes da versão —
+ex.: OS, updated_at, última evolução/imagem). Enquanto essas partes não
+mudam, o mesmo arquivo MEDIA_ROOT/pdf_cache/<relatório>/<chave>.pdf é
+servido direto do disco, e a chave vira o ETag da resposta. Qualquer mudança
+nos dados gera outra chave — não há invalidação explícita; arquivos sem uso
+são apagados pelo purge do worker (render_pdfs).
+"""
+import hashlib
+import json
+import os
+from collections import namedtuple
+from functools import lru_cache
+
+from django.conf import settings
+from django.template.loader import get_template
+
+CACHE_DIR = 'pdf_cache'
+
+# key: chave do conteúdo (também usada como ETag); last_modified: datetime ou None;
+# path: caminho absoluto do PDF em cache, ou None se ainda não foi gerado.
+CacheEntry = namedtuple('CacheEntry', 'key last_modified filename relative_path path')
+
+
+@lru_cache(maxsize=None)
+def _template_digest(template_path):
+    # Alterar o template (deploy) muda a chave de todos os PDFs dele.
+    source = get_template(template_path).template.source
+    return hashlib.sha256(source.encode('utf-8')).hexdigest()[:16]
+
+
+def write_atomic(absolute_path, data):
+    """Grava via arquivo temporário + rename: quem lê nunca vê um PDF pela metade."""
+    os.makedirs(os.path.dirname(absolute_path), exist_ok=True)
+    tmp_path = f'{absolute_path}.{os.getpid()}.tmp'
+    with open(tmp_path, 'wb') as fh:
+        fh.write(data)
+    os.replace(tmp_path, absolute_path)
+
+
+def entry_for(report, user, params):
+    """CacheEntry do pedido, ou None se o relatório não é reaproveitável (ou os dados não existem)."""
+    version = report.version(user, params)
+    if version is None:
+        return None
+    parts, last_modified, filename = version
+    raw = json.dumps(
+        [report.kind, report.template_version, _template_digest(report.template_path), parts],
+        sort_keys=True, default=str,
+    )
+    key = hashlib.sha256(raw.encode('utf-8')).hexdigest()
+    relative_path = f'{CACHE_DIR}/{report.kind}/{key}.pdf'
+    absolute_path = os.path.join(settings.MEDIA_ROOT, CACHE_DIR, report.kind, f'{key}.pdf')
+    if os.path.exists(absolute_path):
+        # Marca o uso, para o purge manter os arquivos ainda procurados.
+        os.utime(absolute_path)
+    else:
+        absolute_path = None
+    return CacheEntry(key, last_modified, filename, relative_path, absolute_path)
+
+
+def store(entry, data):
+    """Grava o PDF da entrada e devolve a entrada com `path` preenchido."""
+    absolute_path = os.path.join(settings.MEDIA_ROOT, entry.relative_path.replace('/', os.sep))
+    write_atomic(absolute_path, data)
+    return entry._replace(path=absolute_path)
+
+
+def purge(older_than_timestamp, keep=()):
+    """Apaga PDFs em cache sem uso desde `older_than_timestamp` (exceto os caminhos em `keep`)."""
+    root = os.path.join(settings.MEDIA_ROOT, CACHE_DIR)
+    removed = 0
+    if not os.path.isdir(root):
+        return removed
+    for kind in os.listdir(root):
+        directory = os.path.join(root, kind)
+        if not os.path.isdir(directory):
+            continue
+        for name in os.listdir(directory):
+            if not name.endswith('.pdf') or f'{CACHE_DIR}/{kind}/{name}' in keep:
+                continue
+            path = os.path.join(directory, name)
+            if os.path.getmtime(path) < older_than_timestamp:
+                os.remove(path)
+                removed += 1
+    return removed
@@ -0,0 +1,181 @@
+"""
+Fila de geração de PDF.
+
+Gerar um PDF com o xhtml2pdf leva segundos de CPU; feito dentro do request,
+ocupa um dos (poucos) workers do gunicorn. Aqui o request só registra o
+pedido (PdfRenderJob) e o visualizador acompanha pelo endpoint *_pdf_status;
+quem gera é o worker `python manage.py render_pdfs` (deploy/os_pdf_worker.service).
+
+O PDF pronto é gravado em MEDIA_ROOT/pdf_renders/<sha256>.pdf — o nome é o
+hash do conteúdo, então gerações idênticas reaproveitam o mesmo arquivo. Os
+relatórios com `version` (pdf_cache.py) vão para o cache em disco e, se a
+versão dos dados já foi gerada, o pedido termina sem gerar de novo.
+
+Se nenhum worker pegar o pedido em INLINE_AFTER_SECONDS (worker parado, ou
+ambiente de desenvolvimento sem worker), o próprio endpoint de status gera o
+PDF, como antes — mais lento, mas nunca fica preso na fila.
+"""
+import hashlib
+import json
+import logging
+import os
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+
+from . import pdf_cache
+from .models import PdfRenderJob
+from .pdf_reports import REPORTS, PdfReportError, render_pdf
+
+logger = logging.getLogger(__name__)
+
+RENDER_DIR = 'pdf_renders'
+INLINE_AFTER_SECONDS = 20
+# Worker que morreu no meio da geração: o pedido volta para a fila.
+STALE_RUNNING_MINUTES = 10
+
+
+def request_key(kind, params, user):
+    raw = json.dumps([kind, params, getattr(user, 'pk', None)], sort_keys=True, default=str)
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+
+def enqueue(kind, params, user):
+    """Pedido em aberto para (relatório, parâmetros, usuário); cria um se não houver."""
+    if kind not in REPORTS:
+        raise PdfReportError('Relatório inválido.', status=404)
+    key = request_key(kind, params, user)
+    job = (
+        PdfRenderJob.objects.filter(request_key=key, status__in=('pending', 'running'))
+        .order_by('-created_at', '-id')
+        .first()
+    )
+    if job:
+        return job
+    return PdfRenderJob.objects.create(kind=kind, params=params, user=user, request_key=key)
+
+
+def queue_position(job):
+    """Quantos pedidos estão na frente (0 = é o próximo)."""
+    if job.status != 'pending':
+        return 0
+    return PdfRenderJob.objects.filter(status='pending').filter(
+        Q(created_at__lt=job.created_at) | Q(created_at=job.created_at, id__lt=job.id)
+    ).count()
+
+
+def requeue_stale():
+    limit = timezone.now() - timedelta(minutes=STALE_RUNNING_MINUTES)
+    return PdfRenderJob.objects.filter(status='running', started_at__lt=limit).update(
+        status='pending', progress=0, started_at=None
+    )
+
+
+def claim(job_id):
+    """Marca o pedido como em geração. False se outro worker já pegou."""
+    return bool(
+        PdfRenderJob.objects.filter(pk=job_id, status='pending').update(
+            status='running', progress=10, started_at=timezone.now()
+        )
+    )
+
+
+def claim_next():
+    """Próximo pedido da fila, já marcado como em geração (ou None)."""
+    pending = PdfRenderJob.objects.filter(status='pending').order_by('created_at', 'id').values_list('id', flat=True)[:10]
+    for job_id in pending:
+        if claim(job_id):
+            return PdfRenderJob.objects.select_related('user').get(pk=job_id)
+    return None
+
+
+def _store(data):
+    content_hash = hashlib.sha256(data).hexdigest()
+    relative_path = f'{RENDER_DIR}/{content_hash}.pdf'
+    absolute_path = os.path.join(settings.MEDIA_ROOT, RENDER_DIR, f'{content_hash}.pdf')
+    if not os.path.exists(absolute_path):
+        pdf_cache.write_atomic(absolute_path, data)
+    return content_hash, relative_path
+
+
+def _set_progress(job, progress):
+    job.progress = progress
+    PdfRenderJob.objects.filter(pk=job.pk).update(progress=progress)
+
+
+def run(job):
+    """Gera o PDF de um pedido já marcado como em geração (claim)."""
+    report = REPORTS.get(job.kind)
+    try:
+        if report is None:
+            raise PdfReportError('Relatório inválido.', status=404)
+        entry = pdf_cache.entry_for(report, job.user, job.params)
+        if entry is not None and entry.path:
+            # Já gerado para esta mesma versão dos dados (por outro pedido ou link direto).
+            filename, content_hash, relative_path = entry.filename, entry.key, entry.relative_path
+        else:
+            html, filename = report.render_html(job.user, job.params, entry)
+            _set_progress(job, 40)
+            data = render_pdf(html)
+            if entry is not None:
+                pdf_cache.store(entry, data)
+                content_hash, relative_path = entry.key, entry.relative_path
+            else:
+                content_hash, relative_path = _store(data)
+    except PdfReportError as e:
+        job.status, job.error = 'failed', e.message
+    except Exception as e:
+        logger.exception("Erro ao gerar PDF %s #%s", job.kind, job.pk)
+        job.status, job.error = 'failed', f'Erro ao gerar PDF: {e}'
+    else:
+        job.status, job.progress = 'done', 100
+        job.filename, job.content_hash, job.file_path = filename, content_hash, relative_path
+    job.finished_at = timezone.now()
+    job.save(update_fields=['status', 'progress', 'filename', 'content_hash', 'file_path', 'error', 'finished_at'])
+    return job
+
+
+def run_inline_if_waiting(job):
+    """Gera no próprio request quando nenhum worker pegou o pedido a tempo."""
+    if job.status != 'pending':
+        return job
+    if timezone.now() - job.created_at < timedelta(seconds=INLINE_AFTER_SECONDS):
+        return job
+    if not claim(job.pk):
+        job.refresh_from_db()
+        return job
+    logger.warning("PDF %s #%s gerado no request: nenhum worker pegou o pedido", job.kind, job.pk)
+    job.refresh_from_db()
+    return run(job)
+
+
+def file_path(job):
+    """Caminho absoluto do PDF pronto, ou None se o pedido não terminou (ou o arquivo sumiu)."""
+    if job.status != 'done' or not job.file_path:
+        return None
+    path = os.path.join(settings.MEDIA_ROOT, job.file_path.replace('/', os.sep))
+    return path if os.path.exists(path) else None
+
+
+def purge(days=7):
+    """Apaga pedidos antigos e os PDFs (da fila e do cache) que nada usa há `days` dias."""
+    limit = timezone.now() - timedelta(days=days)
+    deleted, _ = PdfRenderJob.objects.filter(created_at__lt=limit).exclude(status__in=('pending', 'running')).delete()
+
+    in_use_paths = set(PdfRenderJob.objects.exclude(file_path='').values_list('file_path', flat=True))
+    removed = pdf_cache.purge(limit.timestamp(), keep=in_use_paths)
+
+    directory = os.path.join(settings.MEDIA_ROOT, RENDER_DIR)
+    if not os.path.isdir(directory):
+        return deleted, removed
+    in_use = set(PdfRenderJob.objects.exclude(content_hash='').values_list('content_hash', flat=True))
+    for name in os.listdir(directory):
+        stem, ext = os.path.splitext(name)
+        path = os.path.join(directory, name)
+        # Arquivos recentes podem ser de uma geração que ainda não gravou o pedido.
+        if ext == '.pdf' and stem not in in_use and os.path.getmtime(path) < limit.timestamp():
+            os.remove(path)
+            removed += 1
+    return deleted, removed
@@ -0,0 +1,452 @@
+"""
+Relatórios em PDF (OS detalhada, checklist diário, relatórios diário/semanal/
+mensal de chamados).
+
+Cada relatório separa duas etapas:
+
+- `params_from_request`: lê a querystring e devolve parâmetros já resolvidos
+  (datas concretas, escopo validado pelo nível do usuário), serializáveis em
+  JSON — é o que vai para a fila (PdfRenderJob) e identifica o pedido;
+- `build`: monta contexto e nome do arquivo a partir desses parâmetros, sem
+  depender do request — roda tanto na view quanto no worker (pdf_jobs.py);
+- `version` (opcional): de quais dados o PDF depende, para o cache em disco
+  (pdf_cache.py) servir o arquivo já gerado enquanto nada mudar.
+"""
+import os
+from datetime import datetime, timedelta
+from io import BytesIO
+
+from django.conf import settings
+from django.contrib.staticfiles import finders
+from django.db.models import Count, Max, Prefetch, Q
+from django.template.loader import get_template
+from django.utils import timezone
+from django.utils.text import slugify
+
+try:
+    from xhtml2pdf import pisa
+except ModuleNotFoundError:
+    pisa = None
+
+from . import image_renditions, ticket_stats
+from .models import (
+    ChecklistTemplateItemOption, Client, DailyChecklist, DailyChecklistItemDetail,
+    DailyChecklistItemOptionValue, Ticket,
+)
+
+
+class PdfReportError(Exception):
+    """Pedido de relatório inválido (ex.: OS inexistente). `status` vira o código HTTP."""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.message = message
+        self.status = status
+
+
+def link_callback(uri, rel):
+    """Converte URLs de static/media do HTML em caminhos locais para o xhtml2pdf."""
+    if uri.startswith('http://') or uri.startswith('https://'):
+        return uri
+
+    if settings.STATIC_URL and uri.startswith(settings.STATIC_URL):
+        path = uri.replace(settings.STATIC_URL, '')
+        absolute_path = finders.find(path)
+        if absolute_path:
+            return absolute_path
+
+    if settings.MEDIA_URL and uri.startswith(settings.MEDIA_URL):
+        # Fotos anexadas entram na versão reduzida (image_renditions.py), não na original.
+        path = image_renditions.ensure(uri.replace(settings.MEDIA_URL, ''), 'report')
+        absolute_path = os.path.join(settings.MEDIA_ROOT, path.replace('/', os.sep))
+        if os.path.exists(absolute_path):
+            return absolute_path
+
+    media_root = os.path.join(str(settings.MEDIA_ROOT), '')
+    if uri.startswith(media_root):
+        # Templates que usam `.path` (checklist) passam o caminho absoluto.
+        path = image_renditions.ensure(os.path.relpath(uri, media_root).replace(os.sep, '/'), 'report')
+        return os.path.join(settings.MEDIA_ROOT, path.replace('/', os.sep))
+
+    if not uri.startswith('/'):
+        if 'media/' in uri:
+            possible_path = os.path.join(settings.BASE_DIR, uri.replace('/', os.sep))
+            if os.path.exists(possible_path):
+                return possible_path
+
+    return uri
+
+
+def render_pdf(html):
+    """Bytes do PDF gerado a partir do HTML. Levanta PdfReportError se o xhtml2pdf falhar."""
+    if pisa is None:
+        raise PdfReportError('PDF indisponível.', status=500)
+    buffer = BytesIO()
+    pisa_status = pisa.CreatePDF(html, dest=buffer, link_callback=link_callback)
+    if pisa_status.err:
+        raise PdfReportError('Erro ao gerar PDF.', status=500)
+    return buffer.getvalue()
+
+
+def _parse_date(value, default):
+    if value:
+        try:
+            return datetime.strptime(value, '%Y-%m-%d').date()
+        except ValueError:
+            pass
+    return default
+
+
+def _day_range(start_day, end_day):
+    return (
+        timezone.make_aware(datetime.combine(start_day, datetime.min.time())),
+        timezone.make_aware(datetime.combine(end_day, datetime.max.time())),
+    )
+
+
+class PdfReport:
+    kind = ''
+    template_path = ''
+    # Incrementar quando o PDF mudar por algo fora do template (contexto, estilos, imagens).
+    template_version = 2
+    # Checklist sempre baixa como anexo; os demais abrem no visualizador.
+    always_download = False
+
+    def params_from_request(self, request, **kwargs):
+        return {}
+
+    def version(self, user, params):
+        """
+        (partes, última alteração, nome do arquivo) que identificam o conteúdo do
+        PDF — usado pelo cache em disco (pdf_cache.py). None: gerar sempre.
+        """
+        return None
+
+    def build(self, user, params):
+        """(contexto do template, nome do arquivo)."""
+        raise NotImplementedError
+
+    def render_html(self, user, params, entry=None):
+        """
+        HTML do relatório. Com `entry` (PDF que vai para o cache, pdf_cache.py)
+        o carimbo de data é o da última alteração dos dados — o mesmo arquivo é
+        servido depois, e a hora da geração ficaria errada.
+        """
+        context, filename = self.build(user, params)
+        context['from_cache'] = entry is not None
+        context['generated_at'] = entry.last_modified if entry is not None else timezone.now()
+        return get_template(self.template_path).render(context), filename
+
+
+class TicketReport(PdfReport):
+    kind = 'ticket'
+    template_path = 'tickets/ticket_pdf.html'
+
+    def params_from_request(self, request, **kwargs):
+        return {'pk': int(kwargs['pk'])}
+
+    def version(self, user, params):
+        ticket = (
+            Ticket.objects.select_related('client')
+            .filter(pk=params['pk'])
+            .annotate(
+                updates_count=Count('updates', distinct=True),
+                last_update_id=Max('updates__id'),
+                images_count=Count('images', distinct=True),
+                last_image_id=Max('images__id'),
+                update_images_count=Count('updates__images', distinct=True),
+                last_update_image_id=Max('updates__images__id'),
+            )
+            .first()
+        )
+        if not ticket:
+            return None
+        parts = [
+            ticket.pk, ticket.updated_at.isoformat(),
+            ticket.updates_count, ticket.last_update_id,
+            ticket.images_count, ticket.last_image_id,
+            ticket.update_images_count, ticket.last_update_image_id,
+        ]
+        return parts, ticket.updated_at, self._filename(ticket)
+
+    def _filename(self, ticket):
+        leankeep_part = (ticket.leankeep_id or '').strip() or '00000'
+        client_part = (ticket.client.name or '').strip()
+        client_part = slugify(client_part).replace('-', '_').upper() or 'CLIENTE'
+        return f'{ticket.formatted_id}_{leankeep_part}_{client_part}.pdf'
+
+    def build(self, user, params):
+        ticket = (
+            Ticket.objects.select_related('client', 'hub', 'equipment', 'requester', 'ticket_type', 'problem_type', 'order_type')
+            .prefetch_related('requesters', 'technicians', 'equipments', 'systems', 'updates', 'updates__images', 'images')
+            .filter(pk=params['pk'])
+            .first()
+        )
+        if not ticket:
+            raise PdfReportError('OS não encontrada.', status=404)
+
+        updates = ticket.updates.all().order_by('created_at', 'id')
+        attachments = []
+        if ticket.image:
+            attachments.append({'url': ticket.image.url, 'label': 'Imagem Inicial'})
+        for img in ticket.images.all():
+            attachments.append({'url': img.image.url, 'label': 'Anexo'})
+        attachment_rows = []
+        for i in range(0, len(attachments), 4):
+            row = attachments[i:i + 4]
+            if len(row) < 4:
+                row = row + ([None] * (4 - len(row)))
+            attachment_rows.append(row)
+        context = {
+            'user': user,
+            'ticket': ticket,
+            'updates': updates,
+            'attachment_rows': attachment_rows,
+            'logo_path': os.path.join(settings.MEDIA_ROOT, 'images', 'logo_principal.png'),
+        }
+        return context, self._filename(ticket)
+
+
+def _checklist_item_completed(item):
+    template_item = getattr(item, 'template_item', None)
+    if template_item is not None and hasattr(template_item, 'options') and template_item.options.exists():
+        option_values = list(item.option_values.all()) if hasattr(item, 'option_values') else []
+        by_opt_id = {ov.template_option_id: ov for ov in option_values if ov.template_option_id}
+        for opt in template_item.options.all():
+            if not opt.is_required:
+                continue
+            ov = by_opt_id.get(opt.id)
+            if opt.field_type in ('checkbox', 'switch', 'button'):
+                if not (ov and ov.value_bool):
+                    return False
+            else:
+                if not (ov and (ov.value_text or '').strip()):
+                    return False
+        return bool(item.is_checked) if getattr(item, 'is_required', True) else True
+
+    field_type = getattr(item, 'field_type', None) or 'switch'
+    if field_type == 'group':
+        return True
+    if field_type in ('checkbox', 'switch', 'button'):
+        return bool(item.is_checked)
+    value = (getattr(item, 'value_text', None) or '').strip()
+    if field_type in ('select', 'text'):
+        return value != ''
+    return bool(item.is_checked) or value != ''
+
+
+class ChecklistReport(PdfReport):
+    kind = 'checklist'
+    template_path = 'tickets/checklist_pdf.html'
+    always_download = True
+
+    def params_from_request(self, request, **kwargs):
+        target_date = _parse_date(request.GET.get('date'), timezone.now().date())
+        return {'date': target_date.isoformat()}
+
+    def build(self, user, params):
+        target_date = datetime.strptime(params['date'], '%Y-%m-%d').date()
+        checklist = DailyChecklist.objects.filter(user=user, date=target_date).prefetch_related(
+            'items__images',
+            Prefetch('items__details', queryset=DailyChecklistItemDetail.objects.order_by('hub__name', 'created_at')),
+            Prefetch(
+                'items__option_values',
+                queryset=DailyChecklistItemOptionValue.objects.select_related('template_option').order_by('template_option__order', 'id')
+            ),
+            Prefetch(
+                'items__template_item__options',
+                queryset=ChecklistTemplateItemOption.objects.order_by('order', 'id')
+            ),
+        ).first()
+        if not checklist:
+            raise PdfReportError(f"Nenhum checklist encontrado para {target_date.strftime('%d/%m/%Y')}.", status=404)
+
+        date_start = datetime.combine(target_date, datetime.min.time())
+        date_end = datetime.combine(target_date, datetime.max.time())
+        tickets_activities = Ticket.objects.filter(
+            Q(technicians=user) | Q(requester=user),
+            updated_at__range=(date_start, date_end)
+        ).distinct()
+
+        required_items = [i for i in checklist.items.all() if getattr(i, 'is_required', True)]
+        countable = [i for i in required_items if (getattr(i, 'field_type', None) or 'switch') != 'group']
+        total_items = len(countable)
+        checked_items = len([i for i in countable if _checklist_item_completed(i)])
+
+        context = {
+            'checklist': checklist,
+            'tickets_activities': tickets_activities,
+            'user': user,
+            'date': target_date,
+            'total_items': total_items,
+            'checked_items': checked_items,
+            'pending_items': max(total_items - checked_items, 0),
+            'activities_count': tickets_activities.count(),
+            'logo_path': os.path.join(settings.MEDIA_ROOT, 'images', 'logo_jumper.png'),
+        }
+        return context, f'checklist_{user.username}_{target_date}.pdf'
+
+
+class DailyReport(PdfReport):
+    kind = 'daily'
+    template_path = 'tickets/tickets_daily_report_pdf.html'
+
+    def params_from_request(self, request, **kwargs):
+        target_date = _parse_date(request.GET.get('date'), timezone.localdate())
+        role = getattr(getattr(request.user, 'profile', None), 'role', None)
+        scope = request.GET.get('scope', 'mine')
+        if scope == 'all' and role not in ['admin', 'super_admin']:
+            scope = 'mine'
+        return {'date': target_date.isoformat(), 'scope': scope}
+
+    def _tickets(self, user, target_date, scope):
+        tickets_qs = Ticket.objects.filter(created_at__range=_day_range(target_date, target_date))
+        if scope != 'all':
+            tickets_qs = tickets_qs.filter(Q(technicians=user) | Q(requester=user)).distinct()
+        return tickets_qs
+
+    def version(self, user, params):
+        target_date = datetime.strptime(params['date'], '%Y-%m-%d').date()
+        # O relatório de hoje ainda recebe OS novas: não vai para o cache.
+        if target_date >= timezone.localdate():
+            return None
+        scope = params.get('scope', 'mine')
+        ids = self._tickets(user, target_date, scope).values('id')
+        # Dia encerrado não ganha OS novas, mas as do dia ainda podem ser editadas.
+        stats = Ticket.objects.filter(id__in=ids).aggregate(count=Count('id'), last_change=Max('updated_at'))
+        parts = [params['date'], scope, user.pk, stats['count'], stats['last_change']]
+        return parts, stats['last_change'], 'jumperfour_chamados.pdf'
+
+    def build(self, user, params):
+        target_date = datetime.strptime(params['date'], '%Y-%m-%d').date()
+        scope = params.get('scope', 'mine')
+
+        tickets_qs = self._tickets(user, target_date, scope).select_related('client', 'hub', 'ticket_type').prefetch_related('systems', 'technicians')
+        tickets_qs = tickets_qs.order_by('created_at', 'id')
+
+        context = {
+            'user': user,
+            'date': target_date,
+            'tickets': tickets_qs,
+            'scope': scope,
+            'logo_path': os.path.join(settings.MEDIA_ROOT, 'images', 'logo_principal.png'),
+            'report_title': 'Relatório Diário de Chamados',
+        }
+        return context, 'jumperfour_chamados.pdf'
+
+
+class WeeklyReport(PdfReport):
+    kind = 'weekly'
+    template_path = 'tickets/tickets_weekly_report_pdf.html'
+
+    def params_from_request(self, request, **kwargs):
+        week_str = request.GET.get('week')
+        target_date = timezone.localdate()
+        if week_str:
+            try:
+                year, week_num = map(int, week_str.split('-W'))
+                target_date = datetime.strptime(f'{year}-W{week_num}-1', '%Y-W%W-%w').date()
+            except ValueError:
+                pass
+        # Semana de domingo a sábado
+        days_to_subtract = (target_date.weekday() + 1) % 7
+        return {'start': (target_date - timedelta(days=days_to_subtract)).isoformat()}
+
+    def build(self, user, params):
+        start_week = datetime.strptime(params['start'], '%Y-%m-%d').date()
+        end_week = start_week + timedelta(days=6)
+
+        tickets_qs = Ticket.objects.select_related('client', 'hub', 'ticket_type').prefetch_related('systems', 'technicians').filter(
+            created_at__range=_day_range(start_week, end_week)
+        ).order_by('created_at', 'id')
+
+        day_counts = {
+            day.strftime('%d/%m/%Y'): count
+            for day, count in ticket_stats.daily_counts(start_week, end_week).items()
+        }
+        avg_week = sum(day_counts.values()) / len(day_counts) if day_counts else 0
+
+        context = {
+            'user': user,
+            'start_date': start_week,
+            'end_date': end_week,
+            'tickets': tickets_qs,
+            'day_counts': day_counts,
+            'avg_week': round(avg_week, 1),
+            'logo_path': os.path.join(settings.MEDIA_ROOT, 'images', 'logo_principal.png'),
+            'report_title': 'Relatório Semanal de Chamados',
+        }
+        return context, 'jumperfour_chamados_semanal.pdf'
+
+
+class MonthlyReport(PdfReport):
+    kind = 'monthly'
+    template_path = 'tickets/tickets_monthly_report_pdf.html'
+
+    def params_from_request(self, request, **kwargs):
+        month_str = request.GET.get('month')
+        target_date = timezone.localdate()
+        if month_str:
+            try:
+                year, month_num = map(int, month_str.split('-'))
+                target_date = datetime(year, month_num, 1).date()
+            except ValueError:
+                pass
+        return {'month': target_date.strftime('%Y-%m')}
+
+    def build(self, user, params):
+        start_month = datetime.strptime(params['month'], '%Y-%m').date()
+        if start_month.month == 12:
+            end_month = start_month.replace(year=start_month.year + 1, day=1) - timedelta(days=1)
+        else:
+            end_month = start_month.replace(month=start_month.month + 1, day=1) - timedelta(days=1)
+
+        start_of_month, end_of_month = _day_range(start_month, end_month)
+        tickets_qs = Ticket.objects.select_related('client', 'hub', 'ticket_type').prefetch_related('systems', 'technicians').filter(
+            created_at__range=(start_of_month, end_of_month)
+        ).order_by('created_at', 'id')
+
+        day_counts = {
+            day.strftime('%d/%m/%Y'): count
+            for day, count in ticket_stats.daily_counts(start_month, end_month).items()
+        }
+        avg_day = sum(day_counts.values()) / len(day_counts) if day_counts else 0
+
+        week_counts = {}
+        current_week = 1
+        current_week_count = 0
+        for i, (day_str, count) in enumerate(day_counts.items()):
+            current_week_count += count
+            if (i + 1) % 7 == 0 or i == len(day_counts) - 1:
+                week_counts[f'Semana {current_week}'] = current_week_count
+                current_week += 1
+                current_week_count = 0
+        avg_week = sum(week_counts.values()) / len(week_counts) if week_counts else 0
+
+        by_client = ticket_stats.count_by(start_of_month, end_of_month, ('client',))
+        client_names = dict(Client.objects.filter(id__in=[key[0] for key in by_client]).values_list('id', 'name'))
+        client_counts = {}
+        for (client_pk, ), count in sorted(by_client.items(), key=lambda item: client_names.get(item[0][0]) or ''):
+            client_name = client_names.get(client_pk) or ''
+            client_counts[client_name] = client_counts.get(client_name, 0) + count
+        avg_month = sum(client_counts.values()) / len(client_counts) if client_counts else 0
+
+        context = {
+            'user': user,
+            'month': start_month,
+            'tickets': tickets_qs,
+            'day_counts': day_counts,
+            'avg_day': round(avg_day, 1),
+            'week_counts': week_counts,
+            'avg_week': round(avg_week, 1),
+            'client_counts': client_counts,
+            'avg_month': round(avg_month, 1),
+            'logo_path': os.path.join(settings.MEDIA_ROOT, 'images', 'logo_principal.png'),
+            'report_title': 'Relatório Mensal de Chamados',
+        }
+        return context, 'jumperfour_chamados_mensal.pdf'
+
+
+REPORTS = {report.kind: report for report in (
+    TicketReport(), ChecklistReport(), DailyReport(), WeeklyReport(), MonthlyReport(),
+)}
@@ -0,0 +1,196 @@
+"""
+Presença ("quem está online") sem gravar no banco a cada request.
+
+Antes, todo request autenticado fazia get_or_create em ActiveSession (e um
+save por minuto), e cada consulta de "quem está online" — bolinha de status do
+chat particular, lista de colegas, tool _list_online_users_admin — rodava antes
+um DELETE das sessões paradas.
+
+Agora o SingleSessionPerIpMiddleware chama `touch()` e o estado fica no cache
+do Django em duas partes:
+
+- uma chave por sessão (SESSION_KEY % session_key) com [user_id, ip, última
+  atividade, criada em], gravada só pelos requests da própria sessão, no
+  máximo a cada TOUCH_SECONDS — nenhum request reescreve o estado dos outros,
+  então workers que compartilham o cache não se atropelam;
+- o "rol" (ROSTER_KEY): as sessões de ActiveSession dentro da janela de
+  online, lido do banco (cache vazio, sessão criada/removida, ou a cada
+  REBUILD_SECONDS) e nunca alterado depois — diz quais sessões existem; a
+  chave de cada sessão, quando mais recente, diz a última atividade.
+
+O banco só é escrito em lote, no máximo a cada FLUSH_SECONDS por processo
+(`flush()`), junto com a limpeza das sessões paradas — ActiveSession continua
+valendo como registro/auditoria e para a regra de 1 IP por sessão.
+
+Com o cache padrão (LocMemCache, um por processo do gunicorn) cada worker vê
+na hora a atividade dos próprios requests e a dos outros workers quando
+remonta o rol (até ~REBUILD_SECONDS + FLUSH_SECONDS de atraso — bem abaixo da
+janela de "ausente"). Com um cache compartilhado em CACHES (Redis, Memcached)
+todos veem a mesma coisa.
+"""
+import threading
+import time
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.core.cache import cache
+from django.utils import timezone
+
+ROSTER_KEY = 'tickets:presence:roster'
+SESSION_KEY = 'tickets:presence:session:%s'
+# Atividade de uma sessão só é regravada no cache depois deste intervalo.
+TOUCH_SECONDS = 30
+FLUSH_SECONDS = 30
+REBUILD_SECONDS = 60
+
+_USER, _IP, _LAST, _CREATED = range(4)
+
+_lock = threading.Lock()
+# session_key -> última atividade ainda não gravada em ActiveSession (deste processo).
+_pending = {}
+_last_flush = time.monotonic()
+
+
+def _window_seconds():
+    from .models import ActiveSession
+    return ActiveSession.ONLINE_WINDOW_MINUTES * 60
+
+
+def _load():
+    from .models import ActiveSession
+
+    since = timezone.now() - timedelta(seconds=_window_seconds())
+    return {
+        session_key: [user_id, ip, last.timestamp(), created.timestamp()]
+        for session_key, user_id, ip, last, created in ActiveSession.objects.filter(
+            last_activity__gte=since
+        ).values_list('session_key', 'user_id', 'ip_address', 'last_activity', 'created_at')
+    }
+
+
+def _roster():
+    """Sessões do banco dentro da janela (remontado quando ausente ou velho)."""
+    cached = cache.get(ROSTER_KEY)
+    if cached is not None and time.time() - cached[0] < REBUILD_SECONDS:
+        return cached[1]
+    sessions = _load()
+    cache.set(ROSTER_KEY, (time.time(), sessions), REBUILD_SECONDS * 2)
+    return sessions
+
+
+def _sessions():
+    """Sessões ativas: as do rol, com a atividade das chaves por sessão quando mais recente."""
+    roster = _roster()
+    live = cache.get_many([SESSION_KEY % key for key in roster])
+    sessions = {}
+    for key, entry in roster.items():
+        current = live.get(SESSION_KEY % key)
+        sessions[key] = current if current is not None and current[_LAST] >= entry[_LAST] else entry
+    return _alive(sessions)
+
+
+def _alive(sessions, now=None):
+    limit = (now or time.time()) - _window_seconds()
+    return {key: entry for key, entry in sessions.items() if entry[_LAST] >= limit}
+
+
+def _as_datetime(ts):
+    return datetime.fromtimestamp(ts, tz=dt_timezone.utc)
+
+
+def invalidate():
+    """Descarta o rol; a próxima consulta remonta a partir de ActiveSession."""
+    cache.delete(ROSTER_KEY)
+
+
+def session(session_key):
+    """(user_id, ip) da sessão se ela está ativa, ou None."""
+    entry = cache.get(SESSION_KEY % session_key) or _roster().get(session_key)
+    if entry is None or not _alive({session_key: entry}):
+        return None
+    return entry[_USER], entry[_IP]
+
+
+def touch(session_key, user_id, ip):
+    """Registra atividade da sessão (chamado a cada request autenticado)."""
+    now = time.time()
+    key = SESSION_KEY % session_key
+    entry = cache.get(key) or _roster().get(session_key)
+    if entry is None or entry[_USER] != user_id or now - entry[_LAST] >= TOUCH_SECONDS:
+        created = entry[_CREATED] if entry else now
+        cache.set(key, [user_id, entry[_IP] if entry else ip, now, created], _window_seconds() + TOUCH_SECONDS)
+        with _lock:
+            _pending[session_key] = now
+    flush()
+
+
+def forget(session_keys=(), user_id=None):
+    """Remove as sessões indicadas (e/ou todas as de `user_id`) — logout, troca de IP."""
+    session_keys = set(session_keys)
+    if user_id is not None:
+        session_keys.update(key for key, entry in _roster().items() if entry[_USER] == user_id)
+    cache.delete_many([SESSION_KEY % key for key in session_keys])
+    with _lock:
+        for key in session_keys:
+            _pending.pop(key, None)
+    invalidate()
+
+
+def flush(force=False):
+    """Grava em lote a atividade pendente em ActiveSession e limpa as sessões paradas."""
+    global _last_flush
+    from .models import ActiveSession
+
+    with _lock:
+        if not force and time.monotonic() - _last_flush < FLUSH_SECONDS:
+            return 0
+        _last_flush = time.monotonic()
+        pending = dict(_pending)
+        _pending.clear()
+
+    if pending:
+        rows = list(ActiveSession.objects.filter(session_key__in=pending).only('id', 'session_key'))
+        for row in rows:
+            row.last_activity = _as_datetime(pending[row.session_key])
+        ActiveSession.objects.bulk_update(rows, ['last_activity'])
+        missing = set(pending) - {row.session_key for row in rows}
+        if missing:
+            # Registro apagado (logout em outro processo, limpeza): o próximo
+            # request da sessão passa de novo pelo get_or_create do middleware.
+            forget(missing)
+    ActiveSession.cleanup_stale()
+    return len(pending)
+
+
+def last_activity(user_id):
+    """Última atividade (datetime) do usuário em qualquer sessão ativa, ou None."""
+    sessions = _sessions()
+    latest = max((entry[_LAST] for entry in sessions.values() if entry[_USER] == user_id), default=None)
+    return _as_datetime(latest) if latest is not None else None
+
+
+def status(user_id):
+    """'online', 'away' ou 'offline' (ver ActiveSession.status_from_last_activity)."""
+    from .models import ActiveSession
+    return ActiveSession.status_from_last_activity(last_activity(user_id))
+
+
+def online_user_ids():
+    sessions = _sessions()
+    return {entry[_USER] for entry in sessions.values()}
+
+
+def online_sessions():
+    """Sessões ativas, da atividade mais recente para a mais antiga (para o painel admin)."""
+    sessions = _sessions()
+    result = [
+        {
+            'session_key': key,
+            'user_id': entry[_USER],
+            'ip_address': entry[_IP],
+            'last_activity': _as_datetime(entry[_LAST]),
+            'created_at': _as_datetime(entry[_CREATED]),
+        }
+        for key, entry in sessions.items()
+    ]
+    result.sort(key=lambda s: s['last_activity'], reverse=True)
+    return result
@@ -0,0 +1,187 @@
+"""
+Canal de eventos em tempo real (Server-Sent Events) por usuário.
+
+Os signals (signals.py) publicam um evento curto quando algo novo chega para
+um usuário — mensagem do chat particular, notificação, alerta de passagem de
+turno — e a view `realtime_events` (views_realtime.py) entrega esses eventos
+às abas abertas dele. O front-end continua usando os endpoints de sempre
+para buscar os dados; o evento só diz "tem novidade", o que substitui o poll
+a cada 4s do chat particular.
+
+Pub/sub em dois sabores (mesma interface):
+
+- LocalBroker: em memória, no próprio processo. Serve quando quem publica e
+  quem mantém as conexões SSE é o mesmo processo (um único worker ASGI).
+- RedisBroker: PUBLISH/SUBSCRIBE em um servidor Redis (ou compatível), para
+  quando os requests que criam mensagens rodam em outros processos — o caso
+  do deploy com gunicorn (WSGI) + serviço ASGI separado para /realtime/.
+  Ativado por settings.REALTIME_REDIS_URL; exige o pacote `redis`.
+
+Sem Redis, o stream só é aberto com settings.REALTIME_SINGLE_PROCESS (quem
+publica e quem segura as conexões é o mesmo processo, ex.: runserver/uvicorn
+sozinho): do contrário o navegador conectaria, receberia "ready" e nunca mais
+nada, e o chat particular ficaria no poll de segurança de 60s.
+"""
+import asyncio
+import json
+import logging
+import threading
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+QUEUE_SIZE = 100
+
+
+def _channel(user_id):
+    return f'tickets:realtime:user:{user_id}'
+
+
+class _LocalSubscription:
+    def __init__(self, broker, user_id):
+        self.broker = broker
+        self.user_id = user_id
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(maxsize=QUEUE_SIZE)
+
+    def deliver(self, event):
+        # Chamado de qualquer thread; a fila pertence ao event loop da conexão.
+        def put():
+            try:
+                self.queue.put_nowait(event)
+            except asyncio.QueueFull:
+                # Cliente parado: o próximo poll de segurança do front-end recupera.
+                pass
+        self.loop.call_soon_threadsafe(put)
+
+    async def get(self, timeout):
+        """Próximo evento, ou None se nada chegou em `timeout` segundos."""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    async def __aenter__(self):
+        self.broker._add(self)
+        return self
+
+    async def __aexit__(self, *exc):
+        self.broker._remove(self)
+
+
+class LocalBroker:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers = {}
+
+    def _add(self, subscription):
+        with self._lock:
+            self._subscribers.setdefault(subscription.user_id, set()).add(subscription)
+
+    def _remove(self, subscription):
+        with self._lock:
+            subs = self._subscribers.get(subscription.user_id)
+            if subs is not None:
+                subs.discard(subscription)
+                if not subs:
+                    del self._subscribers[subscription.user_id]
+
+    def subscribe(self, user_id):
+        """`async with broker.subscribe(user_id) as sub: event = await sub.get(timeout)`."""
+        return _LocalSubscription(self, user_id)
+
+    def publish(self, user_id, event):
+        with self._lock:
+            subs = list(self._subscribers.get(user_id, ()))
+        for subscription in subs:
+            try:
+                subscription.deliver(event)
+            except RuntimeError:
+                # Event loop da conexão já foi encerrado.
+                self._remove(subscription)
+
+
+class _RedisSubscription:
+    def __init__(self, url, user_id):
+        self.url = url
+        self.user_id = user_id
+        self.client = None
+        self.pubsub = None
+
+    async def __aenter__(self):
+        import redis.asyncio as aioredis
+
+        self.client = aioredis.from_url(self.url)
+        self.pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+        await self.pubsub.subscribe(_channel(self.user_id))
+        return self
+
+    async def get(self, timeout):
+        message = await self.pubsub.get_message(timeout=timeout)
+        if not message:
+            return None
+        try:
+            return json.loads(message['data'])
+        except (TypeError, ValueError):
+            return None
+
+    async def __aexit__(self, *exc):
+        try:
+            await self.pubsub.unsubscribe()
+            await self.pubsub.aclose()
+            await self.client.aclose()
+        except Exception:
+            logger.debug("Erro ao encerrar assinatura Redis", exc_info=True)
+
+
+class RedisBroker:
+    def __init__(self, url):
+        import redis
+
+        self.url = url
+        self._client = redis.Redis.from_url(url, socket_timeout=2)
+
+    def subscribe(self, user_id):
+        return _RedisSubscription(self.url, user_id)
+
+    def publish(self, user_id, event):
+        self._client.publish(_channel(user_id), json.dumps(event))
+
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def get_broker():
+    global _broker
+    if _broker is None:
+        with _broker_lock:
+            if _broker is None:
+                url = getattr(settings, 'REALTIME_REDIS_URL', '')
+                broker = None
+                if url:
+                    try:
+                        broker = RedisBroker(url)
+                    except ImportError:
+                        logger.warning("REALTIME_REDIS_URL definido, mas o pacote redis não está instalado; usando pub/sub local")
+                _broker = broker or LocalBroker()
+    return _broker
+
+
+def can_stream():
+    """Se os eventos publicados chegam às conexões SSE (ver docstring do módulo)."""
+    return isinstance(get_broker(), RedisBroker) or getattr(settings, 'REALTIME_SINGLE_PROCESS', False)
+
+
+def publish(user_ids, event_type, **data):
+    """Publica {'type': event_type, ...data} para cada usuário. Nunca levanta erro."""
+    event = {'type': event_type, **data}
+    broker = get_broker()
+    for user_id in set(user_ids):
+        if not user_id:
+            continue
+        try:
+            broker.publish(user_id, event)
+        except Exception:
+            logger.warning("Falha ao publicar evento %s para o usuário %s", event_type, user_id, exc_info=True)
@@ -0,0 +1,81 @@
+"""
+Dados do usuário logado que vários middlewares e o context processor usam no
+mesmo request: perfil, registro da sessão (mapa de presença), configurações do
+sistema e notificações não lidas (contador desnormalizado).
+
+Cada um é carregado uma única vez, na primeira vez que alguém pede, e fica em
+`request.user_context` para os demais. O usuário já chega com o perfil
+(TokenBackend.get_user faz select_related), então o perfil não custa query.
+"""
+from functools import cached_property
+
+from . import config_cache, presence
+
+
+class UserContext:
+    def __init__(self, request):
+        self.request = request
+
+    @cached_property
+    def user(self):
+        return self.request.user
+
+    @cached_property
+    def profile(self):
+        """UserProfile do usuário, criado na hora se faltar (None para anônimos)."""
+        from .models import UserProfile
+
+        user = self.user
+        if not user.is_authenticated:
+            return None
+        try:
+            return user.profile
+        except UserProfile.DoesNotExist:
+            pass
+        profile, _ = UserProfile.objects.get_or_create(user=user)
+        # O acesso acima deixou "sem perfil" guardado no usuário; troca pelo criado.
+        UserProfile._meta.get_field('user').remote_field.set_cached_value(user, profile)
+        return profile
+
+    @property
+    def role(self):
+        return getattr(self.profile, 'role', None)
+
+    @cached_property
+    def session_record(self):
+        """(user_id, ip) da sessão no mapa de presença, ou None (ver presence.py)."""
+        session_key = self.request.session.session_key
+        return presence.session(session_key) if session_key else None
+
+    @cached_property
+    def settings(self):
+        try:
+            return config_cache.get_system_settings()
+        except Exception:
+            return None
+
+    @cached_property
+    def _unread_notifications(self):
+        from . import notification_counters
+
+        if not self.user.is_authenticated:
+            return 0, []
+        return notification_counters.get(self.user.pk)
+
+    @property
+    def unread_notifications_count(self):
+        """Badge do menu: lido do contador desnormalizado (notification_counters.py)."""
+        return self._unread_notifications[0]
+
+    @property
+    def unread_notifications(self):
+        """Últimas não lidas (dicts com id, título, urgência, tipo e created_at)."""
+        return self._unread_notifications[1]
+
+
+def get(request):
+    """UserContext do request (criado na primeira chamada)."""
+    context = getattr(request, 'user_context', None)
+    if context is None:
+        context = request.user_context = UserContext(request)
+    return context
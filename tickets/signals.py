@@ -1,8 +1,18 @@
-from django.db.models.signals import m2m_changed, post_save
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_save
 from django.contrib.auth.signals import user_logged_out
 from django.dispatch import receiver
 from django.contrib.auth.models import User
-from .models import Ticket, Notification, UserProfile, ActiveSession
+from django.db import transaction
+from .models import (
+    Ticket, Notification, UserProfile, ActiveSession, AppPage, RoleLevel, RolePagePermission,
+    SystemSettings, AIProviderConfig, SearchProviderConfig, VoiceProviderConfig, TicketStatus,
+    TicketImage, TicketUpdate, TicketUpdateImage, DailyChecklistItem, DailyChecklistItemImage,
+    PrivateChatMessage, ShiftHandoverEntryAlert, TechnicianTravel, TravelSegment,
+)
+from . import (
+    api_tokens, config_cache, http_clients, image_renditions, notification_counters, page_permissions, presence, realtime,
+    status_registry, technician_agenda, ticket_stats,
+)
 
 @receiver(post_save, sender=User)
 def create_user_profile(sender, instance, created, **kwargs):
@@ -58,3 +68,197 @@ def cleanup_active_session_on_logout(sender, request, user, **kwargs):
     """
     if user is not None:
         ActiveSession.objects.filter(user=user).delete()
+        presence.forget(user_id=user.id)
+
+
+@receiver(pre_save, sender=Ticket)
+def remember_ticket_previous_client(sender, instance, raw=False, **kwargs):
+    """Guarda o cliente anterior para que a fatia antiga da estatística diária também seja recalculada."""
+    if raw or not instance.pk:
+        return
+    instance._stats_previous_client_id = (
+        Ticket.objects.filter(pk=instance.pk).values_list('client_id', flat=True).first()
+    )
+
+
+@receiver(post_save, sender=Ticket)
+def refresh_ticket_daily_stats(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    ticket_stats.refresh_for_ticket(instance, getattr(instance, '_stats_previous_client_id', None))
+
+
+@receiver(post_delete, sender=Ticket)
+def refresh_ticket_daily_stats_on_delete(sender, instance, **kwargs):
+    ticket_stats.refresh_for_ticket(instance)
+
+
+@receiver(m2m_changed, sender=Ticket.systems.through)
+def refresh_ticket_daily_stats_on_systems_change(sender, instance, action, reverse, pk_set, **kwargs):
+    """
+    Mudança nos sistemas de uma OS muda as linhas por sistema da estatística
+    diária. No sentido reverso (system.tickets.add/remove/clear) a instância é
+    o System, e as OS afetadas vêm em pk_set (ou são lidas antes do clear).
+    """
+    if not reverse:
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            ticket_stats.refresh_for_ticket(instance)
+        return
+
+    if action == 'pre_clear':
+        instance._stats_cleared_ticket_ids = list(instance.tickets.values_list('id', flat=True))
+        return
+    if action == 'post_clear':
+        ticket_ids = getattr(instance, '_stats_cleared_ticket_ids', [])
+    elif action in ('post_add', 'post_remove'):
+        ticket_ids = pk_set or []
+    else:
+        return
+    for ticket in Ticket.objects.filter(pk__in=ticket_ids).only('id', 'client_id', 'created_at'):
+        ticket_stats.refresh_for_ticket(ticket)
+
+
+@receiver(post_save, sender=AppPage)
+@receiver(post_delete, sender=AppPage)
+@receiver(post_save, sender=RoleLevel)
+@receiver(post_delete, sender=RoleLevel)
+@receiver(post_save, sender=RolePagePermission)
+@receiver(post_delete, sender=RolePagePermission)
+def invalidate_page_permissions(sender, **kwargs):
+    """
+    Descarta a matriz de permissões em cache. Invalida já (o próprio processo
+    enxerga a mudança) e de novo após o commit, para que outro request não
+    remonte e guarde a matriz antiga enquanto a transação ainda está aberta.
+    """
+    page_permissions.invalidate()
+    transaction.on_commit(page_permissions.invalidate)
+
+
+
+@receiver(post_save, sender=SystemSettings)
+@receiver(post_delete, sender=SystemSettings)
+@receiver(post_save, sender=AIProviderConfig)
+@receiver(post_delete, sender=AIProviderConfig)
+@receiver(post_save, sender=SearchProviderConfig)
+@receiver(post_delete, sender=SearchProviderConfig)
+@receiver(post_save, sender=VoiceProviderConfig)
+@receiver(post_delete, sender=VoiceProviderConfig)
+def invalidate_config_cache(sender, **kwargs):
+    """Mesma estratégia de invalidate_page_permissions, para as configurações em cache."""
+    config_cache.invalidate(sender)
+    transaction.on_commit(lambda: config_cache.invalidate(sender))
+
+
+@receiver(post_save, sender=AIProviderConfig)
+@receiver(post_delete, sender=AIProviderConfig)
+@receiver(post_save, sender=SearchProviderConfig)
+@receiver(post_delete, sender=SearchProviderConfig)
+@receiver(post_save, sender=VoiceProviderConfig)
+@receiver(post_delete, sender=VoiceProviderConfig)
+def discard_provider_clients(sender, **kwargs):
+    """Chave/provedor mudou: os próximos pedidos montam clientes de SDK novos (http_clients.py)."""
+    http_clients.invalidate()
+
+
+@receiver(post_save, sender=TicketStatus)
+@receiver(post_delete, sender=TicketStatus)
+def invalidate_status_registry(sender, **kwargs):
+    status_registry.invalidate()
+    transaction.on_commit(status_registry.invalidate)
+
+
+@receiver(post_save, sender=Ticket)
+@receiver(post_delete, sender=Ticket)
+@receiver(post_save, sender=TechnicianTravel)
+@receiver(post_delete, sender=TechnicianTravel)
+@receiver(post_save, sender=TravelSegment)
+@receiver(post_delete, sender=TravelSegment)
+@receiver(post_save, sender=TicketStatus)
+@receiver(post_delete, sender=TicketStatus)
+@receiver(m2m_changed, sender=Ticket.technicians.through)
+@receiver(m2m_changed, sender=Ticket.systems.through)
+def invalidate_technician_agenda(sender, **kwargs):
+    """Agendas da tela "Local" em cache (technician_agenda.py) ficam velhas com qualquer mudança em OS/viagens."""
+    if kwargs.get('action', 'post_').startswith('pre_'):
+        return
+    technician_agenda.invalidate()
+    transaction.on_commit(technician_agenda.invalidate)
+
+
+@receiver(post_save, sender=UserProfile)
+@receiver(post_delete, sender=UserProfile)
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_api_tokens(sender, **kwargs):
+    """Token trocado, usuário desativado/excluído ou papel alterado: o cache de tokens da API é descartado.
+    Saves parciais que não tocam nesses campos (last_login, avisos do perfil...) não passam daqui."""
+    update_fields = kwargs.get('update_fields')
+    if update_fields and not set(update_fields) & api_tokens.IDENTITY_FIELDS:
+        return
+    api_tokens.invalidate()
+    transaction.on_commit(api_tokens.invalidate)
+
+
+@receiver(post_save, sender=ActiveSession)
+@receiver(post_delete, sender=ActiveSession)
+def invalidate_presence(sender, **kwargs):
+    """Sessão criada/removida (login, logout, limpeza): o mapa de presença é remontado.
+    A atividade gravada em lote pelo presence.flush() usa bulk_update e não passa aqui."""
+    presence.invalidate()
+    transaction.on_commit(presence.invalidate)
+
+
+@receiver(post_save, sender=TicketImage)
+@receiver(post_save, sender=TicketUpdate)
+@receiver(post_save, sender=TicketUpdateImage)
+@receiver(post_save, sender=DailyChecklistItemImage)
+@receiver(post_save, sender=Ticket)
+@receiver(post_save, sender=DailyChecklistItem)
+def generate_image_renditions(sender, instance, update_fields=None, **kwargs):
+    """Gera as versões reduzidas da foto enviada (após o commit, com o arquivo já gravado).
+    OS e itens de checklist são salvos toda hora: saves parciais sem a foto não passam daqui."""
+    if update_fields is not None and 'image' not in update_fields:
+        return
+    name = getattr(instance.image, 'name', None)
+    if name:
+        transaction.on_commit(lambda: image_renditions.ensure_all(name))
+
+
+# ── Canal em tempo real (realtime.py): avisa as abas abertas do destinatário ──
+
+@receiver(post_save, sender=PrivateChatMessage)
+def publish_private_chat_message(sender, instance, created, **kwargs):
+    if not created:
+        return
+    thread = instance.thread
+    recipients = [uid for uid in (thread.user_a_id, thread.user_b_id) if uid != instance.sender_id]
+    transaction.on_commit(lambda: realtime.publish(recipients, 'private_chat', thread_id=thread.id))
+
+
+@receiver(post_save, sender=Notification)
+def update_notification_counter(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    notification_counters.apply(instance, created)
+
+
+@receiver(post_delete, sender=Notification)
+def update_notification_counter_on_delete(sender, instance, **kwargs):
+    notification_counters.removed(instance)
+
+
+@receiver(post_save, sender=Notification)
+def publish_notification(sender, instance, created, **kwargs):
+    if not created:
+        return
+    transaction.on_commit(lambda: realtime.publish(
+        [instance.recipient_id], 'notification',
+        id=instance.id, title=instance.title, urgency=instance.urgency,
+    ))
+
+
+@receiver(post_save, sender=ShiftHandoverEntryAlert)
+def publish_handover_alert(sender, instance, created, **kwargs):
+    if not created:
+        return
+    transaction.on_commit(lambda: realtime.publish([instance.target_user_id], 'handover_alert', id=instance.id))
@@ -321,3 +321,109 @@ class SpeechFormatter:
             kept.append(sentence)
             word_count += w
         return kept or sentences[:1]
+
+
+_PARAGRAPH_BREAK_RE = re.compile(r"\n[ \t]*\n")
+_STREAM_SENTENCE_END_RE = re.compile(r"(\w+)?[.!?][ \t]+(?=\S)")
+
+
+class SpeechStream:
+    """Versão incremental do SpeechFormatter, para respostas que chegam em pedaços
+    (modo streaming do chat): `feed()` recebe o texto conforme ele é gerado e
+    devolve os chunks de fala das frases que já terminaram, pro front-end começar
+    o TTS antes da resposta acabar; `finish()` fala o resto e devolve o
+    FormattedSpeech completo (todos os chunks, inclusive os já entregues).
+
+    Um parágrafo com linhas de lista só é formatado quando termina — pode virar
+    um bloco estruturado (trocado por uma frase apontando pro chat). O limite de
+    duração vale pra resposta inteira, somando o que já foi falado."""
+
+    def __init__(self, formatter: SpeechFormatter = None, *, max_seconds: float = MAX_SPOKEN_SECONDS,
+                 speak_full: bool = False):
+        self.formatter = formatter or SpeechFormatter()
+        self.max_seconds = max_seconds
+        self.speak_full = speak_full
+        self._text = ""
+        self._consumed = 0
+        self._chunks: List[str] = []
+        self._spoken_seconds = 0.0
+        self._estimated_seconds = 0.0
+        self._pointer_used = False
+        self._truncated = False
+
+    def feed(self, delta: str) -> List[str]:
+        self._text += delta or ""
+        return self._speak_until(self._ready_end())
+
+    def reset(self):
+        """Descarta o texto ainda não falado (ex: preâmbulo de uma rodada que chamou tools)."""
+        self._text = ""
+        self._consumed = 0
+
+    def finish(self, final_text: str) -> FormattedSpeech:
+        final_text = final_text or ""
+        if final_text.startswith(self._text):
+            self._text = final_text
+        elif not self._chunks:
+            self._text, self._consumed = final_text, 0
+        # Texto final diferente do que veio em tokens, com parte já falada: termina
+        # o que veio em tokens em vez de repetir a fala do começo.
+        self._speak_until(len(self._text))
+        return FormattedSpeech(
+            chunks=list(self._chunks),
+            spoken_text=" ".join(self._chunks),
+            is_truncated=self._truncated,
+            estimated_seconds=round(self._estimated_seconds, 1),
+        )
+
+    def _ready_end(self) -> int:
+        """Índice até onde o texto já pode ser falado: fim da última frase completa,
+        sem entrar num parágrafo que ainda pode virar bloco estruturado."""
+        pending = self._text[self._consumed:]
+        breaks = list(_PARAGRAPH_BREAK_RE.finditer(pending))
+        end = breaks[-1].end() if breaks else 0
+        current = pending[end:]
+        if not self.speak_full and any(_LIST_LINE_RE.match(line) for line in current.split("\n")):
+            return self._consumed + end
+        # Fim de frase seguido de espaço na mesma linha — uma quebra de linha pode ser
+        # o começo de uma lista.
+        last_end = 0
+        for match in _STREAM_SENTENCE_END_RE.finditer(current):
+            if (match.group(1) or "").lower() not in _ABBREVIATIONS:
+                last_end = match.end()
+        return self._consumed + end + last_end
+
+    def _speak_until(self, end: int) -> List[str]:
+        if end <= self._consumed:
+            return []
+        piece = self._text[self._consumed:end]
+        self._consumed = end
+        if self._truncated:
+            self._estimated_seconds += self.formatter._estimate_seconds(piece)
+            return []
+
+        if not self.speak_full:
+            paragraphs = _PARAGRAPH_BREAK_RE.split(piece)
+            kept = [
+                p for p in paragraphs
+                if not (self._pointer_used and self.formatter._is_structured_paragraph(p))
+            ]
+            self._pointer_used = self._pointer_used or any(
+                self.formatter._is_structured_paragraph(p) for p in paragraphs
+            )
+            piece = "\n\n".join(kept)
+        if not piece.strip():
+            return []
+
+        remaining = self.max_seconds - self._spoken_seconds
+        if remaining <= 0:
+            self._truncated = True
+            chunks = [random.choice(CONTINUE_PROMPTS)]
+        else:
+            formatted = self.formatter.format(piece, max_seconds=remaining, speak_full=self.speak_full)
+            chunks = formatted.chunks
+            self._truncated = formatted.is_truncated
+            self._estimated_seconds += formatted.estimated_seconds
+            self._spoken_seconds += self.formatter._estimate_seconds(formatted.spoken_text)
+        self._chunks.extend(chunks)
+        return chunks
@@ -0,0 +1,29 @@
+"""
+Cadastro de "Status de OS" (TicketStatus) em memória.
+
+As propriedades de Ticket que dependem do status (status_color,
+get_status_display, status_display_html, status_row_bg) são chamadas por
+linha nas listagens; em vez de uma consulta por chamada, consultam este
+registro, carregado uma vez e invalidado pelos signals de TicketStatus.
+"""
+from .models import TicketStatus
+from .versioned_cache import VersionedCache
+
+
+def _load():
+    return {ts.code: ts for ts in TicketStatus.objects.all()}
+
+
+_registry = VersionedCache('ticket_status_registry', _load, default={})
+
+
+def get_status(code, active_only=False):
+    """TicketStatus do código (ou None). Com active_only, ignora status inativos."""
+    ts = _registry.get().get(code)
+    if ts is None or (active_only and not ts.is_active):
+        return None
+    return ts
+
+
+def invalidate():
+    _registry.invalidate()
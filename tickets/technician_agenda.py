@@ -0,0 +1,289 @@
+"""
+Agenda do dia dos técnicos (tela "Local"): OS em que o técnico está escalado
+e viagens agendadas, dia a dia.
+
+`agendas()` monta a agenda de vários técnicos × vários dias de uma vez, com
+consultas de sobreposição de período (start_date/deadline das OS,
+scheduled_date das viagens) para o intervalo inteiro — o número de consultas
+não depende de quantos técnicos ou dias foram pedidos. Cada dia é separado
+em Python com a mesma regra que a consulta por dia usava.
+
+O resultado fica em cache por AGENDA_CACHE_SECONDS sob uma chave que inclui a
+versão da agenda, incrementada (signals.py) a cada mudança em OS, viagens,
+trechos de viagem ou status de OS — a tela "Local" fica aberta num painel
+recarregando a agenda, e assim só remonta quando algo mudou (ou o cache
+expira, cobrindo updates em massa que não disparam signals).
+"""
+from collections import defaultdict
+from datetime import datetime, timedelta
+import hashlib
+import logging
+import time
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db.models import Q
+from django.urls import reverse
+from django.utils import timezone
+
+from .models import TechnicianTravel, Ticket
+
+logger = logging.getLogger(__name__)
+
+AGENDA_CACHE_SECONDS = getattr(settings, 'LOCAL_AGENDA_CACHE_SECONDS', 30)
+# Maior intervalo aceito num pedido (dias).
+MAX_RANGE_DAYS = 31
+LOCAL_TECHNICIAN_ROLES = ('technician', 'standard')
+
+_VERSION_KEY = 'tickets:agenda:version'
+
+
+def local_technicians():
+    """Técnicos que aparecem na tela "Local"."""
+    return (
+        User.objects.filter(is_active=True, profile__role__in=LOCAL_TECHNICIAN_ROLES)
+        .select_related('profile__fixed_client', 'profile__fixed_hub')
+        .order_by('first_name', 'username')
+    )
+
+
+def _version():
+    version = cache.get(_VERSION_KEY)
+    if version is None:
+        # Versão inicial única: não reaproveita agendas antigas se a chave foi despejada.
+        cache.add(_VERSION_KEY, int(time.time() * 1000), None)
+        version = cache.get(_VERSION_KEY)
+    return version
+
+
+def invalidate():
+    """Descarta as agendas em cache (chamado pelos signals de OS/viagens)."""
+    try:
+        cache.incr(_VERSION_KEY)
+    except ValueError:
+        cache.add(_VERSION_KEY, int(time.time() * 1000), None)
+    except Exception:
+        logger.exception("Erro ao invalidar o cache de agendas")
+
+
+def _fmt_dt(value, with_time=False):
+    if not value:
+        return None
+    if with_time:
+        return timezone.localtime(value).strftime('%d/%m/%Y %H:%M')
+    return timezone.localtime(value).strftime('%d/%m/%Y')
+
+
+def _fmt_time(value):
+    if not value:
+        return None
+    return timezone.localtime(value).strftime('%H:%M')
+
+
+def _fmt_duration(value):
+    if not value:
+        return None
+    total_minutes = int(value.total_seconds() // 60)
+    hours = total_minutes // 60
+    minutes = total_minutes % 60
+    return f"{hours}:{minutes:02d}"
+
+
+def _overlaps(start_date, deadline, period_start, period_end):
+    """Mesma regra do filtro de OS por período (ver _tickets_in)."""
+    if start_date is not None:
+        return start_date <= period_end and (deadline is None or deadline >= period_start)
+    return deadline is not None and period_start <= deadline <= period_end
+
+
+def _overlap_q(period_start, period_end, prefix=''):
+    start, deadline = f'{prefix}start_date', f'{prefix}deadline'
+    return (
+        (Q(**{f'{start}__isnull': False, f'{start}__lte': period_end})
+         & (Q(**{f'{deadline}__gte': period_start}) | Q(**{f'{deadline}__isnull': True})))
+        | (Q(**{f'{start}__isnull': True}) & Q(**{f'{deadline}__range': (period_start, period_end)}))
+    )
+
+
+def _tickets_in(tech_ids, period_start, period_end):
+    """{tech_id: [Ticket]} — OS não canceladas que se sobrepõem ao período, por ordem de criação."""
+    links = list(
+        Ticket.technicians.through.objects
+        .filter(user_id__in=tech_ids)
+        .exclude(ticket__status='canceled')
+        .filter(_overlap_q(period_start, period_end, prefix='ticket__'))
+        .values_list('ticket_id', 'user_id')
+    )
+    if not links:
+        return {}
+    tickets = {
+        t.id: t
+        for t in Ticket.objects.filter(pk__in={ticket_id for ticket_id, _ in links})
+        .select_related('client', 'hub')
+        .prefetch_related('systems')
+    }
+    by_tech = defaultdict(list)
+    for ticket_id, tech_id in links:
+        by_tech[tech_id].append(tickets[ticket_id])
+    for items in by_tech.values():
+        items.sort(key=lambda t: (t.created_at, t.id))
+    return by_tech
+
+
+def _travels_in(tech_ids, period_start, period_end):
+    by_tech = defaultdict(list)
+    travels = (
+        TechnicianTravel.objects.filter(technician_id__in=tech_ids, scheduled_date__range=(period_start, period_end))
+        .select_related('client', 'hub', 'system', 'service_order')
+        .prefetch_related('segments')
+        .order_by('scheduled_date', 'id')
+    )
+    for travel in travels:
+        by_tech[travel.technician_id].append(travel)
+    return by_tech
+
+
+def _ticket_item(t):
+    hub_name = t.hub.name if t.hub else None
+    return {
+        'kind': 'os',
+        'id': t.id,
+        'label': t.leankeep_id or t.formatted_id,
+        'status': t.get_status_display(),
+        'status_code': t.status,
+        'client': t.client.name,
+        'hub': hub_name,
+        'location': f"{t.client.name} - {hub_name}" if hub_name else t.client.name,
+        'systems': ", ".join(system.name for system in t.systems.all()) or "-",
+        'estimated_time': _fmt_duration(t.estimated_time) or t.calculated_hours,
+        'start_time': _fmt_time(t.start_date),
+        'deadline_time': _fmt_time(t.deadline),
+        'url': reverse('ticket_detail', args=[t.id]),
+        'description': (t.description or '')[:160],
+        'created_at': timezone.localtime(t.created_at).isoformat(),
+    }
+
+
+def _travel_item(tr):
+    hub_name = tr.hub.name if tr.hub else None
+    segment = next(iter(tr.segments.all()), None)
+    travel_payload = {
+        'segment_exists': bool(segment),
+        'transport_type': segment.get_transport_type_display() if segment else None,
+        'carrier': segment.carrier if segment else None,
+        'transport_number': segment.transport_number if segment else None,
+        'locator': segment.locator if segment else None,
+        'departure': _fmt_dt(segment.departure_time, with_time=True) if segment else _fmt_dt(tr.departure_time, with_time=True),
+        'arrival': _fmt_dt(segment.arrival_time, with_time=True) if segment else _fmt_dt(tr.arrival_time, with_time=True),
+    }
+    return {
+        'kind': 'agendamento',
+        'id': tr.id,
+        'client': tr.client.name,
+        'hub': hub_name,
+        'location': f"{tr.client.name} - {hub_name}" if hub_name else tr.client.name,
+        'status': tr.get_status_display(),
+        'status_code': tr.status,
+        'scheduled_at': _fmt_dt(tr.scheduled_date, with_time=True),
+        'system': tr.system.name if tr.system else None,
+        'service_order': tr.service_order.leankeep_id if tr.service_order and tr.service_order.leankeep_id else (tr.service_order.formatted_id if tr.service_order else None),
+        'travel': travel_payload,
+        'url': reverse('travel_detail', args=[tr.id]),
+    }
+
+
+def _day_payload(tech, day, tickets, travels):
+    items = []
+    location_counts = defaultdict(int)
+    total_estimated_minutes = 0
+
+    for t in tickets:
+        item = _ticket_item(t)
+        location_counts[item['location']] += 1
+        if t.estimated_time:
+            total_estimated_minutes += int(t.estimated_time.total_seconds() // 60)
+        items.append(item)
+
+    for tr in travels:
+        item = _travel_item(tr)
+        location_counts[item['location']] += 1
+        items.append(item)
+
+    profile = getattr(tech, 'profile', None)
+    primary_location = None
+    if location_counts:
+        primary_location = sorted(location_counts.items(), key=lambda x: (-x[1], x[0]))[0][0]
+    elif profile and profile.technician_type == 'fixo' and profile.fixed_client:
+        primary_location = f"{profile.fixed_client.name} - {profile.fixed_hub.name}" if profile.fixed_hub else profile.fixed_client.name
+
+    total_estimated = None
+    if total_estimated_minutes > 0:
+        total_estimated = f"{total_estimated_minutes // 60}:{total_estimated_minutes % 60:02d}"
+
+    return {
+        'technician': {
+            'id': tech.id,
+            'name': tech.get_full_name() or tech.username,
+        },
+        'date': day.strftime('%Y-%m-%d'),
+        'date_label': day.strftime('%d/%m/%Y'),
+        'summary': {
+            'primary_location': primary_location,
+            'total_estimated_time': total_estimated,
+            'items_count': len(items),
+        },
+        'items': items,
+    }
+
+
+def build(technicians, date_from, date_to):
+    """Agendas (uma por técnico por dia, date_from..date_to inclusive), técnico a técnico, dia a dia."""
+    technicians = list(technicians)
+    if not technicians:
+        return []
+    tz = timezone.get_current_timezone()
+    days = [date_from + timedelta(days=i) for i in range((date_to - date_from).days + 1)]
+    bounds = [
+        (timezone.make_aware(datetime.combine(d, datetime.min.time()), tz),
+         timezone.make_aware(datetime.combine(d, datetime.max.time()), tz))
+        for d in days
+    ]
+    period_start, period_end = bounds[0][0], bounds[-1][1]
+    tech_ids = [tech.id for tech in technicians]
+    tickets = _tickets_in(tech_ids, period_start, period_end)
+    travels = _travels_in(tech_ids, period_start, period_end)
+
+    agendas = []
+    for tech in technicians:
+        tech_tickets = tickets.get(tech.id, [])
+        tech_travels = travels.get(tech.id, [])
+        for day, (day_start, day_end) in zip(days, bounds):
+            agendas.append(_day_payload(
+                tech, day,
+                [t for t in tech_tickets if _overlaps(t.start_date, t.deadline, day_start, day_end)],
+                [tr for tr in tech_travels if day_start <= tr.scheduled_date <= day_end],
+            ))
+    return agendas
+
+
+def agendas(technician_ids, date_from, date_to):
+    """
+    Como build(), com cache. `technician_ids` None = todos os técnicos da tela
+    "Local"; senão, só os desses IDs (ativos), na mesma ordem da tela.
+    """
+    ids_key = 'all' if technician_ids is None else ','.join(str(i) for i in sorted(set(technician_ids)))
+    digest = hashlib.sha1(f"{ids_key}|{date_from}|{date_to}|{timezone.get_current_timezone_name()}".encode()).hexdigest()
+    key = f'tickets:agenda:{_version()}:{digest}'
+    cached = cache.get(key)
+    if cached is not None:
+        return cached
+
+    technicians = local_technicians() if technician_ids is None else (
+        User.objects.filter(is_active=True, pk__in=technician_ids)
+        .select_related('profile__fixed_client', 'profile__fixed_hub')
+        .order_by('first_name', 'username')
+    )
+    result = build(technicians, date_from, date_to)
+    cache.set(key, result, AGENDA_CACHE_SECONDS)
+    return result
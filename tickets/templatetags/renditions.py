@@ -0,0 +1,11 @@
+from django import template
+
+from tickets import image_renditions
+
+register = template.Library()
+
+
+@register.filter
+def rendition_url(field_file, size='thumb'):
+    """{{ img.image|rendition_url:'thumb' }} — URL da versão reduzida da foto (image_renditions.py)."""
+    return image_renditions.url(field_file, size)
@@ -1,12 +1,13 @@
 import json
 from unittest.mock import patch
 
-from django.test import TestCase
+from django.test import RequestFactory, TestCase
 from django.urls import reverse
 from django.contrib.auth.models import User
 
 from tickets.models import SystemSettings, AIProviderConfig
 from tickets.speech_formatter import FormattedSpeech
+from tickets.views_ai import AIChatView
 
 
 class AIChatViewSpeechFieldTest(TestCase):
@@ -50,6 +51,22 @@ class AIChatViewSpeechFieldTest(TestCase):
         self.assertIn("estimated_seconds", data["speech"])
         self.assertGreater(len(data["speech"]["chunks"]), 0)
 
+    @patch('tickets.views_ai._compact_history')
+    @patch('tickets.views_ai.run_agent')
+    def test_history_is_compacted_after_the_response_is_sent(self, mock_run_agent, mock_compact):
+        mock_run_agent.return_value = "Tudo certo com a sua OS."
+        request = RequestFactory().post(
+            reverse('ai_chat'), data=json.dumps({"message": "oi"}), content_type='application/json',
+        )
+        request.user = self.user
+
+        resp = AIChatView.as_view()(request)
+
+        self.assertEqual(resp.status_code, 200)
+        mock_compact.assert_not_called()
+        resp.close()
+        mock_compact.assert_called_once()
+
     @patch('tickets.views_ai.SpeechFormatter')
     @patch('tickets.views_ai.run_agent')
     def test_speech_formatter_error_degrades_gracefully(self, mock_run_agent, mock_formatter_cls):
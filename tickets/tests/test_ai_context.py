@@ -0,0 +1,84 @@
+from types import SimpleNamespace as NS
+from unittest.mock import patch
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+
+from tickets import ai_context
+from tickets.ai_service import _anthropic_agent_events
+from tickets.ai_tools import SYSTEM_PROMPT
+from tickets.models import AIChatMessage, AIChatSession
+
+
+class FakeAnthropicClient:
+    def __init__(self, *responses):
+        self.responses = list(responses)
+        self.calls = []
+        self.messages = NS(create=self._create)
+
+    def _create(self, **kwargs):
+        self.calls.append(kwargs)
+        return self.responses.pop(0)
+
+
+class AIContextTest(TestCase):
+    def setUp(self):
+        user = User.objects.create_user(username='contexto', password='password')
+        self.session = AIChatSession.objects.create(user=user, title='Conversa')
+        self.added = 0
+
+    def _add_messages(self, count):
+        for i in range(self.added, self.added + count):
+            AIChatMessage.objects.create(session=self.session, role='user' if i % 2 == 0 else 'assistant',
+                                         content=f'mensagem {i}')
+            AIChatMessage.objects.create(session=self.session, role='tool', content='{}')
+        self.added += count
+
+    @patch('tickets.ai_context.run_agent', return_value='- Usuário pediu a OS 12.')
+    def test_old_messages_are_compacted_into_digest(self, mock_run_agent):
+        self._add_messages(ai_context.HISTORY_WINDOW + ai_context.COMPACT_BATCH - 1)
+        self.assertFalse(ai_context.compact_if_needed(self.session, config=None))
+
+        self._add_messages(1)
+        self.assertTrue(ai_context.compact_if_needed(self.session, config=None))
+
+        session = AIChatSession.objects.get(pk=self.session.pk)
+        self.assertEqual(session.digest, '- Usuário pediu a OS 12.')
+        with self.assertNumQueries(1):
+            history = ai_context.load_history(session)
+        self.assertEqual(len(history), ai_context.HISTORY_WINDOW)
+        self.assertEqual(history[-1]['content'], f'mensagem {ai_context.HISTORY_WINDOW + ai_context.COMPACT_BATCH - 1}')
+        summarized = mock_run_agent.call_args[0][1][1]['content']
+        self.assertIn('mensagem 0', summarized)
+        self.assertNotIn(history[0]['content'], summarized)
+
+    @patch('tickets.ai_context.run_agent', return_value='⚠️ Não foi possível obter resposta da IA no momento.')
+    def test_failed_summary_falls_back_to_short_transcript(self, mock_run_agent):
+        self._add_messages(ai_context.HISTORY_WINDOW + ai_context.COMPACT_BATCH)
+
+        ai_context.compact_if_needed(self.session, config=None)
+
+        self.assertTrue(self.session.digest.startswith('Usuário: mensagem 0\nJota4: mensagem 1'))
+        self.assertNotIn('⚠️', self.session.digest)
+
+    def test_static_prefix_is_identical_and_cache_breakpoints_are_bounded(self):
+        first = ai_context.build_messages('USUÁRIO ATUAL: Ana. 10:00', '', [{'role': 'user', 'content': 'oi'}])
+        second = ai_context.build_messages('USUÁRIO ATUAL: Bia. 10:01', 'resumo', [{'role': 'user', 'content': 'e aí'}])
+        self.assertEqual(first[0], second[0])
+        self.assertEqual(first[0]['content'], SYSTEM_PROMPT)
+        self.assertIn('resumo', second[1]['content'])
+
+        tool_turn = NS(content=[NS(type='tool_use', id='t1', name='list_systems', input={})])
+        final_turn = NS(content=[NS(type='text', text='Pronto.')])
+        client = FakeAnthropicClient(tool_turn, final_turn)
+        tools = [{'name': 'list_systems', 'description': 'x'}, {'name': 'get_ticket', 'description': 'y'}]
+
+        events = list(_anthropic_agent_events(client, 'm', first, tools, lambda name, args: {'ok': True}))
+
+        self.assertEqual(events[-1], {'type': 'done', 'text': 'Pronto.'})
+        for kwargs in client.calls:
+            self.assertEqual(kwargs['system'][0], {'type': 'text', 'text': SYSTEM_PROMPT, 'cache_control': {'type': 'ephemeral'}})
+            self.assertEqual(kwargs['tools'][-1]['cache_control'], {'type': 'ephemeral'})
+            marked = [m for m in kwargs['messages'] if isinstance(m['content'], list)
+                      and any(isinstance(b, dict) and 'cache_control' in b for b in m['content'])]
+            self.assertEqual(marked, [kwargs['messages'][-1]])
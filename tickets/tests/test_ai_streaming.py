@@ -0,0 +1,110 @@
+import json
+from types import SimpleNamespace as NS
+from unittest.mock import patch
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.urls import reverse
+
+from tickets.ai_service import _openai_agent_events
+from tickets.models import AIChatMessage, AIProviderConfig, SystemSettings
+from tickets.speech_formatter import SpeechFormatter, SpeechStream
+
+
+def _chunk(content=None, tool_calls=None):
+    return NS(choices=[NS(delta=NS(content=content, tool_calls=tool_calls))])
+
+
+def _tool_fragment(index, id=None, name=None, arguments=None):
+    return NS(index=index, id=id, function=NS(name=name, arguments=arguments))
+
+
+class FakeOpenAIClient:
+    """Devolve uma sequência de streams pré-definida, uma por chamada ao modelo."""
+
+    def __init__(self, *streams):
+        self.streams = list(streams)
+        self.calls = []
+        self.chat = NS(completions=NS(create=self._create))
+
+    def _create(self, **kwargs):
+        self.calls.append(kwargs)
+        return iter(self.streams.pop(0))
+
+
+def _parse_sse(body):
+    events = []
+    for block in body.strip().split('\n\n'):
+        lines = dict(line.split(': ', 1) for line in block.split('\n'))
+        events.append((lines['event'], json.loads(lines['data'])))
+    return events
+
+
+class AIStreamingTest(TestCase):
+    def test_openai_stream_rebuilds_tool_calls_and_forwards_tokens(self):
+        client = FakeOpenAIClient(
+            [
+                _chunk(content='Vou ver.'),
+                _chunk(tool_calls=[_tool_fragment(0, id='call_1', name='list_tickets', arguments='{"sta')]),
+                _chunk(tool_calls=[_tool_fragment(0, arguments='tus": "aberta"}')]),
+                NS(choices=[]),
+            ],
+            [_chunk(content='Há 2 OS '), _chunk(content='abertas.')],
+        )
+        executed = []
+
+        def executor(name, args):
+            executed.append((name, args))
+            return {'ok': True}
+
+        events = list(_openai_agent_events(client, 'm', [{'role': 'user', 'content': 'oi'}], [], executor, stream=True))
+
+        self.assertEqual(executed, [('list_tickets', {'status': 'aberta'})])
+        self.assertEqual([e['type'] for e in events], ['token', 'tool', 'tool', 'token', 'token', 'done'])
+        self.assertEqual(events[-1]['text'], 'Há 2 OS abertas.')
+        self.assertEqual(client.calls[1]['messages'][-1]['tool_call_id'], 'call_1')
+
+    def test_speech_stream_speaks_completed_sentences_first(self):
+        text = "Bom dia! Encontrei 3 OS abertas.\n\n- OS 1\n- OS 2\n- OS 3\n\nQuer fechar alguma?"
+        speech = SpeechStream()
+
+        self.assertEqual(speech.feed("Bom dia! Encon"), ["Bom dia!"])
+        streamed = speech.feed(text[len("Bom dia! Encon"):])
+        self.assertNotIn("Quer fechar alguma?", streamed)
+        formatted = speech.finish(text)
+
+        expected = SpeechFormatter().format(text).spoken_text
+        # A frase que aponta pro chat é sorteada — compara o resto.
+        self.assertEqual(formatted.spoken_text.split(" ")[:6], expected.split(" ")[:6])
+        self.assertTrue(formatted.spoken_text.endswith("Quer fechar alguma?"))
+        self.assertAlmostEqual(formatted.estimated_seconds, SpeechFormatter().format(text).estimated_seconds, delta=1)
+
+    @patch('tickets.views_ai.stream_agent')
+    def test_chat_view_streams_events_and_saves_response(self, mock_stream_agent):
+        user = User.objects.create_user(username='stream', password='password')
+        SystemSettings.objects.create(pk=1, ai_enabled=True)
+        AIProviderConfig.objects.create(name='Teste', provider='openai', api_key='fake', is_active=True)
+        mock_stream_agent.return_value = iter([
+            {'type': 'tool', 'name': 'list_tickets', 'status': 'start'},
+            {'type': 'tool', 'name': 'list_tickets', 'status': 'end', 'ok': True},
+            {'type': 'token', 'text': 'Tudo certo. '},
+            {'type': 'token', 'text': 'Mais alguma'},
+            {'type': 'done', 'text': 'Tudo certo. Mais alguma coisa?'},
+        ])
+        self.client.force_login(user)
+
+        resp = self.client.post(
+            reverse('ai_chat'), data=json.dumps({'message': 'oi'}),
+            content_type='application/json', HTTP_ACCEPT='text/event-stream',
+        )
+
+        self.assertEqual(resp['Content-Type'], 'text/event-stream')
+        events = _parse_sse(b''.join(resp.streaming_content).decode())
+        self.assertEqual([t for t, _ in events], ['tool', 'tool', 'token', 'token', 'speech', 'done'])
+        # "Tudo certo." só sai quando chega o texto seguinte (pode ser abreviação).
+        self.assertEqual(events[4][1]['chunks'], ['Tudo certo.'])
+        done = events[-1][1]
+        self.assertTrue(done['ok'])
+        self.assertEqual(done['response'], 'Tudo certo. Mais alguma coisa?')
+        self.assertEqual(done['speech']['chunks'], ['Tudo certo.', 'Mais alguma coisa?'])
+        self.assertTrue(AIChatMessage.objects.filter(role='assistant', content=done['response']).exists())
@@ -0,0 +1,52 @@
+import time
+from unittest.mock import patch
+
+from django.test import TestCase
+
+from tickets.ai_service import _run_tool_calls
+from tickets.ai_tools import PARALLEL_SAFE_TOOLS
+
+
+class AIToolConcurrencyTest(TestCase):
+    def _sleepy_executor(self, log):
+        def executor(name, args):
+            time.sleep(args.get('sleep', 0))
+            log.append(name)
+            return {'ok': True, 'data': name}
+        return executor
+
+    def test_independent_lookups_run_concurrently_in_order(self):
+        log = []
+        calls = [('search_client', {'sleep': 0.3}), ('list_systems', {'sleep': 0.3}), ('search_web', {'sleep': 0.3})]
+
+        t0 = time.perf_counter()
+        results = _run_tool_calls(self._sleepy_executor(log), calls, PARALLEL_SAFE_TOOLS)
+
+        self.assertLess(time.perf_counter() - t0, 0.8)
+        self.assertEqual([r['data'] for r, _ in results], ['search_client', 'list_systems', 'search_web'])
+        self.assertTrue(all(seconds >= 0.3 for _, seconds in results))
+
+    def test_writes_are_never_concurrent_with_other_tools(self):
+        log = []
+        calls = [('search_client', {'sleep': 0.1}), ('create_ticket', {}), ('get_ticket', {})]
+
+        _run_tool_calls(self._sleepy_executor(log), calls, PARALLEL_SAFE_TOOLS)
+
+        self.assertEqual(log, ['search_client', 'create_ticket', 'get_ticket'])
+
+    @patch('tickets.ai_service.TOOL_TIMEOUT_SECONDS', 0.1)
+    def test_slow_parallel_tool_times_out_with_error(self):
+        calls = [('search_web', {'sleep': 0.5}), ('list_systems', {})]
+
+        results = _run_tool_calls(self._sleepy_executor([]), calls, PARALLEL_SAFE_TOOLS)
+
+        self.assertFalse(results[0][0]['ok'])
+        self.assertIn('demorou demais', results[0][0]['error'])
+        self.assertTrue(results[1][0]['ok'])
+
+    @patch('tickets.ai_service.TOOL_TIMEOUT_SECONDS', 0.1)
+    def test_single_read_tool_also_has_deadline(self):
+        results = _run_tool_calls(self._sleepy_executor([]), [('search_web', {'sleep': 0.5})], PARALLEL_SAFE_TOOLS)
+
+        self.assertFalse(results[0][0]['ok'])
+        self.assertIn('demorou demais', results[0][0]['error'])
@@ -0,0 +1,58 @@
+from django.contrib.auth.models import User
+from django.test import TestCase
+
+from tickets import ai_tool_router
+from tickets.ai_service import _tools_to_anthropic_format, _tools_to_openai_format
+from tickets.ai_tools import TOOL_DEFINITIONS
+from tickets.models import AIChatSession
+
+
+def _names(tools):
+    return [t['name'] for t in tools]
+
+
+class AIToolRouterTest(TestCase):
+    def test_subset_follows_intent_role_and_definition_order(self):
+        tools = ai_tool_router.select_tools('operator', ['Qual o status da OS 123?'])
+        names = _names(tools)
+
+        self.assertIn('update_ticket', names)
+        self.assertNotIn('search_web', names)
+        self.assertLess(len(tools), len(TOOL_DEFINITIONS) / 2)
+        order = _names(TOOL_DEFINITIONS)
+        self.assertEqual(names, sorted(names, key=order.index))
+
+        # Pedido de admin: quem não é admin não recebe as tools restritas.
+        request = ['Troque a senha do usuário joao']
+        self.assertIn('change_user_password_admin', _names(ai_tool_router.select_tools('admin', request)))
+        self.assertFalse(set(_names(ai_tool_router.select_tools('operator', request))) & ai_tool_router.ADMIN_TOOLS)
+
+    def test_follow_up_keeps_topic_from_history_and_used_tools(self):
+        # "sim" sozinho não diz nada: cai no grupo padrão (OS).
+        alone = _names(ai_tool_router.select_tools('operator', ['sim']))
+        self.assertIn('create_ticket', alone)
+        self.assertNotIn('search_web', alone)
+
+        with_history = _names(ai_tool_router.select_tools(
+            'operator', ['Pesquisa na internet o endereço da Jumper', 'Quer que eu pesquise?', 'sim'],
+        ))
+        self.assertIn('search_web', with_history)
+
+        with_used = _names(ai_tool_router.select_tools('operator', ['sim'], used_tools=['start_ticket_batch']))
+        self.assertIn('confirm_ticket_batch', with_used)
+
+    def test_used_tools_are_capped_and_schemas_converted_once(self):
+        user = User.objects.create_user(username='roteador', password='password')
+        session = AIChatSession.objects.create(user=user, title='Conversa')
+
+        ai_tool_router.remember_used_tools(session, [f'tool_{i}' for i in range(ai_tool_router.MAX_USED_TOOLS)])
+        ai_tool_router.remember_used_tools(session, ['tool_0', 'get_ticket', 'get_ticket'])
+
+        used = AIChatSession.objects.get(pk=session.pk).used_tools
+        self.assertEqual(len(used), ai_tool_router.MAX_USED_TOOLS)
+        self.assertEqual(used[-2:], ['tool_0', 'get_ticket'])
+        self.assertNotIn('tool_1', used)
+
+        subset = ai_tool_router.select_tools('admin', ['cliente'])
+        self.assertIs(_tools_to_openai_format(subset)[0], _tools_to_openai_format(TOOL_DEFINITIONS)[0])
+        self.assertIs(_tools_to_anthropic_format(subset)[-1], _tools_to_anthropic_format([subset[-1]])[0])
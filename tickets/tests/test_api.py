@@ -0,0 +1,107 @@
+import json
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from tickets.models import Client, Ticket
+
+
+def _body(response):
+    return json.loads(b''.join(response.streaming_content))
+
+
+class SyncAPITest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='bi', password='password')
+        self.auth = {'HTTP_AUTHORIZATION': f'Bearer {self.user.profile.token}'}
+        self.acme = Client.objects.create(name='Acme')
+        self.other = Client.objects.create(name='Outro')
+        self.tech = User.objects.create_user(username='tecnico1', password='password')
+
+    def _ticket(self, customer, status='open', **kwargs):
+        return Ticket.objects.create(client=customer, requester=self.user, description='OS', status=status, **kwargs)
+
+    def _get(self, params, **headers):
+        return self.client.get(reverse('api_v2_tickets'), params, **self.auth, **headers)
+
+    def test_cursor_pages_cover_everything_once_and_resume_with_changes(self):
+        tickets = [self._ticket(self.acme) for _ in range(5)]
+        tickets[0].technicians.add(self.tech)
+
+        seen, params = [], {'limit': 2, 'fields': 'id,tecnico'}
+        while True:
+            page = _body(self._get(params))
+            seen.extend(page['results'])
+            params['cursor'] = page['next_cursor']
+            if not page['has_more']:
+                break
+
+        self.assertEqual([row['id'] for row in seen], [t.id for t in tickets])
+        self.assertEqual(set(seen[0]), {'id', 'tecnico'})
+        self.assertEqual(seen[0]['tecnico'], 'tecnico1')
+        self.assertEqual(seen[1]['tecnico'], 'Sem técnico')
+
+        # Sincronização seguinte a partir do último cursor: só o que mudou.
+        self.assertEqual(_body(self._get(params))['results'], [])
+        tickets[1].description = 'Alterada'
+        tickets[1].save()
+        self.assertEqual([row['id'] for row in _body(self._get(params))['results']], [tickets[1].id])
+
+    def test_filters_projection_and_query_count(self):
+        old = self._ticket(self.acme, status='finished')
+        Ticket.objects.filter(pk=old.pk).update(created_at=timezone.now() - timedelta(days=10))
+        wanted = self._ticket(self.acme, status='open')
+        self._ticket(self.other, status='open')
+        for _ in range(3):
+            self._ticket(self.acme, status='canceled')
+        _body(self._get({}))  # aquece o cache de status e o do token
+
+        params = {
+            'status': 'open,finished', 'client': str(self.acme.id),
+            'created_from': (timezone.localdate() - timedelta(days=1)).isoformat(),
+            'fields': 'id,cliente,status',
+        }
+        # ETag e linhas com cliente (sem depender de quantas são); o token vem do cache.
+        with self.assertNumQueries(2):
+            rows = _body(self._get(params))['results']
+
+        self.assertEqual(rows, [{'id': wanted.id, 'cliente': 'Acme', 'status': wanted.get_status_display()}])
+        self.assertEqual(self._get({'fields': 'id,senha'}).status_code, 400)
+        self.assertEqual(self._get({'cursor': 'lixo'}).status_code, 400)
+        self.assertEqual(self._get({'updated_since': 'ontem'}).status_code, 400)
+
+    def test_unchanged_page_returns_304(self):
+        ticket = self._ticket(self.acme)
+        url = reverse('api_v2_clients')
+
+        response = self.client.get(url, **self.auth)
+        etag = response['ETag']
+        self.assertEqual(_body(response)['results'][0]['nome'], 'Acme')
+
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag, **self.auth).status_code, 304)
+        self.assertEqual(self.client.get(url, {'token': self.user.profile.token}, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        self.other.name = 'Outro Nome'
+        self.other.save()
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag, **self.auth).status_code, 200)
+
+        self.assertEqual(self.client.get(reverse('api_v2_tickets')).status_code, 401)
+        self.assertEqual(self.client.get(reverse('api_tickets'), **self.auth).json()['results'][0]['id'], ticket.id)
+
+    def test_etag_only_depends_on_the_page(self):
+        # A página lê limit + 1 linhas (a extra decide has_more); a terceira fica de fora.
+        first, _, third = [self._ticket(self.acme) for _ in range(3)]
+        etag = self._get({'limit': 1})['ETag']
+
+        third.description = 'Alterada'
+        third.save()
+        self.assertEqual(self._get({'limit': 1}, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        first.description = 'Alterada'
+        first.save()
+        self.assertEqual(self._get({'limit': 1}, HTTP_IF_NONE_MATCH=etag).status_code, 200)
@@ -0,0 +1,83 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.contrib.auth import authenticate
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from tickets import api_tokens
+
+
+class APITokenCacheTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='integracao', password='password')
+        self.token = str(self.user.profile.token)
+
+    def _get(self, token):
+        return self.client.get(reverse('api_equipments'), HTTP_AUTHORIZATION=f'Bearer {token}')
+
+    def test_owner_and_unknown_tokens_are_cached(self):
+        identity = api_tokens.resolve(self.token)
+        self.assertEqual(identity, (self.user.profile.id, self.user.id, 'standard'))
+        self.assertIsNone(api_tokens.resolve('nao-existe'))
+
+        with self.assertNumQueries(0):
+            self.assertEqual(api_tokens.resolve(self.token), identity)
+            self.assertIsNone(api_tokens.resolve('nao-existe'))
+        # O token não vai em claro para as chaves do cache.
+        self.assertFalse(any(self.token in key for key in cache._cache))
+
+        # Só a listagem de equipamentos; nada de perfil por request.
+        with self.assertNumQueries(1):
+            self.assertEqual(self._get(self.token).status_code, 200)
+
+    def test_revocation_invalidates_the_cache(self):
+        self.assertEqual(self._get(self.token).status_code, 200)
+
+        # Save parcial de outro campo do perfil não derruba o cache.
+        profile = self.user.profile
+        profile.ai_proactive_alert_count = 3
+        profile.save(update_fields=['ai_proactive_alert_count'])
+        with self.assertNumQueries(0):
+            api_tokens.resolve(self.token)
+
+        profile.token = 'novo-token'
+        profile.save()
+        self.assertEqual(self._get(self.token).status_code, 401)
+        self.assertEqual(self._get('novo-token').status_code, 200)
+
+        self.user.is_active = False
+        self.user.save(update_fields=['is_active'])
+        self.assertEqual(self._get('novo-token').status_code, 401)
+        self.assertIsNone(authenticate(None, token='novo-token'))
+
+        # Bloqueio vencido: o login por token reativa e o token volta a valer na API.
+        profile.blocked_until = timezone.now() - timedelta(minutes=1)
+        profile.save(update_fields=['blocked_until'])
+        self.assertEqual(authenticate(None, token='novo-token'), self.user)
+        self.assertEqual(self._get('novo-token').status_code, 200)
+
+    def test_token_login_checks_the_user_row_not_the_cache(self):
+        self.assertEqual(authenticate(None, token=self.token), self.user)
+
+        # update() não dispara signals: é o que outro worker vê até o TTL vencer.
+        User.objects.filter(pk=self.user.pk).update(is_active=False)
+        self.assertIsNotNone(api_tokens.resolve(self.token))
+        self.assertIsNone(authenticate(None, token=self.token))
+
+    def test_requests_are_counted_per_token(self):
+        other = User.objects.create_user(username='outra', password='password')
+
+        with mock.patch.object(api_tokens, 'RATE_LIMIT', 2):
+            first = self._get(self.token)
+            self.assertEqual((first['X-RateLimit-Limit'], first['X-RateLimit-Remaining']), ('2', '1'))
+            self.assertEqual(self._get(self.token).status_code, 200)
+            blocked = self._get(self.token)
+            self.assertEqual(self._get(other.profile.token).status_code, 200)
+
+        self.assertEqual(blocked.status_code, 429)
+        self.assertLessEqual(int(blocked['Retry-After']), api_tokens.RATE_WINDOW_SECONDS)
@@ -0,0 +1,45 @@
+from django.test import TestCase
+from tickets.models import SystemSettings, SearchProviderConfig
+from tickets import config_cache, versioned_cache
+
+
+class ConfigCacheTest(TestCase):
+    def setUp(self):
+        config_cache.invalidate(SystemSettings)
+        config_cache.invalidate(SearchProviderConfig)
+
+    def test_settings_read_once_until_changed(self):
+        settings_obj = config_cache.get_system_settings()
+        self.assertEqual(settings_obj.pk, 1)
+
+        with self.assertNumQueries(0):
+            self.assertEqual(config_cache.get_system_settings().session_timeout_minutes, settings_obj.session_timeout_minutes)
+
+        row = SystemSettings.objects.get(pk=1)
+        row.session_timeout_minutes = 45
+        row.save()
+        self.assertEqual(config_cache.get_system_settings().session_timeout_minutes, 45)
+
+    def test_active_provider_follows_activation(self):
+        self.assertIsNone(config_cache.get_active_search_config())
+
+        first = SearchProviderConfig.objects.create(name='Google', provider='google', is_active=True)
+        self.assertEqual(config_cache.get_active_search_config().pk, first.pk)
+
+        second = SearchProviderConfig.objects.create(name='Tavily', provider='tavily', is_active=True)
+        self.assertEqual(config_cache.get_active_search_config().pk, second.pk)
+
+        second.delete()
+        self.assertIsNone(config_cache.get_active_search_config())
+
+    def test_request_memo_keeps_value_stable_within_request(self):
+        # Só o handler do cache (o signal real também fecharia a conexão do teste)
+        versioned_cache._start_request_memo()
+        try:
+            config_cache.get_system_settings()
+            # Alteração sem signal (update) não aparece no meio do request
+            SystemSettings.objects.filter(pk=1).update(session_timeout_minutes=99)
+            with self.assertNumQueries(0):
+                self.assertNotEqual(config_cache.get_system_settings().session_timeout_minutes, 99)
+        finally:
+            versioned_cache._end_request_memo()
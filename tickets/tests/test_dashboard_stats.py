@@ -0,0 +1,81 @@
+from django.test import TestCase
+from django.urls import reverse
+from django.contrib.auth.models import User
+from django.utils import timezone
+from tickets.models import Client, Ticket, TicketStatus, System
+from tickets.dashboard_stats import build_dashboard_stats
+import datetime
+
+
+class DashboardStatsTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='tech1', password='password')
+        self.other = User.objects.create_user(username='tech2', password='password')
+        self.client_a = Client.objects.create(name='Cliente A')
+        self.client_b = Client.objects.create(name='Cliente B')
+        self.sys_cftv = System.objects.create(name='CFTV', color='#ff0000')
+        self.sys_alarme = System.objects.create(name='Alarme')
+        System.objects.create(name='Sem OS')
+
+        TicketStatus.objects.all().delete()
+        TicketStatus.objects.create(code='open', name='Em Aberto', order=1)
+        TicketStatus.objects.create(code='finished', name='Finalizado', order=2)
+
+        now = timezone.now()
+        t1 = Ticket.objects.create(client=self.client_a, status='open', deadline=now + datetime.timedelta(days=2))
+        t1.systems.add(self.sys_cftv, self.sys_alarme)
+        t1.technicians.add(self.user, self.other)
+
+        t2 = Ticket.objects.create(client=self.client_a, status='finished')
+        t2.systems.add(self.sys_cftv)
+        t2.technicians.add(self.other)
+
+        t3 = Ticket.objects.create(client=self.client_b, status='pending')
+        Ticket.objects.filter(pk=t3.pk).update(deadline=now - datetime.timedelta(days=1))
+        t3.systems.add(self.sys_cftv)
+
+    def test_counts_and_series(self):
+        stats = build_dashboard_stats(Ticket.objects.all(), user=self.user)
+
+        self.assertEqual(stats['total_tickets'], 3)
+        self.assertEqual(stats['tickets_open'], 1)
+        self.assertEqual(stats['tickets_pending'], 1)
+        self.assertEqual(stats['tickets_finished'], 1)
+        self.assertEqual(stats['my_tickets'], 1)
+        self.assertEqual(stats['chart_status_labels'], ['Em Aberto', 'Finalizado'])
+        self.assertEqual(stats['chart_status_data'], [1, 1])
+        self.assertEqual(stats['chart_client_labels'], ['Cliente A', 'Cliente B'])
+        self.assertEqual(stats['chart_client_data'], [2, 1])
+
+    def test_system_health(self):
+        stats = build_dashboard_stats(Ticket.objects.all(), user=self.user)
+
+        self.assertEqual(stats['chart_system_labels'], ['CFTV', 'Alarme'])
+        self.assertEqual(stats['chart_system_data'], [3, 1])
+        self.assertEqual(stats['chart_system_colors'], ['#ff0000', '#6c757d'])
+        self.assertEqual(stats['chart_sys_resolved'], [1, 0])
+        self.assertEqual(stats['chart_sys_open'], [1, 1])
+        self.assertEqual(stats['chart_sys_overdue'], [1, 0])
+
+    def test_collaborator_filter_does_not_duplicate_counts(self):
+        qs = Ticket.objects.filter(technicians__id=self.other.id).distinct()
+        stats = build_dashboard_stats(qs, user=self.user)
+
+        self.assertEqual(stats['total_tickets'], 2)
+        self.assertEqual(stats['my_tickets'], 1)
+        self.assertEqual(stats['chart_system_data'], [2, 1])
+
+    def test_query_count_is_constant(self):
+        for i in range(10):
+            System.objects.create(name=f'Extra {i}')
+            TicketStatus.objects.create(code=f'extra_{i}', name=f'Extra {i}', order=10 + i)
+
+        with self.assertNumQueries(4):
+            build_dashboard_stats(Ticket.objects.all(), user=self.user)
+
+    def test_dashboard_view_renders(self):
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('dashboard'), {'period': 'month'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['total_tickets'], 3)
+        self.assertEqual(response.context['my_tickets'], 1)
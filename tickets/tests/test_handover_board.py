@@ -0,0 +1,99 @@
+from datetime import datetime, timedelta
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from tickets import handover_board
+from tickets.models import Client, ShiftHandover, ShiftHandoverEntry, Ticket
+
+
+class HandoverBoardTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='plantao', password='password')
+        self.customer = Client.objects.create(name='Cliente Turno')
+        self.day = timezone.localdate() - timedelta(days=3)
+
+    def _shift(self, day, shift_type='day'):
+        start_hour, hours = (8, 12) if shift_type == 'day' else (20, 12)
+        start = timezone.make_aware(datetime.combine(day, datetime.min.time())) + timedelta(hours=start_hour)
+        return {'date': day, 'type': shift_type, 'start': start, 'end': start + timedelta(hours=hours)}
+
+    def _ticket(self, created_at, status='finished', deadline=None):
+        ticket = Ticket.objects.create(client=self.customer, requester=self.user, description='OS', status=status,
+                                       deadline=deadline)
+        Ticket.objects.filter(pk=ticket.pk).update(created_at=created_at)
+        return ticket
+
+    def test_tickets_are_bucketed_into_their_shifts(self):
+        day_shift, night_shift = self._shift(self.day), self._shift(self.day, 'night')
+        early = self._ticket(day_shift['start'] + timedelta(hours=1))
+        late = self._ticket(day_shift['start'] + timedelta(hours=2))
+        night = self._ticket(night_shift['start'] + timedelta(hours=1))
+        overdue = self._ticket(day_shift['start'], status='custom', deadline=night_shift['start'] + timedelta(hours=2))
+        open_later = self._ticket(night_shift['start'] + timedelta(hours=3), status='open')
+
+        day_board, night_board = handover_board.load([day_shift, night_shift], self.user)
+
+        self.assertEqual([t.id for t in day_board['tickets_created']], [late.id, early.id, overdue.id])
+        self.assertEqual([t.id for t in night_board['tickets_created']], [open_later.id, night.id])
+        # Prazo vencido só conta a partir do turno em que venceu; aberta só depois de criada.
+        self.assertEqual(day_board['pendencias'], [])
+        self.assertEqual({t.id for t in night_board['pendencias']}, {overdue.id, open_later.id})
+
+    def test_stale_pending_tickets_are_bounded_in_sql(self):
+        day_shift, night_shift = self._shift(self.day), self._shift(self.day, 'night')
+        long_ago = day_shift['start'] - timedelta(days=90)
+        stale = [
+            self._ticket(long_ago, status='custom', deadline=long_ago + timedelta(hours=i))
+            for i in range(handover_board.TICKETS_PER_SHIFT + 10)
+        ]
+        open_later = self._ticket(night_shift['start'] + timedelta(hours=1), status='open')
+        due_at_night = self._ticket(long_ago, status='custom', deadline=night_shift['start'])
+
+        with self.assertNumQueries(2):
+            candidates = handover_board._pending_candidates(day_shift['end'], night_shift['end'])
+        # Só o começo da fila das antigas, mais o que mudou dentro da janela.
+        self.assertEqual(len(candidates), handover_board.TICKETS_PER_SHIFT + 2)
+
+        day_board, night_board = handover_board.load([day_shift, night_shift], self.user)
+        limit = handover_board.TICKETS_PER_SHIFT
+        self.assertEqual([t.id for t in day_board['pendencias']], [t.id for t in stale[:limit]])
+        self.assertEqual([t.id for t in night_board['pendencias']], [open_later.id] + [t.id for t in stale[:limit - 1]])
+        self.assertNotIn(due_at_night.id, [t.id for t in night_board['pendencias']])
+
+    def test_query_count_does_not_grow_with_shifts(self):
+        shifts = [self._shift(self.day - timedelta(days=i), kind) for i in range(15) for kind in ('day', 'night')]
+        for sh in shifts[:6]:
+            handover = ShiftHandover.objects.create(shift_date=sh['date'], shift_type=sh['type'])
+            ShiftHandoverEntry.objects.create(handover=handover, created_by=self.user, text='Anotação')
+            self._ticket(sh['start'] + timedelta(minutes=5), status='open')
+        for _ in range(handover_board.TICKETS_PER_SHIFT + 3):
+            self._ticket(shifts[0]['start'] + timedelta(minutes=1))
+
+        with self.assertNumQueries(7):
+            board = handover_board.load(shifts, self.user)
+
+        self.assertEqual(len(board), 30)
+        self.assertEqual(len(board[0]['tickets_created']), handover_board.TICKETS_PER_SHIFT)
+        self.assertEqual([e.text for e in board[0]['entries']], ['Anotação'])
+        self.assertIsNone(board[-1]['handover'])
+
+    def test_page_is_read_only_and_first_entry_creates_the_handover(self):
+        self.client.force_login(self.user)
+
+        response = self.client.get(reverse('task_list'))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(ShiftHandover.objects.exists())
+        card = response.context['handover_cards'][0]
+
+        response = self.client.post(reverse('handover_entry_add'), {
+            'shift_date': card['shift']['date'].isoformat(), 'shift_type': card['shift']['type'], 'text': 'Tudo ok',
+        })
+
+        self.assertEqual(response.json()['status'], 'success')
+        handover = ShiftHandover.objects.get()
+        self.assertEqual((handover.shift_date, handover.shift_type), (card['shift']['date'], card['shift']['type']))
+        self.assertEqual(handover.entries.get().text, 'Tudo ok')
@@ -0,0 +1,87 @@
+import threading
+import urllib.error
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import patch
+
+from django.test import TestCase
+
+from tickets import http_clients
+from tickets.models import AIProviderConfig
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    connections = []
+
+    def setup(self):
+        super().setup()
+        self.connections.append(self.client_address)
+
+    def _reply(self, status, body, headers=()):
+        self.send_response(status)
+        for name, value in headers:
+            self.send_header(name, value)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path == '/antigo':
+            self._reply(302, b'', [('Location', '/ok')])
+        elif self.path == '/erro':
+            self._reply(403, b'{"error": "chave invalida"}')
+        else:
+            self._reply(200, b'ok')
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers['Content-Length']))
+        self._reply(200, body)
+
+    def log_message(self, *args):
+        pass
+
+
+class HttpClientsTest(TestCase):
+    def setUp(self):
+        _Handler.connections = []
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), _Handler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.base = f'http://127.0.0.1:{self.server.server_port}'
+        http_clients._idle.clear()
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        http_clients._idle.clear()
+
+    def test_requests_to_same_host_reuse_connection(self):
+        with http_clients.urlopen(urllib.request.Request(self.base + '/a'), timeout=5) as r:
+            self.assertEqual(r.read(), b'ok')
+        req = urllib.request.Request(self.base + '/b', data=b'{"q": 1}', method='POST',
+                                     headers={'Content-Type': 'application/json'})
+        with http_clients.urlopen(req, timeout=5) as r:
+            self.assertEqual(r.read(), b'{"q": 1}')
+        # Redirecionamento seguido na mesma conexão.
+        with http_clients.urlopen(self.base + '/antigo', timeout=5) as r:
+            self.assertEqual((r.status, r.url), (200, self.base + '/ok'))
+
+        self.assertEqual(len(_Handler.connections), 1)
+
+    def test_error_status_raises_http_error_with_body(self):
+        with self.assertRaises(urllib.error.HTTPError) as ctx:
+            http_clients.urlopen(self.base + '/erro', timeout=5)
+        self.assertEqual(ctx.exception.code, 403)
+        self.assertIn(b'chave invalida', ctx.exception.read())
+
+    @patch('tickets.http_clients._build_sdk_client', side_effect=lambda *args: object())
+    def test_sdk_clients_are_reused_until_provider_config_changes(self, build):
+        http_clients.invalidate()
+        first = http_clients.sdk_client('openai', 'chave', 'https://api.deepseek.com')
+        self.assertIs(http_clients.sdk_client('openai', 'chave', 'https://api.deepseek.com'), first)
+        self.assertIsNot(http_clients.sdk_client('openai', 'outra'), first)
+
+        AIProviderConfig.objects.create(name='Nova', provider='openai', api_key='chave', is_active=True)
+
+        self.assertIsNot(http_clients.sdk_client('openai', 'chave', 'https://api.deepseek.com'), first)
+        self.assertEqual(build.call_count, 3)
@@ -3,8 +3,9 @@ from django.test import TestCase, RequestFactory
 from django.contrib.auth.models import User
 from django.utils import timezone
 from tickets.models import Client, ClientHub, Ticket, TicketType, UserProfile, TechnicianTravel, TravelSegment, System
-from tickets.views import HubDashboardView
+from tickets.views import HubDashboardView, HubDashboardDetailView
 import datetime
+import json
 
 class HubDashboardLogicTest(TestCase):
     def setUp(self):
@@ -58,6 +59,12 @@ class HubDashboardLogicTest(TestCase):
             seat='12A'
         )
 
+    def _detail(self, kind, pk):
+        request = RequestFactory().get(f'/dashboard/hubs/{kind}/{pk}/')
+        request.user = self.user
+        response = HubDashboardDetailView.as_view()(request, kind=kind, pk=pk)
+        return json.loads(response.content)
+
     def test_context_data_population(self):
         factory = RequestFactory()
         request = factory.get('/dashboard/hubs/')
@@ -72,19 +79,17 @@ class HubDashboardLogicTest(TestCase):
         dashboard_items = context.get('dashboard_items', [])
         self.assertTrue(len(dashboard_items) > 0, "Dashboard items should not be empty")
         
-        # Check if client and hub are present
-        client_found = any(item['type'] == 'client' and item['id'] == self.client.id for item in dashboard_items)
-        hub_found = any(item['type'] == 'hub' and item['id'] == self.hub.id for item in dashboard_items)
-        
-        self.assertTrue(client_found, "Client card should be present")
-        self.assertTrue(hub_found, "Hub card should be present")
+        # Check if client card is present with its hub inside
+        client_item = next((item for item in dashboard_items if item['type'] == 'client' and item['id'] == self.client.id), None)
+        self.assertIsNotNone(client_item, "Client card should be present")
+        self.assertIn({'id': self.hub.id, 'name': self.hub.name}, client_item['hubs'], "Hub should be listed in the client card")
+        self.assertEqual((client_item['tickets_count'], client_item['open_tickets_count'], client_item['travels_count']), (1, 1, 1))
         
-        # Check hubs_data map
-        hubs_data = context.get('hubs_data', {})
-        self.assertIn(f'hub_{self.hub.id}', hubs_data)
+        # Details are no longer embedded in the page
+        self.assertNotIn('hubs_data', context)
         
         # Verify Travel Details in Payload
-        hub_payload = hubs_data[f'hub_{self.hub.id}']
+        hub_payload = self._detail('hub', self.hub.id)
         agendadas = hub_payload.get('agendadas', [])
         
         # Find our ticket
@@ -103,3 +108,27 @@ class HubDashboardLogicTest(TestCase):
         self.assertEqual(travel_data['booking_code'], 'ABC123456')
         self.assertEqual(travel_data['seat'], '12A')
         self.assertEqual(travel_data['duration'], '03h 00min')
+
+    def test_detail_queries_do_not_grow_with_tickets(self):
+        self._detail('client', self.client.id)  # aquece o cache de status
+        for i in range(5):
+            ticket = Ticket.objects.create(client=self.client, hub=self.hub, ticket_type=self.ticket_type,
+                                           requester=self.user, description=f"Extra {i}", status='pending')
+            ticket.technicians.add(self.user)
+            TechnicianTravel.objects.create(client=self.client, hub=self.hub, technician=self.user,
+                                            service_order=ticket, scheduled_date=timezone.now())
+
+        with self.assertNumQueries(7):
+            payload = self._detail('client', self.client.id)
+
+        self.assertEqual(len(payload['agendadas']), 6)
+        self.assertEqual(len(payload['os_abertas']), 6)
+        self.assertEqual(len(payload['viagens']), 6)
+        self.assertEqual([t['name'] for t in payload['technicians']], [self.user.username])
+
+    def test_detail_of_other_hub_excludes_foreign_tickets(self):
+        other_hub = ClientHub.objects.create(client=self.client, name="Other Hub")
+
+        payload = self._detail('hub', other_hub.id)
+
+        self.assertEqual(payload, {'agendadas': [], 'os_abertas': [], 'viagens': [], 'technicians': []})
@@ -0,0 +1,58 @@
+import os
+import shutil
+import tempfile
+from unittest import mock
+
+from django.test import TestCase, override_settings
+from PIL import Image
+
+from tickets import image_renditions, pdf_reports
+from tickets.models import Client, Ticket, TicketImage
+
+
+class ImageRenditionsTest(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        media = override_settings(MEDIA_ROOT=self.media_root)
+        media.enable()
+        self.addCleanup(media.disable)
+
+        os.makedirs(os.path.join(self.media_root, 'tickets'))
+        Image.new('RGB', (2400, 1800), (200, 40, 40)).save(os.path.join(self.media_root, 'tickets', 'foto.jpg'))
+
+    def _size(self, name):
+        with Image.open(os.path.join(self.media_root, name)) as img:
+            return img.size
+
+    def test_upload_generates_report_and_thumb(self):
+        ticket = Ticket.objects.create(client=Client.objects.create(name='Cliente Foto'), status='open')
+        with self.captureOnCommitCallbacks(execute=True):
+            TicketImage.objects.create(ticket=ticket, image='tickets/foto.jpg')
+
+        self.assertEqual(self._size('renditions/report/tickets/foto.jpg'), (1200, 900))
+        self.assertEqual(self._size('renditions/thumb/tickets/foto.jpg'), (320, 240))
+
+    def test_ticket_photo_generates_renditions_on_save(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            ticket = Ticket.objects.create(client=Client.objects.create(name='Cliente Foto'), status='open',
+                                           image='tickets/foto.jpg')
+        self.assertEqual(self._size('renditions/thumb/tickets/foto.jpg'), (320, 240))
+
+        # Save parcial sem a foto não mexe nas versões.
+        with mock.patch.object(image_renditions, 'ensure_all') as ensure_all, \
+                self.captureOnCommitCallbacks(execute=True):
+            ticket.status = 'finished'
+            ticket.save(update_fields=['status'])
+        ensure_all.assert_not_called()
+
+    def test_pdf_link_callback_uses_report_rendition(self):
+        path = pdf_reports.link_callback('/media/tickets/foto.jpg', None)
+        self.assertEqual(path, os.path.join(self.media_root, 'renditions', 'report', 'tickets', 'foto.jpg'))
+
+        absolute = pdf_reports.link_callback(os.path.join(self.media_root, 'tickets', 'foto.jpg'), None)
+        self.assertEqual(absolute, path)
+
+    def test_other_media_and_missing_files_are_left_alone(self):
+        self.assertEqual(image_renditions.ensure('images/logo_principal.png', 'report'), 'images/logo_principal.png')
+        self.assertEqual(image_renditions.ensure('tickets/sumiu.jpg', 'thumb'), 'tickets/sumiu.jpg')
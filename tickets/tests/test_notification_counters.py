@@ -0,0 +1,79 @@
+from unittest.mock import patch
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.urls import reverse
+
+from tickets import notification_counters, realtime
+from tickets.models import Notification, NotificationCounter
+
+
+class NotificationCounterTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='leitor', password='password')
+
+    def _notify(self, title='Aviso'):
+        return Notification.objects.create(recipient=self.user, title=title, message='Teste')
+
+    def test_counter_follows_create_read_and_delete(self):
+        first = self._notify('Primeira')
+        second = self._notify('Segunda')
+        self.assertEqual(notification_counters.get(self.user.pk)[0], 2)
+
+        loaded = Notification.objects.get(pk=first.pk)
+        loaded.is_read = True
+        loaded.save()
+        count, latest = notification_counters.get(self.user.pk)
+        self.assertEqual(count, 1)
+        self.assertEqual([n['title'] for n in latest], ['Segunda'])
+
+        # Salvar de novo sem mudar o estado não conta duas vezes.
+        loaded.save()
+        Notification.objects.get(pk=second.pk).delete()
+        self.assertEqual(notification_counters.get(self.user.pk), (0, []))
+
+    def test_preview_is_capped_and_missing_row_is_recounted(self):
+        for i in range(notification_counters.UNREAD_PREVIEW_SIZE + 2):
+            self._notify(f'Aviso {i}')
+        NotificationCounter.objects.all().delete()
+
+        count, latest = notification_counters.get(self.user.pk)
+        self.assertEqual(count, notification_counters.UNREAD_PREVIEW_SIZE + 2)
+        self.assertEqual(len(latest), notification_counters.UNREAD_PREVIEW_SIZE)
+
+        with self.assertNumQueries(1):
+            notification_counters.get(self.user.pk)
+
+    def test_mark_all_read_view_resets_counter(self):
+        self._notify()
+        self._notify()
+        self.client.force_login(self.user)
+
+        response = self.client.post(reverse('mark_all_notifications_read'))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(notification_counters.get(self.user.pk), (0, []))
+        self.assertFalse(Notification.objects.filter(recipient=self.user, is_read=False).exists())
+
+    def test_broadcast_updates_every_recipient_counter(self):
+        self._notify('Antiga')
+        notification_counters.get(self.user.pk)  # linha do contador já existe
+        other = User.objects.create_user(username='outro', password='password')
+        sender = User.objects.create_user(username='remetente', password='password')
+        self.client.force_login(sender)
+
+        with patch.object(realtime, 'publish') as publish, self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                reverse('send_message'), {'send_to_all': 'on', 'title': 'Geral', 'message': 'Para todos', 'urgency': 'high'},
+                HTTP_X_REQUESTED_WITH='XMLHttpRequest',
+            )
+
+        self.assertEqual(response.json()['count'], User.objects.filter(is_active=True).exclude(pk=sender.pk).count())
+        for user in (self.user, other):
+            count, latest = notification_counters.get(user.pk)
+            self.assertEqual(count, Notification.objects.filter(recipient=user, is_read=False).count())
+            self.assertEqual(latest[0]['title'], 'Geral')
+        self.assertEqual([n['title'] for n in notification_counters.get(self.user.pk)[1]], ['Geral', 'Antiga'])
+        published = {call.args[0][0] for call in publish.call_args_list}
+        self.assertTrue({self.user.pk, other.pk} <= published)
+        self.assertNotIn(sender.pk, published)
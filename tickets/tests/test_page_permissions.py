@@ -0,0 +1,58 @@
+from django.test import TestCase, RequestFactory
+from django.urls import reverse
+from django.contrib.auth.models import User
+from tickets.models import AppPage, RoleLevel, RolePagePermission
+from tickets import page_permissions
+from tickets.context_processors import system_settings
+
+
+class PagePermissionsTest(TestCase):
+    def setUp(self):
+        page_permissions.invalidate()
+        self.user = User.objects.create_user(username='tech1', password='password')
+        self.user.profile.role = 'technician'
+        self.user.profile.save()
+        self.role, _ = RoleLevel.objects.get_or_create(code='technician', defaults={'name': 'Técnico'})
+        self.page, _ = AppPage.objects.get_or_create(
+            url_name='client_list', defaults={'code': 'client-list', 'name': 'Clientes'}
+        )
+
+    def test_matrix_is_served_from_memory(self):
+        page_permissions.get_matrix()
+        with self.assertNumQueries(0):
+            self.assertTrue(page_permissions.is_allowed('technician', 'client_list'))
+            self.assertTrue(page_permissions.is_allowed('technician', 'url_que_nao_e_pagina'))
+
+    def test_signals_invalidate_matrix(self):
+        self.assertTrue(page_permissions.is_allowed('technician', 'client_list'))
+
+        perm = RolePagePermission.objects.create(role=self.role, page=self.page, allowed=False)
+        self.assertFalse(page_permissions.is_allowed('technician', 'client_list'))
+        self.assertTrue(page_permissions.is_allowed('super_admin', 'client_list'))
+
+        perm.delete()
+        self.assertTrue(page_permissions.is_allowed('technician', 'client_list'))
+
+        self.page.is_enabled = False
+        self.page.save()
+        self.assertFalse(page_permissions.is_allowed('admin', 'client_list'))
+
+        self.page.is_enabled = True
+        self.page.save()
+        RolePagePermission.objects.create(role=self.role, page=self.page, allowed=False)
+        self.role.is_active = False
+        self.role.save()
+        self.assertTrue(page_permissions.is_allowed('technician', 'client_list'))
+
+    def test_middleware_and_context_processor_share_matrix(self):
+        RolePagePermission.objects.create(role=self.role, page=self.page, allowed=False)
+        self.client.force_login(self.user)
+
+        response = self.client.get(reverse('client_list'))
+        self.assertEqual(response.status_code, 403)
+
+        request = RequestFactory().get('/')
+        request.user = self.user
+        context = system_settings(request)
+        self.assertNotIn('client_list', context['allowed_url_names'])
+        self.assertIn('ticket_list', context['allowed_url_names'])
@@ -0,0 +1,70 @@
+import shutil
+import tempfile
+from datetime import timedelta
+from unittest.mock import patch
+
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from tickets import pdf_cache, pdf_reports
+from tickets.models import Client, Ticket, TicketUpdate
+
+
+class PdfDiskCacheTest(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        media = override_settings(MEDIA_ROOT=self.media_root)
+        media.enable()
+        self.addCleanup(media.disable)
+
+        self.user = User.objects.create_user(username='cacheuser', password='password')
+        self.client.force_login(self.user)
+        self.ticket = Ticket.objects.create(client=Client.objects.create(name='Cliente Cache'), status='open')
+        self.url = reverse('ticket_pdf', kwargs={'pk': self.ticket.pk})
+
+    def test_ticket_pdf_served_from_disk_until_ticket_changes(self):
+        first = self.client.get(self.url)
+        self.assertEqual(first.status_code, 200)
+        etag = first['ETag']
+        self.assertIn('Last-Modified', first)
+
+        with patch.object(pdf_reports, 'render_pdf', side_effect=AssertionError('não deveria gerar')):
+            again = self.client.get(self.url)
+            self.assertEqual(again['ETag'], etag)
+            self.assertTrue(b''.join(again.streaming_content).startswith(b'%PDF'))
+            self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+            status = self.client.get(reverse('ticket_pdf_status', kwargs={'pk': self.ticket.pk})).json()
+            self.assertTrue(status['ready'])
+            self.assertEqual(status['pdf_url'], self.url)
+
+        TicketUpdate.objects.create(ticket=self.ticket, description='Nova evolução', created_by=self.user)
+        changed = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(changed.status_code, 200)
+        self.assertNotEqual(changed['ETag'], etag)
+
+    def test_daily_report_cached_only_for_past_days(self):
+        url = reverse('tickets_daily_pdf')
+        today = self.client.get(url)
+        self.assertEqual(today.status_code, 200)
+        self.assertNotIn('ETag', today)
+
+        yesterday = (timezone.localdate() - timedelta(days=1)).isoformat()
+        past = self.client.get(url, {'date': yesterday})
+        self.assertIn('ETag', past)
+        self.assertEqual(self.client.get(url, {'date': yesterday}, HTTP_IF_NONE_MATCH=past['ETag']).status_code, 304)
+
+    def test_cached_pdf_stamps_data_time_not_render_time(self):
+        updated_at = timezone.now() - timedelta(days=3)
+        Ticket.objects.filter(pk=self.ticket.pk).update(updated_at=updated_at)
+        report = pdf_reports.REPORTS['ticket']
+        entry = pdf_cache.entry_for(report, self.user, {'pk': self.ticket.pk})
+
+        html, _ = report.render_html(self.user, {'pk': self.ticket.pk}, entry)
+
+        stamp = timezone.localtime(updated_at).strftime('%d/%m/%Y %H:%M')
+        self.assertIn(f'Atualizado em: {stamp}', html)
+        self.assertNotIn('Gerado em', html)
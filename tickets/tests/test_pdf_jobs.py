@@ -0,0 +1,72 @@
+import shutil
+import tempfile
+from datetime import timedelta
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from tickets import pdf_jobs
+from tickets.models import Client, PdfRenderJob, Ticket
+
+
+class PdfRenderQueueTest(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        media = override_settings(MEDIA_ROOT=self.media_root)
+        media.enable()
+        self.addCleanup(media.disable)
+
+        self.user = User.objects.create_user(username='pdfuser', password='password')
+        self.client.force_login(self.user)
+        self.ticket = Ticket.objects.create(client=Client.objects.create(name='Cliente PDF'), status='open')
+        self.status_url = reverse('ticket_pdf_status', kwargs={'pk': self.ticket.pk})
+
+    def test_status_enqueues_once_and_worker_renders(self):
+        first = self.client.get(self.status_url).json()
+        second = self.client.get(self.status_url).json()
+        self.assertTrue(first['ok'])
+        self.assertFalse(first['ready'])
+        self.assertEqual(first['state'], 'pending')
+        self.assertEqual(first['job'], second['job'])
+        self.assertEqual(PdfRenderJob.objects.count(), 1)
+
+        call_command('render_pdfs', once=True, purge_days=0, stdout=StringIO())
+
+        data = self.client.get(f"{self.status_url}?job={first['job']}").json()
+        self.assertTrue(data['ready'])
+        self.assertEqual(data['progress'], 100)
+        job = PdfRenderJob.objects.get(pk=first['job'])
+        self.assertEqual(job.file_path, f'pdf_cache/ticket/{job.content_hash}.pdf')
+
+        response = self.client.get(data['download_url'])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'application/pdf')
+        self.assertTrue(response['Content-Disposition'].startswith(f'attachment; filename="{self.ticket.formatted_id}_'))
+        self.assertTrue(b''.join(response.streaming_content).startswith(b'%PDF'))
+
+        other = User.objects.create_user(username='other', password='password')
+        self.client.force_login(other)
+        self.assertEqual(self.client.get(data['pdf_url']).status_code, 404)
+
+    def test_status_renders_inline_when_no_worker_picks_job(self):
+        job_id = self.client.get(self.status_url).json()['job']
+        PdfRenderJob.objects.filter(pk=job_id).update(
+            created_at=timezone.now() - timedelta(seconds=pdf_jobs.INLINE_AFTER_SECONDS + 1)
+        )
+
+        data = self.client.get(f'{self.status_url}?job={job_id}').json()
+        self.assertTrue(data['ready'])
+
+    def test_failed_job_reports_message(self):
+        url = reverse('ticket_pdf_status', kwargs={'pk': self.ticket.pk + 1000})
+        job_id = self.client.get(url).json()['job']
+        pdf_jobs.run(pdf_jobs.claim_next())
+
+        data = self.client.get(f'{url}?job={job_id}').json()
+        self.assertFalse(data['ok'])
+        self.assertEqual(data['message'], 'OS não encontrada.')
@@ -0,0 +1,79 @@
+import time
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase
+from django.utils import timezone
+
+from tickets import presence
+from tickets.models import ActiveSession
+
+
+class PresenceTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        presence._pending.clear()
+        self.user = User.objects.create_user(username='presente', password='password')
+        self.session = ActiveSession.objects.create(user=self.user, session_key='abc', ip_address='10.0.0.1')
+
+    def test_touch_is_batched_until_flush(self):
+        presence._last_flush = time.monotonic()
+        old = timezone.now() - timedelta(minutes=3)
+        ActiveSession.objects.filter(pk=self.session.pk).update(last_activity=old)
+        presence.invalidate()
+        self.assertEqual(presence.status(self.user.id), 'away')
+
+        with self.assertNumQueries(0):
+            presence.touch('abc', self.user.id, '10.0.0.1')
+            self.assertEqual(presence.status(self.user.id), 'online')
+            self.assertEqual(presence.online_user_ids(), {self.user.id})
+
+        self.session.refresh_from_db()
+        self.assertEqual(self.session.last_activity, old)
+        self.assertEqual(presence.flush(force=True), 1)
+        self.session.refresh_from_db()
+        self.assertGreater(self.session.last_activity, old)
+
+    def test_touch_writes_only_its_own_session_key(self):
+        other = User.objects.create_user(username='colega', password='password')
+        ActiveSession.objects.create(user=other, session_key='xyz', ip_address='10.0.0.9')
+        ActiveSession.objects.update(last_activity=timezone.now() - timedelta(minutes=1))
+        presence.status(self.user.id)
+        roster = cache.get(presence.ROSTER_KEY)
+
+        # Workers com o cache compartilhado: cada request só grava a chave da própria sessão.
+        with self.assertNumQueries(0):
+            presence.touch('abc', self.user.id, '10.0.0.1')
+            presence.touch('xyz', other.id, '10.0.0.9')
+
+        self.assertEqual(cache.get(presence.ROSTER_KEY), roster)
+        self.assertEqual(presence.online_user_ids(), {self.user.id, other.id})
+        self.assertEqual(cache.get(presence.SESSION_KEY % 'xyz')[:2], [other.id, '10.0.0.9'])
+
+        presence.forget(user_id=other.id)
+        self.assertIsNone(cache.get(presence.SESSION_KEY % 'xyz'))
+
+    def test_stale_and_removed_sessions_are_offline(self):
+        self.assertEqual(ActiveSession.get_status(self.user), 'online')
+
+        ActiveSession.objects.filter(pk=self.session.pk).update(
+            last_activity=timezone.now() - timedelta(minutes=ActiveSession.ONLINE_WINDOW_MINUTES + 1)
+        )
+        presence.invalidate()
+        self.assertFalse(ActiveSession.is_user_online(self.user))
+
+        presence.touch('abc', self.user.id, '10.0.0.1')
+        self.session.delete()
+        self.assertEqual(presence.online_sessions(), [])
+
+    def test_middleware_uses_map_after_first_request(self):
+        self.client.force_login(self.user)
+        session_key = self.client.session.session_key
+        self.client.get('/', REMOTE_ADDR='10.0.0.2')
+        self.assertEqual(presence.session(session_key), (self.user.id, '10.0.0.2'))
+
+        # Mesma sessão vinda de outro IP: desloga e remove a sessão do mapa.
+        self.client.get('/', REMOTE_ADDR='10.0.0.3')
+        self.assertIsNone(presence.session(session_key))
+        self.assertFalse(ActiveSession.objects.filter(session_key=session_key).exists())
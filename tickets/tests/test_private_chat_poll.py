@@ -0,0 +1,68 @@
+from django.contrib.auth.models import User
+from django.test import RequestFactory, TestCase
+from django.urls import reverse
+
+from tickets.models import ActiveSession, PrivateChatMessage, PrivateChatReadState, PrivateChatThread
+from tickets.views_private_chat import PrivateChatPollView
+
+
+class PrivateChatPollTest(TestCase):
+    def setUp(self):
+        self.alice = User.objects.create_user(username='alice', password='password')
+        self.bob = User.objects.create_user(username='bob', password='password')
+        self.carol = User.objects.create_user(username='carol', password='password')
+        self.with_bob = PrivateChatThread.objects.create(user_a=self.alice, user_b=self.bob)
+        self.with_carol = PrivateChatThread.objects.create(user_a=self.alice, user_b=self.carol)
+        self.client.force_login(self.alice)
+
+    def _poll(self, cursor=None):
+        params = {'cursor': cursor} if cursor else {}
+        return self.client.get(reverse('private_chat_poll'), params).json()
+
+    def test_unread_counts_and_preview_per_thread(self):
+        PrivateChatMessage.objects.create(thread=self.with_bob, sender=self.bob, content='Oi')
+        PrivateChatMessage.objects.create(thread=self.with_bob, sender=self.alice, content='Minha')
+        PrivateChatMessage.objects.create(thread=self.with_bob, sender=None, is_ai_message=True, content='Do robô')
+        PrivateChatMessage.objects.create(thread=self.with_carol, sender=self.carol, content='Já vista')
+        PrivateChatReadState.objects.create(
+            thread=self.with_carol, user=self.alice,
+            last_read_message_id=self.with_carol.messages.get().id,
+        )
+        ActiveSession.objects.create(user=self.bob, session_key='bob-session', ip_address='127.0.0.1')
+
+        data = self._poll()['data']
+
+        self.assertEqual(len(data), 1)
+        self.assertEqual(data[0]['thread_id'], self.with_bob.id)
+        self.assertEqual(data[0]['unread_count'], 2)
+        self.assertEqual(data[0]['preview'], 'Do robô')
+        self.assertTrue(data[0]['is_ai_message'])
+        self.assertEqual(data[0]['status'], 'online')
+
+    def test_unchanged_cursor_short_circuits(self):
+        PrivateChatMessage.objects.create(thread=self.with_bob, sender=self.bob, content='Oi')
+        cursor = self._poll()['cursor']
+
+        # Só a view (sem sessão/middlewares): o poll sem novidade é uma query.
+        request = RequestFactory().get(reverse('private_chat_poll'), {'cursor': cursor})
+        request.user = self.alice
+        with self.assertNumQueries(1):
+            response = PrivateChatPollView.as_view()(request)
+        self.assertJSONEqual(response.content, {'ok': True, 'unchanged': True, 'cursor': cursor})
+
+        # Mensagem nova ou leitura em outra aba mudam o cursor.
+        PrivateChatMessage.objects.create(thread=self.with_carol, sender=self.carol, content='Nova')
+        self.assertEqual(len(self._poll(cursor)['data']), 2)
+
+    def test_contacts_list_uses_latest_message(self):
+        PrivateChatMessage.objects.create(thread=self.with_carol, sender=self.carol, content='Primeira')
+        PrivateChatMessage.objects.create(thread=self.with_carol, sender=self.alice, content='Resposta')
+
+        threads = self.client.get(reverse('private_chat_contacts')).json()['data']['threads']
+
+        by_user = {c['user_id']: c for c in threads}
+        self.assertEqual(by_user[self.carol.id]['preview'], 'Resposta')
+        self.assertEqual(by_user[self.carol.id]['unread_count'], 1)
+        self.assertEqual(by_user[self.bob.id]['unread_count'], 0)
+        self.assertEqual(by_user[self.bob.id]['status'], 'offline')
+        self.assertEqual(threads[0]['user_id'], self.carol.id)
@@ -0,0 +1,70 @@
+import asyncio
+from unittest.mock import patch
+
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from tickets import realtime
+from tickets.models import Notification, PrivateChatMessage, PrivateChatThread
+
+
+class LocalBrokerTest(TestCase):
+    def test_publish_reaches_only_subscribed_user(self):
+        broker = realtime.LocalBroker()
+
+        async def scenario():
+            async with broker.subscribe(1) as mine, broker.subscribe(2) as other:
+                # Publicação vem de outra thread (request síncrono), como em produção.
+                await asyncio.to_thread(broker.publish, 1, {'type': 'private_chat', 'thread_id': 7})
+                return await mine.get(1), await other.get(0.05)
+
+        received, not_received = asyncio.run(scenario())
+        self.assertEqual(received, {'type': 'private_chat', 'thread_id': 7})
+        self.assertIsNone(not_received)
+        self.assertEqual(broker._subscribers, {})
+
+
+class RealtimeSignalsTest(TestCase):
+    def setUp(self):
+        self.alice = User.objects.create_user(username='alice', password='password')
+        self.bob = User.objects.create_user(username='bob', password='password')
+
+    def test_new_private_message_notifies_other_participant(self):
+        thread = PrivateChatThread.objects.create(user_a=self.alice, user_b=self.bob)
+        with patch.object(realtime, 'publish') as publish:
+            with self.captureOnCommitCallbacks(execute=True):
+                PrivateChatMessage.objects.create(thread=thread, sender=self.alice, content='Oi')
+        publish.assert_called_once_with([self.bob.id], 'private_chat', thread_id=thread.id)
+
+    def test_new_notification_notifies_recipient(self):
+        with patch.object(realtime, 'publish') as publish:
+            with self.captureOnCommitCallbacks(execute=True):
+                notification = Notification.objects.create(recipient=self.bob, title='Aviso', message='Teste')
+        publish.assert_called_once_with(
+            [self.bob.id], 'notification', id=notification.id, title='Aviso', urgency='medium',
+        )
+
+    def test_stream_refused_without_asgi(self):
+        url = reverse('realtime_events')
+        self.assertEqual(self.client.get(url).status_code, 401)
+        self.client.force_login(self.alice)
+        self.assertEqual(self.client.get(url).status_code, 204)
+
+    async def test_stream_refused_when_broker_is_process_local(self):
+        # Só o pub/sub em memória, com publicações vindas de outros processos (gunicorn).
+        await self.async_client.aforce_login(self.alice)
+        response = await self.async_client.get(reverse('realtime_events'))
+        self.assertEqual(response.status_code, 204)
+
+    @override_settings(REALTIME_SINGLE_PROCESS=True)
+    async def test_stream_delivers_published_events(self):
+        await self.async_client.aforce_login(self.alice)
+        response = await self.async_client.get(reverse('realtime_events'))
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+
+        chunks = aiter(response.streaming_content)
+        self.assertIn(b'event: ready', await anext(chunks))
+        await asyncio.to_thread(realtime.publish, [self.alice.id], 'handover_alert', id=3)
+        self.assertIn(b'event: handover_alert', await asyncio.wait_for(anext(chunks), 5))
+        await chunks.aclose()
@@ -0,0 +1,56 @@
+from django.contrib.auth.models import User
+from django.test import Client, RequestFactory, TestCase, override_settings
+from django.urls import reverse
+
+from tickets import presence
+from tickets.context_processors import system_settings
+from tickets.models import Notification, UserProfile
+from tickets.request_context import UserContext
+
+
+class RequestContextTest(TestCase):
+    def setUp(self):
+        presence.invalidate()
+        self.user = User.objects.create_user(username='contexto', password='password')
+        Notification.objects.create(recipient=self.user, title='Aviso', message='Teste')
+
+    def test_profile_created_once_when_missing(self):
+        UserProfile.objects.filter(user=self.user).delete()
+        user = User.objects.get(pk=self.user.pk)
+        request = RequestFactory().get('/')
+        request.user = user
+
+        context = UserContext(request)
+        self.assertEqual(context.profile.user_id, user.pk)
+        with self.assertNumQueries(0):
+            self.assertIs(context.profile, user.profile)
+
+    def test_context_processor_reuses_loaded_values(self):
+        request = RequestFactory().get('/')
+        request.user = User.objects.select_related('profile').get(pk=self.user.pk)
+        request.session = self.client.session
+
+        first = system_settings(request)
+        self.assertEqual(first['unread_notifications_count'], 1)
+        # Segunda renderização no mesmo request (ex.: include/fragmento): sem queries.
+        with self.assertNumQueries(0):
+            second = system_settings(request)
+        self.assertEqual(second['unread_notifications_count'], 1)
+
+    @override_settings(QUERY_COUNT_HEADER=False)
+    def test_query_count_header_and_session_not_saved_every_request(self):
+        url = reverse('private_chat_poll')
+        # Header desligado: só staff vê a contagem de queries.
+        regular = Client()
+        regular.force_login(User.objects.create_user(username='comum', password='password'))
+        self.assertNotIn('X-DB-Queries', regular.get(url, REMOTE_ADDR='10.0.0.2'))
+
+        self.user.is_staff = True
+        self.user.save()
+        self.client.force_login(self.user, backend='tickets.backends.TokenBackend')
+        first = self.client.get(url, REMOTE_ADDR='10.0.0.1')
+        second = self.client.get(url, {'cursor': first.json()['cursor']}, REMOTE_ADDR='10.0.0.1')
+
+        self.assertIn('X-DB-Queries', first)
+        # Sessão + usuário com perfil + cursor do poll: a sessão não é regravada a cada request.
+        self.assertEqual(second['X-DB-Queries'], '3')
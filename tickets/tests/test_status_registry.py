@@ -0,0 +1,40 @@
+from django.test import TestCase
+from tickets.models import Ticket, TicketStatus, Client
+from tickets import status_registry
+
+
+class StatusRegistryTest(TestCase):
+    def setUp(self):
+        TicketStatus.objects.all().delete()
+        self.open = TicketStatus.objects.create(code='open', name='Aberto', color='#00ff00', row_color='rgba(0,255,0,0.1)')
+        TicketStatus.objects.create(code='old', name='Antigo', color='#999999', is_active=False)
+        status_registry.invalidate()
+        client = Client.objects.create(name='Cliente Status')
+        self.tickets = [
+            Ticket.objects.create(client=client, status='open' if i % 2 else 'old')
+            for i in range(6)
+        ]
+
+    def test_properties_do_not_query_per_ticket(self):
+        status_registry.get_status('open')
+        with self.assertNumQueries(0):
+            for ticket in self.tickets:
+                ticket.status_color
+                ticket.get_status_display()
+                ticket.status_display_html
+                ticket.status_row_bg
+
+    def test_active_only_and_fallbacks(self):
+        old_ticket = next(t for t in self.tickets if t.status == 'old')
+        self.assertEqual(old_ticket.get_status_display(), 'Antigo')
+        self.assertIsNone(status_registry.get_status('old', active_only=True))
+        self.assertIsNone(old_ticket.status_row_bg)
+
+    def test_saving_status_refreshes_registry(self):
+        ticket = next(t for t in self.tickets if t.status == 'open')
+        self.assertEqual(ticket.get_status_display(), 'Aberto')
+        self.open.name = 'Em aberto'
+        self.open.save()
+        self.assertEqual(ticket.get_status_display(), 'Em aberto')
+        self.open.delete()
+        self.assertIsNone(status_registry.get_status('open'))
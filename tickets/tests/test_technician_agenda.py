@@ -0,0 +1,84 @@
+from datetime import datetime, timedelta
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from tickets import technician_agenda
+from tickets.models import Client, TechnicianTravel, Ticket
+
+
+class TechnicianAgendaTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.viewer = User.objects.create_user(username='painel', password='password')
+        self.viewer.profile.role = 'admin'
+        self.viewer.profile.save()
+        self.customer = Client.objects.create(name='Cliente Agenda')
+        self.techs = []
+        for name in ('ana', 'bruno', 'carla'):
+            tech = User.objects.create_user(username=name, password='password', first_name=name.title())
+            tech.profile.role = 'technician'
+            tech.profile.save()
+            self.techs.append(tech)
+        self.day = timezone.localdate()
+        self.noon = timezone.make_aware(datetime.combine(self.day, datetime.min.time())) + timedelta(hours=12)
+        self.client.force_login(self.viewer)
+
+    def _ticket(self, techs, **dates):
+        ticket = Ticket.objects.create(client=self.customer, requester=self.viewer, description='OS', status='open', **dates)
+        ticket.technicians.set(techs)
+        return ticket
+
+    def test_batch_matches_single_endpoint_for_every_day(self):
+        ana, bruno, _ = self.techs
+        self._ticket([ana, bruno], start_date=self.noon, deadline=self.noon + timedelta(days=1))
+        self._ticket([ana], deadline=self.noon + timedelta(days=1))
+        TechnicianTravel.objects.create(client=self.customer, technician=bruno, scheduled_date=self.noon)
+
+        response = self.client.get(reverse('local_agenda_batch_api'), {
+            'date': self.day.isoformat(), 'date_to': (self.day + timedelta(days=2)).isoformat(),
+        })
+
+        agendas = response.json()['agendas']
+        self.assertEqual(len(agendas), 3 * 3)
+        for agenda in agendas:
+            single = self.client.get(
+                reverse('local_agenda_api', args=[agenda['technician']['id']]), {'date': agenda['date']},
+            ).json()
+            self.assertEqual(agenda, single)
+        counts = {(a['technician']['id'], a['date']): a['summary']['items_count'] for a in agendas}
+        tomorrow = (self.day + timedelta(days=1)).isoformat()
+        self.assertEqual(counts[(ana.id, self.day.isoformat())], 1)
+        self.assertEqual(counts[(ana.id, tomorrow)], 2)
+        self.assertEqual(counts[(bruno.id, self.day.isoformat())], 2)
+
+    def test_query_count_is_fixed_and_cache_follows_changes(self):
+        for tech in self.techs:
+            self._ticket([tech], start_date=self.noon, deadline=self.noon)
+            TechnicianTravel.objects.create(client=self.customer, technician=tech, scheduled_date=self.noon)
+        technicians = list(technician_agenda.local_technicians())
+        technician_agenda.build(technicians, self.day, self.day)  # aquece o cache de status
+
+        with self.assertNumQueries(5):
+            technician_agenda.build(technicians, self.day, self.day + timedelta(days=6))
+
+        first = technician_agenda.agendas(None, self.day, self.day)
+        with self.assertNumQueries(0):
+            self.assertEqual(technician_agenda.agendas(None, self.day, self.day), first)
+
+        self._ticket([self.techs[0]], deadline=self.noon)
+        counts = [a['summary']['items_count'] for a in technician_agenda.agendas(None, self.day, self.day)]
+        self.assertEqual(counts, [3, 2, 2])
+
+    def test_batch_filters_ids_and_rejects_long_ranges(self):
+        response = self.client.get(reverse('local_agenda_batch_api'), {'ids': f'{self.techs[2].id},{self.techs[0].id}'})
+        self.assertEqual([a['technician']['id'] for a in response.json()['agendas']], [self.techs[0].id, self.techs[2].id])
+
+        too_long = self.day + timedelta(days=technician_agenda.MAX_RANGE_DAYS)
+        response = self.client.get(reverse('local_agenda_batch_api'), {'date': self.day.isoformat(), 'date_to': too_long.isoformat()})
+        self.assertEqual(response.status_code, 400)
+        response = self.client.get(reverse('local_agenda_batch_api'), {'ids': 'a,b'})
+        self.assertEqual(response.status_code, 400)
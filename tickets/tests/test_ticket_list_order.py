@@ -0,0 +1,113 @@
+from django.test import TestCase
+from django.urls import reverse
+from django.contrib.auth.models import User
+from django.utils import timezone
+from tickets.models import Client, Ticket, TicketListRank, TicketStatus
+from tickets import fractional_rank, ticket_list_order, ticket_list_pagination
+from tickets.ai_tools import _reorder_ticket_card
+import datetime
+import random
+
+
+class FractionalRankTest(TestCase):
+    def test_random_inserts_stay_ordered(self):
+        rng = random.Random(4)
+        keys = []
+        for _ in range(500):
+            i = rng.randrange(len(keys) + 1)
+            lower = keys[i - 1] if i > 0 else None
+            upper = keys[i] if i < len(keys) else None
+            key = fractional_rank.rank_between(lower, upper)
+            self.assertTrue((lower is None or lower < key) and (upper is None or key < upper))
+            keys.insert(i, key)
+
+    def test_never_returns_middle(self):
+        for lower, upper in (('h', 'j'), ('9', 'r'), ('hz', 'j'), (None, None)):
+            key = fractional_rank.rank_between(lower, upper)
+            self.assertNotEqual(key, fractional_rank.MIDDLE)
+            self.assertTrue((lower is None or lower < key) and (upper is None or key < upper))
+
+    def test_spread_is_sorted_and_bounded(self):
+        keys = fractional_rank.spread(300, None, fractional_rank.MIDDLE)
+        self.assertEqual(keys, sorted(set(keys)))
+        self.assertLess(keys[-1], fractional_rank.MIDDLE)
+
+
+class TicketListOrderTest(TestCase):
+    def setUp(self):
+        TicketStatus.objects.all().delete()
+        TicketStatus.objects.create(code='open', name='Aberto', order=1)
+        self.user = User.objects.create_user(username='tech1', password='password')
+        client = Client.objects.create(name='Cliente A')
+        now = timezone.now()
+        self.ids = []
+        for i in range(6):
+            ticket = Ticket.objects.create(client=client, status='open')
+            Ticket.objects.filter(pk=ticket.pk).update(updated_at=now - datetime.timedelta(minutes=i))
+            self.ids.append(ticket.id)
+
+    def _order(self):
+        return [t.id for t in ticket_list_pagination.annotate_list_order(Ticket.objects.all(), self.user)]
+
+    def test_move_between_ranked_neighbours_writes_one_row(self):
+        a, b, c, d, e, f = self.ids
+        ticket_list_order.place_between(self.user, e, after_ticket_id=a, before_ticket_id=b)
+        self.assertEqual(self._order(), [a, e, b, c, d, f])
+        before = dict(TicketListRank.objects.values_list('ticket_id', 'rank'))
+
+        # Vizinhas já posicionadas: grava só a OS movida
+        ticket_list_order.place_between(self.user, f, after_ticket_id=a, before_ticket_id=e)
+        self.assertEqual(self._order(), [a, f, e, b, c, d])
+        after = dict(TicketListRank.objects.values_list('ticket_id', 'rank'))
+        self.assertEqual({k: v for k, v in after.items() if k != f}, before)
+
+    def test_move_between_ranks_around_the_middle_keeps_manual_position(self):
+        a, b, c, d, e, f = self.ids
+        for ticket_id, rank in zip(self.ids, 'hjklmn'):
+            TicketListRank.objects.create(user=self.user, ticket_id=ticket_id, rank=rank)
+
+        ticket_list_order.place_between(self.user, e, after_ticket_id=a, before_ticket_id=b)
+        self.assertEqual(self._order(), [a, e, b, c, d, f])
+        self.assertNotEqual(TicketListRank.objects.get(ticket_id=e).rank, fractional_rank.MIDDLE)
+
+        # Continua posicionada (não é tratada como "nunca movida").
+        ticket_list_order.rebalance(self.user)
+        self.assertEqual(self._order(), [a, e, b, c, d, f])
+        self.assertNotEqual(TicketListRank.objects.get(ticket_id=e).rank, fractional_rank.MIDDLE)
+
+    def test_drag_into_default_block_keeps_other_cards_in_place(self):
+        a, b, c, d, e, f = self.ids
+        ticket_list_order.place_between(self.user, f, after_ticket_id=b, before_ticket_id=c)
+        self.assertEqual(self._order(), [a, b, f, c, d, e])
+        # c, d, e continuam na ordem padrão, sem linha própria
+        self.assertEqual(set(TicketListRank.objects.values_list('ticket_id', flat=True)), {a, b, f})
+
+    def test_move_ticket_positions(self):
+        a, b, c, d, e, f = self.ids
+        self.assertEqual(ticket_list_order.move_ticket(self.user, d, position='top'), 0)
+        self.assertEqual(ticket_list_order.move_ticket(self.user, a, position='bottom'), 5)
+        self.assertEqual(self._order(), [d, b, c, e, f, a])
+        self.assertEqual(ticket_list_order.move_ticket(self.user, e, position='up'), 2)
+        self.assertEqual(ticket_list_order.move_ticket(self.user, d, position='down'), 1)
+        self.assertEqual(self._order(), [b, d, e, c, f, a])
+        self.assertEqual(ticket_list_order.move_ticket(self.user, f, after_ticket_id=b), 1)
+        self.assertEqual(self._order(), [b, f, d, e, c, a])
+
+    def test_long_keys_are_rebalanced(self):
+        for _ in range(300):
+            ticket_list_order.move_ticket(self.user, self.ids[-1], position='top')
+            ticket_list_order.move_ticket(self.user, self.ids[-2], position='top')
+        lengths = TicketListRank.objects.values_list('rank', flat=True)
+        self.assertLessEqual(max(len(rank) for rank in lengths), ticket_list_order.MAX_RANK_LENGTH)
+        self.assertEqual(self._order()[:2], [self.ids[-2], self.ids[-1]])
+
+    def test_reorder_view_and_ai_tool(self):
+        a, b, c, d, e, f = self.ids
+        self.client.force_login(self.user)
+        response = self.client.post(reverse('ticket_reorder'), {'ticket_id': c, 'before_ticket_id': a})
+        self.assertEqual(response.json(), {'status': 'ok'})
+        self.assertEqual(self._order()[:2], [c, a])
+
+        result = _reorder_ticket_card({'ticket_id': f, 'position': 'top'}, self.user)
+        self.assertTrue(result['ok'])
+        self.assertEqual(result['data']['new_index'], 0)
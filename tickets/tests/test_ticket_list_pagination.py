@@ -0,0 +1,86 @@
+from django.test import TestCase
+from django.urls import reverse
+from django.contrib.auth.models import User
+from django.utils import timezone
+from tickets.models import Client, Ticket, TicketStatus
+from tickets import ticket_list_order, ticket_list_pagination
+import datetime
+
+
+class TicketListPaginationTest(TestCase):
+    def setUp(self):
+        TicketStatus.objects.all().delete()
+        TicketStatus.objects.create(code='open', name='Aberto', order=1)
+        TicketStatus.objects.create(code='finished', name='Finalizado', order=2)
+        self.user = User.objects.create_user(username='tech1', password='password')
+        self.client_a = Client.objects.create(name='Cliente A')
+
+        now = timezone.now()
+        self.tickets = []
+        for i in range(7):
+            ticket = Ticket.objects.create(client=self.client_a, status='finished' if i % 2 else 'open')
+            Ticket.objects.filter(pk=ticket.pk).update(updated_at=now - datetime.timedelta(minutes=i))
+            self.tickets.append(ticket)
+
+    def _expected_ids(self, saved=()):
+        tickets = Ticket.objects.all()
+        status_order = {'open': 1, 'finished': 2}
+        default = sorted(tickets, key=lambda t: (status_order[t.status], -t.updated_at.timestamp(), t.id))
+        position = {ticket_id: i for i, ticket_id in enumerate(saved)}
+        return [t.id for t in sorted(default, key=lambda t: position.get(t.id, len(saved)))]
+
+    def _walk(self, page_size):
+        ids, cursor = [], None
+        while True:
+            page, cursor = ticket_list_pagination.paginate(
+                Ticket.objects.all(), self.user, cursor=cursor, page_size=page_size
+            )
+            ids.extend(t.id for t in page)
+            if not cursor:
+                return ids
+
+    def test_pages_follow_default_order(self):
+        self.assertEqual(self._walk(page_size=3), self._expected_ids())
+
+    def test_pages_honour_manual_order(self):
+        saved = [self.tickets[5].id, self.tickets[0].id]
+        ticket_list_order.move_ticket(self.user, saved[1], position='top')
+        ticket_list_order.move_ticket(self.user, saved[0], position='top')
+
+        self.assertEqual(self._walk(page_size=2), self._expected_ids(saved))
+
+    def test_after_id_survives_reorder_between_pages(self):
+        first, cursor = ticket_list_pagination.paginate(Ticket.objects.all(), self.user, page_size=3)
+        # Usuário arrasta o último card visível para o topo antes de rolar a lista
+        visible = [t.id for t in first]
+        ticket_list_order.place_between(self.user, visible[-1], before_ticket_id=visible[0])
+
+        rest, _ = ticket_list_pagination.paginate(
+            Ticket.objects.all(), self.user, cursor=cursor, after_id=visible[1], page_size=10
+        )
+
+        self.assertEqual(set(visible) | {t.id for t in rest}, {t.id for t in self.tickets})
+        self.assertFalse(set(visible) & {t.id for t in rest})
+
+    def test_invalid_cursor_returns_first_page(self):
+        page, _ = ticket_list_pagination.paginate(Ticket.objects.all(), self.user, cursor='lixo', page_size=3)
+        self.assertEqual([t.id for t in page], self._expected_ids()[:3])
+
+    def test_list_and_next_page_endpoint(self):
+        self.client.force_login(self.user)
+
+        response = self.client.get(reverse('ticket_list'), {'page_size': 4, 'status': 'open'})
+        self.assertEqual(response.status_code, 200)
+        first_ids = [t.id for t in response.context['tickets']]
+        self.assertEqual(len(first_ids), 4)
+        self.assertIsNone(response.context['next_cursor'])
+
+        response = self.client.get(reverse('ticket_list'), {'page_size': 4})
+        cursor = response.context['next_cursor']
+        self.assertTrue(cursor)
+
+        response = self.client.get(reverse('ticket_list_page'), {'page_size': 4, 'cursor': cursor})
+        data = response.json()
+        self.assertEqual(data['ids'], self._expected_ids()[4:])
+        self.assertFalse(data['has_more'])
+        self.assertIn(f'data-ticket-id="{data["ids"][0]}"', data['html'])
@@ -0,0 +1,117 @@
+from django.test import TestCase
+from django.core.management import call_command
+from django.urls import reverse
+from django.contrib.auth.models import User
+from django.utils import timezone
+from tickets.models import Client, Ticket, TicketDailyStat, System
+from tickets import ticket_stats
+from tickets.dashboard_stats import build_dashboard_stats
+from io import StringIO
+import datetime
+
+
+class TicketDailyStatTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='tech1', password='password')
+        self.client_a = Client.objects.create(name='Cliente A')
+        self.client_b = Client.objects.create(name='Cliente B')
+        self.sys_cftv = System.objects.create(name='CFTV')
+        self.sys_alarme = System.objects.create(name='Alarme')
+
+    def _totals(self, **filters):
+        return {
+            (row.client_id, row.status, row.system_id): row.total
+            for row in TicketDailyStat.objects.filter(**filters)
+        }
+
+    def test_signals_keep_rollup_current(self):
+        ticket = Ticket.objects.create(client=self.client_a, status='open')
+        ticket.systems.add(self.sys_cftv, self.sys_alarme)
+        today = timezone.localdate()
+
+        self.assertEqual(self._totals(day=today), {
+            (self.client_a.id, 'open', None): 1,
+            (self.client_a.id, 'open', self.sys_cftv.id): 1,
+            (self.client_a.id, 'open', self.sys_alarme.id): 1,
+        })
+
+        ticket.status = 'finished'
+        ticket.client = self.client_b
+        ticket.save()
+        ticket.systems.remove(self.sys_alarme)
+
+        self.assertEqual(self._totals(day=today), {
+            (self.client_b.id, 'finished', None): 1,
+            (self.client_b.id, 'finished', self.sys_cftv.id): 1,
+        })
+
+        self.sys_alarme.tickets.add(ticket)
+        self.assertEqual(self._totals(day=today, system=self.sys_alarme), {
+            (self.client_b.id, 'finished', self.sys_alarme.id): 1,
+        })
+
+        ticket.delete()
+        self.assertFalse(TicketDailyStat.objects.exists())
+
+    def test_rebuild_command_fixes_drift(self):
+        ticket = Ticket.objects.create(client=self.client_a, status='open')
+        past = timezone.now() - datetime.timedelta(days=10)
+        # update() não dispara signals: a tabela consolidada fica desatualizada
+        Ticket.objects.filter(pk=ticket.pk).update(created_at=past)
+
+        out = StringIO()
+        call_command('rebuild_ticket_stats', stdout=out)
+
+        self.assertEqual(
+            list(TicketDailyStat.objects.values_list('day', 'total')),
+            [(timezone.localdate(past), 1)],
+        )
+        self.assertIn('1 linhas', out.getvalue())
+
+    def test_split_period_uses_rollup_for_full_days_only(self):
+        tz = timezone.get_current_timezone()
+        start = datetime.datetime(2026, 3, 1, 15, 0, tzinfo=tz)
+        end = datetime.datetime(2026, 3, 5, 10, 0, tzinfo=tz)
+
+        first_day, last_day, live = ticket_stats.split_period(start, end)
+
+        self.assertEqual(first_day, datetime.date(2026, 3, 2))
+        self.assertEqual(last_day, datetime.date(2026, 3, 4))
+        self.assertEqual(len(live), 2)
+        self.assertEqual(live[0][0], start)
+        self.assertEqual(live[1][1], end)
+
+    def test_count_by_matches_live_counts(self):
+        now = timezone.now()
+        for days_ago, client, status in [(0, self.client_a, 'open'), (3, self.client_a, 'finished'),
+                                         (3, self.client_b, 'open'), (40, self.client_b, 'pending')]:
+            ticket = Ticket.objects.create(client=client, status=status)
+            ticket.systems.add(self.sys_cftv)
+            Ticket.objects.filter(pk=ticket.pk).update(created_at=now - datetime.timedelta(days=days_ago, hours=1))
+        ticket_stats.rebuild()
+
+        start = now - datetime.timedelta(days=30)
+        counts = ticket_stats.count_by(start, now, ('client', 'status'))
+        self.assertEqual(counts, {
+            (self.client_a.id, 'open'): 1,
+            (self.client_a.id, 'finished'): 1,
+            (self.client_b.id, 'open'): 1,
+        })
+
+        tickets_qs = Ticket.objects.filter(created_at__range=(start, now))
+        live = build_dashboard_stats(tickets_qs, user=self.user, now=now)
+        rollup = build_dashboard_stats(tickets_qs, user=self.user, now=now, period=(start, now))
+        self.assertEqual(live, rollup)
+
+    def test_monthly_report_reads_rollup(self):
+        Ticket.objects.create(client=self.client_a, status='open')
+        Ticket.objects.create(client=self.client_a, status='open')
+        Ticket.objects.create(client=self.client_b, status='open')
+        self.client.force_login(self.user)
+
+        response = self.client.get(reverse('tickets_monthly_report_view'))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'application/pdf')
+        self.assertEqual(sum(response.context['day_counts'].values()), 3)
+        self.assertEqual(response.context['client_counts'], {'Cliente A': 2, 'Cliente B': 1})
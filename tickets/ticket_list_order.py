@@ -0,0 +1,201 @@
+"""
+Ordem manual dos cards de OS na listagem (arrastar e soltar / Jota4).
+
+Cada usuário só tem linhas TicketListRank para as OS que moveu; a ordenação
+acontece no SQL (ver ticket_list_pagination.py). Mover uma OS entre duas OS
+que já têm posição grava uma única linha. Quando a OS vizinha ainda está na
+ordem padrão, as OS não movidas que aparecem antes dela recebem posição
+também (limitado a MAX_MATERIALIZE), para que nada mude de lugar na tela além
+do card movido.
+"""
+import logging
+
+from django.db import transaction
+from django.db.models import Max, Min
+
+from .fractional_rank import MIDDLE, rank_between, spread
+from .models import Ticket, TicketListRank
+from . import ticket_list_pagination
+
+logger = logging.getLogger(__name__)
+
+# Acima disso a chave é "comprimida": as posições do usuário são redistribuídas.
+MAX_RANK_LENGTH = 48
+
+# Máximo de OS não movidas que recebem posição para manter a tela estável.
+MAX_MATERIALIZE = 200
+
+
+def _ranks(user, exclude_id=None):
+    qs = TicketListRank.objects.filter(user=user)
+    if exclude_id is not None:
+        qs = qs.exclude(ticket_id=exclude_id)
+    return qs
+
+
+def _rank_of(user, ticket_id):
+    return TicketListRank.objects.filter(user=user, ticket_id=ticket_id).values_list('rank', flat=True).first()
+
+
+def _max_below(user, rank, exclude_id=None):
+    return _ranks(user, exclude_id).filter(rank__lt=rank).aggregate(r=Max('rank'))['r']
+
+
+def _min_above(user, rank, exclude_id=None):
+    return _ranks(user, exclude_id).filter(rank__gt=rank).aggregate(r=Min('rank'))['r']
+
+
+def _sort_key(user, ticket_id):
+    ticket = (
+        Ticket.objects.filter(pk=ticket_id)
+        .annotate(**ticket_list_pagination.list_order_annotations(user))
+        .first()
+    )
+    return ticket_list_pagination.ticket_sort_key(ticket) if ticket else None
+
+
+def _save(user, ranks):
+    """Grava {ticket_id: rank}; redistribui as chaves se alguma ficou longa demais."""
+    for ticket_id, rank in ranks.items():
+        TicketListRank.objects.update_or_create(user=user, ticket_id=ticket_id, defaults={'rank': rank})
+    if any(len(rank) > MAX_RANK_LENGTH for rank in ranks.values()):
+        rebalance(user)
+
+
+def rebalance(user):
+    """Redistribui as posições do usuário (mesma ordem, chaves curtas)."""
+    rows = list(_ranks(user).order_by('rank', 'ticket_id'))
+    above = [row for row in rows if row.rank < MIDDLE]
+    below = [row for row in rows if row.rank > MIDDLE]
+    for group, keys in ((above, spread(len(above), None, MIDDLE)), (below, spread(len(below), MIDDLE, None))):
+        for row, key in zip(group, keys):
+            row.rank = key
+    TicketListRank.objects.bulk_update(above + below, ['rank'], batch_size=500)
+
+
+def _materialize_prefix(user, anchor_key, include_anchor, exclude_id):
+    """
+    Dá posição (no fim do bloco de cima, mesma ordem) às OS nunca movidas que
+    aparecem antes da âncora — e à própria âncora, se `include_anchor`.
+    Retorna {ticket_id: rank} e a chave do último item posicionado (ou None).
+    """
+    unranked = ticket_list_pagination.annotate_list_order(
+        Ticket.objects.exclude(pk=exclude_id), user
+    ).filter(manual_rank=MIDDLE)
+    prefix = list(ticket_list_pagination.before_cursor(unranked, anchor_key).values_list('id', flat=True)[:MAX_MATERIALIZE + 1])
+    if len(prefix) > MAX_MATERIALIZE:
+        # Âncora muito para baixo no bloco: posiciona só ela (e o card movido).
+        logger.info("Ordem manual de %s: âncora %s além de %s OS não movidas", user, anchor_key[3], MAX_MATERIALIZE)
+        prefix = []
+    if include_anchor:
+        prefix.append(anchor_key[3])
+
+    lower = _max_below(user, MIDDLE, exclude_id)
+    keys = spread(len(prefix), lower, MIDDLE)
+    ranks = dict(zip(prefix, keys))
+    return ranks, (keys[-1] if keys else lower)
+
+
+def _slot_after(user, anchor_id, exclude_id):
+    """(lower, upper, linhas_extras) para uma chave logo depois da âncora."""
+    anchor_key = _sort_key(user, anchor_id)
+    if anchor_key is None:
+        return None
+    rank = anchor_key[0]
+    if rank == MIDDLE:
+        extra, lower = _materialize_prefix(user, anchor_key, include_anchor=True, exclude_id=exclude_id)
+        return lower, MIDDLE, extra
+    upper = _min_above(user, rank, exclude_id)
+    if rank < MIDDLE and (upper is None or upper > MIDDLE):
+        upper = MIDDLE
+    return rank, upper, {}
+
+
+def _slot_before(user, anchor_id, exclude_id):
+    """(lower, upper, linhas_extras) para uma chave logo antes da âncora."""
+    anchor_key = _sort_key(user, anchor_id)
+    if anchor_key is None:
+        return None
+    rank = anchor_key[0]
+    if rank == MIDDLE:
+        extra, lower = _materialize_prefix(user, anchor_key, include_anchor=False, exclude_id=exclude_id)
+        return lower, MIDDLE, extra
+    lower = _max_below(user, rank, exclude_id)
+    if rank > MIDDLE and (lower is None or lower < MIDDLE):
+        lower = MIDDLE
+    return lower, rank, {}
+
+
+def _place(user, ticket_id, slot):
+    if slot is None:
+        return False
+    lower, upper, extra = slot
+    with transaction.atomic():
+        _save(user, {**extra, ticket_id: rank_between(lower, upper)})
+    return True
+
+
+def place_between(user, ticket_id, after_ticket_id=None, before_ticket_id=None):
+    """
+    Coloca a OS entre as duas vizinhas que o usuário vê na tela depois de
+    soltar o card (qualquer uma pode faltar: topo/fim da lista visível).
+    """
+    ticket_id = int(ticket_id)
+    after_ticket_id = int(after_ticket_id) if after_ticket_id else None
+    before_ticket_id = int(before_ticket_id) if before_ticket_id else None
+
+    if after_ticket_id and before_ticket_id:
+        # Caso comum: as duas vizinhas já têm posição — uma linha só.
+        lower, upper = _rank_of(user, after_ticket_id), _rank_of(user, before_ticket_id)
+        if lower and upper and lower < upper:
+            with transaction.atomic():
+                _save(user, {ticket_id: rank_between(lower, upper)})
+            return True
+    if after_ticket_id:
+        return _place(user, ticket_id, _slot_after(user, after_ticket_id, ticket_id))
+    if before_ticket_id:
+        return _place(user, ticket_id, _slot_before(user, before_ticket_id, ticket_id))
+    return False
+
+
+def move_ticket(user, ticket_id, position=None, before_ticket_id=None, after_ticket_id=None):
+    """
+    Reposiciona uma única OS (usado pelo Jota4).
+    `position`: 'top', 'bottom', 'up' ou 'down'.
+    Retorna o novo índice (0-based) da OS na lista completa do usuário.
+    """
+    ticket_id = int(ticket_id)
+
+    if before_ticket_id is not None:
+        _place(user, ticket_id, _slot_before(user, int(before_ticket_id), ticket_id))
+    elif after_ticket_id is not None:
+        _place(user, ticket_id, _slot_after(user, int(after_ticket_id), ticket_id))
+    elif position == 'top':
+        upper = _ranks(user, ticket_id).aggregate(r=Min('rank'))['r']
+        _place(user, ticket_id, (None, min(upper, MIDDLE) if upper else MIDDLE, {}))
+    elif position == 'bottom':
+        lower = _ranks(user, ticket_id).aggregate(r=Max('rank'))['r']
+        _place(user, ticket_id, (max(lower, MIDDLE) if lower else MIDDLE, None, {}))
+    elif position in ('up', 'down'):
+        key = _sort_key(user, ticket_id)
+        if key is not None:
+            ordered = ticket_list_pagination.annotate_list_order(Ticket.objects.all(), user)
+            if position == 'up':
+                neighbour = ticket_list_pagination.before_cursor(ordered, key).reverse().values_list('id', flat=True).first()
+                if neighbour:
+                    _place(user, ticket_id, _slot_before(user, neighbour, ticket_id))
+            else:
+                neighbour = ticket_list_pagination.after_cursor(ordered, key).values_list('id', flat=True).first()
+                if neighbour:
+                    _place(user, ticket_id, _slot_after(user, neighbour, ticket_id))
+
+    return position_of(user, ticket_id)
+
+
+def position_of(user, ticket_id):
+    """Índice (0-based) da OS na lista completa do usuário, ou None se não existir."""
+    key = _sort_key(user, ticket_id)
+    if key is None:
+        return None
+    ordered = ticket_list_pagination.annotate_list_order(Ticket.objects.all(), user)
+    return ticket_list_pagination.before_cursor(ordered, key).count()
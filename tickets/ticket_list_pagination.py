@@ -0,0 +1,139 @@
+"""
+Paginação por cursor (keyset) da listagem de OS.
+
+A ordem da lista é a posição manual do usuário (TicketListRank, arrastar e
+soltar / Jota4) e, entre as OS que ele nunca moveu, a ordem padrão — status
+(campo 'order' de "Status de OS"), mais recentes primeiro (-updated_at) e id
+como desempate. Tudo isso vira colunas anotadas no SQL, e cada página é um
+"WHERE (chave) > (chave da última OS) LIMIT n": só as n OS da página são
+carregadas e renderizadas, sem montar a lista inteira em Python.
+
+O banco, porém, não tem índice para essa chave — manual_rank e status_order
+são subconsultas (a posição é por usuário e a ordem vem de "Status de OS") —,
+então toda página ainda percorre e ordena as OS filtradas. O custo cresce com
+o tamanho do filtro, não com o número da página; o que a paginação economiza é
+a transferência e a montagem das linhas.
+"""
+import base64
+import json
+from datetime import datetime
+
+from django.db.models import CharField, IntegerField, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Coalesce
+
+from .fractional_rank import MIDDLE
+from .models import Ticket, TicketListRank, TicketStatus
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+# Status sem cadastro em "Status de OS" aparecem no topo, como já acontecia
+# com o NULL na ordenação do SQLite/MySQL.
+UNKNOWN_STATUS_ORDER = -1
+
+ORDERING = ('manual_rank', 'status_order', '-updated_at', 'id')
+
+
+def list_order_annotations(user):
+    """Expressões manual_rank/status_order da ordem da listagem para o usuário."""
+    ticket_status_order = TicketStatus.objects.filter(code=OuterRef('status')).values('order')[:1]
+    status_order = Coalesce(Subquery(ticket_status_order), Value(UNKNOWN_STATUS_ORDER), output_field=IntegerField())
+
+    if user is not None and getattr(user, 'is_authenticated', False):
+        user_rank = TicketListRank.objects.filter(user=user, ticket=OuterRef('pk')).values('rank')[:1]
+        manual_rank = Coalesce(Subquery(user_rank), Value(MIDDLE), output_field=CharField())
+    else:
+        manual_rank = Value(MIDDLE, output_field=CharField())
+    return {'manual_rank': manual_rank, 'status_order': status_order}
+
+
+def annotate_list_order(queryset, user, annotations=None):
+    """Anota manual_rank/status_order e aplica a ordem da listagem."""
+    annotations = annotations or list_order_annotations(user)
+    return queryset.annotate(**annotations).order_by(*ORDERING)
+
+
+def ticket_sort_key(ticket):
+    return ticket.manual_rank, ticket.status_order, ticket.updated_at, ticket.id
+
+
+def encode_cursor(ticket):
+    manual_rank, status_order, updated_at, ticket_id = ticket_sort_key(ticket)
+    payload = [manual_rank, status_order, updated_at.isoformat(), ticket_id]
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Retorna (manual_rank, status_order, updated_at, id) ou None se o cursor for inválido."""
+    if not cursor:
+        return None
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        manual_rank, status_order, updated_at, ticket_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return str(manual_rank), int(status_order), datetime.fromisoformat(updated_at), int(ticket_id)
+    except (ValueError, TypeError):
+        return None
+
+
+def _keyset_filter(cursor, forward=True):
+    manual_rank, status_order, updated_at, ticket_id = cursor
+    after = 'gt' if forward else 'lt'
+    before = 'lt' if forward else 'gt'
+    same_rank = Q(manual_rank=manual_rank)
+    same_status = same_rank & Q(status_order=status_order)
+    same_update = same_status & Q(updated_at=updated_at)
+    return (
+        Q(**{f'manual_rank__{after}': manual_rank})
+        | (same_rank & Q(**{f'status_order__{after}': status_order}))
+        | (same_status & Q(**{f'updated_at__{before}': updated_at}))
+        | (same_update & Q(**{f'id__{after}': ticket_id}))
+    )
+
+
+def after_cursor(queryset, cursor):
+    """Filtra as OS que vêm depois do cursor na ordem (manual_rank, status_order, -updated_at, id)."""
+    return queryset.filter(_keyset_filter(cursor, forward=True))
+
+
+def before_cursor(queryset, cursor):
+    """Filtra as OS que vêm antes do cursor (mantém a ordem do queryset)."""
+    return queryset.filter(_keyset_filter(cursor, forward=False))
+
+
+def parse_page_size(value, default=DEFAULT_PAGE_SIZE):
+    try:
+        size = int(value)
+    except (TypeError, ValueError):
+        return default
+    return max(1, min(size, MAX_PAGE_SIZE))
+
+
+def paginate(queryset, user, cursor=None, after_id=None, page_size=DEFAULT_PAGE_SIZE):
+    """
+    Uma página da listagem. Retorna (lista_de_tickets, próximo_cursor); o
+    próximo cursor é None quando não há mais OS depois desta página.
+
+    `after_id` é a última OS que o usuário tem na tela: a posição dela é
+    recalculada agora, então a página seguinte continua certa mesmo que ele
+    tenha arrastado cards (o que muda manual_rank) depois de receber o cursor.
+    Se essa OS não existir mais, vale o `cursor` recebido.
+    """
+    annotations = list_order_annotations(user)
+    queryset = annotate_list_order(queryset, user, annotations)
+
+    key = None
+    if after_id:
+        anchor = Ticket.objects.filter(pk=after_id).annotate(**annotations).first()
+        if anchor is not None:
+            key = ticket_sort_key(anchor)
+    if key is None:
+        key = decode_cursor(cursor)
+    if key:
+        queryset = after_cursor(queryset, key)
+
+    # Busca 1 a mais só para saber se existe próxima página, sem COUNT(*).
+    tickets = list(queryset[:page_size + 1])
+    has_more = len(tickets) > page_size
+    tickets = tickets[:page_size]
+    next_cursor = encode_cursor(tickets[-1]) if has_more and tickets else None
+    return tickets, next_cursor
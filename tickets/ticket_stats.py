@@ -0,0 +1,205 @@
+"""
+Tabela consolidada de estatísticas diárias de OS (TicketDailyStat).
+
+Cada fatia (dia local de abertura × cliente) é recalculada por inteiro a partir
+de Ticket sempre que uma OS daquela fatia muda (signals em signals.py) — a
+fatia é pequena, e recalcular evita ter que descobrir o que mudou (status,
+tipo, sistemas) para incrementar/decrementar contadores.
+
+As consultas por período (`count_by`) leem os dias completos da tabela
+consolidada e só consultam Ticket diretamente nas pontas parciais do período
+(ex.: "últimos 7 dias" começa no meio de um dia e termina agora).
+"""
+from datetime import datetime, time, timedelta
+import logging
+
+from django.db import transaction
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import Ticket, TicketDailyStat
+
+logger = logging.getLogger(__name__)
+
+# Dimensão -> campo na tabela consolidada / no Ticket
+ROLLUP_FIELDS = {
+    'day': 'day',
+    'client': 'client_id',
+    'status': 'status',
+    'ticket_type': 'ticket_type_id',
+    'system': 'system_id',
+}
+LIVE_FIELDS = {
+    'day': 'day',
+    'client': 'client_id',
+    'status': 'status',
+    'ticket_type': 'ticket_type_id',
+    'system': 'systems__id',
+}
+
+
+def day_bounds(day):
+    """Início (inclusive) e fim (exclusive) de um dia local, timezone-aware."""
+    start = timezone.make_aware(datetime.combine(day, time.min))
+    end = timezone.make_aware(datetime.combine(day + timedelta(days=1), time.min))
+    return start, end
+
+
+def _aggregate_tickets(tickets_qs):
+    """Linhas TicketDailyStat (não salvas) para um queryset de Ticket."""
+    tickets_qs = tickets_qs.order_by().annotate(
+        day=TruncDate('created_at', tzinfo=timezone.get_current_timezone())
+    )
+    rows = []
+    totals = tickets_qs.values('day', 'client_id', 'status', 'ticket_type_id').annotate(total=Count('id', distinct=True))
+    for row in totals:
+        rows.append(TicketDailyStat(system_id=None, **row))
+    per_system = (
+        tickets_qs
+        .filter(systems__isnull=False)
+        .values('day', 'client_id', 'status', 'ticket_type_id', 'systems__id')
+        .annotate(total=Count('id', distinct=True))
+    )
+    for row in per_system:
+        system_id = row.pop('systems__id')
+        rows.append(TicketDailyStat(system_id=system_id, **row))
+    return rows
+
+
+def refresh_slice(day, client_id):
+    """Recalcula todas as linhas de (dia, cliente) a partir de Ticket."""
+    if day is None or client_id is None:
+        return
+    start, end = day_bounds(day)
+    tickets_qs = Ticket.objects.filter(client_id=client_id, created_at__gte=start, created_at__lt=end)
+    with transaction.atomic():
+        TicketDailyStat.objects.filter(day=day, client_id=client_id).delete()
+        TicketDailyStat.objects.bulk_create(_aggregate_tickets(tickets_qs))
+
+
+def refresh_for_ticket(ticket, previous_client_id=None):
+    """
+    Atualiza as fatias afetadas por uma OS. Falhas aqui nunca devem impedir o
+    salvamento da OS — o comando `rebuild_ticket_stats` corrige qualquer desvio.
+    """
+    if not ticket.created_at:
+        return
+    day = timezone.localdate(ticket.created_at)
+    try:
+        refresh_slice(day, ticket.client_id)
+        if previous_client_id and previous_client_id != ticket.client_id:
+            refresh_slice(day, previous_client_id)
+    except Exception:
+        logger.exception("Erro ao atualizar estatísticas diárias da OS %s", ticket.pk)
+
+
+def rebuild(start_day=None, end_day=None):
+    """
+    Reconstrói a tabela consolidada (inteira ou só o intervalo de dias
+    informado, inclusive). Retorna a quantidade de linhas gravadas.
+    """
+    tickets_qs = Ticket.objects.all()
+    stats_qs = TicketDailyStat.objects.all()
+    if start_day:
+        tickets_qs = tickets_qs.filter(created_at__gte=day_bounds(start_day)[0])
+        stats_qs = stats_qs.filter(day__gte=start_day)
+    if end_day:
+        tickets_qs = tickets_qs.filter(created_at__lt=day_bounds(end_day)[1])
+        stats_qs = stats_qs.filter(day__lte=end_day)
+
+    rows = _aggregate_tickets(tickets_qs)
+    with transaction.atomic():
+        stats_qs.delete()
+        TicketDailyStat.objects.bulk_create(rows, batch_size=1000)
+    return len(rows)
+
+
+def split_period(start, end):
+    """
+    Divide [start, end] (datetimes, fim inclusive) em dias completos, servidos
+    pela tabela consolidada, e trechos parciais nas pontas, consultados direto
+    em Ticket. Retorna (primeiro_dia, ultimo_dia, [(inicio, fim), ...]); os dias
+    vêm como None quando não há nenhum dia completo no período.
+    """
+    start = timezone.localtime(start) if timezone.is_aware(start) else timezone.make_aware(start)
+    end = timezone.localtime(end) if timezone.is_aware(end) else timezone.make_aware(end)
+    if end < start:
+        return None, None, []
+
+    first_day = start.date()
+    if start != day_bounds(first_day)[0]:
+        first_day += timedelta(days=1)
+
+    last_day = end.date()
+    if end < day_bounds(last_day)[1] - timedelta(microseconds=1):
+        last_day -= timedelta(days=1)
+
+    if first_day > last_day:
+        return None, None, [(start, end)]
+
+    live = []
+    first_start = day_bounds(first_day)[0]
+    if start < first_start:
+        live.append((start, first_start - timedelta(microseconds=1)))
+    last_end = day_bounds(last_day)[1]
+    if end >= last_end:
+        live.append((last_end, end))
+    return first_day, last_day, live
+
+
+def count_by(start, end, dims, client_id=None, statuses=None):
+    """
+    Quantidade de OS abertas entre start e end (inclusive), agrupada pelas
+    dimensões pedidas ('day', 'client', 'status', 'ticket_type', 'system').
+    Retorna {tupla_de_valores: total}. Com 'system' nas dimensões, cada OS é
+    contada uma vez por sistema e OS sem sistema ficam de fora.
+    """
+    dims = tuple(dims)
+    by_system = 'system' in dims
+    counts = {}
+
+    def add(rows, fields):
+        for row in rows:
+            key = tuple(row[fields[d]] for d in dims)
+            counts[key] = counts.get(key, 0) + (row['n'] or 0)
+
+    first_day, last_day, live_ranges = split_period(start, end)
+
+    if first_day is not None:
+        stats_qs = TicketDailyStat.objects.filter(day__gte=first_day, day__lte=last_day, system__isnull=not by_system)
+        if client_id:
+            stats_qs = stats_qs.filter(client_id=client_id)
+        if statuses is not None:
+            stats_qs = stats_qs.filter(status__in=statuses)
+        fields = [ROLLUP_FIELDS[d] for d in dims]
+        add(stats_qs.values(*fields).annotate(n=Sum('total')).order_by(), ROLLUP_FIELDS)
+
+    for range_start, range_end in live_ranges:
+        tickets_qs = Ticket.objects.filter(created_at__range=(range_start, range_end))
+        if client_id:
+            tickets_qs = tickets_qs.filter(client_id=client_id)
+        if statuses is not None:
+            tickets_qs = tickets_qs.filter(status__in=statuses)
+        if by_system:
+            tickets_qs = tickets_qs.filter(systems__isnull=False)
+        if 'day' in dims:
+            tickets_qs = tickets_qs.annotate(day=TruncDate('created_at', tzinfo=timezone.get_current_timezone()))
+        fields = [LIVE_FIELDS[d] for d in dims]
+        add(tickets_qs.order_by().values(*fields).annotate(n=Count('id', distinct=True)), LIVE_FIELDS)
+
+    return counts
+
+
+def daily_counts(start_day, end_day, client_id=None):
+    """{data: total de OS abertas no dia} para cada dia de start_day a end_day, inclusive."""
+    start = day_bounds(start_day)[0]
+    end = day_bounds(end_day)[1] - timedelta(microseconds=1)
+    counts = count_by(start, end, ('day',), client_id=client_id)
+
+    result = {}
+    day = start_day
+    while day <= end_day:
+        result[day] = counts.get((day,), 0)
+        day += timedelta(days=1)
+    return result
@@ -1,12 +1,13 @@
 from django.urls import path
 from django.contrib.auth.views import LogoutView
 from .views_ai import AIChatView, AIChatNewSessionView, AIChatHistoryView, AIChatTestView, AIChatProactiveCheckView, AITTSView, ElevenLabsVoicesListView
+from .views_realtime import realtime_events
 from .views_private_chat import (
     PrivateChatContactsView, PrivateChatOpenView, PrivateChatMessagesView,
     PrivateChatSendView, PrivateChatPollView,
 )
 from .views import (
-    DashboardView, HubDashboardView, TicketListView, TicketCreateView, TicketCreateModalView, TicketAccordionItemView, TicketMiniPreviewView, TicketUpdateView, TicketDeleteView, TicketDetailView, TicketModalView, TicketInlineView, TokenLoginView,
+    DashboardView, HubDashboardView, HubDashboardDetailView, TicketListView, TicketListPageView, TicketCreateView, TicketCreateModalView, TicketAccordionItemView, TicketMiniPreviewView, TicketUpdateView, TicketDeleteView, TicketDetailView, TicketModalView, TicketInlineView, TokenLoginView,
     ticket_status_html,
     TicketPDFView, TicketPDFViewerView, TicketsDailyReportViewerView, TicketPDFStatusView, TicketsDailyReportPDFStatusView,
     ClientListView, ClientCreateView, ClientUpdateView, ClientDeleteView, ClientSearchView, client_quick_update,
@@ -34,11 +35,14 @@ from .views import (
     notification_edit, notification_delete,
     load_hubs, ChecklistDailyView, ChecklistPDFView,
     TicketsDailyReportPDFView, TicketsWeeklyReportPDFView, TicketsMonthlyReportPDFView,
+    ChecklistPDFStatusView, ChecklistPDFViewerView,
+    TicketsWeeklyReportPDFStatusView, TicketsWeeklyReportViewerView,
+    TicketsMonthlyReportPDFStatusView, TicketsMonthlyReportViewerView,
     ChecklistConfigView, ChecklistTemplateCreateView, ChecklistTemplateUpdateView, ChecklistTemplateDeleteView, ChecklistItemCreateView, ChecklistItemUpdateView, ChecklistItemDeleteView,
     TicketUpdateEditView, TicketUpdateDeleteView, TicketUpdateImageDeleteView, TicketImageDeleteView,
     ChecklistItemDetailAddView, ChecklistItemDetailUpdateView, ChecklistItemDetailDeleteView, ClientHubsAPIView, ClientTodaysTicketsAPIView,
     ChecklistImageToggleReportView, ServicesHubView, WelcomeView,
-    LocalView, LocalAgendaAPIView,
+    LocalView, LocalAgendaAPIView, LocalAgendaBatchAPIView,
     PermissionsView,
     clients_sharepoint_sync_status, microsoft_connect_start, microsoft_connect_poll, clients_sharepoint_sync_run,
     load_client_people,
@@ -51,12 +55,18 @@ from .views import (
     ContactClientListView, ContactClientCreateView, ContactClientUpdateView, ContactClientDeleteView, ContactClientModalFormView, ContactClientRowView,
     ContactJumperListView, ContactJumperCreateView, ContactJumperUpdateView, ContactJumperDeleteView, ContactJumperModalFormView, ContactJumperRowView
 )
-from .api import TicketAPIView, ClientAPIView, EquipmentAPIView
+from .api import (
+    TicketAPIView, ClientAPIView, EquipmentAPIView,
+    TicketSyncAPIView, ClientSyncAPIView, EquipmentSyncAPIView,
+)
 
 urlpatterns = [
     path('api/tickets/', TicketAPIView.as_view(), name='api_tickets'),
     path('api/clients/', ClientAPIView.as_view(), name='api_clients'),
     path('api/equipments/', EquipmentAPIView.as_view(), name='api_equipments'),
+    path('api/v2/tickets/', TicketSyncAPIView.as_view(), name='api_v2_tickets'),
+    path('api/v2/clients/', ClientSyncAPIView.as_view(), name='api_v2_clients'),
+    path('api/v2/equipments/', EquipmentSyncAPIView.as_view(), name='api_v2_equipments'),
     path('ajax/load-hubs/', load_hubs, name='ajax_load_hubs'),
     path('ajax/load-client-people/', load_client_people, name='ajax_load_client_people'),
     path('ajax/load-os-contacts/', load_os_contacts, name='ajax_load_os_contacts'),
@@ -84,11 +94,17 @@ urlpatterns = [
     # Checklist
     path('checklist/daily/', ChecklistDailyView.as_view(), name='checklist_daily'),
     path('checklist/daily/pdf/', ChecklistPDFView.as_view(), name='checklist_pdf'),
+    path('checklist/daily/pdf/status/', ChecklistPDFStatusView.as_view(), name='checklist_pdf_status'),
+    path('checklist/daily/pdf/view/', ChecklistPDFViewerView.as_view(), name='checklist_pdf_viewer'),
     path('tickets/daily/pdf/', TicketsDailyReportPDFView.as_view(), name='tickets_daily_pdf'),
     path('tickets/daily/pdf/status/', TicketsDailyReportPDFStatusView.as_view(), name='tickets_daily_pdf_status'),
     path('tickets/daily/report/', TicketsDailyReportViewerView.as_view(), name='tickets_daily_report_view'),
     path('tickets/weekly/pdf/', TicketsWeeklyReportPDFView.as_view(), name='tickets_weekly_report_view'),
+    path('tickets/weekly/pdf/status/', TicketsWeeklyReportPDFStatusView.as_view(), name='tickets_weekly_pdf_status'),
+    path('tickets/weekly/report/', TicketsWeeklyReportViewerView.as_view(), name='tickets_weekly_report_viewer'),
     path('tickets/monthly/pdf/', TicketsMonthlyReportPDFView.as_view(), name='tickets_monthly_report_view'),
+    path('tickets/monthly/pdf/status/', TicketsMonthlyReportPDFStatusView.as_view(), name='tickets_monthly_pdf_status'),
+    path('tickets/monthly/report/', TicketsMonthlyReportViewerView.as_view(), name='tickets_monthly_report_viewer'),
     path('checklist/config/', ChecklistConfigView.as_view(), name='checklist_config'),
     path('checklist/config/new/', ChecklistTemplateCreateView.as_view(), name='checklist_template_create'),
     path('checklist/config/<int:pk>/edit/', ChecklistTemplateUpdateView.as_view(), name='checklist_template_edit'),
@@ -99,7 +115,9 @@ urlpatterns = [
 
     # Dashboard Hubs
     path('dashboard/hubs/', HubDashboardView.as_view(), name='hub_dashboard'),
+    path('dashboard/hubs/<str:kind>/<int:pk>/', HubDashboardDetailView.as_view(), name='hub_dashboard_detail'),
     path('local/', LocalView.as_view(), name='local'),
+    path('local/agenda/', LocalAgendaBatchAPIView.as_view(), name='local_agenda_batch_api'),
     path('local/agenda/<int:technician_id>/', LocalAgendaAPIView.as_view(), name='local_agenda_api'),
 
     path('profile/', ProfileView.as_view(), name='profile'),
@@ -127,6 +145,7 @@ urlpatterns = [
     path('logout/', LogoutView.as_view(next_page='home'), name='logout'),
     
     path('tickets/', TicketListView.as_view(), name='ticket_list'),
+    path('tickets/page/', TicketListPageView.as_view(), name='ticket_list_page'),
     path('tickets/new/', TicketCreateView.as_view(), name='ticket_create'),
     path('tickets/<int:pk>/', TicketDetailView.as_view(), name='ticket_detail'),
     path('tickets/<int:pk>/pdf/', TicketPDFView.as_view(), name='ticket_pdf'),
@@ -272,4 +291,5 @@ urlpatterns = [
     path('chat/private/messages/', PrivateChatMessagesView.as_view(), name='private_chat_messages'),
     path('chat/private/send/', PrivateChatSendView.as_view(), name='private_chat_send'),
     path('chat/private/poll/', PrivateChatPollView.as_view(), name='private_chat_poll'),
+    path('realtime/events/', realtime_events, name='realtime_events'),
 ]
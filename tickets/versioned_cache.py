@@ -0,0 +1,121 @@
+"""
+Valores "quentes" lidos do banco (configurações singleton, matriz de
+permissões...) guardados em três camadas:
+
+1. memória do request — o mesmo valor durante todo o request, sem custo;
+2. memória do processo — reaproveitada entre requests enquanto a versão no
+   cache não mudar (conferida no máximo a cada `check_seconds`);
+3. cache do Django, sob uma chave com o número de versão — compartilhado
+   entre processos quando o cache é compartilhado (Redis/Memcached).
+
+`invalidate()` (chamado pelos signals de save/delete dos modelos de origem)
+incrementa a versão. Com o cache padrão (LocMemCache, por processo) os outros
+processos só enxergam a mudança quando o valor expira (`timeout`), por isso o
+timeout é curto.
+
+Os valores devolvidos são compartilhados: trate-os como somente leitura.
+"""
+import logging
+import threading
+import time
+
+from django.core.cache import cache
+from django.core.signals import request_finished, request_started
+from django.db.utils import OperationalError, ProgrammingError
+
+logger = logging.getLogger(__name__)
+
+_MISSING = object()
+_request_memo = threading.local()
+
+
+def _start_request_memo(**kwargs):
+    _request_memo.values = {}
+
+
+def _end_request_memo(**kwargs):
+    _request_memo.values = None
+
+
+request_started.connect(_start_request_memo, dispatch_uid='tickets.versioned_cache.start')
+request_finished.connect(_end_request_memo, dispatch_uid='tickets.versioned_cache.end')
+
+
+class VersionedCache:
+    def __init__(self, name, loader, default=None, timeout=60, check_seconds=5):
+        self.name = name
+        self.loader = loader
+        self.default = default
+        self.timeout = timeout
+        self.check_seconds = check_seconds
+        self.version_key = f'tickets:{name}:version'
+        # RLock: o loader pode disparar signals que chamam invalidate() (ex.: get_or_create).
+        self._lock = threading.RLock()
+        self._reset()
+
+    def _reset(self):
+        self._version = None
+        self._value = _MISSING
+        self._loaded_at = 0.0
+        self._checked_at = 0.0
+
+    def _current_version(self):
+        version = cache.get(self.version_key)
+        if version is None:
+            # Versão inicial única: evita reaproveitar um valor antigo caso a
+            # chave de versão tenha sido despejada do cache.
+            cache.add(self.version_key, int(time.time() * 1000), None)
+            version = cache.get(self.version_key)
+        return version
+
+    def _load(self, now):
+        version = self._current_version()
+        if self._value is not _MISSING and version == self._version and now - self._loaded_at < self.timeout:
+            self._checked_at = now
+            return self._value
+
+        value_key = f'tickets:{self.name}:{version}'
+        cached = cache.get(value_key)
+        if cached is None:
+            value = self.loader()
+            # Tupla para distinguir "valor None" de "não está no cache".
+            cache.set(value_key, (value,), self.timeout)
+        else:
+            value = cached[0]
+
+        self._version, self._value = version, value
+        self._loaded_at = self._checked_at = now
+        return value
+
+    def get(self):
+        memo = getattr(_request_memo, 'values', None)
+        if memo is not None and self.name in memo:
+            return memo[self.name]
+
+        now = time.monotonic()
+        with self._lock:
+            if self._value is not _MISSING and now - self._checked_at < self.check_seconds:
+                value = self._value
+            else:
+                try:
+                    value = self._load(now)
+                except (OperationalError, ProgrammingError):
+                    # Tabelas ainda não migradas: usa o padrão e não memoriza.
+                    return self.default
+
+        if memo is not None:
+            memo[self.name] = value
+        return value
+
+    def invalidate(self):
+        with self._lock:
+            self._reset()
+        memo = getattr(_request_memo, 'values', None)
+        if memo is not None:
+            memo.pop(self.name, None)
+        try:
+            cache.incr(self.version_key)
+        except ValueError:
+            cache.add(self.version_key, int(time.time() * 1000), None)
+        except Exception:
+            logger.exception("Erro ao invalidar o cache %s", self.name)
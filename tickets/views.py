@@ -1,5 +1,4 @@
 from django.shortcuts import render, get_object_or_404, redirect
-import os
 import json
 from django.utils.decorators import method_decorator
 from django.views.decorators.csrf import ensure_csrf_cookie
@@ -10,15 +9,9 @@ from django.contrib.auth.views import LoginView
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.contrib.auth.decorators import login_required
 from django.urls import reverse_lazy, reverse
-from django.http import JsonResponse, HttpResponse
+from django.http import JsonResponse, HttpResponse, FileResponse
 from django.db.models import Q, Exists, OuterRef, Subquery, Prefetch
-from django.template.loader import get_template, render_to_string
-try:
-    from xhtml2pdf import pisa
-except ModuleNotFoundError:
-    pisa = None
-from django.contrib.staticfiles import finders
-from django.conf import settings
+from django.template.loader import render_to_string
 from django.db import transaction
 from django.utils.text import slugify
 from django.db.utils import OperationalError, ProgrammingError
@@ -26,6 +19,18 @@ from django.forms import inlineformset_factory, modelform_factory
 from .models import *
 from .forms import *
 from .api import TicketAPIView  # Re-export for URL compatibility
+from .dashboard_stats import build_dashboard_stats
+from . import config_cache
+from . import handover_board
+from . import notification_counters
+from . import page_permissions
+from . import pdf_cache
+from . import pdf_jobs
+from . import pdf_reports
+from . import realtime
+from .pdf_reports import PdfReportError
+from . import ticket_list_pagination
+from . import technician_agenda
 from .views_checklist_config import ChecklistConfigView, ChecklistTemplateCreateView, ChecklistTemplateUpdateView, ChecklistTemplateDeleteView, ChecklistItemCreateView, ChecklistItemDeleteView, ChecklistItemUpdateView
 from django.utils import timezone
 from datetime import timedelta, datetime
@@ -33,6 +38,8 @@ from django.db.models import Count, Q, Case, When, Value, IntegerField
 from django.db.models.functions import Coalesce
 from collections import defaultdict
 from django.views.decorators.http import require_http_methods
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
 
 @method_decorator(ensure_csrf_cookie, name='dispatch')
 class DashboardView(LoginRequiredMixin, TemplateView):
@@ -109,16 +116,23 @@ class DashboardView(LoginRequiredMixin, TemplateView):
         # Filter Tickets
         tickets_qs = Ticket.objects.filter(created_at__range=(start_date, end_date))
 
+        # Sem filtro de colaborador os totais saem da tabela consolidada
+        # (TicketDailyStat), que não tem a dimensão de técnico.
+        stats_period = (start_date, end_date)
+        stats_client_id = None
+
         # Aplicar filtros de cliente e colaborador
         if client_id:
             try:
-                tickets_qs = tickets_qs.filter(client_id=int(client_id))
+                stats_client_id = int(client_id)
+                tickets_qs = tickets_qs.filter(client_id=stats_client_id)
             except (TypeError, ValueError):
-                pass
+                stats_client_id = None
 
         if collaborator_id:
             try:
                 tickets_qs = tickets_qs.filter(technicians__id=int(collaborator_id)).distinct()
+                stats_period = None
             except (TypeError, ValueError):
                 pass
 
@@ -144,89 +158,14 @@ class DashboardView(LoginRequiredMixin, TemplateView):
             except (User.DoesNotExist, TypeError, ValueError):
                 context['current_collaborator_name'] = None
         
-        # Counts
-        context['total_tickets'] = tickets_qs.count()
-        context['tickets_open'] = tickets_qs.filter(status='open').count()
-        context['tickets_pending'] = tickets_qs.filter(status='pending').count()
-        context['tickets_finished'] = tickets_qs.filter(status='finished').count()
-        
-        # Charts Data - Status
-        status_counts = []
-        status_labels = []
-        from .models import TicketStatus
-        all_statuses = list(TicketStatus.objects.filter(is_active=True).order_by('order', 'name'))
-        if not all_statuses:
-            for status_code, status_label in Ticket.STATUS_CHOICES:
-                count = tickets_qs.filter(status=status_code).count()
-                status_counts.append(count)
-                status_labels.append(status_label)
-        else:
-            for ts in all_statuses:
-                count = tickets_qs.filter(status=ts.code).count()
-                status_counts.append(count)
-                status_labels.append(ts.name)
-        
-        context['chart_status_labels'] = status_labels
-        context['chart_status_data'] = status_counts
-        
-        # Charts Data - Produtividade Recente (OS por Cliente no mês)
-        # Agrupa tickets do período por cliente
-        from django.db.models import Count
-        client_counts = (
-            tickets_qs
-            .values('client__name')
-            .annotate(total=Count('id'))
-            .order_by('-total')[:20]  # Top 20 clientes
-        )
-
-        # Separa em labels e dados
-        client_labels = []
-        client_data = []
-        for item in client_counts:
-            name = item['client__name'] or 'Sem Cliente'
-            client_labels.append(name)
-            client_data.append(item['total'])
-
-        context['chart_client_labels'] = client_labels
-        context['chart_client_data'] = client_data
-        
-        # Charts Data - Systems
-        systems = System.objects.all()
-        system_labels = []
-        system_resolved = []
-        system_open = []
-        system_overdue = []
-        system_volume = []
-        system_colors = []
-        now = timezone.now()
-        
-        for system in systems:
-            sys_tickets = tickets_qs.filter(systems=system)
-            count = sys_tickets.count()
-            
-            if count > 0:
-                resolved = sys_tickets.filter(status='finished').count()
-                open_tickets = sys_tickets.filter(Q(status='open') | Q(status='pending'))
-                open = open_tickets.filter(deadline__gte=now).count()
-                overdue = open_tickets.filter(deadline__lt=now).count()
-                
-                system_labels.append(system.name)
-                system_resolved.append(resolved)
-                system_open.append(open)
-                system_overdue.append(overdue)
-                system_volume.append(count)
-                system_colors.append(system.color if system.color else '#6c757d')
-                
-        context['chart_system_labels'] = system_labels
-        context['chart_system_data'] = system_volume
-        context['chart_system_colors'] = system_colors
-        
-        context['chart_sys_health_labels'] = system_labels
-        context['chart_sys_resolved'] = system_resolved
-        context['chart_sys_open'] = system_open
-        context['chart_sys_overdue'] = system_overdue
-        
-        context['my_tickets'] = tickets_qs.filter(technicians=self.request.user).count()
+        # Cards e gráficos em número fixo de consultas (agregação condicional),
+        # independente de quantos status/sistemas estiverem cadastrados.
+        context.update(build_dashboard_stats(
+            tickets_qs,
+            user=self.request.user,
+            period=stats_period,
+            client_id=stats_client_id,
+        ))
         return context
 
 @method_decorator(ensure_csrf_cookie, name='dispatch')
@@ -336,7 +275,8 @@ class TicketListView(LoginRequiredMixin, ListView):
     template_name = 'tickets/ticket_list.html'
     context_object_name = 'tickets'
 
-    def get_queryset(self):
+    def get_filtered_queryset(self):
+        """OS que atendem aos filtros da querystring (sem ordenação/paginação)."""
         queryset = (
             Ticket.objects.all()
             .select_related(
@@ -457,26 +397,30 @@ class TicketListView(LoginRequiredMixin, ListView):
             except (ValueError, TypeError):
                 pass
 
-        # Ordenação pela ordem definida em "Cadastros > Status de OS"
-        # Usa o campo 'order' de TicketStatus para definir a prioridade
-        from django.db.models import Subquery, OuterRef
-
-        # Busca o valor de 'order' de cada TicketStatus para o status do Ticket
-        ticket_status_order = TicketStatus.objects.filter(
-            code=OuterRef('status')
-        ).values('order')[:1]
+        return queryset
 
-        queryset = queryset.annotate(
-            status_order=Subquery(ticket_status_order)
+    def get_queryset(self):
+        # Ordem: cards arrastados pelo usuário, depois "Cadastros > Status de OS"
+        # (campo 'order') e mais recentes primeiro. Só a primeira página vem no
+        # HTML; as demais chegam por TicketListPageView (rolagem infinita).
+        tickets, self.next_cursor = ticket_list_pagination.paginate(
+            self.get_filtered_queryset(),
+            self.request.user,
+            cursor=self.request.GET.get('cursor') or None,
+            after_id=self._after_id(),
+            page_size=ticket_list_pagination.parse_page_size(self.request.GET.get('page_size')),
         )
+        return tickets
 
-        queryset = queryset.order_by('status_order', '-updated_at')
-
-        from .models import TicketListOrder
-        return TicketListOrder.apply_saved_order(self.request.user, queryset)
+    def _after_id(self):
+        try:
+            return int(self.request.GET.get('after') or 0) or None
+        except (TypeError, ValueError):
+            return None
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
+        context['next_cursor'] = self.next_cursor
         # Context for filters
         context['ticket_types'] = TicketType.objects.all().order_by('name')
         context['status_list'] = TicketStatus.objects.filter(is_active=True).order_by('order', 'name')
@@ -615,7 +559,13 @@ class TicketListView(LoginRequiredMixin, ListView):
         context['now'] = now
         context['today_tickets_count'] = today_count
         context['can_daily_report_all'] = getattr(getattr(self.request.user, 'profile', None), 'role', None) in ['admin', 'super_admin']
-        context['all_tickets'] = Ticket.objects.all().select_related('client').order_by('-created_at')
+        # Select "OS Específica" do modal de PDF: só as mais recentes, para não
+        # carregar o histórico inteiro a cada abertura da lista.
+        context['all_tickets'] = (
+            Ticket.objects.select_related('client')
+            .only('id', 'client__name')
+            .order_by('-created_at')[:500]
+        )
 
         # Permitir que admin/super_admin ajuste o "criador" da OS direto na lista
         role = getattr(getattr(self.request.user, 'profile', None), 'role', None)
@@ -629,6 +579,32 @@ class TicketListView(LoginRequiredMixin, ListView):
         
         return context
 
+class TicketListPageView(TicketListView):
+    """
+    Próxima página da lista de OS (rolagem infinita), em JSON: HTML dos cards
+    e o cursor da página seguinte. Aceita os mesmos filtros da lista.
+    """
+
+    item_template_name = 'tickets/_ticket_accordion_item.html'
+
+    def get(self, request, *args, **kwargs):
+        tickets = self.get_queryset()
+        now = timezone.localtime(timezone.now())
+        role = getattr(getattr(request.user, 'profile', None), 'role', None)
+        item_context = {'now': now, 'can_edit_ticket_creator': role in ['admin', 'super_admin']}
+        html = ''.join(
+            render_to_string(self.item_template_name, {**item_context, 'ticket': ticket}, request=request)
+            for ticket in tickets
+        )
+        return JsonResponse({
+            'html': html,
+            'count': len(tickets),
+            'ids': [ticket.id for ticket in tickets],
+            'next_cursor': self.next_cursor,
+            'has_more': self.next_cursor is not None,
+        })
+
+
 class TicketDetailView(LoginRequiredMixin, DetailView):
     model = Ticket
     template_name = 'tickets/ticket_detail.html'
@@ -651,83 +627,163 @@ class TicketDetailView(LoginRequiredMixin, DetailView):
         return context
 
 
-class TicketPDFView(LoginRequiredMixin, View):
-    def get(self, request, pk, *args, **kwargs):
-        if pisa is None:
-            return HttpResponse('PDF indisponível.', status=500)
-
-        ticket = (
-            Ticket.objects.select_related('client', 'hub', 'equipment', 'requester', 'ticket_type', 'problem_type', 'order_type')
-            .prefetch_related('requesters', 'technicians', 'equipments', 'systems', 'updates', 'updates__images', 'images')
-            .filter(pk=pk)
-            .first()
-        )
-        if not ticket:
-            return HttpResponse('OS não encontrada.', status=404)
+class PdfReportView(LoginRequiredMixin, View):
+    """
+    Serve um relatório em PDF (pdf_reports.py). Com ?job=<id>, entrega o
+    arquivo já gerado pela fila (pdf_jobs.py); sem, usa o cache em disco
+    (pdf_cache.py) quando o relatório permite, ou gera na hora.
+    Respostas com ETag/Last-Modified: o navegador revalida e recebe 304.
+    """
+    kind = ''
 
-        updates = ticket.updates.all().order_by('created_at', 'id')
-        attachments = []
-        if ticket.image:
-            attachments.append({'url': ticket.image.url, 'label': 'Imagem Inicial'})
-        for img in ticket.images.all():
-            attachments.append({'url': img.image.url, 'label': 'Anexo'})
-        attachment_rows = []
-        for i in range(0, len(attachments), 4):
-            row = attachments[i:i + 4]
-            if len(row) < 4:
-                row = row + ([None] * (4 - len(row)))
-            attachment_rows.append(row)
-        context = {
-            'user': request.user,
-            'ticket': ticket,
-            'updates': updates,
-            'attachment_rows': attachment_rows,
-            'generated_at': timezone.now(),
-            'logo_path': os.path.join(settings.MEDIA_ROOT, 'images', 'logo_principal.png'),
-        }
+    def get(self, request, *args, **kwargs):
+        report = pdf_reports.REPORTS[self.kind]
+        job_id = request.GET.get('job')
+        download = str(request.GET.get('download') or '').strip() == '1'
 
-        template_path = 'tickets/ticket_pdf.html'
-        response = HttpResponse(content_type='application/pdf')
+        if job_id:
+            job = PdfRenderJob.objects.filter(pk=job_id, kind=self.kind, user=request.user).first() if job_id.isdigit() else None
+            path = pdf_jobs.file_path(job) if job else None
+            if not path:
+                return HttpResponse('PDF não encontrado. Gere o relatório novamente.', status=404)
+            etag, last_modified, filename = job.content_hash, job.finished_at, job.filename
+            body = None
+        else:
+            try:
+                params = report.params_from_request(request, **kwargs)
+                entry = pdf_cache.entry_for(report, request.user, params)
+                if entry is not None:
+                    etag, last_modified, filename, path = entry.key, entry.last_modified, entry.filename, entry.path
+                    body = None
+                    if not path:
+                        not_modified = self._not_modified(request, etag, last_modified)
+                        if not_modified:
+                            return not_modified
+                        html, filename = report.render_html(request.user, params, entry)
+                        path = pdf_cache.store(entry, pdf_reports.render_pdf(html)).path
+                else:
+                    etag = last_modified = path = None
+                    html, filename = report.render_html(request.user, params)
+                    body = pdf_reports.render_pdf(html)
+            except PdfReportError as e:
+                return self.report_error(request, e)
+            download = download or report.always_download
+
+        if body is None:
+            not_modified = self._not_modified(request, etag, last_modified)
+            if not_modified:
+                return not_modified
+            response = FileResponse(open(path, 'rb'), content_type='application/pdf')
+        else:
+            response = HttpResponse(body, content_type='application/pdf')
+        self._set_validators(response, etag, last_modified)
         response['X-Frame-Options'] = 'SAMEORIGIN'
-        download = str(request.GET.get('download') or '').strip() == '1'
         disposition = 'attachment' if download else 'inline'
-        leankeep_part = (ticket.leankeep_id or '').strip() or '00000'
-        client_part = (ticket.client.name or '').strip()
-        client_part = slugify(client_part).replace('-', '_').upper() or 'CLIENTE'
-        response['Content-Disposition'] = f'{disposition}; filename="{ticket.formatted_id}_{leankeep_part}_{client_part}.pdf"'
-
-        template = get_template(template_path)
-        html = template.render(context)
-
-        def link_callback(uri, rel):
-            if uri.startswith('http://') or uri.startswith('https://'):
-                return uri
-
-            if settings.STATIC_URL and uri.startswith(settings.STATIC_URL):
-                path = uri.replace(settings.STATIC_URL, '')
-                absolute_path = finders.find(path)
-                if absolute_path:
-                    return absolute_path
-
-            if settings.MEDIA_URL and uri.startswith(settings.MEDIA_URL):
-                path = uri.replace(settings.MEDIA_URL, '')
-                absolute_path = os.path.join(settings.MEDIA_ROOT, path.replace('/', os.sep))
-                if os.path.exists(absolute_path):
-                    return absolute_path
-
-            if not uri.startswith('/'):
-                if 'media/' in uri:
-                    possible_path = os.path.join(settings.BASE_DIR, uri.replace('/', os.sep))
-                    if os.path.exists(possible_path):
-                        return possible_path
-
-            return uri
-
-        pisa_status = pisa.CreatePDF(html, dest=response, link_callback=link_callback)
-        if pisa_status.err:
-            return HttpResponse('Erro ao gerar PDF.', status=500)
+        response['Content-Disposition'] = f'{disposition}; filename="{filename}"'
+        return response
+
+    def _not_modified(self, request, etag, last_modified):
+        if not etag:
+            return None
+        response = get_conditional_response(
+            request,
+            etag=quote_etag(etag),
+            last_modified=int(last_modified.timestamp()) if last_modified else None,
+        )
+        if response is not None:
+            self._set_validators(response, etag, last_modified)
         return response
 
+    def _set_validators(self, response, etag, last_modified):
+        if not etag:
+            return
+        response['ETag'] = quote_etag(etag)
+        if last_modified:
+            response['Last-Modified'] = http_date(last_modified.timestamp())
+        # Relatório de usuário logado: só o navegador guarda, e sempre revalida.
+        response['Cache-Control'] = 'private, no-cache'
+
+    def report_error(self, request, error):
+        return HttpResponse(error.message, status=error.status)
+
+
+class PdfReportStatusView(LoginRequiredMixin, View):
+    """
+    Andamento da geração de um relatório, consultado pelo visualizador.
+
+    Sem ?job=<id>, registra o pedido na fila (ou reaproveita o que já está em
+    aberto para os mesmos parâmetros) e devolve o id para as próximas consultas.
+    """
+    kind = ''
+    pdf_url_name = ''
+
+    def get(self, request, *args, **kwargs):
+        if pdf_reports.pisa is None:
+            return JsonResponse({'ok': False, 'message': 'PDF indisponível.'}, status=200)
+
+        job_id = request.GET.get('job')
+        if job_id:
+            job = PdfRenderJob.objects.filter(pk=job_id, kind=self.kind, user=request.user).first() if job_id.isdigit() else None
+            if not job:
+                return JsonResponse({'ok': False, 'message': 'Pedido de PDF não encontrado.'}, status=200)
+        else:
+            report = pdf_reports.REPORTS[self.kind]
+            try:
+                params = report.params_from_request(request, **kwargs)
+                entry = pdf_cache.entry_for(report, request.user, params)
+                if entry is not None and entry.path:
+                    # Já gerado para esta versão dos dados: o link direto serve do disco.
+                    pdf_url = reverse(self.pdf_url_name, kwargs=kwargs) + (f'?{request.GET.urlencode()}' if request.GET else '')
+                    return JsonResponse({
+                        'ok': True, 'state': 'done', 'progress': 100, 'ready': True, 'queue_position': 0,
+                        'pdf_url': pdf_url,
+                        'download_url': pdf_url + ('&' if request.GET else '?') + 'download=1',
+                    })
+                job = pdf_jobs.enqueue(self.kind, params, request.user)
+            except PdfReportError as e:
+                return JsonResponse({'ok': False, 'message': e.message}, status=200)
+
+        job = pdf_jobs.run_inline_if_waiting(job)
+        data = {
+            'ok': job.status != 'failed',
+            'job': job.pk,
+            'state': job.status,
+            'progress': job.progress,
+            'ready': job.status == 'done',
+            'queue_position': pdf_jobs.queue_position(job),
+        }
+        if job.status == 'failed':
+            data['message'] = job.error or 'Erro ao gerar PDF.'
+        if job.status == 'done':
+            pdf_url = f"{reverse(self.pdf_url_name, kwargs=kwargs)}?job={job.pk}"
+            data['pdf_url'] = pdf_url
+            data['download_url'] = f'{pdf_url}&download=1'
+        return JsonResponse(data)
+
+
+class PdfReportViewerView(LoginRequiredMixin, TemplateView):
+    """Visualizador (pdf_viewer.html) para relatórios cujos parâmetros vêm só da querystring."""
+    template_name = 'tickets/pdf_viewer.html'
+    title = ''
+    pdf_url_name = ''
+    status_url_name = ''
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        query = self.request.GET.copy()
+        query.pop('download', None)
+        qs = f'?{query.urlencode()}' if query else ''
+        pdf_url = reverse(self.pdf_url_name) + qs
+        context['title'] = self.title
+        context['pdf_url'] = pdf_url
+        context['status_url'] = reverse(self.status_url_name) + qs
+        context['download_url'] = pdf_url + ('&' if qs else '?') + 'download=1'
+        return context
+
+
+class TicketPDFView(PdfReportView):
+    kind = 'ticket'
+
 
 class TicketPDFViewerView(LoginRequiredMixin, TemplateView):
     template_name = 'tickets/pdf_viewer.html'
@@ -929,17 +985,8 @@ class TicketDeleteView(LoginRequiredMixin, DeleteView):
             if not _is_admin_or_super(request.user):
                 raise PermissionDenied
             role_code = getattr(getattr(request.user, 'profile', None), 'role', None)
-            if role_code != 'super_admin':
-                page = AppPage.objects.filter(url_name='ticket_delete').first()
-                if page and not page.is_enabled:
-                    raise PermissionDenied
-
-                if page and role_code:
-                    role = RoleLevel.objects.filter(code=role_code, is_active=True).first()
-                    if role:
-                        perm = RolePagePermission.objects.filter(role=role, page=page).first()
-                        if perm and not perm.allowed:
-                            raise PermissionDenied
+            if not page_permissions.is_allowed(role_code, 'ticket_delete'):
+                raise PermissionDenied
         except (OperationalError, ProgrammingError):
             # Se tabelas de permissão ainda não existirem, não bloqueia aqui
             pass
@@ -2642,8 +2689,7 @@ class TaskListView(LoginRequiredMixin, TemplateView):
     template_name = 'tasks/task_list.html'
 
     def _get_shift_settings(self):
-        settings_obj, _ = SystemSettings.objects.get_or_create(pk=1)
-        return settings_obj
+        return config_cache.get_system_settings()
 
     def _build_shifts(self, now):
         settings_obj = self._get_shift_settings()
@@ -2906,31 +2952,11 @@ class TaskListView(LoginRequiredMixin, TemplateView):
             .order_by('first_name', 'last_name', 'username')
         )
 
-        # Prefetch leve para exibir lista
+        # Handovers, anotações e OS da página inteira em consultas fixas (handover_board.py).
         data = []
-        for sh in shifts_page:
-            handover, _ = ShiftHandover.objects.get_or_create(shift_date=sh['date'], shift_type=sh['type'])
-
+        for sh, board in zip(shifts_page, handover_board.load(shifts_page, self.request.user)):
             shift_end_ref = min(sh['end'], now) if sh['start'] <= now else sh['end']
 
-            tickets_created = (
-                Ticket.objects
-                .select_related('client', 'hub')
-                .prefetch_related('systems', 'technicians')
-                .filter(created_at__gte=sh['start'], created_at__lt=sh['end'])
-                .order_by('-created_at')
-            )[:30]
-
-            pendencias = (
-                Ticket.objects
-                .select_related('client', 'hub')
-                .prefetch_related('systems', 'technicians')
-                .exclude(status__in=['finished', 'canceled'])
-                .filter(created_at__lte=sh['end'])
-                .filter(Q(deadline__lt=sh['end']) | Q(status__in=['pending', 'in_progress', 'open']))
-                .order_by('deadline', '-updated_at')
-            )[:30]
-
             def serialize_ticket(t):
                 return {
                     'id': t.id,
@@ -2942,36 +2968,19 @@ class TaskListView(LoginRequiredMixin, TemplateView):
                     'preview_url': reverse('ticket_mini_preview', kwargs={'pk': t.id}),
                 }
 
-            # Prefetch alertas (para destinatário e para o criador acompanhar baixas)
-            user_alerts = list(
-                handover.entries
-                .prefetch_related(
-                    Prefetch(
-                        'alerts',
-                        queryset=ShiftHandoverEntryAlert.objects.select_related('target_user').all(),
-                        to_attr='alerts_all'
-                    ),
-                    Prefetch(
-                        'alerts',
-                        queryset=ShiftHandoverEntryAlert.objects.filter(target_user=self.request.user),
-                        to_attr='alerts_for_user'
-                    )
-                )
-                .select_related('created_by', 'parent')
-                .all()
-            )
-
-            entry_tree = build_handover_entry_tree(user_alerts)
+            entry_tree = build_handover_entry_tree(board['entries'])
 
             data.append({
-                'handover': handover,
+                'handover': board['handover'],
+                # Identifica o post-it na página (o turno pode ainda não ter ShiftHandover).
+                'key': f"{sh['date']:%Y%m%d}-{sh['type']}",
                 'shift': sh,
                 'weekday_label': weekday_pt.get(sh['date'].weekday(), ''),
                 'title_date': sh['date'],
                 'shift_label': 'Diurno' if sh['type'] == 'day' else 'Noturno',
                 'is_current': bool(sh.get('is_current')),
-                'tickets_created': [serialize_ticket(t) for t in tickets_created],
-                'pendencias': [serialize_ticket(t) for t in pendencias],
+                'tickets_created': [serialize_ticket(t) for t in board['tickets_created']],
+                'pendencias': [serialize_ticket(t) for t in board['pendencias']],
                 'entries_data': [build_handover_entry_data(e, self.request.user) for e in entry_tree],
             })
 
@@ -3094,9 +3103,21 @@ class ShiftHandoverEntryCreateView(LoginRequiredMixin, View):
         handover_id = request.POST.get('handover_id')
         parent_id = request.POST.get('parent_id')
         text = (request.POST.get('text') or '').strip()
+        # Post-it de turno ainda sem ShiftHandover: vem a data/tipo do turno e a linha
+        # é criada aqui, na primeira anotação.
+        shift_date = None
+        shift_type = request.POST.get('shift_type')
+        if request.POST.get('shift_date'):
+            try:
+                shift_date = datetime.strptime(request.POST['shift_date'], '%Y-%m-%d').date()
+            except ValueError:
+                shift_date = None
+        has_shift = bool(shift_date and shift_type in dict(ShiftHandover.SHIFT_TYPE_CHOICES))
         if parent_id and not str(parent_id).isdigit():
             return JsonResponse({'status': 'error', 'message': 'Registro pai inválido.'}, status=400)
-        if not handover_id and not parent_id:
+        if handover_id and not str(handover_id).isdigit():
+            return JsonResponse({'status': 'error', 'message': 'Turno inválido.'}, status=400)
+        if not handover_id and not parent_id and not has_shift:
             return JsonResponse({'status': 'error', 'message': 'Turno inválido.'}, status=400)
         if not text:
             return JsonResponse({'status': 'error', 'message': 'Digite uma anotação.'}, status=400)
@@ -3107,8 +3128,10 @@ class ShiftHandoverEntryCreateView(LoginRequiredMixin, View):
         if parent_id:
             parent = get_object_or_404(ShiftHandoverEntry.objects.select_related('handover'), pk=int(parent_id))
             handover = parent.handover
-        else:
+        elif handover_id:
             handover = get_object_or_404(ShiftHandover, pk=int(handover_id))
+        else:
+            handover, _ = ShiftHandover.objects.get_or_create(shift_date=shift_date, shift_type=shift_type)
 
         # Criar apenas anotação, sem gerar ticket automaticamente
         # As OS devem ser criadas exclusivamente na tela de "Ordens de Serviço"
@@ -4159,28 +4182,29 @@ def ticket_set_creator(request, pk):
 @login_required
 def ticket_reorder(request):
     """
-    Salva a ordem manual (arrastar e soltar) dos cards de OS na listagem,
-    por usuário. Usado pelo drag-and-drop da lista e também pelo Jota4.
+    Salva a posição manual (arrastar e soltar) de um card de OS na listagem,
+    por usuário: a OS movida e as vizinhas dela na tela depois de soltar.
     """
     if request.method != 'POST':
         return JsonResponse({'status': 'error', 'message': 'Método inválido.'}, status=405)
 
-    from .models import TicketListOrder
-
-    try:
-        payload = json.loads(request.POST.get('order') or '[]')
-    except (ValueError, TypeError):
-        return JsonResponse({'status': 'error', 'message': 'Ordem inválida.'}, status=400)
-
-    if not isinstance(payload, list):
-        return JsonResponse({'status': 'error', 'message': 'Ordem inválida.'}, status=400)
+    from . import ticket_list_order
 
     try:
-        ticket_ids = [int(i) for i in payload]
+        ticket_id = int(request.POST.get('ticket_id'))
+        after_ticket_id = int(request.POST.get('after_ticket_id') or 0) or None
+        before_ticket_id = int(request.POST.get('before_ticket_id') or 0) or None
     except (ValueError, TypeError):
         return JsonResponse({'status': 'error', 'message': 'IDs inválidos.'}, status=400)
 
-    TicketListOrder.save_new_order(request.user, ticket_ids)
+    if not Ticket.objects.filter(pk=ticket_id).exists():
+        return JsonResponse({'status': 'error', 'message': 'OS não encontrada.'}, status=404)
+
+    ticket_list_order.place_between(
+        request.user, ticket_id,
+        after_ticket_id=after_ticket_id,
+        before_ticket_id=before_ticket_id,
+    )
     return JsonResponse({'status': 'ok'})
 
 @login_required
@@ -4194,6 +4218,8 @@ def mark_all_notifications_read(request):
             _send_read_receipt(notification)
             notification.save(update_fields=['is_read', 'read_at', 'read_receipt_notified'])
         unread.filter(is_read=False).update(is_read=True, read_at=now)
+        # update() em lote não passa pelos signals do contador do badge.
+        notification_counters.mark_all_read(request.user.id)
         return JsonResponse({'status': 'ok'})
     return JsonResponse({'status': 'error'}, status=400)
 
@@ -4349,6 +4375,12 @@ class SendMessageView(LoginRequiredMixin, SuccessMessageMixin, CreateView):
 
         if notifications:
             Notification.objects.bulk_create(notifications)
+            # bulk_create não dispara post_save: contador do badge e aviso em tempo real aqui.
+            notification_counters.added_in_bulk(notifications)
+            def publish():
+                for n in notifications:
+                    realtime.publish([n.recipient_id], 'notification', id=n.id, title=n.title, urgency=n.urgency)
+            transaction.on_commit(publish)
             if self.is_ajax():
                 return JsonResponse({'status': 'ok', 'count': len(notifications)})
             messages.success(self.request, f"Mensagem enviada para {len(notifications)} destinatários.")
@@ -4501,7 +4533,22 @@ class ClientSearchView(LoginRequiredMixin, ListView):
         context['q'] = self.request.GET.get('q', '')
         return context
 
+HUB_DASHBOARD_OPEN_STATUSES = ('open', 'in_progress', 'pending')
+
+
+def _hub_dashboard_fmt_dt(dt, with_time=False):
+    if not dt: return '-'
+    if with_time:
+        return timezone.localtime(dt).strftime('%d/%m/%Y %H:%M')
+    return timezone.localtime(dt).strftime('%d/%m/%Y')
+
+
 class HubDashboardView(LoginRequiredMixin, TemplateView):
+    """
+    Grade de empresas com suas lojas/filiais. A página só traz o resumo de cada
+    card (contagens agregadas por cliente); os detalhes de uma matriz ou loja
+    (OS, viagens, técnicos) vêm de HubDashboardDetailView quando o modal abre.
+    """
     template_name = 'tickets/hub_dashboard.html'
 
     def get_context_data(self, **kwargs):
@@ -4520,138 +4567,93 @@ class HubDashboardView(LoginRequiredMixin, TemplateView):
         context['selected_client_id'] = selected_client_id_int
 
         # Filter Logic
-        hubs_qs = ClientHub.objects.all()
-        tickets_qs = Ticket.objects.select_related('client', 'hub', 'ticket_type').prefetch_related('technicians', 'systems')
-        travels_qs = TechnicianTravel.objects.select_related('technician', 'service_order', 'hub', 'client').prefetch_related('segments')
+        hubs_qs = ClientHub.objects.only('id', 'name', 'client_id').order_by('name')
+        tickets_qs = Ticket.objects.all()
+        travels_qs = TechnicianTravel.objects.all()
+        card_clients = clients_qs
 
         if selected_client_id_int:
             hubs_qs = hubs_qs.filter(client_id=selected_client_id_int)
             tickets_qs = tickets_qs.filter(client_id=selected_client_id_int)
             travels_qs = travels_qs.filter(client_id=selected_client_id_int)
+            card_clients = clients_qs.filter(id=selected_client_id_int)
+
+        # Contagens dos cards: uma query agregada por tabela, sem carregar as OS/viagens.
+        ticket_counts = {
+            row['client_id']: row
+            for row in tickets_qs.order_by().values('client_id').annotate(
+                total=Count('id'),
+                open=Count('id', filter=Q(status__in=HUB_DASHBOARD_OPEN_STATUSES)),
+            )
+        }
+        travel_counts = dict(
+            travels_qs.order_by().values('client_id').annotate(total=Count('id')).values_list('client_id', 'total')
+        )
 
-        # Helper for date formatting
-        def fmt_dt(dt, with_time=False):
-            if not dt: return '-'
-            if with_time:
-                return timezone.localtime(dt).strftime('%d/%m/%Y %H:%M')
-            return timezone.localtime(dt).strftime('%d/%m/%Y')
-
-                # Build card items for grid (clients with hubs inside)
+        # Build card items for grid (clients with hubs inside)
         dashboard_items = []
         # Group hubs by client
         client_hubs_map = defaultdict(list)
         for h in hubs_qs:
             client_hubs_map[h.client_id].append(h)
 
-        if selected_client_id_int:
-            client_obj = clients_qs.filter(id=selected_client_id_int).first()
-            if client_obj:
-                hubs_do_cliente = client_hubs_map.get(client_obj.id, [])
-                dashboard_items.append({
-                    'type': 'client',
-                    'id': client_obj.id,
-                    'display_name': client_obj.name,
-                    'client_name': client_obj.name,
-                    'address': getattr(client_obj, 'address', None),
-                    'logo': client_obj.logo if hasattr(client_obj, 'logo') else None,
-                    'hubs': [{'id': h.id, 'name': h.name} for h in hubs_do_cliente],
-                })
-        else:
-            for client_obj in clients_qs:
-                hubs_do_cliente = client_hubs_map.get(client_obj.id, [])
-                dashboard_items.append({
-                    'type': 'client',
-                    'id': client_obj.id,
-                    'display_name': client_obj.name,
-                    'client_name': client_obj.name,
-                    'address': getattr(client_obj, 'address', None),
-                    'logo': client_obj.logo if hasattr(client_obj, 'logo') else None,
-                    'hubs': [{'id': h.id, 'name': h.name} for h in hubs_do_cliente],
-                })
+        for client_obj in card_clients:
+            hubs_do_cliente = client_hubs_map.get(client_obj.id, [])
+            counts = ticket_counts.get(client_obj.id, {})
+            dashboard_items.append({
+                'type': 'client',
+                'id': client_obj.id,
+                'display_name': client_obj.name,
+                'client_name': client_obj.name,
+                'address': getattr(client_obj, 'address', None),
+                'logo': client_obj.logo if hasattr(client_obj, 'logo') else None,
+                'hubs': [{'id': h.id, 'name': h.name} for h in hubs_do_cliente],
+                'tickets_count': counts.get('total', 0),
+                'open_tickets_count': counts.get('open', 0),
+                'travels_count': travel_counts.get(client_obj.id, 0),
+            })
         context['dashboard_items'] = dashboard_items
+        return context
 
-                # Organize data by hub/client for modal details
-        hubs_data = {}
-        
-        # Initialize with real hubs
-        for hub in hubs_qs:
-            hubs_data[hub.id] = {
-                'id': hub.id,
-                'name': hub.name,
-                'address': hub.address,
-                'client_name': hub.client.name,
-                'tickets': [],
-                'travels': []
-            }
-        
-        # Group hubs by client for quick lookup
-        client_hubs_dict = defaultdict(list)
-        for hub in hubs_qs:
-            client_hubs_dict[hub.client_id].append(hub)
-        
-        no_hub_key = 'no_hub'
-        hubs_data[no_hub_key] = {
-            'id': None,
-            'name': 'Sem Hub/Loja',
-            'address': '-',
-            'client_name': '-',
-            'tickets': [],
-            'travels': []
-        }
 
-        hub_tickets_map = defaultdict(list)
-        for t in tickets_qs:
-            hub_id = t.hub_id if t.hub_id else no_hub_key
-            hub_tickets_map[hub_id].append(t)
-            
-        hub_travels_map = defaultdict(list)
-        for tr in travels_qs:
-            if tr.service_order and tr.service_order.hub_id:
-                hub_id = tr.service_order.hub_id
-            elif tr.hub_id:
-                hub_id = tr.hub_id
-            else:
-                hub_id = no_hub_key
-            hub_travels_map[hub_id].append(tr)
-
-        # Client-level aggregation
-        client_tickets_map = defaultdict(list)
-        for t in tickets_qs:
-            if t.client_id:
-                client_tickets_map[t.client_id].append(t)
-        client_travels_map = defaultdict(list)
-        for tr in travels_qs:
-            if tr.client_id:
-                client_travels_map[tr.client_id].append(tr)
-
-        final_hubs_list = []
-        hubs_data_map = {}
-        
-        for hub_id, hub_info in hubs_data.items():
-            tickets = hub_tickets_map[hub_id]
-            travels = hub_travels_map[hub_id]
-            
-            # Skip empty "No Hub"
-            if hub_id == no_hub_key and not tickets and not travels:
-                continue
+class HubDashboardDetailView(LoginRequiredMixin, View):
+    """
+    GET /dashboard/hubs/<hub|client>/<id>/ — detalhes de uma loja ou matriz
+    para o modal do Dashboard de Hubs (OS agendadas, OS abertas, viagens e
+    técnicos), montados só para o item pedido.
+    """
 
-            data = self._build_hub_data(tickets, travels, fmt_dt)
-            hub_info.update(data)
-            final_hubs_list.append(hub_info)
-            hubs_data_map[f"hub_{hub_info['id'] if hub_info['id'] is not None else 'nohub'}"] = data
+    def get(self, request, kind, pk):
+        role_code = getattr(getattr(request.user, 'profile', None), 'role', None)
+        if not page_permissions.is_allowed(role_code, 'hub_dashboard'):
+            return JsonResponse({'error': 'Sem permissão.'}, status=403)
 
-        # Sort: "No Hub" last, others by name
-        final_hubs_list.sort(key=lambda x: (x['id'] is None, x['name']))
-        
-        # Add client-level entries to hubs_data_map
-        for client in clients_qs:
-            ct = client_tickets_map.get(client.id, [])
-            cv = client_travels_map.get(client.id, [])
-            data = self._build_hub_data(ct, cv, fmt_dt)
-            hubs_data_map[f"client_{client.id}"] = data
-
-        context['hubs_data'] = hubs_data_map
-        return context
+        travels_prefetch = Prefetch(
+            'travels',
+            queryset=TechnicianTravel.objects.select_related('technician').prefetch_related('segments'),
+        )
+        tickets = Ticket.objects.select_related('ticket_type').prefetch_related(
+            Prefetch('technicians', queryset=User.objects.select_related('profile')),
+            'systems',
+            travels_prefetch,
+        )
+        travels = TechnicianTravel.objects.select_related('technician__profile')
+
+        if kind == 'hub':
+            get_object_or_404(ClientHub, pk=pk)
+            tickets = tickets.filter(hub_id=pk)
+            # A viagem conta para a loja da OS; sem loja na OS, para a loja da própria viagem.
+            travels = travels.filter(
+                Q(service_order__hub_id=pk) | Q(service_order__hub__isnull=True, hub_id=pk)
+            )
+        elif kind == 'client':
+            get_object_or_404(Client, pk=pk)
+            tickets = tickets.filter(client_id=pk)
+            travels = travels.filter(client_id=pk)
+        else:
+            return JsonResponse({'error': 'Tipo inválido.'}, status=404)
+
+        return JsonResponse(self._build_hub_data(tickets, travels, _hub_dashboard_fmt_dt))
 
     def _build_hub_data(self, tickets, travels, fmt_dt):
         agendadas = []
@@ -4659,8 +4661,6 @@ class HubDashboardView(LoginRequiredMixin, TemplateView):
         viagens = []
         technicians_map = {}
 
-        open_statuses = {'open', 'in_progress', 'pending'}
-
         for ticket in tickets:
             systems_names = ", ".join(system.name for system in ticket.systems.all()) or "-"
             tech_names = []
@@ -4668,13 +4668,12 @@ class HubDashboardView(LoginRequiredMixin, TemplateView):
                 technicians_map[tech.id] = tech
                 tech_names.append(tech.get_full_name() or tech.username)
 
-            travel_obj = None
-            if hasattr(ticket, 'travels'):
-                travel_obj = ticket.travels.all().first()
+            # Viagens pré-carregadas (Prefetch em get): a mais recente vem primeiro.
+            travel_obj = next(iter(ticket.travels.all()), None)
 
             travel_payload = None
             if travel_obj:
-                segment = travel_obj.segments.all().first()
+                segment = next(iter(travel_obj.segments.all()), None)
                 if segment:
                     travel_payload = {
                         'segment_exists': True,
@@ -4713,7 +4712,7 @@ class HubDashboardView(LoginRequiredMixin, TemplateView):
                 'travel': travel_payload,
             })
 
-            if ticket.status in open_statuses:
+            if ticket.status in HUB_DASHBOARD_OPEN_STATUSES:
                 os_abertas.append({
                     'id': ticket.id,
                     'leankeep': ticket.leankeep_id or ticket.formatted_id,
@@ -4963,7 +4962,7 @@ class ChecklistDailyView(LoginRequiredMixin, TemplateView):
         context['is_admin_user'] = self._is_admin_user()
         
         # Get System Settings
-        context['system_settings'] = SystemSettings.objects.first()
+        context['system_settings'] = config_cache.get_system_settings()
         
         checklist = DailyChecklist.objects.filter(user=user, date=target_date).first()
         
@@ -5215,429 +5214,27 @@ class ChecklistDailyView(LoginRequiredMixin, TemplateView):
         
         return self.render_to_response(context)
 
-class ChecklistPDFView(LoginRequiredMixin, View):
-    def get(self, request, *args, **kwargs):
-        # Determine date
-        date_str = request.GET.get('date')
-        target_date = timezone.now().date()
-        if date_str:
-            try:
-                target_date = datetime.strptime(date_str, '%Y-%m-%d').date()
-            except ValueError:
-                pass
+class ChecklistPDFView(PdfReportView):
+    kind = 'checklist'
 
-        user = request.user
-        
-        checklist = DailyChecklist.objects.filter(user=user, date=target_date).prefetch_related(
-            'items__images',
-            Prefetch('items__details', queryset=DailyChecklistItemDetail.objects.order_by('hub__name', 'created_at')),
-            Prefetch(
-                'items__option_values',
-                queryset=DailyChecklistItemOptionValue.objects.select_related('template_option').order_by('template_option__order', 'id')
-            ),
-            Prefetch(
-                'items__template_item__options',
-                queryset=ChecklistTemplateItemOption.objects.order_by('order', 'id')
-            ),
-        ).first()
-        if not checklist:
-            messages.warning(request, f"Nenhum checklist encontrado para {target_date.strftime('%d/%m/%Y')}.")
+    def report_error(self, request, error):
+        if error.status == 404:
+            messages.warning(request, error.message)
             return redirect('checklist_daily')
+        return super().report_error(request, error)
 
-        # Tickets Activities
-        date_start = datetime.combine(target_date, datetime.min.time())
-        date_end = datetime.combine(target_date, datetime.max.time())
-        
-        tickets_activities = Ticket.objects.filter(
-            Q(technicians=user) | Q(requester=user),
-            updated_at__range=(date_start, date_end)
-        ).distinct()
-
-        def item_completed(item):
-            template_item = getattr(item, 'template_item', None)
-            if template_item is not None and hasattr(template_item, 'options') and template_item.options.exists():
-                option_values = list(item.option_values.all()) if hasattr(item, 'option_values') else []
-                by_opt_id = {ov.template_option_id: ov for ov in option_values if ov.template_option_id}
-                for opt in template_item.options.all():
-                    if not opt.is_required:
-                        continue
-                    ov = by_opt_id.get(opt.id)
-                    if opt.field_type in ('checkbox', 'switch', 'button'):
-                        if not (ov and ov.value_bool):
-                            return False
-                    else:
-                        if not (ov and (ov.value_text or '').strip()):
-                            return False
-                return bool(item.is_checked) if getattr(item, 'is_required', True) else True
-
-            field_type = getattr(item, 'field_type', None) or 'switch'
-            if field_type == 'group':
-                return True
-            if field_type in ('checkbox', 'switch', 'button'):
-                return bool(item.is_checked)
-            value = (getattr(item, 'value_text', None) or '').strip()
-            if field_type in ('select', 'text'):
-                return value != ''
-            return bool(item.is_checked) or value != ''
-
-        required_items = [i for i in checklist.items.all() if getattr(i, 'is_required', True)]
-        total_items = len([i for i in required_items if (getattr(i, 'field_type', None) or 'switch') != 'group'])
-        checked_items = len([i for i in required_items if (getattr(i, 'field_type', None) or 'switch') != 'group' and item_completed(i)])
-        pending_items = max(total_items - checked_items, 0)
-        activities_count = tickets_activities.count()
-
-        context = {
-            'checklist': checklist,
-            'tickets_activities': tickets_activities,
-            'user': user,
-            'date': target_date,
-            'total_items': total_items,
-            'checked_items': checked_items,
-            'pending_items': pending_items,
-            'activities_count': activities_count,
-            'logo_path': os.path.join(settings.MEDIA_ROOT, 'images', 'logo_jumper.png'),
-        }
-        
-        template_path = 'tickets/checklist_pdf.html'
-        response = HttpResponse(content_type='application/pdf')
-        response['Content-Disposition'] = f'attachment; filename="checklist_{user.username}_{target_date}.pdf"'
-        
-        template = get_template(template_path)
-        html = template.render(context)
-        
-        def link_callback(uri, rel):
-            if uri.startswith('http://') or uri.startswith('https://'):
-                return uri
-            
-            # Handle Static Files
-            if settings.STATIC_URL and uri.startswith(settings.STATIC_URL):
-                path = uri.replace(settings.STATIC_URL, '')
-                absolute_path = finders.find(path)
-                if absolute_path:
-                    return absolute_path
-
-            # Handle Media Files
-            if settings.MEDIA_URL and uri.startswith(settings.MEDIA_URL):
-                path = uri.replace(settings.MEDIA_URL, '')
-                absolute_path = os.path.join(settings.MEDIA_ROOT, path.replace('/', os.sep))
-                if os.path.exists(absolute_path):
-                    return absolute_path
-            
-            # Handle relative paths (fallback)
-            if not uri.startswith('/'):
-                    # Check if it is a media file referenced relatively
-                    if 'media/' in uri:
-                        possible_path = os.path.join(settings.BASE_DIR, uri.replace('/', os.sep))
-                        if os.path.exists(possible_path):
-                            return possible_path
-
-            return uri
-        
-        try:
-            if pisa is None:
-                return HttpResponse('PDF indisponível.', status=500)
-            pisa_status = pisa.CreatePDF(html, dest=response, link_callback=link_callback)
-            if pisa_status.err:
-                return HttpResponse(f'We had some errors <pre>{html}</pre>')
-        except Exception as e:
-            return HttpResponse(f'Error generating PDF: {str(e)}')
-            
-        return response
-
-class TicketsDailyReportPDFView(LoginRequiredMixin, View):
-    def get(self, request, *args, **kwargs):
-        user = request.user
-        role = getattr(getattr(user, 'profile', None), 'role', None)
-
-        date_str = request.GET.get('date')
-        target_date = timezone.localdate()
-        if date_str:
-            try:
-                target_date = datetime.strptime(date_str, '%Y-%m-%d').date()
-            except ValueError:
-                pass
 
-        start_of_day = timezone.make_aware(datetime.combine(target_date, datetime.min.time()))
-        end_of_day = timezone.make_aware(datetime.combine(target_date, datetime.max.time()))
+class TicketsDailyReportPDFView(PdfReportView):
+    kind = 'daily'
 
-        scope = request.GET.get('scope', 'mine')
-        if scope == 'all' and role not in ['admin', 'super_admin']:
-            scope = 'mine'
 
-        tickets_qs = Ticket.objects.select_related('client', 'hub', 'ticket_type').prefetch_related('systems', 'technicians').filter(
-            created_at__range=(start_of_day, end_of_day)
-        )
+class TicketsWeeklyReportPDFView(PdfReportView):
+    kind = 'weekly'
 
-        if scope != 'all':
-            tickets_qs = tickets_qs.filter(Q(technicians=user) | Q(requester=user)).distinct()
 
-        tickets_qs = tickets_qs.order_by('created_at', 'id')
+class TicketsMonthlyReportPDFView(PdfReportView):
+    kind = 'monthly'
 
-        context = {
-            'user': user,
-            'date': target_date,
-            'tickets': tickets_qs,
-            'scope': scope,
-            'logo_path': os.path.join(settings.MEDIA_ROOT, 'images', 'logo_principal.png'),
-            'report_title': 'Relatório Diário de Chamados',
-        }
-
-        template_path = 'tickets/tickets_daily_report_pdf.html'
-        response = HttpResponse(content_type='application/pdf')
-        response['X-Frame-Options'] = 'SAMEORIGIN'
-        download = str(request.GET.get('download') or '').strip() == '1'
-        disposition = 'attachment' if download else 'inline'
-        response['Content-Disposition'] = f'{disposition}; filename="jumperfour_chamados.pdf"'
-
-        template = get_template(template_path)
-        html = template.render(context)
-
-        def link_callback(uri, rel):
-            if uri.startswith('http://') or uri.startswith('https://'):
-                return uri
-
-            if settings.STATIC_URL and uri.startswith(settings.STATIC_URL):
-                path = uri.replace(settings.STATIC_URL, '')
-                absolute_path = finders.find(path)
-                if absolute_path:
-                    return absolute_path
-
-            if settings.MEDIA_URL and uri.startswith(settings.MEDIA_URL):
-                path = uri.replace(settings.MEDIA_URL, '')
-                absolute_path = os.path.join(settings.MEDIA_ROOT, path.replace('/', os.sep))
-                if os.path.exists(absolute_path):
-                    return absolute_path
-
-            if not uri.startswith('/'):
-                if 'media/' in uri:
-                    possible_path = os.path.join(settings.BASE_DIR, uri.replace('/', os.sep))
-                    if os.path.exists(possible_path):
-                        return possible_path
-
-            return uri
-
-        try:
-            if pisa is None:
-                return HttpResponse('PDF indisponível.', status=500)
-            pisa_status = pisa.CreatePDF(html, dest=response, link_callback=link_callback)
-            if pisa_status.err:
-                return HttpResponse(f'We had some errors <pre>{html}</pre>')
-        except Exception as e:
-            return HttpResponse(f'Error generating PDF: {str(e)}')
-
-        return response
-
-
-class TicketsWeeklyReportPDFView(LoginRequiredMixin, View):
-    def get(self, request, *args, **kwargs):
-        week_str = request.GET.get('week')
-        today = timezone.localdate()
-        
-        if week_str:
-            try:
-                year, week_num = map(int, week_str.split('-W'))
-                target_date = datetime.strptime(f'{year}-W{week_num}-1', '%Y-W%W-%w').date()
-            except ValueError:
-                target_date = today
-        else:
-            target_date = today
-        
-        days_to_subtract = (target_date.weekday() + 1) % 7
-        start_week = target_date - timedelta(days=days_to_subtract)
-        end_week = start_week + timedelta(days=6)
-        
-        start_of_week = timezone.make_aware(datetime.combine(start_week, datetime.min.time()))
-        end_of_week = timezone.make_aware(datetime.combine(end_week, datetime.max.time()))
-        
-        tickets_qs = Ticket.objects.select_related('client', 'hub', 'ticket_type').prefetch_related('systems', 'technicians').filter(
-            created_at__range=(start_of_week, end_of_week)
-        ).order_by('created_at', 'id')
-        
-        day_counts = {}
-        for i in range(7):
-            day = start_week + timedelta(days=i)
-            day_start = timezone.make_aware(datetime.combine(day, datetime.min.time()))
-            day_end = timezone.make_aware(datetime.combine(day, datetime.max.time()))
-            count = Ticket.objects.filter(created_at__range=(day_start, day_end)).count()
-            day_counts[day.strftime('%d/%m/%Y')] = count
-        
-        avg_week = sum(day_counts.values()) / len(day_counts) if day_counts else 0
-        
-        context = {
-            'user': request.user,
-            'start_date': start_week,
-            'end_date': end_week,
-            'tickets': tickets_qs,
-            'day_counts': day_counts,
-            'avg_week': round(avg_week, 1),
-            'logo_path': os.path.join(settings.MEDIA_ROOT, 'images', 'logo_principal.png'),
-            'report_title': 'Relatório Semanal de Chamados',
-        }
-        
-        template_path = 'tickets/tickets_weekly_report_pdf.html'
-        response = HttpResponse(content_type='application/pdf')
-        response['X-Frame-Options'] = 'SAMEORIGIN'
-        download = str(request.GET.get('download') or '').strip() == '1'
-        disposition = 'attachment' if download else 'inline'
-        response['Content-Disposition'] = f'{disposition}; filename="jumperfour_chamados_semanal.pdf"'
-        
-        template = get_template(template_path)
-        html = template.render(context)
-        
-        def link_callback(uri, rel):
-            if uri.startswith('http://') or uri.startswith('https://'):
-                return uri
-
-            if settings.STATIC_URL and uri.startswith(settings.STATIC_URL):
-                path = uri.replace(settings.STATIC_URL, '')
-                absolute_path = finders.find(path)
-                if absolute_path:
-                    return absolute_path
-
-            if settings.MEDIA_URL and uri.startswith(settings.MEDIA_URL):
-                path = uri.replace(settings.MEDIA_URL, '')
-                absolute_path = os.path.join(settings.MEDIA_ROOT, path.replace('/', os.sep))
-                if os.path.exists(absolute_path):
-                    return absolute_path
-
-            if not uri.startswith('/'):
-                if 'media/' in uri:
-                    possible_path = os.path.join(settings.BASE_DIR, uri.replace('/', os.sep))
-                    if os.path.exists(possible_path):
-                        return possible_path
-
-            return uri
-        
-        try:
-            if pisa is None:
-                return HttpResponse('PDF indisponível.', status=500)
-            pisa_status = pisa.CreatePDF(html, dest=response, link_callback=link_callback)
-            if pisa_status.err:
-                return HttpResponse(f'We had some errors <pre>{html}</pre>')
-        except Exception as e:
-            return HttpResponse(f'Error generating PDF: {str(e)}')
-        
-        return response
-
-
-class TicketsMonthlyReportPDFView(LoginRequiredMixin, View):
-    def get(self, request, *args, **kwargs):
-        month_str = request.GET.get('month')
-        today = timezone.localdate()
-        
-        if month_str:
-            try:
-                year, month_num = map(int, month_str.split('-'))
-                target_date = datetime(year, month_num, 1).date()
-            except ValueError:
-                target_date = today
-        else:
-            target_date = today
-        
-        start_month = target_date.replace(day=1)
-        if start_month.month == 12:
-            end_month = start_month.replace(year=start_month.year+1, day=1) - timedelta(days=1)
-        else:
-            end_month = start_month.replace(month=start_month.month+1, day=1) - timedelta(days=1)
-        
-        start_of_month = timezone.make_aware(datetime.combine(start_month, datetime.min.time()))
-        end_of_month = timezone.make_aware(datetime.combine(end_month, datetime.max.time()))
-        
-        tickets_qs = Ticket.objects.select_related('client', 'hub', 'ticket_type').prefetch_related('systems', 'technicians').filter(
-            created_at__range=(start_of_month, end_of_month)
-        ).order_by('created_at', 'id')
-        
-        day_counts = {}
-        day = start_month
-        while day <= end_month:
-            day_start = timezone.make_aware(datetime.combine(day, datetime.min.time()))
-            day_end = timezone.make_aware(datetime.combine(day, datetime.max.time()))
-            count = Ticket.objects.filter(created_at__range=(day_start, day_end)).count()
-            day_counts[day.strftime('%d/%m/%Y')] = count
-            day += timedelta(days=1)
-        
-        avg_day = sum(day_counts.values()) / len(day_counts) if day_counts else 0
-        
-        week_counts = {}
-        current_week = 1
-        current_week_count = 0
-        for i, (day_str, count) in enumerate(day_counts.items()):
-            current_week_count += count
-            if (i + 1) % 7 == 0 or i == len(day_counts) - 1:
-                week_counts[f'Semana {current_week}'] = current_week_count
-                current_week += 1
-                current_week_count = 0
-        
-        avg_week = sum(week_counts.values()) / len(week_counts) if week_counts else 0
-        
-        client_counts = {}
-        for ticket in tickets_qs:
-            client_name = ticket.client.name
-            if client_name in client_counts:
-                client_counts[client_name] += 1
-            else:
-                client_counts[client_name] = 1
-        
-        avg_month = sum(client_counts.values()) / len(client_counts) if client_counts else 0
-        
-        context = {
-            'user': request.user,
-            'month': start_month,
-            'tickets': tickets_qs,
-            'day_counts': day_counts,
-            'avg_day': round(avg_day, 1),
-            'week_counts': week_counts,
-            'avg_week': round(avg_week, 1),
-            'client_counts': client_counts,
-            'avg_month': round(avg_month, 1),
-            'logo_path': os.path.join(settings.MEDIA_ROOT, 'images', 'logo_principal.png'),
-            'report_title': 'Relatório Mensal de Chamados',
-        }
-        
-        template_path = 'tickets/tickets_monthly_report_pdf.html'
-        response = HttpResponse(content_type='application/pdf')
-        response['X-Frame-Options'] = 'SAMEORIGIN'
-        download = str(request.GET.get('download') or '').strip() == '1'
-        disposition = 'attachment' if download else 'inline'
-        response['Content-Disposition'] = f'{disposition}; filename="jumperfour_chamados_mensal.pdf"'
-        
-        template = get_template(template_path)
-        html = template.render(context)
-        
-        def link_callback(uri, rel):
-            if uri.startswith('http://') or uri.startswith('https://'):
-                return uri
-
-            if settings.STATIC_URL and uri.startswith(settings.STATIC_URL):
-                path = uri.replace(settings.STATIC_URL, '')
-                absolute_path = finders.find(path)
-                if absolute_path:
-                    return absolute_path
-
-            if settings.MEDIA_URL and uri.startswith(settings.MEDIA_URL):
-                path = uri.replace(settings.MEDIA_URL, '')
-                absolute_path = os.path.join(settings.MEDIA_ROOT, path.replace('/', os.sep))
-                if os.path.exists(absolute_path):
-                    return absolute_path
-
-            if not uri.startswith('/'):
-                if 'media/' in uri:
-                    possible_path = os.path.join(settings.BASE_DIR, uri.replace('/', os.sep))
-                    if os.path.exists(possible_path):
-                        return possible_path
-
-            return uri
-        
-        try:
-            if pisa is None:
-                return HttpResponse('PDF indisponível.', status=500)
-            pisa_status = pisa.CreatePDF(html, dest=response, link_callback=link_callback)
-            if pisa_status.err:
-                return HttpResponse(f'We had some errors <pre>{html}</pre>')
-        except Exception as e:
-            return HttpResponse(f'Error generating PDF: {str(e)}')
-        
-        return response
 
 
 class TicketsDailyReportViewerView(LoginRequiredMixin, TemplateView):
@@ -5668,21 +5265,48 @@ class TicketsDailyReportViewerView(LoginRequiredMixin, TemplateView):
         return context
 
 
-class TicketPDFStatusView(LoginRequiredMixin, View):
-    def get(self, request, pk, *args, **kwargs):
-        if pisa is None:
-            return JsonResponse({'ok': False, 'message': 'PDF indisponível.'}, status=200)
-        exists = Ticket.objects.filter(pk=pk).exists()
-        if not exists:
-            return JsonResponse({'ok': False, 'message': 'OS não encontrada.'}, status=200)
-        return JsonResponse({'ok': True})
+class TicketPDFStatusView(PdfReportStatusView):
+    kind = 'ticket'
+    pdf_url_name = 'ticket_pdf'
 
 
-class TicketsDailyReportPDFStatusView(LoginRequiredMixin, View):
-    def get(self, request, *args, **kwargs):
-        if pisa is None:
-            return JsonResponse({'ok': False, 'message': 'PDF indisponível.'}, status=200)
-        return JsonResponse({'ok': True})
+class TicketsDailyReportPDFStatusView(PdfReportStatusView):
+    kind = 'daily'
+    pdf_url_name = 'tickets_daily_pdf'
+
+
+class TicketsWeeklyReportPDFStatusView(PdfReportStatusView):
+    kind = 'weekly'
+    pdf_url_name = 'tickets_weekly_report_view'
+
+
+class TicketsMonthlyReportPDFStatusView(PdfReportStatusView):
+    kind = 'monthly'
+    pdf_url_name = 'tickets_monthly_report_view'
+
+
+class ChecklistPDFStatusView(PdfReportStatusView):
+    kind = 'checklist'
+    pdf_url_name = 'checklist_pdf'
+
+
+class TicketsWeeklyReportViewerView(PdfReportViewerView):
+    title = 'Relatório Semanal de Chamados'
+    pdf_url_name = 'tickets_weekly_report_view'
+    status_url_name = 'tickets_weekly_pdf_status'
+
+
+class TicketsMonthlyReportViewerView(PdfReportViewerView):
+    title = 'Relatório Mensal de Chamados'
+    pdf_url_name = 'tickets_monthly_report_view'
+    status_url_name = 'tickets_monthly_pdf_status'
+
+
+class ChecklistPDFViewerView(PdfReportViewerView):
+    title = 'Checklist Diário'
+    pdf_url_name = 'checklist_pdf'
+    status_url_name = 'checklist_pdf_status'
+
 
 class ChecklistItemDetailAddView(LoginRequiredMixin, View):
     def post(self, request, item_id):
@@ -5843,11 +5467,7 @@ class LocalView(LoginRequiredMixin, TemplateView):
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        technicians = (
-            User.objects.filter(is_active=True, profile__role__in=['technician', 'standard'])
-            .select_related('profile')
-            .order_by('first_name', 'username')
-        )
+        technicians = technician_agenda.local_technicians()
 
         technician_cards = []
         for tech in technicians:
@@ -5876,147 +5496,54 @@ class LocalView(LoginRequiredMixin, TemplateView):
         return context
 
 
+def _parse_agenda_date(value, default):
+    if value:
+        try:
+            return datetime.strptime(value, '%Y-%m-%d').date()
+        except ValueError:
+            pass
+    return default
+
+
 class LocalAgendaAPIView(LoginRequiredMixin, View):
+    """GET /local/agenda/<id>/?date=YYYY-MM-DD — agenda de um técnico num dia (technician_agenda.py)."""
+
     def get(self, request, technician_id):
         tech = get_object_or_404(User, pk=technician_id, is_active=True)
-        profile = getattr(tech, 'profile', None)
+        target_date = _parse_agenda_date(request.GET.get('date'), timezone.localdate())
+        payload = technician_agenda.agendas([tech.id], target_date, target_date)[0]
+        return JsonResponse(payload, safe=False)
 
-        date_str = request.GET.get('date')
-        target_date = timezone.localdate()
-        if date_str:
-            try:
-                target_date = datetime.strptime(date_str, '%Y-%m-%d').date()
-            except ValueError:
-                target_date = timezone.localdate()
 
-        tz = timezone.get_current_timezone()
-        day_start = timezone.make_aware(datetime.combine(target_date, datetime.min.time()), tz)
-        day_end = timezone.make_aware(datetime.combine(target_date, datetime.max.time()), tz)
+class LocalAgendaBatchAPIView(LoginRequiredMixin, View):
+    """
+    GET /local/agenda/?date=YYYY-MM-DD[&date_to=YYYY-MM-DD][&ids=1,2,3] — agendas
+    de vários técnicos (todos os da tela "Local" sem `ids`) para cada dia do
+    intervalo, numa chamada só. Cada item de "agendas" tem o mesmo formato da
+    resposta de LocalAgendaAPIView.
+    """
 
-        tickets_qs = Ticket.objects.filter(technicians=tech).exclude(status='canceled')
-        tickets_for_day = (
-            tickets_qs.filter(
-                (Q(start_date__isnull=False) & Q(start_date__lte=day_end) & (Q(deadline__gte=day_start) | Q(deadline__isnull=True))) |
-                (Q(start_date__isnull=True) & Q(deadline__range=(day_start, day_end)))
+    def get(self, request):
+        date_from = _parse_agenda_date(request.GET.get('date'), timezone.localdate())
+        date_to = _parse_agenda_date(request.GET.get('date_to'), date_from)
+        if date_to < date_from:
+            return JsonResponse({'error': 'date_to anterior a date.'}, status=400)
+        if (date_to - date_from).days + 1 > technician_agenda.MAX_RANGE_DAYS:
+            return JsonResponse(
+                {'error': f'Intervalo máximo de {technician_agenda.MAX_RANGE_DAYS} dias.'}, status=400
             )
-            .select_related('client', 'hub', 'ticket_type')
-            .prefetch_related('systems')
-            .order_by('created_at')
-        )
-
-        travels_for_day = (
-            TechnicianTravel.objects.filter(technician=tech, scheduled_date__range=(day_start, day_end))
-            .select_related('client', 'hub', 'system', 'service_order')
-            .prefetch_related('segments')
-            .order_by('scheduled_date')
-        )
 
-        def fmt_dt(value, with_time=False):
-            if not value:
-                return None
-            if with_time:
-                return timezone.localtime(value).strftime('%d/%m/%Y %H:%M')
-            return timezone.localtime(value).strftime('%d/%m/%Y')
-
-        def fmt_time(value):
-            if not value:
-                return None
-            return timezone.localtime(value).strftime('%H:%M')
-
-        def fmt_duration(value):
-            if not value:
-                return None
-            total_minutes = int(value.total_seconds() // 60)
-            hours = total_minutes // 60
-            minutes = total_minutes % 60
-            return f"{hours}:{minutes:02d}"
-
-        items = []
-        location_counts = defaultdict(int)
-        total_estimated_minutes = 0
-
-        for t in tickets_for_day:
-            hub_name = t.hub.name if t.hub else None
-            location_label = f"{t.client.name} - {hub_name}" if hub_name else t.client.name
-            location_counts[location_label] += 1
-
-            estimated = fmt_duration(t.estimated_time) or t.calculated_hours
-            if t.estimated_time:
-                total_estimated_minutes += int(t.estimated_time.total_seconds() // 60)
-
-            systems_names = ", ".join(system.name for system in t.systems.all()) or "-"
-
-            items.append({
-                'kind': 'os',
-                'id': t.id,
-                'label': t.leankeep_id or t.formatted_id,
-                'status': t.get_status_display(),
-                'status_code': t.status,
-                'client': t.client.name,
-                'hub': hub_name,
-                'location': location_label,
-                'systems': systems_names,
-                'estimated_time': estimated,
-                'start_time': fmt_time(t.start_date),
-                'deadline_time': fmt_time(t.deadline),
-                'url': reverse('ticket_detail', args=[t.id]),
-                'description': (t.description or '')[:160],
-                'created_at': timezone.localtime(t.created_at).isoformat(),
-            })
-
-        for tr in travels_for_day:
-            hub_name = tr.hub.name if tr.hub else None
-            location_label = f"{tr.client.name} - {hub_name}" if hub_name else tr.client.name
-            location_counts[location_label] += 1
-
-            segment = tr.segments.all().first()
-            travel_payload = {
-                'segment_exists': bool(segment),
-                'transport_type': segment.get_transport_type_display() if segment else None,
-                'carrier': segment.carrier if segment else None,
-                'transport_number': segment.transport_number if segment else None,
-                'locator': segment.locator if segment else None,
-                'departure': fmt_dt(segment.departure_time, with_time=True) if segment else fmt_dt(tr.departure_time, with_time=True),
-                'arrival': fmt_dt(segment.arrival_time, with_time=True) if segment else fmt_dt(tr.arrival_time, with_time=True),
-            }
-
-            items.append({
-                'kind': 'agendamento',
-                'id': tr.id,
-                'client': tr.client.name,
-                'hub': hub_name,
-                'location': location_label,
-                'status': tr.get_status_display(),
-                'status_code': tr.status,
-                'scheduled_at': fmt_dt(tr.scheduled_date, with_time=True),
-                'system': tr.system.name if tr.system else None,
-                'service_order': tr.service_order.leankeep_id if tr.service_order and tr.service_order.leankeep_id else (tr.service_order.formatted_id if tr.service_order else None),
-                'travel': travel_payload,
-                'url': reverse('travel_detail', args=[tr.id]),
-            })
-
-        primary_location = None
-        if location_counts:
-            primary_location = sorted(location_counts.items(), key=lambda x: (-x[1], x[0]))[0][0]
-        elif profile and profile.technician_type == 'fixo' and profile.fixed_client:
-            primary_location = f"{profile.fixed_client.name} - {profile.fixed_hub.name}" if profile.fixed_hub else profile.fixed_client.name
-
-        total_estimated = None
-        if total_estimated_minutes > 0:
-            total_estimated = f"{total_estimated_minutes // 60}:{total_estimated_minutes % 60:02d}"
+        technician_ids = None
+        raw_ids = (request.GET.get('ids') or '').strip()
+        if raw_ids:
+            try:
+                technician_ids = [int(value) for value in raw_ids.split(',') if value.strip()]
+            except ValueError:
+                return JsonResponse({'error': 'ids inválidos.'}, status=400)
 
         return JsonResponse({
-            'technician': {
-                'id': tech.id,
-                'name': tech.get_full_name() or tech.username,
-            },
-            'date': target_date.strftime('%Y-%m-%d'),
-            'date_label': target_date.strftime('%d/%m/%Y'),
-            'summary': {
-                'primary_location': primary_location,
-                'total_estimated_time': total_estimated,
-                'items_count': len(items),
-            },
-            'items': items,
-        }, safe=False)
+            'date_from': date_from.strftime('%Y-%m-%d'),
+            'date_to': date_to.strftime('%Y-%m-%d'),
+            'agendas': technician_agenda.agendas(technician_ids, date_from, date_to),
+        })
 
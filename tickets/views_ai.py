@@ -6,16 +6,17 @@ import logging
 import re
 import time
 from django.contrib.auth.mixins import LoginRequiredMixin
-from django.http import JsonResponse
+from django.http import JsonResponse, StreamingHttpResponse
 from django.views import View
 from django.views.decorators.csrf import csrf_exempt
 from django.utils.decorators import method_decorator
 from django.utils import timezone
 
-from .models import SystemSettings, AIProviderConfig, AIChatSession, AIChatMessage, AIUserMemory
-from .ai_service import run_agent
-from .ai_tools import TOOL_DEFINITIONS, SYSTEM_PROMPT, execute_tool
-from .speech_formatter import SpeechFormatter
+from .models import AIProviderConfig, AIChatSession, AIChatMessage, AIUserMemory
+from . import ai_context, ai_tool_router, config_cache
+from .ai_service import run_agent, stream_agent
+from .ai_tools import PARALLEL_SAFE_TOOLS, execute_tool
+from .speech_formatter import SpeechFormatter, SpeechStream
 
 logger = logging.getLogger(__name__)
 
@@ -52,14 +53,54 @@ def _is_read_aloud_request(text):
     return bool(_READ_ALOUD_RE.search(text or ""))
 
 
+def _wants_stream(request):
+    """O widget pede o modo streaming (SSE) com `Accept: text/event-stream`."""
+    return 'text/event-stream' in request.headers.get('Accept', '')
+
+
+def _sse(event_type, data):
+    return f'event: {event_type}\ndata: {json.dumps(data)}\n\n'
+
+
+def _speech_payload(formatted):
+    return {
+        "chunks": formatted.chunks,
+        "is_truncated": formatted.is_truncated,
+        "estimated_seconds": formatted.estimated_seconds,
+    }
+
+
+def _compact_history(session, config):
+    try:
+        ai_context.compact_if_needed(session, config)
+    except Exception as e:
+        logger.error("Erro ao resumir o histórico da sessão %s: %s", session.pk, e)
+
+
+class _JsonResponseThen(JsonResponse):
+    """
+    JsonResponse que chama `after()` em close() — o servidor WSGI chama
+    close() depois de enviar o corpo, então o cliente não espera por `after`.
+    """
+
+    def __init__(self, data, after, **kwargs):
+        super().__init__(data, **kwargs)
+        self._after = after
+
+    def close(self):
+        try:
+            super().close()
+        finally:
+            self._after()
+
+
 def _get_settings():
-    obj, _ = SystemSettings.objects.get_or_create(pk=1)
-    return obj
+    return config_cache.get_system_settings()
 
 
 def _get_active_ai_config():
     """Retorna a AIProviderConfig marcada como ativa, ou None se nenhuma estiver cadastrada/ativa."""
-    return AIProviderConfig.objects.filter(is_active=True).first()
+    return config_cache.get_active_ai_config()
 
 
 class AIChatView(LoginRequiredMixin, View):
@@ -147,15 +188,12 @@ class AIChatView(LoginRequiredMixin, View):
         if not is_proactive_check:
             AIChatMessage.objects.create(session=session, role='user', content=user_message, audio=audio_file)
 
-        # Monta histórico para enviar ao modelo (últimas 20 mensagens para não estourar contexto)
-        history = list(
-            session.messages.order_by('created_at').values('role', 'content')
-        )
-        # Remove mensagens de role 'tool' do histórico visível — são internas
-        visible_history = [m for m in history if m['role'] in ('user', 'assistant')]
+        # Histórico para o modelo: só as mensagens de usuário/assistente ainda não
+        # resumidas (as antigas vão no resumo da sessão — ver ai_context.py).
+        history = ai_context.load_history(session)
 
         first_name = (request.user.first_name or request.user.username).split()[0]
-        is_new_conversation = len(visible_history) <= 1
+        is_new_conversation = len(history) <= 1 and not session.digest
         now_local = timezone.localtime(timezone.now())
         current_hour = now_local.hour
         weekday_name = _WEEKDAYS_PT[now_local.weekday()]
@@ -185,9 +223,10 @@ class AIChatView(LoginRequiredMixin, View):
                     "ou soletrar o trecho específico que ficou confuso."
                 )
 
-        system_with_user = (
-            SYSTEM_PROMPT
-            + f"\n\nUSUÁRIO ATUAL: {first_name}. Use o primeiro nome dele ocasionalmente para tornar a conversa mais natural — não em todas as mensagens, apenas em perguntas, confirmações ou quando fizer sentido humanizar."
+        # Contexto deste turno — vai depois do SYSTEM_PROMPT, que fica idêntico entre
+        # turnos para o cache de prompt dos providers.
+        turn_context = (
+            f"USUÁRIO ATUAL: {first_name}. Use o primeiro nome dele ocasionalmente para tornar a conversa mais natural — não em todas as mensagens, apenas em perguntas, confirmações ou quando fizer sentido humanizar."
             + (f"\n\nMEMÓRIA SOBRE ESTE USUÁRIO (aprendida em conversas anteriores):\n{memory_notes}" if memory_notes else "")
             + (
                 f"\n\nDATA E HORA ATUAL DO SISTEMA: {weekday_name}, {now_local.strftime('%d/%m/%Y')} às "
@@ -208,10 +247,7 @@ class AIChatView(LoginRequiredMixin, View):
             + voice_note
         )
 
-        messages = [{"role": "system", "content": system_with_user}] + [
-            {"role": m["role"], "content": m["content"]}
-            for m in visible_history[-20:]
-        ]
+        messages = ai_context.build_messages(turn_context, session.digest, history)
 
         if is_proactive_check:
             attempt_number = 1
@@ -243,7 +279,10 @@ class AIChatView(LoginRequiredMixin, View):
         _open_private_chat  = {"value": None}
         _navigate_url       = {"value": None}
 
+        _used_tools         = []
+
         def tool_executor(tool_name, args):
+            _used_tools.append(tool_name)
             result = execute_tool(tool_name, args, request.user)
             if result.get("clear_chat"):
                 _clear_requested["value"] = True
@@ -269,54 +308,116 @@ class AIChatView(LoginRequiredMixin, View):
                 _navigate_url["value"] = data.get("url")
             return result
 
-        # Chama o agente
-        response_text = run_agent(active_ai_config, messages, TOOL_DEFINITIONS, tool_executor, expose_errors=is_admin_user)
-
-        if _clear_requested["value"]:
-            # Apaga TODAS as sessões antigas do usuário (incluindo a atual, que
-            # já cumpriu seu papel nesta requisição) e começa uma sessão nova
-            # em folha — evita gravar na sessão que acabou de ser removida.
-            AIChatSession.objects.filter(user=request.user).delete()
-            session = AIChatSession.objects.create(user=request.user, title="Nova conversa")
-            AIChatMessage.objects.create(session=session, role='assistant', content=response_text)
-        else:
-            # Salva resposta do assistente
-            AIChatMessage.objects.create(session=session, role='assistant', content=response_text)
+        # Só as tools do assunto da conversa (ver ai_tool_router.py).
+        recent_texts = [m["content"] for m in messages[2:]][-(ai_tool_router.RECENT_MESSAGES + 1):]
+        turn_tools = ai_tool_router.select_tools(
+            getattr(user_profile, 'role', None), recent_texts, session.used_tools,
+        )
 
-            # Atualiza título da sessão se for a primeira resposta
-            if user_message and session.messages.count() <= 2:
-                session.title = user_message[:80]
-                session.save(update_fields=['title', 'updated_at'])
+        speak_full = not is_proactive_check and _is_read_aloud_request(user_message)
+
+        def save_response(response_text):
+            """Grava a resposta e devolve o payload do endpoint (sem 'speech')."""
+            nonlocal session
+            if _clear_requested["value"]:
+                # Apaga TODAS as sessões antigas do usuário (incluindo a atual, que
+                # já cumpriu seu papel nesta requisição) e começa uma sessão nova
+                # em folha — evita gravar na sessão que acabou de ser removida.
+                AIChatSession.objects.filter(user=request.user).delete()
+                session = AIChatSession.objects.create(user=request.user, title="Nova conversa")
+                AIChatMessage.objects.create(session=session, role='assistant', content=response_text)
             else:
-                session.save(update_fields=['updated_at'])
+                # Salva resposta do assistente
+                AIChatMessage.objects.create(session=session, role='assistant', content=response_text)
+
+                # Atualiza título da sessão se for a primeira resposta
+                if user_message and is_new_conversation:
+                    session.title = user_message[:80]
+                    session.save(update_fields=['title', 'updated_at'])
+                else:
+                    session.save(update_fields=['updated_at'])
+                ai_tool_router.remember_used_tools(session, _used_tools)
+
+            return {
+                "ok": True,
+                "session_id": session.id,
+                "response": response_text,
+                "clear_chat": _clear_requested["value"],
+                "new_ticket_id": _new_ticket["id"],
+                "new_ticket_formatted_id": _new_ticket["formatted_id"],
+                "updated_ticket_id": _updated_ticket_id["value"],
+                "ticket_list_changed": _list_changed["value"],
+                "open_private_chat": _open_private_chat["value"],
+                "navigate_url": _navigate_url["value"],
+            }
+
+        if _wants_stream(request):
+            def event_stream():
+                # Mesmo fluxo do modo JSON abaixo, mas repassando os tokens e o
+                # progresso das tools conforme chegam; a fala começa pelas frases
+                # já completas (SpeechStream) e o evento "done" traz o mesmo
+                # payload da resposta JSON.
+                try:
+                    speech = SpeechStream(SpeechFormatter(), speak_full=speak_full)
+                except Exception as e:
+                    logger.error("Erro ao formatar resposta para fala: %s", e)
+                    speech = None
+                response_text = ""
+                for event in stream_agent(active_ai_config, messages, turn_tools, tool_executor,
+                                          expose_errors=is_admin_user, parallel_tools=PARALLEL_SAFE_TOOLS):
+                    if event["type"] == "done":
+                        response_text = event["text"]
+                        continue
+                    yield _sse(event["type"], event)
+                    if speech is None:
+                        continue
+                    try:
+                        if event["type"] == "tool" and event["status"] == "start":
+                            speech.reset()
+                        elif event["type"] == "token":
+                            chunks = speech.feed(event["text"])
+                            if chunks:
+                                yield _sse("speech", {"chunks": chunks})
+                    except Exception as e:
+                        logger.error("Erro ao formatar resposta para fala: %s", e)
+                        speech = None
+
+                payload = save_response(response_text)
+                payload["speech"] = None
+                if speech is not None:
+                    try:
+                        payload["speech"] = _speech_payload(speech.finish(response_text))
+                    except Exception as e:
+                        logger.error("Erro ao formatar resposta para fala: %s", e)
+                logger.info("POST /ai/chat/ (stream) concluído em %.2fs", time.perf_counter() - t0)
+                yield _sse("done", payload)
+                # Depois do "done": o usuário já tem a resposta quando o resumo roda.
+                _compact_history(session, active_ai_config)
+
+            response = StreamingHttpResponse(event_stream(), content_type='text/event-stream')
+            response['Cache-Control'] = 'no-cache'
+            # nginx: repassa cada evento na hora, sem acumular em buffer.
+            response['X-Accel-Buffering'] = 'no'
+            return response
+
+        # Chama o agente
+        response_text = run_agent(active_ai_config, messages, turn_tools, tool_executor,
+                                  expose_errors=is_admin_user, parallel_tools=PARALLEL_SAFE_TOOLS)
+        payload = save_response(response_text)
 
         speech_payload = None
         try:
-            speak_full = not is_proactive_check and _is_read_aloud_request(user_message)
             formatted = SpeechFormatter().format(response_text, speak_full=speak_full)
-            speech_payload = {
-                "chunks": formatted.chunks,
-                "is_truncated": formatted.is_truncated,
-                "estimated_seconds": formatted.estimated_seconds,
-            }
+            speech_payload = _speech_payload(formatted)
         except Exception as e:
             logger.error("Erro ao formatar resposta para fala: %s", e)
 
         logger.info("POST /ai/chat/ concluído em %.2fs", time.perf_counter() - t0)
-
-        return JsonResponse({
-            "ok": True,
-            "session_id": session.id,
-            "response": response_text,
-            "speech": speech_payload,
-            "clear_chat": _clear_requested["value"],
-            "new_ticket_id": _new_ticket["id"],
-            "new_ticket_formatted_id": _new_ticket["formatted_id"],
-            "updated_ticket_id": _updated_ticket_id["value"],
-            "ticket_list_changed": _list_changed["value"],
-            "open_private_chat": _open_private_chat["value"],
-            "navigate_url": _navigate_url["value"],
-        })
+        # Como no modo stream, o resumo roda depois que o usuário já tem a resposta.
+        return _JsonResponseThen(
+            {**payload, "speech": speech_payload},
+            after=lambda: _compact_history(session, active_ai_config),
+        )
 
 
 class AIChatProactiveCheckView(LoginRequiredMixin, View):
@@ -6,16 +6,18 @@ import json
 import re
 from django.contrib.auth.models import User as DjangoUser
 from django.contrib.auth.mixins import LoginRequiredMixin
-from django.db.models import Q
+from django.db.models import Count, IntegerField, OuterRef, Q, Subquery, Sum
+from django.db.models.functions import Coalesce
 from django.http import JsonResponse
 from django.utils import timezone
 from django.views import View
 
 from .models import (
-    ActiveSession, PrivateChatThread, PrivateChatMessage, PrivateChatReadState, SystemSettings, AIProviderConfig,
+    ActiveSession, PrivateChatThread, PrivateChatMessage, PrivateChatReadState,
 )
+from . import ai_tool_router, config_cache, presence
 from .ai_service import run_agent
-from .ai_tools import TOOL_DEFINITIONS, SYSTEM_PROMPT, execute_tool
+from .ai_tools import PARALLEL_SAFE_TOOLS, SYSTEM_PROMPT, execute_tool
 
 # Detecta menções ao robô dentro de uma conversa particular ("Jota4", "jota 4", "J4")
 _JOTA4_MENTION_RE = re.compile(r'\bjota\s*4\b|\bj4\b', re.IGNORECASE)
@@ -50,6 +52,60 @@ def _visible_messages(thread, user, limit):
     return list(qs[:limit])
 
 
+def _threads_with_summary(user):
+    """
+    Conversas do usuário já com o resumo que o poll e a lista de contatos usam,
+    tudo numa query só (subqueries correlacionadas no índice thread+id):
+    last_read, unread_count, última mensagem não lida (latest_unread_*) e última
+    mensagem da conversa (last_content). O status da outra pessoa vem do mapa de
+    presença (presence.py), sem consultar sessão por conversa.
+    """
+    messages = PrivateChatMessage.objects.filter(thread=OuterRef('pk')).order_by('-id')
+    unread = messages.filter(id__gt=OuterRef('last_read')).exclude(sender=user)
+    return (
+        PrivateChatThread.objects.filter(Q(user_a=user) | Q(user_b=user))
+        .select_related('user_a', 'user_b')
+        .annotate(
+            last_read=Coalesce(
+                Subquery(
+                    PrivateChatReadState.objects.filter(thread=OuterRef('pk'), user=user)
+                    .values('last_read_message_id')[:1]
+                ),
+                0,
+            ),
+            unread_count=Coalesce(
+                Subquery(
+                    unread.order_by().values('thread').annotate(n=Count('id')).values('n'),
+                    output_field=IntegerField(),
+                ),
+                0,
+            ),
+            latest_unread_content=Subquery(unread.values('content')[:1]),
+            latest_unread_is_ai=Subquery(unread.values('is_ai_message')[:1]),
+            last_content=Subquery(messages.values('content')[:1]),
+        )
+    )
+
+
+def _poll_cursor(user):
+    """
+    Marca do estado do chat particular do usuário: última mensagem em qualquer
+    conversa dele + soma dos "lido até". Se não mudou, o resultado do poll também
+    não mudou — é o que deixa o poll vazio (o caso comum) custar uma query.
+    """
+    row = DjangoUser.objects.filter(pk=user.pk).values(
+        last_message=Subquery(
+            PrivateChatMessage.objects.filter(Q(thread__user_a=user) | Q(thread__user_b=user))
+            .order_by('-id').values('id')[:1]
+        ),
+        read_sum=Subquery(
+            PrivateChatReadState.objects.filter(user=user).order_by()
+            .values('user').annotate(total=Sum('last_read_message_id')).values('total')
+        ),
+    ).first() or {}
+    return f"{row.get('last_message') or 0}.{row.get('read_sum') or 0}"
+
+
 def _clear_private_chat_for_user(thread, user):
     read_state, _ = PrivateChatReadState.objects.get_or_create(thread=thread, user=user)
     last_msg = thread.messages.order_by('-created_at').first()
@@ -78,11 +134,11 @@ def _generate_ai_reply(thread, summoned_by):
     """Chama o Jota4 no papel de 'ouvinte' de uma conversa particular — só é
     acionado quando alguém o menciona pelo nome dentro do chat.
     Retorna (mensagem_criada_ou_None, limpou_o_chat: bool)."""
-    settings_obj, _ = SystemSettings.objects.get_or_create(pk=1)
+    settings_obj = config_cache.get_system_settings()
     if not settings_obj.ai_enabled:
         return None, False
 
-    active_ai_config = AIProviderConfig.objects.filter(is_active=True).first()
+    active_ai_config = config_cache.get_active_ai_config()
     if not active_ai_config:
         return None, False
 
@@ -131,9 +187,13 @@ def _generate_ai_reply(thread, summoned_by):
 
     summoner_profile = getattr(summoned_by, 'profile', None)
     is_admin_summoner = summoner_profile and summoner_profile.role in ('admin', 'super_admin')
+    turn_tools = ai_tool_router.select_tools(
+        getattr(summoner_profile, 'role', None),
+        [m.content for m in recent[-(ai_tool_router.RECENT_MESSAGES + 1):]],
+    )
     response_text = run_agent(
-        active_ai_config, messages, TOOL_DEFINITIONS + [_CLEAR_PRIVATE_CHAT_TOOL], tool_executor,
-        expose_errors=is_admin_summoner,
+        active_ai_config, messages, turn_tools + [_CLEAR_PRIVATE_CHAT_TOOL], tool_executor,
+        expose_errors=is_admin_summoner, parallel_tools=PARALLEL_SAFE_TOOLS,
     )
     if not response_text:
         return None, _cleared["value"]
@@ -156,30 +216,18 @@ class PrivateChatContactsView(LoginRequiredMixin, View):
     """
 
     def get(self, request):
-        threads = PrivateChatThread.objects.filter(
-            Q(user_a=request.user) | Q(user_b=request.user)
-        ).select_related('user_a', 'user_b')
-
-        read_states = {
-            rs.thread_id: rs.last_read_message_id
-            for rs in PrivateChatReadState.objects.filter(thread__in=threads, user=request.user)
-        }
-
         existing_user_ids = set()
         thread_contacts = []
-        for thread in threads:
+        for thread in _threads_with_summary(request.user):
             other = thread.other_user(request.user)
             existing_user_ids.add(other.id)
-            last_read = read_states.get(thread.id, 0)
-            unread_count = thread.messages.filter(id__gt=last_read).exclude(sender=request.user).count()
-            last_msg = thread.messages.order_by('-created_at').first()
             thread_contacts.append({
                 "user_id": other.id,
                 "name": other.get_full_name() or other.username,
-                "status": ActiveSession.get_status(other),
+                "status": presence.status(other.id),
                 "thread_id": thread.id,
-                "unread_count": unread_count,
-                "preview": (last_msg.content or "")[:80] if last_msg else "",
+                "unread_count": thread.unread_count,
+                "preview": (thread.last_content or "")[:80],
             })
         thread_contacts.sort(key=lambda c: (-c["unread_count"], c["name"].lower()))
 
@@ -312,38 +360,30 @@ class PrivateChatSendView(LoginRequiredMixin, View):
 
 class PrivateChatPollView(LoginRequiredMixin, View):
     """
-    GET /chat/private/poll/ — poll leve (sem LLM): para cada conversa do usuário,
-    informa se há mensagens novas (de outra pessoa ou do Jota4) desde a última vez
-    que ele viu, para o front-end decidir se abre/pisca um popup.
+    GET /chat/private/poll/?cursor=X — poll leve (sem LLM): para cada conversa do
+    usuário, informa se há mensagens novas (de outra pessoa ou do Jota4) desde a
+    última vez que ele viu, para o front-end decidir se abre/pisca um popup.
+
+    A resposta traz um `cursor`; se o front-end o devolve e nada mudou desde
+    então, responde só {"unchanged": true} sem montar a lista.
     """
 
     def get(self, request):
-        threads = PrivateChatThread.objects.filter(
-            Q(user_a=request.user) | Q(user_b=request.user)
-        ).select_related('user_a', 'user_b')
-
-        read_states = {
-            rs.thread_id: rs.last_read_message_id
-            for rs in PrivateChatReadState.objects.filter(thread__in=threads, user=request.user)
-        }
+        cursor = _poll_cursor(request.user)
+        if request.GET.get("cursor") == cursor:
+            return JsonResponse({"ok": True, "unchanged": True, "cursor": cursor})
 
         result = []
-        for thread in threads:
-            last_read = read_states.get(thread.id, 0)
-            new_qs = thread.messages.filter(id__gt=last_read).exclude(sender=request.user)
-            unread_count = new_qs.count()
-            if unread_count == 0:
-                continue
-            latest = new_qs.order_by('-created_at').first()
+        for thread in _threads_with_summary(request.user).filter(unread_count__gt=0):
             other = thread.other_user(request.user)
             result.append({
                 "thread_id": thread.id,
                 "other_user_id": other.id,
                 "other_user_name": other.get_full_name() or other.username,
-                "status": ActiveSession.get_status(other),
-                "unread_count": unread_count,
-                "preview": (latest.content or "")[:120],
-                "is_ai_message": latest.is_ai_message,
+                "status": presence.status(other.id),
+                "unread_count": thread.unread_count,
+                "preview": (thread.latest_unread_content or "")[:120],
+                "is_ai_message": bool(thread.latest_unread_is_ai),
             })
 
-        return JsonResponse({"ok": True, "data": result})
+        return JsonResponse({"ok": True, "data": result, "cursor": cursor})
@@ -0,0 +1,51 @@
+"""
+Endpoint SSE do canal em tempo real (ver realtime.py).
+
+Precisa de servidor ASGI (conexão longa, sem prender worker) e de um pub/sub
+que alcance os outros processos (realtime.can_stream). Sem isso responde 204 —
+o EventSource do navegador desiste e o front-end segue no poll de sempre.
+"""
+import json
+import time
+
+from django.core.handlers.asgi import ASGIRequest
+from django.http import HttpResponse, StreamingHttpResponse
+
+from . import realtime
+
+# Comentário SSE periódico: mantém proxies/navegador com a conexão aberta.
+KEEPALIVE_SECONDS = 25
+# Reconecta de tempos em tempos (o navegador refaz sozinho): revalida sessão/permissões.
+MAX_STREAM_SECONDS = 600
+RETRY_MS = 5000
+
+
+def _sse(event_type, data):
+    return f'event: {event_type}\ndata: {json.dumps(data)}\n\n'
+
+
+async def _event_stream(user_id):
+    deadline = time.monotonic() + MAX_STREAM_SECONDS
+    async with realtime.get_broker().subscribe(user_id) as subscription:
+        # "ready" só depois de assinar: nada publicado a partir daqui se perde.
+        yield f'retry: {RETRY_MS}\n' + _sse('ready', {'user_id': user_id})
+        while time.monotonic() < deadline:
+            event = await subscription.get(KEEPALIVE_SECONDS)
+            if event is None:
+                yield ': ping\n\n'
+            else:
+                yield _sse(event.get('type', 'message'), event)
+
+
+async def realtime_events(request):
+    user = await request.auser()
+    if not user.is_authenticated:
+        return HttpResponse(status=401)
+    if not isinstance(request, ASGIRequest) or not realtime.can_stream():
+        return HttpResponse(status=204)
+
+    response = StreamingHttpResponse(_event_stream(user.id), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    # nginx: não acumular o stream em buffer.
+    response['X-Accel-Buffering'] = 'no'
+    return response